@@ -1,5 +1,5 @@
 from django.contrib import admin
-from auditoria.models import AuditMark
+from auditoria.models import AuditMark, RenderJob
 
 
 @admin.register(AuditMark)
@@ -31,4 +31,13 @@ class AuditMarkAdmin(admin.ModelAdmin):
         if len(obj.description) > 50:
             return obj.description[:50] + '...'
         return obj.description
-    description_short.short_description = 'Descripción'
\ No newline at end of file
+    description_short.short_description = 'Descripción'
+
+
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'folder', 'audit', 'requested_by',
+                   'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['filename', 'folder', 'audit__title']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'result_path', 'error']
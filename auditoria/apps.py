@@ -1,5 +1,26 @@
+import logging
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 class AuditoriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'auditoria'
\ No newline at end of file
+    name = 'auditoria'
+
+    def ready(self):
+        # Índice de los árboles de plantillas: evita recorrer el disco en cada descarga
+        from auditoria.utils.template_index import build_template_indexes
+        try:
+            build_template_indexes()
+        except Exception as e:
+            logger.error(f"No se pudo construir el índice de plantillas: {e}")
+
+        # Temporales huérfanos del almacén de .xlsm. Las carpetas de versiones
+        # anteriores (XLSM_OUTPUT_SWEEP_LEGACY_TEMP) solo se barren en el proceso
+        # que procesa archivos con macros, cada XLSM_OUTPUT_JANITOR_INTERVAL segundos
+        from auditoria.excel_utils.xlsm_output_store import get_xlsm_output_store
+        try:
+            get_xlsm_output_store().sweep(include_legacy=False)
+        except Exception as e:
+            logger.error(f"No se pudieron limpiar los temporales de archivos con macros: {e}")
@@ -0,0 +1,27 @@
+"""
+Medición del rendimiento de la generación de documentos (ver `manage.py bench_render`).
+"""
+
+from .synthetic import SyntheticAudit, build_financial_records, build_synthetic_audit
+from .runner import (
+    TemplateCase,
+    benchmark_template,
+    compare_results,
+    iter_template_cases,
+    load_results,
+    run_benchmark,
+    write_results,
+)
+
+__all__ = [
+    'SyntheticAudit',
+    'build_financial_records',
+    'build_synthetic_audit',
+    'TemplateCase',
+    'benchmark_template',
+    'compare_results',
+    'iter_template_cases',
+    'load_results',
+    'run_benchmark',
+    'write_results',
+]
@@ -0,0 +1,246 @@
+"""
+Medición de render_document sobre las plantillas reales.
+
+Para cada tamaño de auditoría sintética y cada plantilla procesable de los
+árboles static/templates_base_* se genera el documento varias veces y se
+registran:
+
+- first: la primera generación, que incluye el parseo y la compilación de la
+  plantilla (cachés por proceso vacías; las cachés en disco pueden existir)
+- warm: la mejor de las repeticiones siguientes
+- peak_kb: el pico de memoria reservada por Python en una generación aparte
+  con tracemalloc (que ralentiza la ejecución y por eso no se cronometra)
+- output_bytes: el tamaño del documento generado
+- stages: los tiempos (ms) de las etapas de auditoria.utils.render_timing en
+  la mejor repetición
+
+Los resultados se guardan en JSON (ver write_results) para compararlos entre
+commits con compare_results.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+
+from auditoria.benchmarks.synthetic import SyntheticAudit
+from auditoria.processors.excel.sheet_processor import get_data_processor_name
+from auditoria.services.document_renderer import get_render_content_type, render_document
+from auditoria.utils.render_timing import render_timing
+from auditoria.utils.template_index import get_templates_base_path
+
+RESULTS_VERSION = 2
+
+TREES = {'financiera': False, 'interna': True}
+
+
+class TemplateCase:
+    """Plantilla a medir."""
+
+    __slots__ = ('path', 'tree', 'name', 'relative_path')
+
+    def __init__(self, path, tree):
+        self.path = path
+        self.tree = tree
+        self.name = os.path.basename(path)
+        self.relative_path = os.path.relpath(path, get_templates_base_path(TREES[tree]))
+
+    @property
+    def key(self):
+        return f"{self.tree}/{self.relative_path}"
+
+    @property
+    def processor(self):
+        """Tipo de archivo y, en Excel, el procesador de datos de la plantilla."""
+        extension = os.path.splitext(self.name)[1].lower()
+        if extension == '.xlsx':
+            return get_data_processor_name(self.name) or 'xlsx'
+        return extension.lstrip('.')
+
+
+def iter_template_cases(trees=TREES, pattern=None, limit=0):
+    """Plantillas procesables de los árboles indicados, en orden estable."""
+    count = 0
+    for tree in trees:
+        base_path = get_templates_base_path(TREES[tree])
+        for root, dirs, files in os.walk(base_path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.startswith('~$') or get_render_content_type(name) is None:
+                    continue
+                case = TemplateCase(os.path.join(root, name), tree)
+                if pattern and pattern.lower() not in case.key.lower():
+                    continue
+                if limit and count >= limit:
+                    return
+                count += 1
+                yield case
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _render_once(case, synthetic):
+    output = io.BytesIO()
+    with contextlib.redirect_stdout(io.StringIO()), render_timing(force=True) as timing:
+        wall, cpu = time.perf_counter(), time.process_time()
+        render_document(
+            case.path, case.name, synthetic.audit, output,
+            financial_data=synthetic.financial_data, marks=synthetic.marks,
+        )
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return wall, cpu, len(output.getvalue()), timing.as_dict()
+
+
+def _peak_memory(case, synthetic):
+    """Pico de memoria (KB) reservada por Python al generar el documento."""
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            render_document(
+                case.path, case.name, synthetic.audit, io.BytesIO(),
+                financial_data=synthetic.financial_data, marks=synthetic.marks,
+            )
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def benchmark_template(case, synthetic, repeat=3, memory=True):
+    """
+    Mide la generación de una plantilla.
+
+    Returns:
+        dict: Resultado de la plantilla (status 'error' con el mensaje si falla)
+    """
+    synthetic.audit.tipoAuditoria = 'I' if TREES[case.tree] else 'F'
+    result = {
+        'template': case.key,
+        'tree': case.tree,
+        'processor': case.processor,
+        'accounts': synthetic.accounts,
+    }
+    try:
+        wall, cpu, size, timing = _render_once(case, synthetic)
+        result['first'] = {'wall_ms': _ms(wall), 'cpu_ms': _ms(cpu)}
+        best = None
+        for _ in range(repeat):
+            run = _render_once(case, synthetic)
+            if best is None or run[0] < best[0]:
+                best = run
+        if best is not None:
+            result['warm'] = {'wall_ms': _ms(best[0]), 'cpu_ms': _ms(best[1])}
+            timing = best[3]
+        result['pipeline'] = timing.get('pipeline')
+        result['stages'] = timing['spans']
+        result['output_bytes'] = size
+        if memory:
+            result['peak_kb'] = _peak_memory(case, synthetic)
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run_benchmark(cases, sizes, auxiliares=None, marks=0, repeat=3, memory=True, progress=None):
+    """
+    Mide todas las plantillas para cada número de cuentas de `sizes`.
+
+    Args:
+        cases: TemplateCase a medir
+        sizes: Números de cuentas por sección y fecha de corte
+        auxiliares: Registros auxiliares, saldos iniciales y ajustes (por defecto igual a las cuentas)
+        marks: Marcas de auditoría, repartidas entre las plantillas
+        repeat: Repeticiones con las cachés ya calientes
+        memory: Si se mide el pico de memoria
+        progress: Función llamada con cada resultado
+
+    Returns:
+        dict: Documento de resultados (ver write_results)
+    """
+    cases = list(cases)
+    work_papers = [os.path.splitext(case.name)[0] for case in cases]
+    results = []
+    for accounts in sizes:
+        synthetic = SyntheticAudit(accounts, auxiliares=auxiliares, marks=marks, work_papers=work_papers)
+        for case in cases:
+            result = benchmark_template(case, synthetic, repeat=repeat, memory=memory)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': {
+            'sizes': list(sizes),
+            'auxiliares': auxiliares,
+            'marks': marks,
+            'repeat': repeat,
+            'memory': memory,
+            'templates': len(cases),
+        },
+        'results': results,
+    }
+
+
+def _git_commit():
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def write_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, metric='warm', field='cpu_ms', threshold=0.1):
+    """
+    Plantillas cuyo tiempo cambia más de `threshold` (fracción) respecto a `baseline`.
+
+    Returns:
+        list: (plantilla, cuentas, antes, después, ratio) ordenadas de peor a mejor
+    """
+    before = {
+        (r['template'], r['accounts']): r[metric][field]
+        for r in baseline['results'] if r.get('status') == 'ok' and metric in r
+    }
+    changes = []
+    for result in current['results']:
+        key = (result['template'], result['accounts'])
+        if result.get('status') != 'ok' or metric not in result or key not in before:
+            continue
+        old, new = before[key], result[metric][field]
+        ratio = new / old if old else float('inf') if new else 1.0
+        if abs(ratio - 1) > threshold:
+            changes.append((key[0], key[1], old, new, ratio))
+    changes.sort(key=lambda change: change[4], reverse=True)
+    return changes
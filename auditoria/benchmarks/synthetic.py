@@ -0,0 +1,160 @@
+"""
+Auditorías sintéticas para medir la generación de documentos.
+
+Los objetos se construyen en memoria y nunca se guardan: la auditoría y su
+jefe son instancias sin guardar, los datos financieros se organizan igual que
+los devuelve auditoria.utils.data_db y las marcas se entregan ya obtenidas a
+render_document, de modo que la medición no consulta ni modifica la base de
+datos.
+"""
+
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+
+from audits.models import Audit
+from auditoria.models import AuditMark
+from auditoria.utils.data_db import organize_financial_data
+
+SECCIONES = ('Activo', 'Pasivo', 'Patrimonio', 'ESTADO DE RESULTADOS')
+
+
+def _fechas_corte(year):
+    """Fechas de corte por tipo de balance: periodo anterior y actual."""
+    return {
+        'ANUAL': (date(year - 1, 12, 31), date(year, 12, 31)),
+        'SEMESTRAL': (date(year, 6, 30), date(year, 12, 31)),
+    }
+
+
+def _tipo_cuenta(seccion, index):
+    if seccion in ('Activo', 'Pasivo'):
+        return 'Corriente' if index % 2 == 0 else 'No Corriente'
+    return 'NT'
+
+
+def build_account_names(accounts):
+    """Nombres de las `accounts` cuentas sintéticas de cada sección."""
+    return {
+        seccion: [f"{seccion.title()} cuenta {index + 1:04d}" for index in range(accounts)]
+        for seccion in SECCIONES
+    }
+
+
+def build_financial_records(accounts, auxiliares=None, year=2024):
+    """
+    Registros serializados como los de data_db.get_all_financial_data.
+
+    Args:
+        accounts: Cuentas por sección y fecha de corte
+        auxiliares: Registros auxiliares, saldos iniciales y ajustes
+            (por defecto uno por cuenta de Activo)
+        year: Año del periodo actual
+
+    Returns:
+        dict: balances, registros_auxiliares, saldos_iniciales y ajustes_reclasificaciones
+    """
+    names = build_account_names(accounts)
+    if auxiliares is None:
+        auxiliares = accounts
+
+    balances = []
+    for tipo_balance, fechas in _fechas_corte(year).items():
+        for periodo, fecha in enumerate(fechas):
+            for seccion in SECCIONES:
+                for index, nombre in enumerate(names[seccion]):
+                    balances.append({
+                        'tipo_balance': tipo_balance,
+                        'fecha_corte': fecha.isoformat(),
+                        'seccion': seccion,
+                        'nombre_cuenta': nombre,
+                        'tipo_cuenta': _tipo_cuenta(seccion, index),
+                        'valor': float(1000 * (index + 1) + 100 * periodo),
+                    })
+    balances.sort(key=lambda b: (b['tipo_balance'], b['fecha_corte'], b['seccion'], b['nombre_cuenta']))
+
+    # Auxiliares, saldos iniciales y ajustes sobre las mismas cuentas para que se crucen con los balances
+    cuentas = [nombre for seccion in SECCIONES for nombre in names[seccion]][:auxiliares]
+    fecha_inicial = _fechas_corte(year)['ANUAL'][0].isoformat()
+    return {
+        'balances': balances,
+        'registros_auxiliares': [
+            {'cuenta': cuenta, 'saldo': float(500 * (index + 1))} for index, cuenta in enumerate(cuentas)
+        ],
+        'saldos_iniciales': [
+            {'cuenta': cuenta, 'saldo': float(250 * (index + 1)), 'fecha_corte': fecha_inicial}
+            for index, cuenta in enumerate(cuentas)
+        ],
+        'ajustes_reclasificaciones': [
+            {'cuenta': cuenta, 'debe': float(10 * (index + 1)), 'haber': float(5 * (index + 1))}
+            for index, cuenta in enumerate(cuentas)
+        ],
+    }
+
+
+def build_synthetic_audit(audit_id=0, year=2024, internal=False):
+    """Auditoría sin guardar con un jefe de auditoría también sin guardar."""
+    manager = get_user_model()(first_name='Ana', last_name='Pérez', email='bench@example.com')
+    audit = Audit(
+        id=audit_id,
+        title=f'Auditoría sintética {year}',
+        identidad='Empresa Sintética, S.A.',
+        fechaInit=datetime(year, 1, 1),
+        fechaEnd=datetime(year, 12, 31),
+        tipoAuditoria='I' if internal else 'F',
+        moneda='GTQ',
+    )
+    audit.audit_manager = manager
+    return audit
+
+
+def build_audit_marks(audit, work_papers, marks):
+    """
+    `marks` marcas activas repartidas entre los papeles de trabajo `work_papers`
+    (nombres de plantilla), como las devolvería AuditMarkProcessor.get_active_marks.
+    """
+    if not work_papers or marks <= 0:
+        return []
+    step = max(len(work_papers) / marks, 1)
+    result = []
+    for index in range(marks):
+        work_paper = work_papers[int(index * step) % len(work_papers)]
+        result.append(AuditMark(
+            audit=audit,
+            symbol=f'M{index + 1}',
+            description=f'Marca sintética {index + 1}',
+            work_paper_number=work_paper,
+            category='Benchmark',
+            is_active=True,
+        ))
+    return result
+
+
+class SyntheticAudit:
+    """
+    Auditoría sintética con sus datos financieros y marcas.
+
+    Args:
+        accounts: Cuentas por sección y fecha de corte
+        auxiliares: Registros auxiliares, saldos iniciales y ajustes (por defecto `accounts`)
+        marks: Marcas de auditoría
+        work_papers: Nombres de plantilla entre los que se reparten las marcas
+        year: Año del periodo actual
+    """
+
+    def __init__(self, accounts, auxiliares=None, marks=0, work_papers=(), year=2024):
+        self.accounts = accounts
+        self.auxiliares = accounts if auxiliares is None else auxiliares
+        self.audit = build_synthetic_audit(year=year)
+        self.financial_data = organize_financial_data(
+            build_financial_records(accounts, self.auxiliares, year=year)
+        )
+        self.marks = build_audit_marks(self.audit, list(work_papers), marks)
+
+    def describe(self):
+        return {
+            'accounts': self.accounts,
+            'auxiliares': self.auxiliares,
+            'marks': len(self.marks),
+            'balances': len(self.financial_data['balances']),
+        }
@@ -3,7 +3,6 @@ Utilidades modularizadas para procesamiento de documentos Excel.
 Funciones principales para modificar documentos Excel normales y con macros.
 """
 
-from openpyxl import load_workbook
 from .date_formatter import format_audit_dates
 from .xlsm_processor import modify_document_excel_with_macros
 from ..processors.excel.sheet_processor import process_excel_sheets
@@ -12,27 +11,33 @@ from ..utils.replacements_utils import (
     get_tables_config,
     build_replacements_dict,
 )
-from ..utils.data_db import get_all_financial_data
+from ..utils.data_db import LazyFinancialData
+from ..utils.template_cache import load_template_workbook
+from ..services.placeholder_manifest import get_workbook_manifest
 
-def modify_document_excel(template_path, audit):
+def modify_document_excel(template_path, audit, financial_data=None):
     """
     Modifica un documento Excel (.xlsx) aplicando reemplazos y procesando hojas.
     
     Args:
         template_path: Ruta al archivo Excel template
         audit: Objeto Audit con los datos para reemplazar
+        financial_data: Datos financieros organizados ya obtenidos (opcional,
+            p. ej. un LazyFinancialData compartido). Si no se indica, solo se
+            consultan los conjuntos que necesita el procesador de la plantilla.
         
     Returns:
         Workbook: Objeto openpyxl Workbook procesado
     """
-    wb = load_workbook(template_path)
+    # Copia de trabajo de la plantilla (parseada una sola vez por proceso)
+    wb = load_template_workbook(template_path)
+    manifest = get_workbook_manifest(template_path, wb)
 
     # Formatear fechas de auditoría
     fecha_inicio, fecha_fin = format_audit_dates(audit)
 
-    # Obtener datos financieros
-    financial_data = get_all_financial_data(audit.id)
-    data_bd = financial_data['organized']
+    # Datos financieros: se consultan al usarlos
+    data_bd = financial_data if financial_data is not None else LazyFinancialData(audit.id)
     
     # Obtener configuraciones
     replacements_config = get_replacements_config()
@@ -46,10 +51,8 @@ def modify_document_excel(template_path, audit):
         fecha_fin=fecha_fin,
     )
     
-    print(data_bd)
-    
     # Procesar el documento Excel
-    process_excel_sheets(wb, tables_config, replacements, data_bd, template_path)
+    process_excel_sheets(wb, tables_config, replacements, data_bd, template_path, manifest=manifest)
     
     return wb
 
@@ -1,65 +1,74 @@
 """
 Reemplazador de texto en archivos XLSM usando manipulación directa de XML.
 Funciona como fallback cuando xlwings no está disponible.
+
+Solo se descomprimen las partes XML con texto (cadenas compartidas, hojas y
+dibujos); los reemplazos se aplican a cada una en una sola pasada con
+CompiledReplacer, y las partes que no cambian, las macros (vbaProject.bin) y
+las imágenes se copian con sus bytes comprimidos originales.
 """
 
+import logging
 import zipfile
 
-def replace_in_xlsm_shared_strings(src_path: str, dst_path: str, replacements: dict):
+from ..processors.shared.text_replacer import get_compiled_replacer
+from ..utils.template_bytes import open_template
+from ..utils.zip_utils import RawZipWriter, read_raw_members
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_text_replace(filename):
+    """Si el miembro del ZIP puede contener placeholders."""
+    return (
+        filename == 'xl/sharedStrings.xml' or
+        (filename.startswith('xl/worksheets/') and filename.endswith('.xml')) or
+        (filename.startswith('xl/drawings/') and filename.endswith('.xml'))
+    )
+
+
+def replace_in_xlsm_shared_strings(src_path: str, output, replacements: dict):
     """
     Copia un .xlsm y reemplaza placeholders en:
     - xl/sharedStrings.xml
     - xl/worksheets/*.xml (inlineStr y headerFooter)
     - xl/drawings/*.xml (textos en shapes)
-    Devuelve una copia con reemplazos sin tocar macros.
+    Escribe una copia con reemplazos sin tocar macros.
     
     Args:
         src_path: Ruta del archivo XLSM origen
-        dst_path: Ruta del archivo XLSM destino
-        replacements: Diccionario con los reemplazos a aplicar
+        output: Objeto tipo archivo binario donde se escribe el resultado
+        replacements: Diccionario con los reemplazos a aplicar (en orden, como str.replace)
         
     Returns:
-        None (modifica el archivo destino)
+        list: Miembros del ZIP modificados
     """
-    total_hits = 0
+    replacer = get_compiled_replacer({k: v for k, v in replacements.items() if k})
     files_touched = []
-    
-    with zipfile.ZipFile(src_path, 'r') as zin, zipfile.ZipFile(dst_path, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
-        for item in zin.infolist():
-            data = zin.read(item.filename)
-            
-            # Determinar si el archivo necesita procesamiento de texto
-            needs_text_replace = (
-                item.filename == 'xl/sharedStrings.xml' or
-                (item.filename.startswith('xl/worksheets/') and item.filename.endswith('.xml')) or
-                (item.filename.startswith('xl/drawings/') and item.filename.endswith('.xml'))
-            )
-            
-            if needs_text_replace:
-                try:
-                    text = data.decode('utf-8')
-                except UnicodeDecodeError:
-                    text = data.decode('utf-8', errors='ignore')
-                
-                file_hits = 0
-                for k, v in replacements.items():
-                    if not isinstance(v, str):
-                        v = str(v)
-                    if not k:
+
+    with open_template(src_path) as src:
+        members = read_raw_members(src)
+        writer = RawZipWriter(output)
+        with zipfile.ZipFile(src) as zin:
+            for member in members:
+                if _needs_text_replace(member.filename):
+                    data = zin.read(member.filename)
+                    try:
+                        text = data.decode('utf-8')
+                    except UnicodeDecodeError:
+                        text = data.decode('utf-8', errors='ignore')
+
+                    new_text = replacer.replace(text)
+                    if new_text != text:
+                        files_touched.append(member.filename)
+                        writer.write(member.filename, new_text.encode('utf-8'), date_time=member.date_time)
                         continue
-                    
-                    occurrences = text.count(k)
-                    if occurrences:
-                        text = text.replace(k, v)
-                        file_hits += occurrences
-                
-                if file_hits:
-                    files_touched.append((item.filename, file_hits))
-                    total_hits += file_hits
-                
-                data = text.encode('utf-8')
-            
-            zout.writestr(item, data)
+                writer.copy_raw(src, member)
+        writer.close()
+
+    logger.debug(f"XLSM {src_path}: partes modificadas {files_touched}")
+    return files_touched
+
 
 def build_filtered_replacements(replacements_all: dict) -> dict:
     """
@@ -0,0 +1,293 @@
+"""
+Generación rápida de plantillas Excel (.xlsx) que solo llevan reemplazos de texto.
+
+Cuando ningún procesador de datos de process_excel_sheets reclama la plantilla,
+el único trabajo real es reemplazar placeholders en las celdas de texto. En
+lugar de load_workbook + recorrer todas las celdas + wb.save, se reescriben
+solo las entradas afectadas de xl/sharedStrings.xml y las celdas de texto en
+línea, y el resto de miembros del ZIP se copian sin descomprimir.
+
+La clasificación de cada plantilla se calcula una vez (clave: ruta + mtime +
+tamaño + disparadores de la configuración) y guarda qué cadenas compartidas y
+qué hojas contienen algún disparador (clave de reemplazo, patrón exacto o
+patrón de tablas.json). Solo esas se procesan en cada descarga.
+
+No se usa la ruta rápida (se genera con openpyxl) cuando:
+- La plantilla tiene un procesador de datos financieros
+- Alguna fórmula contiene un disparador (openpyxl también reemplaza fórmulas)
+- Un valor reemplazado no puede escribirse como texto simple (empieza por '=',
+  es un código de error de Excel o tiene caracteres ilegales)
+"""
+
+import os
+import re
+import logging
+import threading
+import zipfile
+from xml.sax.saxutils import escape, unescape
+
+from django.conf import settings
+from lxml import etree
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, ERROR_CODES
+from openpyxl.cell.text import Text
+from openpyxl.xml.constants import SHEET_MAIN_NS
+
+from .date_formatter import format_audit_dates
+from ..processors.excel.sheet_processor import get_data_processor_name, replace_cell_value
+from ..processors.shared.text_replacer import get_compiled_replacer
+from ..utils.replacements_utils import (
+    get_replacements_config, get_tables_config, build_replacements_dict, get_replacement_triggers
+)
+from ..utils.template_bytes import open_template
+from ..utils.zip_utils import RawZipWriter, read_raw_members
+
+logger = logging.getLogger(__name__)
+
+_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_REL_TYPE_BASE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+_CELL_TAG = f'{{{SHEET_MAIN_NS}}}c'
+_FORMULA_TAG = f'{{{SHEET_MAIN_NS}}}f'
+_VALUE_TAG = f'{{{SHEET_MAIN_NS}}}v'
+_INLINE_TAG = f'{{{SHEET_MAIN_NS}}}is'
+_TEXT_TAG = f'{{{SHEET_MAIN_NS}}}t'
+_SPACE_ATTR = '{http://www.w3.org/XML/1998/namespace}space'
+
+_SHARED_STRING_RE = re.compile(rb'<(\w+:)?si\b(?:[^>]*/>|.*?</(?:\w+:)?si>)', re.DOTALL)
+_FORMULA_RE = re.compile(rb'<(?:\w+:)?f\b(?:[^>]*/>|[^>]*>(.*?)</(?:\w+:)?f>)', re.DOTALL)
+_XML_ENTITIES = {'&quot;': '"', '&apos;': "'"}
+
+
+class WorkbookTemplateInfo:
+    """
+    Clasificación de una plantilla Excel.
+
+    Attributes:
+        text_only: Si puede generarse con la ruta rápida
+        reason: Motivo por el que no puede (si text_only es False)
+        shared_strings: Miembro del ZIP con las cadenas compartidas (o None)
+        string_spans: {índice: (inicio, fin, prefijo, texto)} de las cadenas con disparadores
+        inline_sheets: Hojas con celdas de texto en línea que contienen disparadores
+    """
+
+    __slots__ = ('text_only', 'reason', 'shared_strings', 'string_spans', 'inline_sheets')
+
+    def __init__(self, text_only, reason=None, shared_strings=None, string_spans=None, inline_sheets=()):
+        self.text_only = text_only
+        self.reason = reason
+        self.shared_strings = shared_strings
+        self.string_spans = string_spans or {}
+        self.inline_sheets = tuple(inline_sheets)
+
+
+def _contains_trigger(text, triggers):
+    return any(trigger in text for trigger in triggers)
+
+
+def _inline_cells(root):
+    """Celdas de texto en línea o 'str' sin fórmula con el texto que ve openpyxl."""
+    for cell in root.iter(_CELL_TAG):
+        data_type = cell.get('t')
+        if data_type == 'inlineStr':
+            inline = cell.find(_INLINE_TAG)
+            if inline is not None:
+                yield cell, Text.from_tree(inline).content
+        elif data_type == 'str' and cell.find(_FORMULA_TAG) is None:
+            value = cell.findtext(_VALUE_TAG)
+            if value:
+                yield cell, value
+
+
+def _workbook_members(zf):
+    """Devuelve (cadenas compartidas, [hojas]) según las relaciones del libro."""
+    rels = etree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    shared_strings = None
+    worksheets = []
+    for rel in rels.iter(f'{_REL_NS}Relationship'):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target', '')
+        member = target.lstrip('/') if target.startswith('/') else os.path.normpath(
+            os.path.join('xl', target)).replace(os.sep, '/')
+        rel_type = rel.get('Type', '')
+        if rel_type == _REL_TYPE_BASE + 'sharedStrings':
+            shared_strings = member
+        elif rel_type == _REL_TYPE_BASE + 'worksheet':
+            worksheets.append(member)
+    return shared_strings, worksheets
+
+
+def classify_workbook_template(template_path):
+    """Clasifica la plantilla (ver WorkbookTemplateInfo)."""
+    processor = get_data_processor_name(os.path.basename(template_path))
+    if processor:
+        return WorkbookTemplateInfo(False, f"Procesador de datos: {processor}")
+
+    triggers = get_replacement_triggers(get_replacements_config(), get_tables_config())
+
+    with zipfile.ZipFile(template_path) as zf:
+        shared_strings, worksheets = _workbook_members(zf)
+
+        string_spans = {}
+        if shared_strings:
+            data = zf.read(shared_strings)
+            spans = list(_SHARED_STRING_RE.finditer(data))
+            items = etree.fromstring(data).findall(f'{{{SHEET_MAIN_NS}}}si')
+            if len(spans) != len(items):
+                return WorkbookTemplateInfo(False, "Formato de sharedStrings no reconocido")
+            for index, (span, item) in enumerate(zip(spans, items)):
+                text = Text.from_tree(item).content
+                if not _contains_trigger(text, triggers):
+                    continue
+                if 'x005F_' in text:
+                    return WorkbookTemplateInfo(False, "Cadenas con secuencias de escape de Excel")
+                prefix = (span.group(1) or b'').decode('ascii')
+                string_spans[index] = (span.start(), span.end(), prefix, text)
+
+        inline_sheets = []
+        for sheet in worksheets:
+            data = zf.read(sheet)
+            for match in _FORMULA_RE.finditer(data):
+                formula = unescape((match.group(1) or b'').decode('utf-8'), _XML_ENTITIES)
+                if _contains_trigger('=' + formula, triggers):
+                    return WorkbookTemplateInfo(False, f"Fórmula con placeholders en {sheet}")
+            if b'inlineStr' in data or b't="str"' in data:
+                root = etree.fromstring(data)
+                if any(_contains_trigger(text, triggers) for _, text in _inline_cells(root)):
+                    inline_sheets.append(sheet)
+
+    return WorkbookTemplateInfo(True, None, shared_strings, string_spans, inline_sheets)
+
+
+_classifications = {}
+_classifications_lock = threading.Lock()
+
+
+def get_workbook_template_info(template_path):
+    """Clasificación memorizada por (ruta, mtime, tamaño, disparadores)."""
+    stat = os.stat(template_path)
+    triggers = get_replacement_triggers(get_replacements_config(), get_tables_config())
+    key = (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size, hash(triggers))
+    info = _classifications.get(key)
+    if info is None:
+        try:
+            info = classify_workbook_template(template_path)
+        except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+            info = WorkbookTemplateInfo(False, f"Plantilla no legible: {e}")
+        if not info.text_only:
+            logger.info(f"Plantilla Excel con generación completa {os.path.basename(template_path)}: {info.reason}")
+        with _classifications_lock:
+            _classifications[key] = info
+    return info
+
+
+def is_text_only_workbook(template_path):
+    """Indica si la plantilla puede generarse con write_text_only_workbook."""
+    if not getattr(settings, 'XLSX_TEXT_FAST_PATH_ENABLED', True):
+        return False
+    return get_workbook_template_info(template_path).text_only
+
+
+def _is_plain_text(value):
+    """Si openpyxl guardaría el valor como texto sin cambiar su tipo."""
+    if not isinstance(value, str):
+        return False
+    if value.startswith('=') and len(value) > 1:
+        return False
+    return value not in ERROR_CODES and not ILLEGAL_CHARACTERS_RE.search(value)
+
+
+def _text_element(tag, value):
+    attrs = ' xml:space="preserve"' if value.strip() != value else ''
+    return f'<{tag}{attrs}>{escape(value)}</{tag}>'
+
+
+def _rewrite_inline_sheet(data, replace):
+    """Aplica `replace` a las celdas en línea de una hoja; None si algún valor no es texto simple."""
+    root = etree.fromstring(data)
+    changed = False
+    for cell, text in list(_inline_cells(root)):
+        new_value = replace(text)
+        if new_value is None or new_value == text:
+            continue
+        if not _is_plain_text(new_value):
+            return None
+        if cell.get('t') == 'inlineStr':
+            inline = cell.find(_INLINE_TAG)
+            for child in list(inline):
+                inline.remove(child)
+            element = etree.SubElement(inline, _TEXT_TAG)
+        else:
+            element = cell.find(_VALUE_TAG)
+        element.text = new_value
+        if new_value.strip() != new_value:
+            element.set(_SPACE_ATTR, 'preserve')
+        changed = True
+    if not changed:
+        return data
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def write_text_only_workbook(template_path, audit, output):
+    """
+    Genera la plantilla aplicando los reemplazos de texto de la auditoría y lo
+    escribe en `output`.
+
+    Devuelve False, sin escribir nada, si el resultado debe generarse con openpyxl.
+    """
+    info = get_workbook_template_info(template_path)
+    if not info.text_only:
+        return False
+
+    fecha_inicio, fecha_fin = format_audit_dates(audit)
+    replacements = get_compiled_replacer(
+        build_replacements_dict(get_replacements_config(), audit, fecha_inicio, fecha_fin)
+    )
+    tables_config = get_tables_config()
+    patrones_exactos = tables_config.get('patrones_exactos', {})
+    patrones_regex = tables_config.get('patrones_regex', {})
+
+    def replace(text):
+        return replace_cell_value(text, replacements, patrones_exactos, patrones_regex)
+
+    rewritten = {}
+    with open_template(template_path) as src:
+        members = read_raw_members(src)
+        with zipfile.ZipFile(src) as zf:
+            if info.string_spans:
+                data = zf.read(info.shared_strings)
+                pieces = []
+                position = 0
+                for index in sorted(info.string_spans):
+                    start, end, prefix, text = info.string_spans[index]
+                    new_value = replace(text)
+                    if new_value is None or new_value == text:
+                        continue
+                    if not _is_plain_text(new_value):
+                        return False
+                    pieces.append(data[position:start])
+                    pieces.append(
+                        f'<{prefix}si>{_text_element(prefix + "t", new_value)}</{prefix}si>'.encode('utf-8')
+                    )
+                    position = end
+                if pieces:
+                    pieces.append(data[position:])
+                    rewritten[info.shared_strings] = b''.join(pieces)
+
+            for sheet in info.inline_sheets:
+                data = zf.read(sheet)
+                new_data = _rewrite_inline_sheet(data, replace)
+                if new_data is None:
+                    return False
+                if new_data is not data:
+                    rewritten[sheet] = new_data
+
+        writer = RawZipWriter(output)
+        for member in members:
+            if member.filename in rewritten:
+                writer.write(member.filename, rewritten[member.filename], date_time=member.date_time)
+            else:
+                writer.copy_raw(src, member)
+        writer.close()
+
+    logger.debug(f"Plantilla Excel generada por la ruta rápida: {os.path.basename(template_path)}")
+    return True
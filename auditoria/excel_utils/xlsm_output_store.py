@@ -0,0 +1,198 @@
+"""
+Almacén en disco de los archivos con macros (.xlsm) ya procesados.
+
+El procesamiento de un .xlsm (por XML o con xlwings) deja el resultado en un
+archivo. Antes cada descarga creaba una carpeta con tempfile.mkdtemp() que no
+se eliminaba nunca, de modo que cada clic dejaba una copia nueva de varios MB
+en el directorio temporal.
+
+Los resultados se guardan ahora en XLSM_OUTPUT_DIR con una clave calculada a
+partir del hash de la plantilla y de los reemplazos aplicados: si ya existe un
+resultado para la misma plantilla y los mismos reemplazos se reutiliza sin
+volver a procesarla. El tamaño total se limita a XLSM_OUTPUT_MAX_BYTES con
+desalojo LRU (DiskCache), y un barrido periódico elimina los archivos
+temporales huérfanos (procesos interrumpidos). Las carpetas que dejaron las
+versiones anteriores en el directorio temporal del sistema solo se eliminan
+con XLSM_OUTPUT_SWEEP_LEGACY_TEMP.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+from django.conf import settings
+
+from ..services.render_cache import get_template_hash
+from ..utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Incrementar cuando cambie el procesamiento de los .xlsm para descartar resultados previos
+XLSM_OUTPUT_VERSION = 1
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class XlsmOutputStore(DiskCache):
+    """
+    DiskCache de resultados .xlsm que se generan escribiendo en una ruta.
+
+    Args:
+        directory: Carpeta del almacén
+        max_bytes: Tamaño total máximo antes de desalojar
+        orphan_max_age: Segundos tras los que un temporal sin terminar se considera huérfano
+        legacy_temp_dir: Carpeta donde las versiones anteriores creaban sus
+            temporales; si es None no se barre
+    """
+
+    def __init__(self, directory, max_bytes, orphan_max_age=3600, legacy_temp_dir=None):
+        super().__init__(directory, max_bytes)
+        self.orphan_max_age = orphan_max_age
+        self.legacy_temp_dir = legacy_temp_dir
+        self._last_sweep = 0.0
+
+    def owns(self, path):
+        """Si `path` es un archivo del almacén (no debe eliminarlo quien lo recibe)."""
+        directory = os.path.abspath(self.directory) + os.sep
+        return os.path.abspath(path).startswith(directory)
+
+    def get_or_create(self, key, produce, filename):
+        """
+        Devuelve la ruta del resultado guardado bajo `key`, generándolo si no existe.
+
+        `produce(path)` debe escribir el resultado en `path`, una ruta nueva con
+        el nombre `filename` (xlwings necesita la extensión para abrir el libro).
+        La ruta devuelta puede desalojarse más adelante: quien la recibe debe
+        abrirla enseguida y no eliminarla.
+        """
+        path = self.get(key)
+        if path is not None:
+            logger.debug(f"Resultado XLSM reutilizado para {filename}")
+            return path
+
+        work_dir = os.path.join(self._tmp_dir(), uuid.uuid4().hex)
+        os.makedirs(work_dir)
+        try:
+            work_path = os.path.join(work_dir, filename)
+            produce(work_path)
+            return self._commit(key, work_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Barrido de huérfanos
+    # ------------------------------------------------------------------
+    def sweep(self, include_legacy=True):
+        """
+        Elimina los temporales huérfanos del almacén y, si se indicó
+        legacy_temp_dir e `include_legacy`, las carpetas de tempfile.mkdtemp()
+        con resultados .xlsm de versiones anteriores, y desaloja si se supera
+        el tamaño máximo.
+
+        Returns:
+            int: Número de temporales eliminados
+        """
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - self.orphan_max_age
+        removed = 0
+
+        for entry in _scandir_quietly(self._tmp_dir()):
+            if _mtime(entry) < cutoff:
+                removed += _remove_entry(entry)
+
+        for entry in _scandir_quietly(self.legacy_temp_dir) if include_legacy and self.legacy_temp_dir else ():
+            if (entry.name.startswith('tmp') and entry.is_dir(follow_symlinks=False)
+                    and _mtime(entry) < cutoff and _is_legacy_xlsm_dir(entry.path)):
+                removed += _remove_entry(entry)
+
+        if removed:
+            logger.info(f"Almacén XLSM {self.directory}: {removed} temporales huérfanos eliminados")
+        self.evict()
+        return removed
+
+    def sweep_if_due(self, interval):
+        """Ejecuta sweep() si han pasado `interval` segundos desde el anterior."""
+        if interval > 0 and time.monotonic() - self._last_sweep >= interval:
+            self.sweep()
+
+
+def _scandir_quietly(directory):
+    try:
+        return list(os.scandir(directory))
+    except OSError:
+        return []
+
+
+def _mtime(entry):
+    try:
+        return entry.stat(follow_symlinks=False).st_mtime
+    except OSError:
+        return float('inf')
+
+
+def _remove_entry(entry):
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path, ignore_errors=True)
+        return 0 if os.path.exists(entry.path) else 1
+    return 1 if DiskCache._remove_quietly(entry.path) else 0
+
+
+def _is_legacy_xlsm_dir(path):
+    """Carpeta de mkdtemp() que solo contiene un resultado .xlsm (y el bloqueo de Excel)."""
+    entries = _scandir_quietly(path)
+    return bool(entries) and all(
+        entry.is_file(follow_symlinks=False) and entry.name.lower().endswith('.xlsm')
+        for entry in entries
+    )
+
+
+def get_xlsm_output_store():
+    """Devuelve la instancia de XlsmOutputStore del proceso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = XlsmOutputStore(
+                    settings.XLSM_OUTPUT_DIR,
+                    settings.XLSM_OUTPUT_MAX_BYTES,
+                    orphan_max_age=settings.XLSM_OUTPUT_ORPHAN_MAX_AGE,
+                    legacy_temp_dir=tempfile.gettempdir() if settings.XLSM_OUTPUT_SWEEP_LEGACY_TEMP else None,
+                )
+    return _store
+
+
+def build_xlsm_output_key(template_path, processor, replacements):
+    """
+    Clave del resultado de aplicar `replacements` a la plantilla con el
+    procesador indicado ('xml' o 'xlwings').
+    """
+    parts = (
+        f"v{XLSM_OUTPUT_VERSION}",
+        processor,
+        get_template_hash(template_path),
+        os.path.basename(template_path),
+        repr(list(replacements.items())),
+    )
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_or_create_xlsm_output(template_path, processor, replacements, produce):
+    """
+    Ruta del resultado de procesar la plantilla con `replacements`,
+    reutilizando uno anterior si existe (ver XlsmOutputStore.get_or_create).
+    """
+    store = get_xlsm_output_store()
+    store.sweep_if_due(settings.XLSM_OUTPUT_JANITOR_INTERVAL)
+    key = build_xlsm_output_key(template_path, processor, replacements)
+    return store.get_or_create(key, produce, os.path.basename(template_path))
+
+
+def is_xlsm_output(path):
+    """Si `path` pertenece al almacén de resultados .xlsm."""
+    return get_xlsm_output_store().owns(path)
@@ -3,11 +3,10 @@ Procesador principal para archivos Excel con macros (.xlsm).
 Coordina entre xlwings y fallback de manipulación XML.
 """
 
-import tempfile
-import os
 from .date_formatter import format_audit_dates
 from .xlwings_handler import process_xlsm_with_xlwings, is_xlwings_available
 from .shared_strings_replacer import replace_in_xlsm_shared_strings, build_filtered_replacements
+from .xlsm_output_store import get_or_create_xlsm_output
 from ..utils.replacements_utils import (
     get_replacements_config,
     build_replacements_dict,
@@ -23,7 +22,8 @@ def modify_document_excel_with_macros(template_path, audit):
         audit: Objeto Audit con los datos para reemplazar
         
     Returns:
-        string: Ruta al archivo procesado (puede ser el mismo o un temporal)
+        string: Ruta al archivo procesado (la plantilla o un resultado del almacén
+            de xlsm_output_store, que no debe eliminarse)
     """
     if not is_xlwings_available():
         return _process_xlsm_fallback(template_path, audit)
@@ -53,12 +53,12 @@ def _process_xlsm_fallback(template_path: str, audit) -> str:
         # Filtrar reemplazos para XLSM
         filtered_repl = build_filtered_replacements(replacements_all)
         
-        # Crear archivo temporal destino (mismo nombre)
-        temp_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_dir, os.path.basename(template_path))
-        
-        replace_in_xlsm_shared_strings(template_path, temp_file_path, filtered_repl)
-        return temp_file_path
+        def produce(output_path):
+            with open(output_path, 'wb') as output:
+                replace_in_xlsm_shared_strings(template_path, output, filtered_repl)
+
+        # Se reutiliza el resultado anterior si la plantilla y los reemplazos no cambiaron
+        return get_or_create_xlsm_output(template_path, 'xml', filtered_repl, produce)
         
     except Exception:
         return template_path
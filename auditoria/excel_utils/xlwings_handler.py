@@ -3,8 +3,6 @@ Manejador de xlwings para procesamiento de archivos Excel con macros.
 Contiene funciones para aplicar reemplazos usando xlwings preservando macros.
 """
 
-import tempfile
-import os
 import shutil
 
 try:
@@ -12,6 +10,8 @@ try:
 except ImportError:
     xw = None
 
+from .xlsm_output_store import get_or_create_xlsm_output
+
 def process_xlsm_with_xlwings(template_path: str, replacements: dict) -> str:
     """
     Procesa un archivo XLSM usando xlwings para preservar macros.
@@ -21,7 +21,7 @@ def process_xlsm_with_xlwings(template_path: str, replacements: dict) -> str:
         replacements: Diccionario con los reemplazos a aplicar
         
     Returns:
-        str: Ruta al archivo procesado (temporal)
+        str: Ruta al archivo procesado, guardado en el almacén de xlsm_output_store
         
     Raises:
         Exception: Si xlwings no está disponible o hay errores en el procesamiento
@@ -29,17 +29,24 @@ def process_xlsm_with_xlwings(template_path: str, replacements: dict) -> str:
     if xw is None:
         raise Exception("xlwings no está instalado")
     
-    # Crear un archivo temporal con el mismo nombre que el original
-    temp_dir = tempfile.mkdtemp()
-    temp_file_path = os.path.join(temp_dir, os.path.basename(template_path))
-    
-    # Copiar el archivo original al temporal
-    shutil.copy2(template_path, temp_file_path)
+    # Se reutiliza el resultado anterior si la plantilla y los reemplazos no cambiaron
+    return get_or_create_xlsm_output(
+        template_path, 'xlwings', replacements,
+        lambda output_path: _process_copy(template_path, output_path, replacements)
+    )
+
+def _process_copy(template_path: str, output_path: str, replacements: dict):
+    """
+    Copia la plantilla en `output_path` (con el mismo nombre que el original)
+    y aplica los reemplazos sobre la copia con xlwings.
+    """
+    # Copiar el archivo original al destino
+    shutil.copy2(template_path, output_path)
     
     # Usar xlwings para aplicar los reemplazos y preservar macros
     app = xw.App(visible=False)
     try:
-        wb = app.books.open(temp_file_path)
+        wb = app.books.open(output_path)
         
         # Aplicar solo los reemplazos básicos en todas las hojas
         for sheet in wb.sheets:
@@ -48,7 +55,6 @@ def process_xlsm_with_xlwings(template_path: str, replacements: dict) -> str:
         # Guardar y cerrar
         wb.save()
         wb.close()
-        return temp_file_path
         
     finally:
         app.quit()
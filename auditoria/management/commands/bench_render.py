@@ -0,0 +1,120 @@
+"""
+Mide la generación de documentos con auditorías sintéticas sobre todas las plantillas.
+
+Uso:
+    python manage.py bench_render                                # 50 cuentas por sección
+    python manage.py bench_render --accounts 10 100 1000         # Varios tamaños
+    python manage.py bench_render --tree financiera --filter CENTRALIZADORA
+    python manage.py bench_render --output antes.json
+    python manage.py bench_render --output despues.json --compare antes.json
+
+No consulta ni modifica la base de datos (ver auditoria.benchmarks.synthetic).
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria.benchmarks import (
+    compare_results,
+    iter_template_cases,
+    load_results,
+    run_benchmark,
+    write_results,
+)
+from auditoria.benchmarks.runner import TREES
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo, la memoria y el tamaño de salida de cada plantilla con auditorías sintéticas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, nargs='+', default=[50],
+                            help='Cuentas por sección y fecha de corte (uno o varios tamaños)')
+        parser.add_argument('--auxiliares', type=int, default=None,
+                            help='Registros auxiliares, saldos iniciales y ajustes (por defecto igual a las cuentas)')
+        parser.add_argument('--marks', type=int, default=20, help='Marcas de auditoría repartidas entre las plantillas')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones con las cachés calientes')
+        parser.add_argument('--tree', choices=sorted(TREES), action='append',
+                            help='Árbol de plantillas (por defecto ambos)')
+        parser.add_argument('--filter', default=None, help='Solo plantillas cuya ruta contiene este texto')
+        parser.add_argument('--limit', type=int, default=0, help='Máximo de plantillas (0 = todas)')
+        parser.add_argument('--no-memory', action='store_true', help='No medir el pico de memoria')
+        parser.add_argument('--output', default=None, help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--compare', default=None, help='Resultados JSON anteriores con los que comparar')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Cambio relativo mínimo que se informa al comparar')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_results(options['compare'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudieron leer los resultados {options['compare']}: {e}")
+
+        cases = list(iter_template_cases(
+            trees=options['tree'] or list(TREES), pattern=options['filter'], limit=options['limit'],
+        ))
+        if not cases:
+            raise CommandError("Ninguna plantilla coincide con los filtros")
+        self.stdout.write(f"{len(cases)} plantillas, tamaños {options['accounts']}")
+
+        if options['verbosity'] < 2:
+            # Los procesadores registran cada reemplazo y cada aviso de plantilla
+            logging.disable(logging.WARNING)
+        try:
+            results = run_benchmark(
+                cases, options['accounts'],
+                auxiliares=options['auxiliares'], marks=options['marks'],
+                repeat=options['repeat'], memory=not options['no_memory'],
+                progress=self._report,
+            )
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self._summary(results)
+        if options['output']:
+            write_results(results, options['output'])
+            self.stdout.write(f"Resultados guardados en {options['output']}")
+        if baseline is not None:
+            self._compare(baseline, results, options['threshold'])
+
+    def _report(self, result):
+        if result['status'] != 'ok':
+            self.stderr.write(f"ERROR {result['template']} ({result['accounts']}): {result['error']}")
+            return
+        warm = result.get('warm', result['first'])
+        peak = f"{result['peak_kb'] / 1024:7.1f} MB" if 'peak_kb' in result else ''
+        self.stdout.write(
+            f"{result['accounts']:>6} {warm['cpu_ms']:9.1f} ms {result['first']['cpu_ms']:9.1f} ms "
+            f"{peak} {result['output_bytes'] / 1024:8.0f} KB  {result['processor']:<28} {result['template']}"
+        )
+
+    def _summary(self, results):
+        ok = [r for r in results['results'] if r['status'] == 'ok']
+        errors = len(results['results']) - len(ok)
+        for accounts in results['params']['sizes']:
+            sized = [r for r in ok if r['accounts'] == accounts]
+            total = sum(r.get('warm', r['first'])['cpu_ms'] for r in sized)
+            self.stdout.write(f"{accounts} cuentas: {len(sized)} plantillas, {total:.0f} ms de CPU en caliente")
+
+        slowest = sorted(ok, key=lambda r: r.get('warm', r['first'])['cpu_ms'], reverse=True)[:10]
+        if slowest:
+            self.stdout.write("Plantillas más lentas:")
+            for result in slowest:
+                self.stdout.write(
+                    f"  {result.get('warm', result['first'])['cpu_ms']:9.1f} ms  "
+                    f"{result['accounts']:>6}  {result['template']}"
+                )
+        if errors:
+            self.stderr.write(f"{errors} plantillas con errores")
+
+    def _compare(self, baseline, results, threshold):
+        changes = compare_results(baseline, results, threshold=threshold)
+        self.stdout.write(
+            f"Comparación con {baseline.get('commit') or 'resultados anteriores'}: "
+            f"{len(changes)} plantillas cambian más de {threshold:.0%}"
+        )
+        for template, accounts, old, new, ratio in changes:
+            self.stdout.write(f"  x{ratio:5.2f} {old:9.1f} -> {new:9.1f} ms  {accounts:>6}  {template}")
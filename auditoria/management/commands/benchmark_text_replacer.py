@@ -0,0 +1,135 @@
+"""
+Compara el bucle clásico de replace_text con CompiledReplacer sobre los
+textos reales de las plantillas: párrafos y celdas de tablas Word, y celdas
+de texto de Excel.
+
+Uso:
+    python manage.py benchmark_text_replacer                 # Todas las plantillas
+    python manage.py benchmark_text_replacer --limit 50      # Solo las 50 primeras
+    python manage.py benchmark_text_replacer --repeat 5      # Más repeticiones
+"""
+
+import os
+import time
+import logging
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from docx import Document
+from openpyxl import load_workbook
+
+from auditoria.processors.shared.text_replacer import replace_text, CompiledReplacer
+from auditoria.utils.config_store import get_config_store
+from auditoria.utils.replacements_utils import build_replacements_dict
+from auditoria.utils.template_index import get_templates_base_path
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_templates(limit):
+    count = 0
+    for is_internal in (False, True):
+        for root, _, files in os.walk(get_templates_base_path(is_internal)):
+            for name in sorted(files):
+                if name.startswith('~$') or not name.lower().endswith(('.docx', '.xlsx')):
+                    continue
+                if limit and count >= limit:
+                    return
+                count += 1
+                yield os.path.join(root, name)
+
+
+def _docx_texts(path):
+    doc = Document(path)
+    paragraphs = [p.text for p in doc.paragraphs]
+    cells = [
+        cell.text.strip().replace('\n', ' ').replace('  ', ' ')
+        for table in doc.tables for row in table.rows for cell in row.cells
+    ]
+    return paragraphs, cells
+
+
+def _xlsx_texts(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [
+            value.strip()
+            for sheet in wb.worksheets
+            for row in sheet.iter_rows(values_only=True)
+            for value in row
+            if value and isinstance(value, str)
+        ]
+    finally:
+        wb.close()
+
+
+class Command(BaseCommand):
+    help = 'Mide replace_text clásico frente a CompiledReplacer con los textos de las plantillas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=0, help='Máximo de plantillas a leer (0 = todas)')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones de cada medición')
+
+    def handle(self, *args, **options):
+        paragraphs, table_cells, sheet_cells = [], [], []
+        for path in _iter_templates(options['limit']):
+            try:
+                if path.lower().endswith('.docx'):
+                    doc_paragraphs, doc_cells = _docx_texts(path)
+                    paragraphs.extend(doc_paragraphs)
+                    table_cells.extend(doc_cells)
+                else:
+                    sheet_cells.extend(_xlsx_texts(path))
+            except Exception as e:
+                logger.warning(f"No se pudo leer {path}: {e}")
+
+        store = get_config_store()
+        audit = SimpleNamespace(
+            identidad='Empresa Ejemplo, S.A.', title='Auditoría Financiera 2024', tipoAuditoria='F',
+            moneda='GTQ', audit_manager=None,
+        )
+        replacements = build_replacements_dict(
+            store.get_replacements_config(), audit, '01 de Enero de 2024', '31 de Diciembre de 2024'
+        )
+        regex_rules = store.get_replacement_regex_rules()
+
+        start = time.process_time()
+        replacer = CompiledReplacer(replacements)
+        build_ms = (time.process_time() - start) * 1000
+        self.stdout.write(f"Compilación de {len(replacer)} claves: {build_ms:.2f} ms")
+
+        corpora = (
+            ('Párrafos Word', paragraphs, regex_rules),
+            ('Celdas de tablas Word', table_cells, None),
+            ('Celdas Excel', sheet_cells, None),
+        )
+        for label, texts, rules in corpora:
+            if not texts:
+                continue
+            legacy = [replace_text(text, replacements, rules) for text in texts]
+            compiled = [replace_text(text, replacer, rules) for text in texts]
+            mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+
+            legacy_ms = self._measure(texts, replacements, rules, options['repeat'])
+            compiled_ms = self._measure(texts, replacer, rules, options['repeat'])
+            changed = sum(1 for text, result in zip(texts, legacy) if text != result)
+            self.stdout.write(
+                f"{label}: {len(texts)} textos ({changed} con reemplazos), "
+                f"clásico {legacy_ms:.1f} ms, compilado {compiled_ms:.1f} ms, "
+                f"x{legacy_ms / compiled_ms if compiled_ms else float('inf'):.1f}, "
+                f"diferencias: {mismatches}"
+            )
+            if mismatches:
+                self.stderr.write(f"{label}: {mismatches} resultados distintos")
+
+    @staticmethod
+    def _measure(texts, replacements, rules, repeat):
+        """Mejor tiempo de CPU (ms) de aplicar replace_text a todo el corpus."""
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.process_time()
+            for text in texts:
+                replace_text(text, replacements, rules)
+            elapsed = (time.process_time() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
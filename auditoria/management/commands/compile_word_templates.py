@@ -0,0 +1,57 @@
+"""
+Compila por adelantado las plantillas Word de ambos árboles de plantillas.
+
+Uso:
+    python manage.py compile_word_templates            # Compila las que no estén compiladas
+    python manage.py compile_word_templates --force    # Vuelve a compilar todas
+"""
+
+import os
+import logging
+
+from django.core.management.base import BaseCommand
+
+from auditoria.utils.template_index import get_templates_base_path
+from auditoria.services.compiled_docx import get_compiled_docx_store
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Compila las plantillas Word (.docx) para generarlas sin python-docx'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Vuelve a compilar aunque ya exista la plantilla compilada'
+        )
+
+    def handle(self, *args, **options):
+        store = get_compiled_docx_store()
+        compiled = skipped = failed = 0
+
+        for is_internal in (False, True):
+            base_path = get_templates_base_path(is_internal)
+            for root, _, files in os.walk(base_path):
+                for name in sorted(files):
+                    if not name.lower().endswith('.docx') or name.startswith('~$'):
+                        continue
+                    template_path = os.path.join(root, name)
+                    relative_path = os.path.relpath(template_path, base_path)
+                    try:
+                        result, reason = store.compile(template_path, force=options['force'])
+                    except Exception as e:
+                        failed += 1
+                        logger.exception(f"Error al compilar {relative_path}: {e}")
+                        self.stderr.write(f"ERROR {relative_path}: {e}")
+                        continue
+                    if result is None:
+                        skipped += 1
+                        if options['verbosity'] > 1:
+                            self.stdout.write(f"Omitida {relative_path}: {reason}")
+                    else:
+                        compiled += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Plantillas Word compiladas: {compiled}, no compilables: {skipped}, errores: {failed}"
+        ))
@@ -0,0 +1,74 @@
+"""
+Worker de la cola de generación de documentos en segundo plano.
+
+Uso:
+    python manage.py render_worker            # Procesa trabajos indefinidamente
+    python manage.py render_worker --once     # Procesa los pendientes y termina
+"""
+
+import time
+import signal
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from auditoria.services.render_jobs import (
+    claim_next_job, run_job, requeue_stale_jobs, fail_unclaimed_jobs, purge_expired_jobs
+)
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre revisiones de trabajos vencidos y expirados
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Genera en segundo plano los documentos encolados desde la vista de descarga'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Procesa los trabajos pendientes y termina'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Segundos de espera cuando no hay trabajos (por defecto RENDER_WORKER_POLL_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval'] or settings.RENDER_WORKER_POLL_INTERVAL
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(f"Worker de generación iniciado (espera {poll_interval}s)")
+        last_maintenance = 0.0
+        processed = 0
+
+        while not self._stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                requeue_stale_jobs()
+                fail_unclaimed_jobs()
+                purge_expired_jobs()
+                last_maintenance = time.monotonic()
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"Generando trabajo {job.id}: {job.folder}/{job.filename}")
+            run_job(job)
+            processed += 1
+
+        self.stdout.write(f"Worker de generación detenido ({processed} trabajos procesados)")
+
+    def _stop(self, signum, frame):
+        # Se termina el trabajo en curso antes de salir
+        self._stopping = True
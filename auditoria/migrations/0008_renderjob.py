@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-17 00:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditoria', '0007_auditmark'),
+        ('audits', '0003_audit_moneda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folder', models.CharField(max_length=500, verbose_name='Carpeta')),
+                ('filename', models.CharField(max_length=255, verbose_name='Archivo')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('result_path', models.CharField(blank=True, default='', max_length=500, verbose_name='Ruta del resultado')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('audit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='render_jobs', to='audits.audit', verbose_name='Auditoría')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='render_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Generación en segundo plano',
+                'verbose_name_plural': 'Generaciones en segundo plano',
+                'db_table': 'auditoria_renderjob',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='auditoria_r_status_8ddfbb_idx')],
+            },
+        ),
+    ]
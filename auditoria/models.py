@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from django.core.validators import MinValueValidator
 from audits.models import Audit
 
@@ -168,4 +169,93 @@ class AuditMark(models.Model):
 
     def __str__(self):
         wp = self.work_paper_number or 'General'
-        return f"{self.symbol} - {wp} ({self.audit.title})"
\ No newline at end of file
+        return f"{self.symbol} - {wp} ({self.audit.title})"
+
+# -----------------------------------------------------------------------------
+# Modelo para la cola de generación de documentos en segundo plano
+# -----------------------------------------------------------------------------
+class RenderJob(models.Model):
+    """
+    Documento pendiente de generar por el proceso `manage.py render_worker`.
+    Permite que las plantillas Excel pesadas se generen fuera de la solicitud
+    web; el navegador consulta el estado y descarga el resultado al terminar.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    audit = models.ForeignKey(
+        Audit,
+        on_delete=models.CASCADE,
+        related_name='render_jobs',
+        verbose_name='Auditoría'
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='render_jobs',
+        verbose_name='Solicitado por'
+    )
+    folder = models.CharField(
+        max_length=500,
+        verbose_name='Carpeta'
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name='Archivo'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+        verbose_name='Estado'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+    result_path = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        verbose_name='Ruta del resultado'
+    )
+    error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='Error'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Inicio'
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Fin'
+    )
+
+    class Meta:
+        db_table = 'auditoria_renderjob'
+        verbose_name = 'Generación en segundo plano'
+        verbose_name_plural = 'Generaciones en segundo plano'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.folder}/{self.filename} ({self.get_status_display()})"
@@ -0,0 +1,75 @@
+"""
+Precarga de bibliotecas, configuración y plantillas en el proceso maestro de
+gunicorn antes de crear los trabajadores (TEMPLATE_PRELOAD_ENABLED).
+"""
+
+import gc
+import time
+import logging
+import importlib
+
+from django.db import connections
+
+from auditoria.utils.config_store import get_config_store
+from auditoria.utils.template_bytes import get_template_bytes_store
+from auditoria.utils.template_index import build_template_indexes, get_templates_base_path
+
+logger = logging.getLogger(__name__)
+
+# Bibliotecas pesadas que los trabajadores importarían en su primera solicitud
+PRELOAD_MODULES = (
+    'docx',
+    'openpyxl',
+    'lxml.etree',
+    'weasyprint',
+    'auditoria.word_utils',
+    'auditoria.excel_utils',
+    'auditoria.services.compiled_docx',
+    'auditoria.services.document_renderer',
+)
+
+
+def _import_modules():
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # weasyprint necesita bibliotecas del sistema que pueden faltar
+            logger.warning(f"Precarga: no se pudo importar {name}: {e}")
+
+
+def _load_config():
+    store = get_config_store()
+    store.get_replacement_regex_rules()
+    store.get_table_regex_rules()
+    store.get_folder_structure(is_internal=False)
+    store.get_folder_structure(is_internal=True)
+
+
+def preload_process():
+    """
+    Importa las bibliotecas pesadas, construye los índices de plantillas,
+    carga la configuración y el contenido de todas las plantillas, y congela
+    los objetos resultantes para el recolector de ciclos.
+    """
+    start = time.perf_counter()
+    _import_modules()
+    build_template_indexes()
+    try:
+        _load_config()
+    except Exception as e:
+        logger.error(f"Precarga: no se pudo cargar la configuración: {e}")
+
+    store = get_template_bytes_store()
+    for is_internal in (False, True):
+        store.load_tree(get_templates_base_path(is_internal))
+
+    # Ninguna conexión abierta en el maestro debe heredarse en los trabajadores
+    connections.close_all()
+    gc.collect()
+    # Fuera de las recolecciones: el recolector de los trabajadores no escribe en las páginas compartidas
+    gc.freeze()
+    logger.info(
+        f"Precarga completada: {len(store)} plantillas ({store.total_bytes / (1024 * 1024):.1f} MB) "
+        f"en {time.perf_counter() - start:.2f}s, {gc.get_freeze_count()} objetos congelados"
+    )
@@ -1,5 +1,8 @@
 from .fechas import preparar_fechas_excel, insertar_fechas_en_celdas
-from .utils import mover_imagenes_por_insercion, buscar_fila_por_valor
+from openpyxl.utils.cell import column_index_from_string
+
+from .utils import buscar_fila_por_valor
+from ..row_layout import RowLayoutPlan
 
 def procesar_seccion_centralizadora(
     sheet,
@@ -34,14 +37,17 @@ def procesar_seccion_centralizadora(
     filas_a_insertar = max(0, filas_necesarias - filas_disponibles)
 
     if filas_a_insertar > 0:
-        sheet.insert_rows(suma_row, filas_a_insertar)
-        mover_imagenes_por_insercion(sheet, suma_row, filas_a_insertar)
-        suma_row += filas_a_insertar
+        # Desplaza también imágenes, rangos combinados y fórmulas por debajo de la suma
+        plan = RowLayoutPlan(sheet)
+        plan.insert(suma_row, filas_a_insertar)
+        plan.apply()
+        suma_row = plan.row(suma_row)
 
     # 3. Insertar datos en cada fila
+    indices_columnas = {col: column_index_from_string(col) for col in fechas_columnas}
     for i, cuenta in enumerate(cuentas_ordenadas):
         fila_actual = fila_inicio + i
-        sheet[f'B{fila_actual}'] = cuenta
+        sheet.cell(row=fila_actual, column=2).value = cuenta
 
         # Insertar saldos por fecha
         for col, fecha in fechas_columnas.items():
@@ -55,16 +61,16 @@ def procesar_seccion_centralizadora(
                     elif not isinstance(list(cuentas_por_fecha[fecha].values())[0], dict):
                         valor = cuentas_por_fecha[fecha].get(cuenta, 0)
                         if valor != 0: break
-            sheet[f'{col}{fila_actual}'] = valor
+            sheet.cell(row=fila_actual, column=indices_columnas[col]).value = valor
 
-        # Insertar ajustes
-        sheet[f'G{fila_actual}'] = ajustes_reclasificaciones.get(cuenta, {}).get('debe', 0)
-        sheet[f'H{fila_actual}'] = ajustes_reclasificaciones.get(cuenta, {}).get('haber', 0)
+        # Insertar ajustes (columnas G y H)
+        sheet.cell(row=fila_actual, column=7).value = ajustes_reclasificaciones.get(cuenta, {}).get('debe', 0)
+        sheet.cell(row=fila_actual, column=8).value = ajustes_reclasificaciones.get(cuenta, {}).get('haber', 0)
 
     # 4. Actualizar la fila de suma
     if cuentas_ordenadas:
         last_row = fila_inicio + len(cuentas_ordenadas) - 1
         for col in columnas_suma:
-            sheet[f"{col}{suma_row}"] = f"=SUM({col}{fila_inicio}:{col}{last_row})"
+            sheet.cell(row=suma_row, column=column_index_from_string(col)).value = f"=SUM({col}{fila_inicio}:{col}{last_row})"
             
     return filas_a_insertar
@@ -1,4 +1,5 @@
 from .fechas import obtener_año_mas_reciente
+from ....utils.financial_dataset import as_financial_dataset
 
 
 def process_comparative_file(workbook, balances, registros_auxiliares):
@@ -11,22 +12,17 @@ def process_comparative_file(workbook, balances, registros_auxiliares):
     max_filas = fila_inicio + 29
 
     # Obtener año más reciente y clasificar cuentas
-    año_actual = obtener_año_mas_reciente(balances)
-    if not año_actual:
+    balances = as_financial_dataset(balances)
+    periodo_actual = obtener_año_mas_reciente(balances)
+    if not periodo_actual:
         return workbook
 
     # Clasificar cuentas por categoría
+    tipo_actual, fecha_actual = periodo_actual
     cuentas_por_categoria = {
-        'Activo': {},
-        'Pasivo': {},
-        'Patrimonio': {},
-        'ESTADO DE RESULTADOS': {}
+        categoria: balances.cuentas(tipo_actual, fecha_actual, categoria)
+        for categoria in ['Activo', 'Pasivo', 'Patrimonio', 'ESTADO DE RESULTADOS']
     }
-    for clave, valor in balances.items():
-        if año_actual in clave and len((partes := clave.split('-'))) >= 6:
-            categoria, cuenta = partes[4], partes[5]
-            if categoria in cuentas_por_categoria:
-                cuentas_por_categoria[categoria][cuenta] = valor
 
     # Procesar cuentas en orden específico
     fila_actual, cuentas_procesadas = fila_inicio, set()
@@ -1,5 +1,6 @@
 from .data_extraction import extraer_cuentas_por_seccion
 from .sheet_processing import procesar_hoja_balance
+from ....utils.financial_dataset import as_financial_dataset
 
 def process_horizontal_vertical_analysis(workbook, balances):
     """
@@ -7,20 +8,17 @@ def process_horizontal_vertical_analysis(workbook, balances):
 
     Args:
         workbook: El libro de Excel a procesar
-        balances: Diccionario con los balances financieros
+        balances: FinancialDataset con los balances financieros
 
     Returns:
         El libro de Excel procesado
     """
-    balances_anuales = {k: v for k, v in balances.items() if k.startswith('ANUAL-')}
-    if not balances_anuales:
-        return workbook
-
-    años = sorted(set(p.split('-')[1] for p in balances_anuales.keys() if len(p.split('-')) > 1 and p.split('-')[1].isdigit()), reverse=True)
+    balances = as_financial_dataset(balances)
+    años = sorted(balances.años('ANUAL'), reverse=True)
     if len(años) < 2:
         return workbook
 
-    cuentas_por_seccion = extraer_cuentas_por_seccion(balances_anuales, años)
+    cuentas_por_seccion = extraer_cuentas_por_seccion(balances, años)
 
     for sheet in workbook.worksheets:
         if "BALANCE" in sheet.title.upper() or "BG" in sheet.title.upper():
@@ -1,4 +1,6 @@
-from .utils import copiar_estilo, actualizar_formulas_fila
+from .utils import actualizar_formulas_fila
+from ..row_layout import RowLayoutPlan
+from ..row_template import RowTemplate
 
 def procesar_hoja_balance(sheet, cuentas_por_seccion, años_ordenados):
     """Procesa una única hoja de balance, insertando y actualizando datos."""
@@ -14,22 +16,17 @@ def procesar_hoja_balance(sheet, cuentas_por_seccion, años_ordenados):
         fila_suma_pasivo_patrimonio = fila_pasivo_patrimonio + 10
 
     año_actual, año_anterior = años_ordenados[0], años_ordenados[1]
+    cuentas_activo = _cuentas_seccion(cuentas_por_seccion, ['Activo'], año_actual, año_anterior)
+    cuentas_pasivo_patrimonio = _cuentas_seccion(cuentas_por_seccion, ['Pasivo', 'Patrimonio'], año_actual, año_anterior)
 
-    # Procesar ACTIVO
-    filas_insertadas_activo = _procesar_seccion(
-        sheet, 'Activo', fila_activo, fila_suma_activo, 
-        cuentas_por_seccion, año_actual, año_anterior
-    )
-    
-    # Ajustar filas de secciones posteriores
-    fila_pasivo_patrimonio += filas_insertadas_activo
-    fila_suma_pasivo_patrimonio += filas_insertadas_activo
+    # Planificar las filas de ambas secciones y desplazar la hoja una sola vez
+    plan = RowLayoutPlan(sheet)
+    _planificar_filas(plan, fila_activo + 1, fila_suma_activo, len(cuentas_activo))
+    _planificar_filas(plan, fila_pasivo_patrimonio + 1, fila_suma_pasivo_patrimonio, len(cuentas_pasivo_patrimonio))
+    plan.apply()
 
-    # Procesar PASIVO y PATRIMONIO
-    _procesar_seccion_combinada(
-        sheet, ['Pasivo', 'Patrimonio'], fila_pasivo_patrimonio, fila_suma_pasivo_patrimonio, 
-        cuentas_por_seccion, año_actual, año_anterior
-    )
+    _procesar_seccion(sheet, plan, fila_activo, fila_suma_activo, cuentas_activo)
+    _procesar_seccion(sheet, plan, fila_pasivo_patrimonio, fila_suma_pasivo_patrimonio, cuentas_pasivo_patrimonio)
 
 def _buscar_secciones(sheet):
     """Busca y devuelve las filas clave de las secciones del balance."""
@@ -47,48 +44,37 @@ def _buscar_secciones(sheet):
                 fila_suma_pasivo_patrimonio = row_idx
     return fila_activo, fila_suma_activo, fila_pasivo_patrimonio, fila_suma_pasivo_patrimonio
 
-def _procesar_seccion(sheet, seccion, fila_seccion, fila_suma, cuentas_por_seccion, año_actual, año_anterior):
-    """Procesa una sección individual del balance (ej. Activo)."""
-    cuentas = cuentas_por_seccion[seccion][año_actual]
-    filas_insertadas = _insertar_filas_si_es_necesario(sheet, fila_seccion + 1, fila_suma, len(cuentas))
-    fila_suma += filas_insertadas
-
-    actualizar_formulas_fila(sheet, fila_suma, fila_seccion + 1, fila_suma - 1, [3, 4])
+def _cuentas_seccion(cuentas_por_seccion, secciones, año_actual, año_anterior):
+    """Lista (cuenta, valor actual, valor anterior) de las secciones, en orden."""
+    return [
+        (cuenta, valor_actual, cuentas_por_seccion[seccion][año_anterior].get(cuenta, 0))
+        for seccion in secciones
+        for cuenta, valor_actual in cuentas_por_seccion[seccion][año_actual].items()
+    ]
 
-    fila_actual = fila_seccion + 1
-    for cuenta, valor_actual in cuentas.items():
-        valor_anterior = cuentas_por_seccion[seccion][año_anterior].get(cuenta, 0)
-        _llenar_fila_datos(sheet, fila_actual, cuenta, valor_actual, valor_anterior, fila_suma)
-        fila_actual += 1
-        
-    return filas_insertadas
+def _planificar_filas(plan, fila_inicio, fila_fin, cuentas_necesarias):
+    """Registra en el plan las filas que faltan antes de la fila de suma si el espacio no es suficiente."""
+    espacio_disponible = fila_fin - fila_inicio
+    plan.insert(fila_fin, max(0, cuentas_necesarias - espacio_disponible))
 
-def _procesar_seccion_combinada(sheet, secciones, fila_seccion, fila_suma, cuentas_por_seccion, año_actual, año_anterior):
-    """Procesa secciones combinadas (Pasivo y Patrimonio)."""
-    cuentas_combinadas = {k: v for sec in secciones for k, v in cuentas_por_seccion[sec][año_actual].items()}
-    filas_insertadas = _insertar_filas_si_es_necesario(sheet, fila_seccion + 1, fila_suma, len(cuentas_combinadas))
-    fila_suma += filas_insertadas
+def _procesar_seccion(sheet, plan, fila_seccion, fila_suma, cuentas):
+    """
+    Procesa una sección del balance (ej. Activo, o Pasivo y Patrimonio) una
+    vez aplicado el plan de filas. Las filas se indican en la numeración original.
+    """
+    # Las filas nuevas toman el estilo de la última fila de la sección
+    filas_nuevas = plan.inserted_rows(fila_suma)
+    if filas_nuevas:
+        RowTemplate(sheet, plan.row(fila_suma - 1)).stamp_rows(filas_nuevas)
 
+    fila_seccion = plan.row(fila_seccion)
+    fila_suma = plan.row(fila_suma)
     actualizar_formulas_fila(sheet, fila_suma, fila_seccion + 1, fila_suma - 1, [3, 4])
 
     fila_actual = fila_seccion + 1
-    for seccion in secciones:
-        for cuenta, valor_actual in cuentas_por_seccion[seccion][año_actual].items():
-            valor_anterior = cuentas_por_seccion[seccion][año_anterior].get(cuenta, 0)
-            _llenar_fila_datos(sheet, fila_actual, cuenta, valor_actual, valor_anterior, fila_suma)
-            fila_actual += 1
-
-def _insertar_filas_si_es_necesario(sheet, fila_inicio, fila_fin, cuentas_necesarias):
-    """Inserta filas en la hoja si el espacio no es suficiente."""
-    espacio_disponible = fila_fin - fila_inicio
-    filas_a_insertar = max(0, cuentas_necesarias - espacio_disponible)
-    if filas_a_insertar > 0:
-        fila_modelo = fila_fin - 1
-        for _ in range(filas_a_insertar):
-            sheet.insert_rows(fila_fin)
-            for col in range(1, sheet.max_column + 1):
-                copiar_estilo(sheet.cell(row=fila_modelo, column=col), sheet.cell(row=fila_fin, column=col))
-    return filas_a_insertar
+    for cuenta, valor_actual, valor_anterior in cuentas:
+        _llenar_fila_datos(sheet, fila_actual, cuenta, valor_actual, valor_anterior, fila_suma)
+        fila_actual += 1
 
 def _llenar_fila_datos(sheet, fila, cuenta, valor_actual, valor_anterior, fila_suma_seccion):
     """Llena los datos y fórmulas para una fila de cuenta."""
@@ -1,6 +1,7 @@
 from .ingresos_totales import process_ir_ingresos_totales
 from .activos_totales import process_ir_activos_totales
 from .utilidad import process_ir_utilidad
+from ....utils.financial_dataset import as_financial_dataset
 
 
 def process_importance_relative(workbook, balances):
@@ -9,17 +10,11 @@ def process_importance_relative(workbook, balances):
     de balances en las tablas correspondientes.
     """
     # Identificar el año más reciente en los balances
-    anios = set()
-    for key in balances.keys():
-        if key.startswith('ANUAL-'):
-            parts = key.split('-')
-            if len(parts) > 1:
-                anios.add(parts[1])
-
+    anios = as_financial_dataset(balances).años('ANUAL')
     if not anios:
         return workbook
 
-    anio_actual = max(anios)
+    anio_actual = anios[-1]
 
     # Procesar cada hoja específica
     for sheet_name in workbook.sheetnames:
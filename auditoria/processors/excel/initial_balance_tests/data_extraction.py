@@ -1,37 +1,21 @@
-import re
+from ....utils.financial_dataset import as_financial_dataset
 
 def obtener_fecha_ultimo_dia_año_reciente(balances):
     """Obtiene la fecha del último día del año más reciente de los balances"""
-    patron_fecha = re.compile(r'ANUAL-(\d{4}-\d{2}-\d{2})')
-    fechas = {}
-    
-    for clave in balances:
-        if match := patron_fecha.search(clave):
-            fecha_completa = match.group(1)
-            año = fecha_completa.split('-')[0]
-            
-            if fecha_completa.endswith('12-31'):
-                if año not in fechas or fecha_completa > fechas[año]:
-                    fechas[año] = fecha_completa
-    
+    fechas = [fecha for fecha in as_financial_dataset(balances).fechas('ANUAL') if fecha.endswith('12-31')]
     if not fechas:
         return None, None
     
-    año_mas_reciente = max(fechas.keys())
-    return fechas[año_mas_reciente], año_mas_reciente
+    # Las fechas están ordenadas: la última es la del año más reciente
+    return fechas[-1], fechas[-1][:4]
 
 def extraer_cuentas_balance_ultimo_dia(balances, fecha_ultimo_dia):
     """Extrae todas las cuentas de todas las secciones del último día del año más reciente"""
-    cuentas_por_seccion = {seccion: {} for seccion in ['Activo', 'Pasivo', 'Patrimonio', 'ESTADO DE RESULTADOS']}
-    patron_clave = re.compile(f'ANUAL-{fecha_ultimo_dia}-(.*?)-(.*)')
-    
-    for clave, valor in balances.items():
-        if match := patron_clave.match(clave):
-            seccion, cuenta = match.groups()
-            if seccion in cuentas_por_seccion:
-                cuentas_por_seccion[seccion][cuenta] = valor
-    
-    return cuentas_por_seccion
+    balances = as_financial_dataset(balances)
+    return {
+        seccion: dict(balances.cuentas('ANUAL', fecha_ultimo_dia, seccion))
+        for seccion in ['Activo', 'Pasivo', 'Patrimonio', 'ESTADO DE RESULTADOS']
+    }
 
 def extraer_cuentas_saldos_iniciales(saldos_iniciales):
     """Extrae todas las cuentas de los saldos iniciales"""
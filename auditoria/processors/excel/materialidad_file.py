@@ -1,35 +1,24 @@
 from openpyxl.styles import Border, Side
 from copy import copy
 
+from ...utils.financial_dataset import as_financial_dataset
+
 def process_materialidad_file(workbook, balances):
     """Procesa el archivo de materialidad con las cuentas de ESTADO DE RESULTADOS del año más reciente"""
     
-    # Extraer todas las claves relacionadas con ESTADO DE RESULTADOS
-    claves_resultados = [key for key in balances.keys() if 'ESTADO DE RESULTADOS' in key]
-    
-    # Extraer los años disponibles
-    años = set()
-    for key in claves_resultados:
-        partes = key.split('-')
-        if len(partes) >= 2:
-            año = partes[1].split('-')[0]  # Extraer solo el año de la fecha
-            años.add(año)
-    
-    if not años:
+    # Cuentas de ESTADO DE RESULTADOS (balances anuales y semestrales)
+    filas_resultados = list(as_financial_dataset(balances).filas(seccion='ESTADO DE RESULTADOS'))
+    if not filas_resultados:
         return workbook
     
     # Encontrar el año más reciente
-    año_reciente = max(años)
+    año_reciente = max(fila.fecha[:4] for fila in filas_resultados)
     
     # Filtrar las cuentas de ESTADO DE RESULTADOS del año más reciente
     cuentas_resultados = {}
-    for key in claves_resultados:
-        if año_reciente in key:
-            partes = key.split('-')
-            if len(partes) >= 6:  # Asegurarnos de que hay suficientes elementos
-                cuenta = partes[5]  # La cuenta está en la posición 5, no en la 4
-                valor = balances[key]
-                cuentas_resultados[cuenta] = valor
+    for fila in filas_resultados:
+        if fila.fecha.startswith(año_reciente):
+            cuentas_resultados[fila.cuenta] = fila.valor
     
     # Insertar las cuentas en la tabla de materialidad
     for sheet in workbook.worksheets:
@@ -1,7 +1,10 @@
+from ....utils.financial_dataset import as_financial_dataset
+
 def extraer_y_clasificar_datos(balances):
     """Extrae fechas y clasifica cuentas de los balances para ANUAL y SEMESTRAL."""
-    fechas_anual = sorted(list(set(k.split('-')[1] + '-' + k.split('-')[2] + '-' + k.split('-')[3] for k in balances if k.startswith('ANUAL-'))))
-    fechas_semestral = sorted(list(set(k.split('-')[1] + '-' + k.split('-')[2] + '-' + k.split('-')[3] for k in balances if k.startswith('SEMESTRAL-'))))
+    balances = as_financial_dataset(balances)
+    fechas_anual = list(balances.fechas('ANUAL'))
+    fechas_semestral = list(balances.fechas('SEMESTRAL'))
 
     cuentas_anual = _clasificar_cuentas_por_seccion(balances, 'ANUAL')
     cuentas_semestral = _clasificar_cuentas_por_seccion(balances, 'SEMESTRAL')
@@ -23,14 +26,10 @@ def _clasificar_cuentas_por_seccion(balances, tipo_balance):
     }
     cuentas_vistas = set()
 
-    for clave in balances.keys():
-        partes = clave.split('-')
-        if len(partes) >= 5 and partes[0] == tipo_balance:
-            seccion = partes[4]
-            cuenta = '-'.join(partes[5:])
-            if seccion in cuentas_por_seccion and cuenta not in cuentas_vistas:
-                cuentas_por_seccion[seccion].append(cuenta)
-                cuentas_vistas.add(cuenta)
+    for fila in balances.filas(tipo=tipo_balance):
+        if fila.seccion in cuentas_por_seccion and fila.cuenta not in cuentas_vistas:
+            cuentas_por_seccion[fila.seccion].append(fila.cuenta)
+            cuentas_vistas.add(fila.cuenta)
 
     for seccion in cuentas_por_seccion:
         cuentas_por_seccion[seccion].sort()
@@ -1,71 +1,97 @@
-from .utils import copiar_estilo_fila, buscar_filas_clave, encontrar_fila_cuenta_normal, _actualizar_formula_suma, _columnas_valores
+from .utils import buscar_filas_clave, encontrar_fila_cuenta_normal, _actualizar_formula_suma, _columnas_valores
+from ..row_layout import RowLayoutPlan
+from ..row_template import RowTemplate
 
 def insertar_cuentas_en_hoja(sheet, cuentas_por_seccion, tipo_balance, fechas, balances):
-    """Inserta las cuentas en las posiciones correctas de la hoja Excel."""
+    """
+    Inserta las cuentas en las posiciones correctas de la hoja Excel.
+
+    Las filas que faltan en cada sección se calculan primero sobre la
+    numeración original de la hoja y se insertan todas a la vez con RowLayoutPlan.
+    """
     filas = buscar_filas_clave(sheet)
     fila_balance_general = filas['BALANCE GENERAL']
     fila_total_activo = filas['TOTAL ACTIVO']
     fila_total_pasivo_patrimonio = filas['TOTAL PASIVO Y PATRIMONIO']
 
-    # 1. Insertar ACTIVO
-    fila_actual, fila_total_activo, fila_estilo = _insertar_seccion_cuentas(
-        sheet, 'Activo', cuentas_por_seccion['Activo'], tipo_balance, fechas, balances,
-        fila_balance_general + 1, fila_total_activo, fila_balance_general
+    cuentas_activo = [('Activo', cuenta) for cuenta in cuentas_por_seccion['Activo']]
+    cuentas_pasivo_patrimonio = [
+        (seccion, cuenta) for seccion in ('Pasivo', 'Patrimonio') for cuenta in cuentas_por_seccion[seccion]
+    ]
+    cuentas_resultados = cuentas_por_seccion['ESTADO DE RESULTADOS']
+
+    # 1. Planificar las filas de todas las secciones y desplazar la hoja una sola vez
+    plan = RowLayoutPlan(sheet)
+    fila_insercion_activo = _planificar_seccion(plan, fila_balance_general + 1, fila_total_activo, len(cuentas_activo))
+    fila_insercion_pasivo_patrimonio = _planificar_seccion(
+        plan, fila_total_activo + 1, fila_total_pasivo_patrimonio, len(cuentas_pasivo_patrimonio)
     )
+    fila_inicio_resultados = fila_total_pasivo_patrimonio + 1
+    espacio_disponible = sheet.max_row - fila_inicio_resultados
+    if espacio_disponible < len(cuentas_resultados):
+        plan.insert(fila_inicio_resultados, len(cuentas_resultados) - espacio_disponible)
+    plan.apply()
+
     cols_valores = _columnas_valores(tipo_balance, fechas)
-    _actualizar_formula_suma(sheet, fila_total_activo, cols_valores, fila_balance_general + 1, fila_total_activo - 1)
 
-    # Ajustar filas posteriores
-    filas_insertadas_activo = fila_total_activo - filas['TOTAL ACTIVO']
-    fila_total_pasivo_patrimonio += filas_insertadas_activo
+    # 2. Insertar ACTIVO
+    _insertar_seccion_cuentas(
+        sheet, plan, cuentas_activo, tipo_balance, fechas, balances, fila_balance_general + 1, fila_insercion_activo
+    )
+    _actualizar_formula_suma(
+        sheet, plan.row(fila_total_activo), cols_valores,
+        plan.row(fila_balance_general) + 1, plan.row(fila_total_activo) - 1
+    )
 
-    # 2. Insertar PASIVO y PATRIMONIO
-    fila_actual = fila_total_activo + 1
-    fila_actual, fila_total_pasivo_patrimonio, _ = _insertar_seccion_cuentas(
-        sheet, 'Pasivo', cuentas_por_seccion['Pasivo'], tipo_balance, fechas, balances,
-        fila_actual, fila_total_pasivo_patrimonio, fila_total_activo
+    # 3. Insertar PASIVO y PATRIMONIO
+    _insertar_seccion_cuentas(
+        sheet, plan, cuentas_pasivo_patrimonio, tipo_balance, fechas, balances,
+        fila_total_activo + 1, fila_insercion_pasivo_patrimonio
+    )
+    _actualizar_formula_suma(
+        sheet, plan.row(fila_total_pasivo_patrimonio), cols_valores,
+        plan.row(fila_total_activo) + 1, plan.row(fila_total_pasivo_patrimonio) - 1
     )
-    fila_actual, fila_total_pasivo_patrimonio, _ = _insertar_seccion_cuentas(
-        sheet, 'Patrimonio', cuentas_por_seccion['Patrimonio'], tipo_balance, fechas, balances,
-        fila_actual, fila_total_pasivo_patrimonio, fila_actual - 1
+
+    # 4. Insertar ESTADO DE RESULTADOS
+    _insertar_estado_resultados(
+        sheet, cuentas_resultados, tipo_balance, fechas, balances,
+        plan.first_row(fila_inicio_resultados), fila_balance_general
     )
-    _actualizar_formula_suma(sheet, fila_total_pasivo_patrimonio, cols_valores, fila_total_activo + 1, fila_total_pasivo_patrimonio - 1)
 
-    # 3. Insertar ESTADO DE RESULTADOS
-    _insertar_estado_resultados(sheet, cuentas_por_seccion['ESTADO DE RESULTADOS'], tipo_balance, fechas, balances, fila_total_pasivo_patrimonio + 1, fila_balance_general)
+def _planificar_seccion(plan, fila_inicio, fila_limite, cuentas_necesarias):
+    """
+    Registra en el plan las filas que faltan para las cuentas de una sección
+    (desde `fila_inicio` hasta la fila de total `fila_limite`). Devuelve la
+    fila original antes de la que se insertan.
+    """
+    fila_insercion = max(fila_inicio, fila_limite)
+    plan.insert(fila_insercion, cuentas_necesarias - max(0, fila_limite - fila_inicio))
+    return fila_insercion
 
-def _insertar_seccion_cuentas(sheet, seccion, cuentas, tipo_balance, fechas, balances, fila_inicio, fila_limite, fila_estilo):
-    """Inserta cuentas de una sección, gestionando la inserción de filas."""
-    fila_actual = fila_inicio
-    for cuenta in cuentas:
-        if fila_actual >= fila_limite:
-            sheet.insert_rows(fila_actual)
-            copiar_estilo_fila(sheet, fila_estilo, fila_actual)
-            fila_limite += 1
-        
+def _insertar_seccion_cuentas(sheet, plan, cuentas, tipo_balance, fechas, balances, fila_inicio, fila_insercion):
+    """Inserta las cuentas (sección, cuenta) de una sección una vez aplicado el plan de filas."""
+    # Las filas nuevas toman el estilo de la fila anterior a ellas
+    filas_nuevas = plan.inserted_rows(fila_insercion)
+    if filas_nuevas:
+        RowTemplate(sheet, plan.row(fila_insercion - 1)).stamp_rows(filas_nuevas)
+
+    fila_actual = plan.first_row(fila_inicio)
+    for seccion, cuenta in cuentas:
         sheet.cell(row=fila_actual, column=2).value = cuenta
         _insertar_valores_fila(sheet, fila_actual, tipo_balance, fechas, seccion, cuenta, balances)
-        
-        fila_estilo = fila_actual
         fila_actual += 1
 
-    return fila_actual, fila_limite, fila_estilo
-
 def _insertar_estado_resultados(sheet, cuentas, tipo_balance, fechas, balances, fila_inicio, fila_referencia_estilo):
-    """Inserta las cuentas de ESTADO DE RESULTADOS al final."""
+    """Inserta las cuentas de ESTADO DE RESULTADOS al final (las filas ya están insertadas)."""
     fila_actual = fila_inicio
     fila_cuenta_normal = encontrar_fila_cuenta_normal(sheet, fila_referencia_estilo + 1, sheet.max_row) or fila_referencia_estilo + 1
-
-    espacio_disponible = sheet.max_row - fila_actual
-    if espacio_disponible < len(cuentas):
-        for _ in range(len(cuentas) - espacio_disponible):
-            sheet.insert_rows(fila_actual)
-            copiar_estilo_fila(sheet, fila_cuenta_normal, fila_actual)
+    estilo_cuenta = RowTemplate(sheet, fila_cuenta_normal)
 
     for cuenta in cuentas:
         sheet.cell(row=fila_actual, column=2).value = cuenta
         _insertar_valores_fila(sheet, fila_actual, tipo_balance, fechas, 'ESTADO DE RESULTADOS', cuenta, balances)
-        copiar_estilo_fila(sheet, fila_cuenta_normal, fila_actual)
+        estilo_cuenta.stamp(fila_actual)
         fila_actual += 1
 
 def _insertar_valores_fila(sheet, fila, tipo_balance, fechas, seccion, cuenta, balances):
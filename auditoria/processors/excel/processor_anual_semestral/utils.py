@@ -1,5 +1,3 @@
-from copy import copy
-
 def formatear_fecha(fecha_str):
     """Formatea una fecha en formato YYYY-MM-DD a 'Al DD/MM/YYYY'"""
     try:
@@ -8,18 +6,6 @@ def formatear_fecha(fecha_str):
     except Exception:
         return fecha_str
 
-def copiar_estilo_fila(sheet, fila_origen, fila_destino, columnas=None):
-    """Copia el estilo completo de una fila a otra."""
-    if columnas is None:
-        columnas = range(1, sheet.max_column + 1)
-    for col in columnas:
-        celda_origen = sheet.cell(row=fila_origen, column=col)
-        celda_destino = sheet.cell(row=fila_destino, column=col)
-        if celda_origen.has_style:
-            for attr in ['border', 'font', 'fill', 'alignment']:
-                setattr(celda_destino, attr, copy(getattr(celda_origen, attr)))
-            celda_destino.number_format = celda_origen.number_format
-
 def buscar_filas_clave(sheet):
     """Busca las filas clave (TOTAL ACTIVO, etc.) en la hoja Excel."""
     filas = {'BALANCE GENERAL': None, 'TOTAL ACTIVO': None, 'TOTAL PASIVO Y PATRIMONIO': None}
@@ -0,0 +1,212 @@
+"""
+Planificación de inserciones de filas en hojas de openpyxl.
+
+Los procesadores que amplían tablas insertaban las filas de una en una con
+sheet.insert_rows. Cada llamada ordena y desplaza todas las celdas por debajo
+del punto de inserción (y crea las vacías de la cuadrícula), así que insertar
+N cuentas costaba O(N × filas × columnas). Además insert_rows solo mueve las
+celdas: los rangos combinados, las imágenes, las alturas de fila y las
+referencias de las fórmulas quedaban apuntando a las posiciones anteriores.
+
+RowLayoutPlan recoge primero todas las inserciones de la hoja, expresadas en
+las filas originales, y después las aplica en una sola pasada sobre las
+celdas, las alturas de fila, los rangos combinados, las imágenes y gráficos,
+y las referencias a la hoja en las fórmulas de todo el libro (como hace
+Excel al insertar filas). Las filas nuevas quedan vacías; el procesador
+copia en ellas el estilo de la fila que corresponda.
+"""
+
+import re
+import bisect
+
+from openpyxl.utils.cell import coordinate_from_string
+from openpyxl.worksheet.formula import ArrayFormula
+
+# Referencias a celdas, rangos y filas completas, con la hoja opcional. Las
+# cadenas literales se reconocen para dejarlas como están.
+_REFERENCE_RE = re.compile(
+    r'''"(?:[^"]|"")*"'''
+    r"""|(?<![\w.$'])(?P<sheet>(?:'(?:[^']|'')+'|[A-Za-z_][\w.]*)!)?"""
+    r'(?P<ref>\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?|\$?\d+:\$?\d+)'
+    r'(?![\w(!])'
+)
+_ROW_RE = re.compile(r'(\$?[A-Za-z]{0,3}\$?)(\d+)')
+
+
+class RowLayoutPlan:
+    """
+    Inserciones de filas pendientes en una hoja.
+
+    Las filas se indican siempre en la numeración original de la hoja, de
+    modo que cada sección puede calcular sus inserciones sin tener en cuenta
+    las de las demás. Tras apply(), row(), first_row() e inserted_rows()
+    traducen esas filas a su posición final.
+
+    Args:
+        sheet: Worksheet de openpyxl
+    """
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self._amounts = {}  # Fila original -> filas insertadas antes de ella
+        self._positions = []
+        self._cumulative = []
+        self.applied = False
+
+    def insert(self, row, amount=1):
+        """Inserta `amount` filas antes de la fila original `row`."""
+        if self.applied:
+            raise RuntimeError("El plan de filas ya se aplicó")
+        if amount > 0:
+            self._amounts[row] = self._amounts.get(row, 0) + amount
+            self._build_index()
+
+    @property
+    def total_inserted(self):
+        """Número total de filas insertadas."""
+        return self._cumulative[-1] if self._cumulative else 0
+
+    def _build_index(self):
+        self._positions = sorted(self._amounts)
+        total = 0
+        self._cumulative = []
+        for position in self._positions:
+            total += self._amounts[position]
+            self._cumulative.append(total)
+
+    def _inserted_up_to(self, row, inclusive=True):
+        """Filas insertadas antes de la fila original `row` (o antes de su bloque)."""
+        find = bisect.bisect_right if inclusive else bisect.bisect_left
+        index = find(self._positions, row)
+        return self._cumulative[index - 1] if index else 0
+
+    def row(self, original_row):
+        """Posición final de la fila original `original_row`."""
+        return original_row + self._inserted_up_to(original_row)
+
+    def first_row(self, original_row):
+        """
+        Primera fila final a partir de la fila original `original_row`: la
+        primera de las insertadas antes de ella o, si no hay, la propia fila.
+        """
+        return self.inserted_rows(original_row).start
+
+    def inserted_rows(self, original_row):
+        """Filas finales insertadas antes de la fila original `original_row`."""
+        start = original_row + self._inserted_up_to(original_row, inclusive=False)
+        return range(start, start + self._amounts.get(original_row, 0))
+
+    def apply(self):
+        """Desplaza el contenido de la hoja según las inserciones registradas."""
+        if self.applied:
+            return
+        self.applied = True
+        if not self._amounts:
+            return
+        first = self._positions[0]
+
+        self._shift_cells(first)
+        self._shift_row_dimensions(first)
+        self._shift_merged_cells(first)
+        self._shift_drawings(first)
+        self._shift_formulas()
+        self.sheet._current_row = self.sheet.max_row
+
+    # ------------------------------------------------------------------
+    # Desplazamientos
+    # ------------------------------------------------------------------
+    def _shift_cells(self, first):
+        cells = self.sheet._cells
+        moved = [cell for (row, _), cell in cells.items() if row >= first]
+        for cell in moved:
+            del cells[(cell.row, cell.column)]
+        for cell in moved:
+            cell.row = self.row(cell.row)
+            cells[(cell.row, cell.column)] = cell
+
+    def _shift_row_dimensions(self, first):
+        dimensions = self.sheet.row_dimensions
+        moved = [(row, dimensions.pop(row)) for row in sorted(dimensions) if row >= first]
+        for row, dimension in moved:
+            new_row = self.row(row)
+            dimension.index = new_row
+            dimensions[new_row] = dimension
+
+    def _shift_merged_cells(self, first):
+        for merged_range in self.sheet.merged_cells.ranges:
+            if merged_range.max_row < first:
+                continue
+            old_height = merged_range.max_row - merged_range.min_row
+            # Primero el extremo inferior para no dejar nunca min_row > max_row
+            merged_range.max_row = self.row(merged_range.max_row)
+            merged_range.min_row = self.row(merged_range.min_row)
+            if merged_range.max_row - merged_range.min_row > old_height:
+                # Se insertaron filas dentro del rango: crear sus MergedCell
+                merged_range.format()
+
+    def _shift_anchor_marker(self, marker):
+        """Desplaza un marcador de anclaje (filas contadas desde 0)."""
+        if marker is not None:
+            marker.row = self.row(marker.row + 1) - 1
+
+    def _shift_drawings(self, first):
+        for drawing in list(getattr(self.sheet, '_images', [])) + list(getattr(self.sheet, '_charts', [])):
+            anchor = drawing.anchor
+            if isinstance(anchor, str):
+                column, row = coordinate_from_string(anchor)
+                if row >= first:
+                    drawing.anchor = f"{column}{self.row(row)}"
+                continue
+            self._shift_anchor_marker(getattr(anchor, '_from', None))
+            self._shift_anchor_marker(getattr(anchor, 'to', None))
+
+    def _shift_formulas(self):
+        workbook = self.sheet.parent
+        worksheets = workbook.worksheets if workbook is not None else [self.sheet]
+        for worksheet in worksheets:
+            same_sheet = worksheet is self.sheet
+            for cell in worksheet._cells.values():
+                if cell.data_type != 'f':
+                    continue
+                value = cell.value
+                if isinstance(value, ArrayFormula):
+                    value.text = self.shift_formula(value.text, same_sheet)
+                    if same_sheet:
+                        value.ref = self._shift_reference(value.ref)
+                elif isinstance(value, str):
+                    shifted = self.shift_formula(value, same_sheet)
+                    if shifted != value:
+                        cell.value = shifted
+
+    # ------------------------------------------------------------------
+    # Fórmulas
+    # ------------------------------------------------------------------
+    def _shift_reference(self, reference):
+        return _ROW_RE.sub(lambda m: m.group(1) + str(self.row(int(m.group(2)))), reference)
+
+    def shift_formula(self, formula, same_sheet=True):
+        """
+        Traduce las referencias a filas de la hoja en `formula` a sus posiciones
+        finales. Con `same_sheet` la fórmula está en la propia hoja y también se
+        traducen las referencias sin nombre de hoja.
+        """
+        if not formula:
+            return formula
+        title = self.sheet.title.lower()
+
+        def replace(match):
+            reference = match.group('ref')
+            if reference is None:
+                return match.group(0)
+            sheet = match.group('sheet')
+            if sheet:
+                name = sheet[:-1]
+                if name.startswith("'"):
+                    name = name[1:-1].replace("''", "'")
+                if name.lower() != title:
+                    return match.group(0)
+            elif not same_sheet:
+                return match.group(0)
+            return (sheet or '') + self._shift_reference(reference)
+
+        return _REFERENCE_RE.sub(replace, formula)
@@ -0,0 +1,71 @@
+"""
+Fila modelo de una hoja de openpyxl que se estampa en otras filas (estilos,
+fórmulas y celdas combinadas) asignando sus identificadores de estilo.
+"""
+
+from copy import copy
+
+from openpyxl.styles.cell_style import StyleArray
+
+
+class RowTemplate:
+    """
+    Fila modelo capturada para estamparla en otras filas.
+
+    Args:
+        sheet: Worksheet de openpyxl
+        row: Fila modelo
+        columns: Columnas a capturar (por defecto de la 1 a sheet.max_column)
+        styled_only: Si es True solo se estampan las celdas de la fila modelo
+            con estilo, y las demás conservan el suyo en la fila destino
+        formula_translator: Función (fórmula, fila_modelo, fila_destino) -> fórmula;
+            si se indica, las fórmulas de la fila modelo se copian traducidas
+        merges: Si es True se repiten en cada fila destino, como rangos de una
+            fila, las celdas combinadas horizontalmente que incluyen la fila modelo
+    """
+
+    def __init__(self, sheet, row, columns=None, styled_only=True, formula_translator=None, merges=False):
+        self.sheet = sheet
+        self.row = row
+        if columns is None:
+            columns = range(1, sheet.max_column + 1)
+
+        self._styles = []
+        self._formulas = []
+        cells = sheet._cells
+        for column in columns:
+            cell = cells.get((row, column))
+            if cell is not None and cell.has_style:
+                self._styles.append((column, copy(cell._style)))
+            elif not styled_only:
+                self._styles.append((column, StyleArray()))
+
+            if formula_translator is not None and cell is not None and cell.data_type == 'f' and isinstance(cell.value, str):
+                self._formulas.append((column, cell.value))
+        self._formula_translator = formula_translator
+
+        self._merges = []
+        if merges:
+            self._merges = [
+                (merged_range.min_col, merged_range.max_col)
+                for merged_range in sheet.merged_cells.ranges
+                if merged_range.min_row <= row <= merged_range.max_row and merged_range.max_col > merged_range.min_col
+            ]
+
+    def stamp(self, row):
+        """Aplica los estilos, fórmulas y celdas combinadas de la fila modelo a `row`."""
+        sheet = self.sheet
+        for column, style in self._styles:
+            # Cada celda necesita su propio StyleArray: openpyxl lo modifica en el sitio
+            sheet.cell(row=row, column=column)._style = copy(style)
+
+        for column, formula in self._formulas:
+            sheet.cell(row=row, column=column).value = self._formula_translator(formula, self.row, row)
+
+        for min_col, max_col in self._merges:
+            sheet.merge_cells(start_row=row, start_column=min_col, end_row=row, end_column=max_col)
+
+    def stamp_rows(self, rows):
+        """Estampa la fila modelo en cada una de `rows`."""
+        for row in rows:
+            self.stamp(row)
@@ -1,4 +1,4 @@
-from ...shared.text_replacer import replace_text
+from ...shared.text_replacer import replace_text, get_compiled_replacer
 from ..processor_anual_semestral import process_anual_semestral_sheets
 from ..auxiliary_file import process_auxiliary_file_sheets
 from ..comparative_actual_auxiliar import process_comparative_file
@@ -10,6 +10,7 @@ from ..sumaria import process_sumaria_file
 from ..importance_relativa import process_importance_relative
 from ..ratios_financieros import process_ratios_financieros
 from .normalizar_balances import normalizar_balances
+from ....utils.render_timing import annotate, span
 import os
 import re
 import logging
@@ -17,7 +18,207 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def process_excel_sheets(workbook, tables_config, replacements, data_bd, file_path=None):
+def replace_cell_value(value, replacements, patrones_exactos, patrones_regex):
+    """
+    Aplica los reemplazos de texto a una celda.
+
+    Args:
+        value: Texto de la celda
+        replacements: Diccionario con los reemplazos a aplicar (o CompiledReplacer)
+        patrones_exactos: Textos de celda completos que se sustituyen por un placeholder
+        patrones_regex: Subcadenas que se sustituyen por un placeholder (si es diccionario)
+
+    Returns:
+        El nuevo valor de la celda o None si no hay reemplazos
+    """
+    valor_original = value.strip()
+
+    # Reemplazos exactos
+    if valor_original in patrones_exactos:
+        placeholder = patrones_exactos[valor_original]
+        if placeholder in replacements:
+            return replacements[placeholder]
+
+    # Reemplazos de texto parciales
+    nuevo_valor = replace_text(valor_original, replacements)
+    if nuevo_valor != valor_original:
+        return nuevo_valor
+
+    # Reemplazos con regex (si están definidos como diccionario)
+    if isinstance(patrones_regex, dict):
+        for patron, placeholder in patrones_regex.items():
+            if patron in valor_original and placeholder in replacements:
+                return valor_original.replace(patron, replacements[placeholder])
+
+    return None
+
+
+class DataProcessor:
+    """
+    Procesador de datos financieros de una plantilla Excel.
+
+    Attributes:
+        name: Nombre del procesador
+        matches: Función que recibe el nombre del archivo y dice si le corresponde
+        requires: Conjuntos de datos que deben tener contenido para aplicarlo
+        optional: Conjuntos de datos que usa aunque estén vacíos
+        handler: Función (workbook, datos, file_name) que devuelve el libro procesado
+    """
+
+    __slots__ = ('name', 'matches', 'requires', 'optional', 'handler')
+
+    def __init__(self, name, matches, requires, handler, optional=()):
+        self.name = name
+        self.matches = matches
+        self.requires = tuple(requires)
+        self.optional = tuple(optional)
+        self.handler = handler
+
+    @property
+    def datasets(self):
+        return self.requires + self.optional
+
+
+def _file_in(*names):
+    return lambda file_name: file_name in names
+
+
+# Conjuntos derivados: nombre -> (conjunto de origen, transformación)
+DERIVED_DATASETS = {
+    'balances_normalizados': ('balances', normalizar_balances),
+}
+
+# Se aplica el primer procesador cuyo nombre de archivo coincide
+DATA_PROCESSORS = (
+    # Usa los balances originales, con sufijos de tipo_cuenta
+    DataProcessor(
+        'ratios_financieros', _file_in("6 RATIOS FINANCIEROS.xlsx"), ('balances',),
+        lambda wb, data, file_name: process_ratios_financieros(wb, data['balances'])),
+    DataProcessor(
+        'anual_semestral',
+        _file_in("1 Estados Financieros Actuales y Anterior.xlsx",
+                 "19 Estados Financieros Actuales y Anterior.xlsx"),
+        ('balances_normalizados',),
+        lambda wb, data, file_name: process_anual_semestral_sheets(wb, data['balances_normalizados'])),
+    DataProcessor(
+        'registros_auxiliares', _file_in("2 REGISTROS AUXILIARES.xlsx"), ('registros_auxiliares',),
+        lambda wb, data, file_name: process_auxiliary_file_sheets(wb, data['registros_auxiliares'])),
+    DataProcessor(
+        'comparativo', _file_in("3 Comparativo Estados Financieros y Registros Auxiliares.xlsx"),
+        ('balances_normalizados', 'registros_auxiliares'),
+        lambda wb, data, file_name: process_comparative_file(
+            wb, data['balances_normalizados'], data['registros_auxiliares'])),
+    # "8 MATERIALIDAD.xlsx" siempre se ha procesado, aunque no haya balances
+    DataProcessor(
+        'materialidad', _file_in("8 MATERIALIDAD.xlsx"), (),
+        lambda wb, data, file_name: process_materialidad_file(wb, data['balances_normalizados']),
+        optional=('balances_normalizados',)),
+    DataProcessor(
+        'materialidad', _file_in("23 MATERIALIDAD.xlsx"), ('balances_normalizados',),
+        lambda wb, data, file_name: process_materialidad_file(wb, data['balances_normalizados'])),
+    DataProcessor(
+        'analisis_horizontal_vertical',
+        _file_in("4 ANÁLISIS HORIZONTAL DE BALANCE GENERAL.xlsx",
+                 "20 ANÁLISIS HORIZONTAL DE BALANCE GENERAL.xlsx",
+                 "5 ANÁLISIS VERTICAL DE BALANCE GENERAL.xlsx",
+                 "21 ANÁLISIS VERTICAL DE BALANCE GENERAL.xlsx"),
+        ('balances_normalizados',),
+        lambda wb, data, file_name: process_horizontal_vertical_analysis(wb, data['balances_normalizados'])),
+    DataProcessor(
+        'saldos_iniciales', _file_in("6 Prueba de Saldos Iniciales.xlsx"),
+        ('balances_normalizados', 'saldos_iniciales'),
+        lambda wb, data, file_name: process_initial_balance_tests(
+            wb, data['balances_normalizados'], data['saldos_iniciales'])),
+    DataProcessor(
+        'centralizadora', lambda file_name: file_name.startswith("CENTRALIZADORA"),
+        ('balances_normalizados',),
+        lambda wb, data, file_name: process_centralizadora_file(
+            wb, data['balances_normalizados'], data['ajustes_reclasificaciones'], file_name),
+        optional=('ajustes_reclasificaciones',)),
+    DataProcessor(
+        'sumaria', lambda file_name: "SUMARIA" in file_name.upper(),
+        ('balances_normalizados',),
+        lambda wb, data, file_name: process_sumaria_file(
+            wb, data['balances_normalizados'], data['ajustes_reclasificaciones'], file_name),
+        optional=('ajustes_reclasificaciones',)),
+    DataProcessor(
+        'importancia_relativa', lambda file_name: "IMPORTANCIA RELATIVA" in file_name.upper(),
+        ('balances_normalizados',),
+        lambda wb, data, file_name: process_importance_relative(wb, data['balances_normalizados'])),
+)
+
+
+def get_data_processor(file_name):
+    """Procesador de datos financieros para la plantilla `file_name`, o None."""
+    for processor in DATA_PROCESSORS:
+        if processor.matches(file_name):
+            return processor
+    return None
+
+
+def get_data_processor_name(file_name):
+    """
+    Nombre del procesador de datos financieros que process_excel_sheets aplica
+    a la plantilla `file_name`, o None si solo lleva reemplazos de texto.
+    """
+    processor = get_data_processor(file_name)
+    return processor.name if processor else None
+
+
+def get_data_requirements(file_name):
+    """
+    Conjuntos de datos de la base de datos (claves de LazyFinancialData) que
+    puede consultar la plantilla `file_name`.
+    """
+    processor = get_data_processor(file_name)
+    if processor is None:
+        return ()
+    names = []
+    for name in processor.datasets:
+        source = DERIVED_DATASETS[name][0] if name in DERIVED_DATASETS else name
+        if source not in names:
+            names.append(source)
+    return tuple(names)
+
+
+def _resolve_dataset(data_bd, name, resolved):
+    """Obtiene un conjunto de data_bd, calculando los derivados una sola vez."""
+    if name not in resolved:
+        if name in DERIVED_DATASETS:
+            source, transform = DERIVED_DATASETS[name]
+            resolved[name] = transform(_resolve_dataset(data_bd, source, resolved))
+        else:
+            resolved[name] = data_bd.get(name, {})
+    return resolved[name]
+
+
+def apply_data_processor(workbook, data_bd, file_name):
+    """
+    Aplica a `workbook` el procesador de datos de la plantilla, consultando en
+    data_bd solo los conjuntos que ese procesador necesita.
+
+    Los conjuntos de `requires` se consultan en orden y, si alguno está vacío,
+    no se procesa la plantilla ni se consultan los siguientes.
+    """
+    processor = get_data_processor(file_name)
+    if processor is None:
+        return workbook
+
+    resolved = {}
+    for name in processor.requires:
+        if not _resolve_dataset(data_bd, name, resolved):
+            logger.info(f"Sin datos de {name} para {file_name}, se omite el procesador {processor.name}")
+            return workbook
+    for name in processor.optional:
+        _resolve_dataset(data_bd, name, resolved)
+
+    logger.info(f"Procesando {file_name} con el procesador {processor.name}")
+    annotate(processor=processor.name)
+    with span(f'excel.{processor.name}'):
+        return processor.handler(workbook, resolved, file_name)
+
+
+def process_excel_sheets(workbook, tables_config, replacements, data_bd, file_path=None, manifest=None):
     """
     Procesa las hojas del Excel aplicando los reemplazos de texto
 
@@ -25,96 +226,36 @@ def process_excel_sheets(workbook, tables_config, replacements, data_bd, file_pa
         workbook: El libro de Excel a procesar
         tables_config: Configuración de las tablas
         replacements: Diccionario con los reemplazos a aplicar
-        data_bd: Diccionario con los datos financieros
+        data_bd: Datos financieros organizados (diccionario o LazyFinancialData);
+            solo se leen los conjuntos que necesita el procesador de la plantilla
         file_path: Ruta completa al archivo Excel (opcional)
+        manifest: PlaceholderManifest de la plantilla (opcional); si se indica
+            solo se visitan las celdas que contienen placeholders
     """
-    # Extraer los componentes de data_bd en variables separadas
-    balances = data_bd.get('balances', {})
-    registros_auxiliares = data_bd.get('registros_auxiliares', {})
-    saldos_iniciales = data_bd.get('saldos_iniciales', {})
-    ajustes_reclasificaciones = data_bd.get('ajustes_reclasificaciones', {})
+    # Procesar reemplazos normales usando tables_config
+    patrones_exactos = tables_config.get('patrones_exactos', {})
+    patrones_regex = tables_config.get('patrones_regex', {})
+    replacer = get_compiled_replacer(replacements)
 
     # Procesar reemplazos normales en todas las hojas
-    for sheet in workbook.worksheets:
-        print(f"\n Procesando reemplazos en hoja: {sheet.title}")
+    with span('excel.text'):
+        for sheet in workbook.worksheets:
+            logger.debug(f"Procesando reemplazos en hoja: {sheet.title}")
 
-        # Procesar reemplazos normales usando tables_config
-        patrones_exactos = tables_config.get('patrones_exactos', {})
-        patrones_regex = tables_config.get('patrones_regex', {})
+            if manifest is not None:
+                cells = (sheet[coordinate] for coordinate in manifest.cells.get(sheet.title, ()))
+            else:
+                cells = (cell for row in sheet.iter_rows() for cell in row)
 
-        # Procesar cada celda de la hoja para reemplazos
-        for row in sheet.iter_rows():
-            for cell in row:
+            # Procesar cada celda de la hoja para reemplazos
+            for cell in cells:
                 if cell.value and isinstance(cell.value, str):
-                    valor_original = cell.value.strip()
-
-                    # Reemplazos exactos
-                    if valor_original in patrones_exactos:
-                        placeholder = patrones_exactos[valor_original]
-                        if placeholder in replacements:
-                            cell.value = replacements[placeholder]
-                            continue
-
-                    # Reemplazos de texto parciales
-                    nuevo_valor = replace_text(valor_original, replacements)
-                    if nuevo_valor != valor_original:
+                    nuevo_valor = replace_cell_value(
+                        cell.value, replacer, patrones_exactos, patrones_regex)
+                    if nuevo_valor is not None:
                         cell.value = nuevo_valor
-                        continue
-
-                    # Reemplazos con regex (si están definidos como diccionario)
-                    if isinstance(patrones_regex, dict):
-                        for patron, placeholder in patrones_regex.items():
-                            if patron in valor_original and placeholder in replacements:
-                                cell.value = valor_original.replace(
-                                    patron, replacements[placeholder])
-                                break
 
     if file_path:
-        file_name = os.path.basename(file_path)
-
-        # Para RATIOS FINANCIEROS, usamos los balances originales con sufijos de tipo_cuenta
-        if file_name == "6 RATIOS FINANCIEROS.xlsx" and balances:
-            logger.info(
-                "Procesando RATIOS FINANCIEROS con balances originales (con sufijos tipo_cuenta)")
-            workbook = process_ratios_financieros(workbook, balances)
-        else:
-            # Para todos los demás archivos, normalizamos los balances eliminando sufijos
-            balances_normalizados = normalizar_balances(balances)
-            if (file_name == "1 Estados Financieros Actuales y Anterior.xlsx" or
-                    file_name == "19 Estados Financieros Actuales y Anterior.xlsx") and balances_normalizados:
-
-                logger.info(
-                    "Procesando Estados Financieros Actuales y Anterior con balances normalizados")
-                logger.debug("Balances normalizados: %s",
-                             balances_normalizados)
-                workbook = process_anual_semestral_sheets(
-                    workbook, balances_normalizados)
-            elif file_name == "2 REGISTROS AUXILIARES.xlsx" and registros_auxiliares:
-                workbook = process_auxiliary_file_sheets(
-                    workbook, registros_auxiliares)
-            elif file_name == "3 Comparativo Estados Financieros y Registros Auxiliares.xlsx" and balances_normalizados and registros_auxiliares:
-                workbook = process_comparative_file(
-                    workbook, balances_normalizados, registros_auxiliares)
-            elif file_name == "8 MATERIALIDAD.xlsx" or file_name == "23 MATERIALIDAD.xlsx" and balances_normalizados:
-                workbook = process_materialidad_file(
-                    workbook, balances_normalizados)
-            elif (file_name == "4 ANÁLISIS HORIZONTAL DE BALANCE GENERAL.xlsx" or
-                  file_name == "20 ANÁLISIS HORIZONTAL DE BALANCE GENERAL.xlsx" or
-                  file_name == "5 ANÁLISIS VERTICAL DE BALANCE GENERAL.xlsx" or
-                  file_name == "21 ANÁLISIS VERTICAL DE BALANCE GENERAL.xlsx") and balances_normalizados:
-                workbook = process_horizontal_vertical_analysis(
-                    workbook, balances_normalizados)
-            elif file_name == "6 Prueba de Saldos Iniciales.xlsx" and balances_normalizados and saldos_iniciales:
-                workbook = process_initial_balance_tests(
-                    workbook, balances_normalizados, saldos_iniciales)
-            elif file_name.startswith("CENTRALIZADORA") and balances_normalizados:
-                workbook = process_centralizadora_file(
-                    workbook, balances_normalizados, ajustes_reclasificaciones, file_name)
-            elif "SUMARIA" in file_name.upper() and balances_normalizados:
-                workbook = process_sumaria_file(
-                    workbook, balances_normalizados, ajustes_reclasificaciones, file_name)
-            elif "IMPORTANCIA RELATIVA" in file_name.upper() and balances_normalizados:
-                workbook = process_importance_relative(
-                    workbook, balances_normalizados)
+        workbook = apply_data_processor(workbook, data_bd, os.path.basename(file_path))
 
     return workbook
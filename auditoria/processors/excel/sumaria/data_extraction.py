@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 from typing import Dict, List
-import re
+
+from ....utils.account_index import get_account_index
+from ....utils.financial_dataset import as_financial_dataset
 
 __all__ = [
     "encontrar_ajuste_para_cuenta",
@@ -21,6 +23,9 @@ def encontrar_ajuste_para_cuenta(
 ) -> Dict[str, float] | None:
     """Busca coincidencias exactas o parciales en ajustes_reclasificaciones.
 
+    Las parciales se resuelven con el AccountIndex de los ajustes (sin
+    distinguir mayúsculas ni acentos), que se construye una sola vez.
+
     Args:
         ajustes_reclasificaciones: Diccionario de ajustes/reclasificaciones
         nombre_cuenta: Nombre de la cuenta a buscar
@@ -36,13 +41,8 @@ def encontrar_ajuste_para_cuenta(
         return ajustes_reclasificaciones[nombre_cuenta]
 
     # Coincidencia parcial
-    nombre_normalizado = nombre_cuenta.lower().strip()
-    for cuenta, valores in ajustes_reclasificaciones.items():
-        cuenta_normalizada = cuenta.lower().strip()
-        if nombre_normalizado in cuenta_normalizada or cuenta_normalizada in nombre_normalizado:
-            return valores
-
-    return None
+    cuenta = get_account_index(ajustes_reclasificaciones).buscar(nombre_cuenta)
+    return ajustes_reclasificaciones[cuenta] if cuenta is not None else None
 
 
 # ---------------------------------------------------------------------
@@ -57,15 +57,10 @@ def obtener_todas_cuentas_seccion(
     """Construye un dict {nombre_cuenta: {fecha: valor, ...}} para *seccion*."""
 
     todas_cuentas: Dict[str, Dict[str, float]] = {}
-    patron = re.compile(fr"SEMESTRAL-(.*?)-{seccion}-(.*)")
-
-    for clave, valor in balances.items():
-        m = patron.match(clave)
-        if not m:
-            continue
-        fecha, nombre_cuenta = m.groups()
-        if fecha not in fechas_semestrales:
-            continue
-        todas_cuentas.setdefault(nombre_cuenta, {})[fecha] = valor
+    balances = as_financial_dataset(balances)
+
+    for fila in balances.filas(tipo="SEMESTRAL", seccion=seccion):
+        if fila.fecha in fechas_semestrales:
+            todas_cuentas.setdefault(fila.cuenta, {})[fila.fecha] = fila.valor
 
     return todas_cuentas
\ No newline at end of file
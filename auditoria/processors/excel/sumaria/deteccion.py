@@ -7,6 +7,9 @@ from typing import Tuple, Dict, List, Optional
 
 from openpyxl.worksheet.worksheet import Worksheet
 
+from ....utils.account_index import get_account_index
+from ....utils.financial_dataset import as_financial_dataset
+
 __all__ = [
     "determinar_cuenta_por_nombre_archivo",
     "verificar_cuenta_en_balances",
@@ -85,31 +88,28 @@ def verificar_cuenta_en_balances(
     """Comprueba la existencia de *cuenta_asociada* en *balances* y
     devuelve los valores por fecha.
 
-    Retorna `(existe, datos_por_fecha)`.
+    Retorna `(existe, datos_por_fecha)`. Las coincidencias parciales se
+    buscan con el AccountIndex de las cuentas de cada sección y fecha.
     """
 
     datos_cuenta: dict[str, float] = {}
     cuenta_existe = False
-    cuenta_normalizada = cuenta_asociada.lower().strip()
+    balances = as_financial_dataset(balances)
 
     for seccion in ["Activo", "Pasivo", "Patrimonio", "ESTADO DE RESULTADOS"]:
         for fecha in fechas_semestrales:
-            clave_exacta = f"SEMESTRAL-{fecha}-{seccion}-{cuenta_asociada}"
-            if clave_exacta in balances:
-                datos_cuenta[fecha] = balances[clave_exacta]
+            cuentas = balances.cuentas("SEMESTRAL", fecha, seccion)
+            if cuenta_asociada in cuentas:
+                datos_cuenta[fecha] = cuentas[cuenta_asociada]
                 cuenta_existe = True
                 continue
 
             # Buscar coincidencias parciales si no hay exactas
-            if fecha not in datos_cuenta:
-                prefijo = f"SEMESTRAL-{fecha}-{seccion}-"
-                for clave, valor in balances.items():
-                    if clave.startswith(prefijo):
-                        nombre_cuenta = "-".join(clave.split("-")[3:]).lower().strip()
-                        if cuenta_normalizada in nombre_cuenta or nombre_cuenta in cuenta_normalizada:
-                            datos_cuenta[fecha] = valor
-                            cuenta_existe = True
-                            break
+            if fecha not in datos_cuenta and cuentas:
+                nombre_cuenta = get_account_index(cuentas).buscar(cuenta_asociada)
+                if nombre_cuenta is not None:
+                    datos_cuenta[fecha] = cuentas[nombre_cuenta]
+                    cuenta_existe = True
 
     return cuenta_existe, datos_cuenta
 
@@ -4,10 +4,10 @@ from __future__ import annotations
 
 from typing import Dict, List
 
-from openpyxl.utils import get_column_letter
 from openpyxl.styles import Alignment
 from openpyxl.worksheet.worksheet import Worksheet
 
+from ..row_template import RowTemplate
 from .formulas import ajustar_formula_para_nueva_fila
 from .data_extraction import encontrar_ajuste_para_cuenta
 from .fechas import _formatear_fecha_ddmmaa
@@ -18,6 +18,12 @@ __all__ = [
     "actualizar_fechas_encabezados",
 ]
 
+# Columnas E, F, G y J (saldos por fecha) y H, I (debe y haber de los ajustes)
+_COLUMNAS_VALORES = (5, 6, 7, 10)
+_COLUMNA_DEBE = 8
+_COLUMNA_HABER = 9
+_ALINEACION_DERECHA = Alignment(horizontal="right")
+
 
 # ---------------------------------------------------------------------
 # Inserción sencilla (una cuenta)
@@ -73,89 +79,34 @@ def insertar_multiples_cuentas(
     filas_disponibles = 1  # la plantilla tiene 1 fila vacía (13)
     filas_a_insertar = max(0, filas_necesarias - filas_disponibles)
 
-    # Guardar rangos combinados de la fila 13
-    celdas_combinadas_originales = []
-    for merged_range in sheet.merged_cells.ranges:
-        if 13 in range(merged_range.min_row, merged_range.max_row + 1):
-            celdas_combinadas_originales.append(
-                {
-                    "min_row": merged_range.min_row,
-                    "max_row": merged_range.max_row,
-                    "min_col": merged_range.min_col,
-                    "max_col": merged_range.max_col,
-                }
-            )
-
     if filas_a_insertar:
-        # Copiar estilos/fórmulas de la fila 13
-        estilos_fila_13 = {}
-        formulas_fila_13 = {}
-        for col in range(1, sheet.max_column + 1):
-            celda = sheet.cell(row=13, column=col)
-            estilos_fila_13[col] = {
-                "font": celda.font.copy() if celda.font else None,
-                "border": celda.border.copy() if celda.border else None,
-                "fill": celda.fill.copy() if celda.fill else None,
-                "number_format": celda.number_format,
-                "alignment": celda.alignment.copy() if celda.alignment else None,
-                "protection": celda.protection.copy() if celda.protection else None,
-            }
-            if celda.data_type == "f":
-                formulas_fila_13[col] = celda.value
-
+        # Estilos, fórmulas y combinaciones de la fila 13, capturados una vez
+        fila_13 = RowTemplate(
+            sheet, 13, styled_only=False, formula_translator=ajustar_formula_para_nueva_fila, merges=True
+        )
         sheet.insert_rows(14, filas_a_insertar)
-
-        for i in range(filas_a_insertar):
-            fila_destino = 14 + i
-            for col, estilos in estilos_fila_13.items():
-                celda_dest = sheet.cell(row=fila_destino, column=col)
-                if estilos["font"]:
-                    celda_dest.font = estilos["font"]
-                if estilos["border"]:
-                    celda_dest.border = estilos["border"]
-                if estilos["fill"]:
-                    celda_dest.fill = estilos["fill"]
-                celda_dest.number_format = estilos["number_format"]
-                if estilos["alignment"]:
-                    celda_dest.alignment = estilos["alignment"]
-                if estilos["protection"]:
-                    celda_dest.protection = estilos["protection"]
-
-                # Ajustar fórmulas
-                if col in formulas_fila_13:
-                    formula_orig = formulas_fila_13[col]
-                    if isinstance(formula_orig, str) and formula_orig.startswith("="):
-                        celda_dest.value = ajustar_formula_para_nueva_fila(
-                            formula_orig, 13, fila_destino
-                        )
-
-            # Restaurar combinaciones
-            for rng in celdas_combinadas_originales:
-                if rng["max_col"] > rng["min_col"]:
-                    rango = f"{get_column_letter(rng['min_col'])}{fila_destino}:{get_column_letter(rng['max_col'])}{fila_destino}"
-                    sheet.merge_cells(rango)
+        fila_13.stamp_rows(range(14, 14 + filas_a_insertar))
 
     # Escribir datos en filas
     for i, nombre_cuenta in enumerate(cuentas_ordenadas):
         fila = 13 + i
-        sheet[f"B{fila}"].value = nombre_cuenta
-        celdas_valores_col = ["E", "F", "G", "J"]
-        for j, col_letra in enumerate(celdas_valores_col):
+        sheet.cell(row=fila, column=2).value = nombre_cuenta
+        for j, columna in enumerate(_COLUMNAS_VALORES):
             if j < len(fechas_ordenadas):
                 fecha = fechas_ordenadas[j]
                 if fecha in todas_cuentas[nombre_cuenta]:
-                    sheet[f"{col_letra}{fila}"].value = todas_cuentas[nombre_cuenta][fecha]
-                    sheet[f"{col_letra}{fila}"].alignment = Alignment(horizontal="right")
+                    celda = sheet.cell(row=fila, column=columna)
+                    celda.value = todas_cuentas[nombre_cuenta][fecha]
+                    celda.alignment = _ALINEACION_DERECHA
 
         # Insertar valores de ajustes/reclasificaciones usando la nueva función
         valores_ajuste = encontrar_ajuste_para_cuenta(ajustes_reclasificaciones, nombre_cuenta)
         if valores_ajuste:
-            if 'debe' in valores_ajuste:
-                sheet[f"H{fila}"].value = valores_ajuste['debe']
-                sheet[f"H{fila}"].alignment = Alignment(horizontal="right")
-            if 'haber' in valores_ajuste:
-                sheet[f"I{fila}"].value = valores_ajuste['haber']
-                sheet[f"I{fila}"].alignment = Alignment(horizontal="right")
+            for clave, columna in (('debe', _COLUMNA_DEBE), ('haber', _COLUMNA_HABER)):
+                if clave in valores_ajuste:
+                    celda = sheet.cell(row=fila, column=columna)
+                    celda.value = valores_ajuste[clave]
+                    celda.alignment = _ALINEACION_DERECHA
 
 
 # ---------------------------------------------------------------------
@@ -1,4 +1,4 @@
-from .text_replacer import replace_text
+from .text_replacer import replace_text, CompiledReplacer, get_compiled_replacer
 from .urls_programs.main_functions import get_file_info_from_pattern
 
-__all__ = ["replace_text", "get_file_info_from_pattern"]
\ No newline at end of file
+__all__ = ["replace_text", "CompiledReplacer", "get_compiled_replacer", "get_file_info_from_pattern"]
\ No newline at end of file
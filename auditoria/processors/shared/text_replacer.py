@@ -1,29 +1,185 @@
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Reemplazadores compilados recientes, por contenido del diccionario de reemplazos
+_REPLACER_CACHE_SIZE = 32
+_replacers = OrderedDict()
+_replacers_lock = threading.Lock()
+
+
+def _suffix_prefix_overlap(a, b):
+    """Si algún sufijo propio de `a` es prefijo de `b`."""
+    start = a.find(b[0], 1)
+    while start != -1:
+        if b.startswith(a[start:]):
+            return True
+        start = a.find(b[0], start + 1)
+    return False
+
+
+def _can_overlap(a, b):
+    """Si una aparición de `a` y otra de `b` pueden compartir caracteres en un texto."""
+    return a in b or b in a or _suffix_prefix_overlap(a, b) or _suffix_prefix_overlap(b, a)
+
+
+class CompiledReplacer(Mapping):
+    """
+    Diccionario de reemplazos compilado para aplicarlo muchas veces.
+
+    Da el mismo resultado que el bucle de replace_text (cada clave, en orden,
+    sustituye todas sus apariciones en el texto ya modificado por las claves
+    anteriores), pero busca todas las claves en una sola pasada con una
+    alternancia ordenada de mayor a menor longitud. Los textos sin ninguna
+    clave, la gran mayoría, cuestan una búsqueda proporcional a su longitud.
+
+    Cuando hay coincidencias solo se recorren, en su orden original, las
+    claves encontradas y las que pueden verse afectadas por ellas: claves que
+    se solapan con una encontrada (la alternancia no informa de apariciones
+    solapadas) o que pueden aparecer al insertar el valor de una clave
+    reemplazada. Esas relaciones se calculan al compilar.
+
+    Se comporta como un Mapping de solo lectura con los reemplazos originales.
+    """
+
+    def __init__(self, replacements):
+        self._replacements = dict(replacements)
+        self._keys = list(self._replacements)
+        self._values = [str(value) for value in self._replacements.values()]
+        self._order = {key: index for index, key in enumerate(self._keys)}
+
+        # Una clave vacía aparece en cualquier texto: se aplica el bucle completo
+        self._sequential_only = '' in self._order
+        self._pattern = None
+        self._related = {}
+        if self._keys and not self._sequential_only:
+            self._pattern = re.compile('|'.join(
+                re.escape(key) for key in sorted(self._keys, key=len, reverse=True)
+            ))
+            self._related = self._build_relations()
+
+    def _build_relations(self):
+        """Claves que deben revisarse además de cada clave encontrada."""
+        keys = self._keys
+        related = {key: set() for key in keys}
+        for i, a in enumerate(keys):
+            for b in keys[i + 1:]:
+                if _can_overlap(a, b):
+                    related[a].add(b)
+                    related[b].add(a)
+
+        created_by_value = {}
+        for key, value in zip(keys, self._values):
+            if value not in created_by_value:
+                if value == '':
+                    # Al eliminar la clave se unen los textos de ambos lados
+                    created_by_value[value] = set(keys)
+                else:
+                    created_by_value[value] = {other for other in keys if _can_overlap(value, other)}
+            related[key].update(created_by_value[value])
+        return related
+
+    def __getitem__(self, key):
+        return self._replacements[key]
+
+    def __iter__(self):
+        return iter(self._replacements)
+
+    def __len__(self):
+        return len(self._replacements)
+
+    def _candidates(self, text):
+        """Claves que el bucle secuencial podría reemplazar en `text`, en su orden."""
+        pending = set(self._pattern.findall(text))
+        if not pending:
+            return ()
+        candidates = set()
+        while pending:
+            key = pending.pop()
+            candidates.add(key)
+            pending.update(self._related[key] - candidates)
+        return sorted(candidates, key=self._order.__getitem__)
+
+    def replace(self, text):
+        """Aplica los reemplazos literales a `text`."""
+        if self._sequential_only:
+            candidates = self._keys
+        elif self._pattern is None:
+            return text
+        else:
+            candidates = self._candidates(text)
+
+        values = self._replacements
+        for key in candidates:
+            if key in text:
+                text = text.replace(key, str(values[key]))
+        return text
+
+
+def get_compiled_replacer(replacements):
+    """
+    Devuelve un CompiledReplacer para `replacements` (el mismo objeto si ya lo
+    es). Los últimos diccionarios compilados se reutilizan mientras su
+    contenido no cambie.
+    """
+    if isinstance(replacements, CompiledReplacer):
+        return replacements
+    try:
+        cache_key = tuple(replacements.items())
+        hash(cache_key)
+    except TypeError:
+        return CompiledReplacer(replacements)
+
+    with _replacers_lock:
+        replacer = _replacers.get(cache_key)
+        if replacer is not None:
+            _replacers.move_to_end(cache_key)
+            return replacer
+
+    replacer = CompiledReplacer(replacements)
+    with _replacers_lock:
+        _replacers[cache_key] = replacer
+        while len(_replacers) > _REPLACER_CACHE_SIZE:
+            _replacers.popitem(last=False)
+    return replacer
+
 
 def replace_text(text, replacements, regex_patterns=None):
     """
     Reemplaza texto con coincidencias simples y patrones regex dinámicos.
-    
+
     Args:
         text (str): Texto original a procesar
-        replacements (dict): Diccionario de reemplazos simples
-        regex_patterns (list): Lista de patrones regex con claves a reemplazar (opcional)
+        replacements (dict): Diccionario de reemplazos simples o CompiledReplacer
+        regex_patterns (list): Lista de patrones regex con claves a reemplazar (opcional);
+            diccionarios del JSON o RegexRule ya compilados sin distinguir mayúsculas
     Returns:
         str: Texto con los reemplazos aplicados
     """
-    # Reemplazo directo (case-insensitive)
-    for key, value in replacements.items():
-        if key.lower() in text.lower():
-            text = text.replace(key, str(value))
+    if isinstance(replacements, CompiledReplacer):
+        text = replacements.replace(text)
+    else:
+        # Reemplazo directo (case-insensitive)
+        for key, value in replacements.items():
+            if key.lower() in text.lower():
+                text = text.replace(key, str(value))
 
     # Reemplazos por regex si están definidos
     if regex_patterns:
         for rule in regex_patterns:
-            pattern = rule.get("pattern")
-            key = rule.get("reemplazar_por")
+            if isinstance(rule, dict):
+                pattern = rule.get("pattern")
+                key = rule.get("reemplazar_por")
+            else:
+                # RegexRule ya compilado por el almacén de configuración
+                pattern = rule.regex
+                key = rule.key
             value = replacements.get(key)
 
             if pattern and value:
-                text = re.sub(pattern, str(value), text, flags=re.IGNORECASE)
+                if isinstance(pattern, str):
+                    text = re.sub(pattern, str(value), text, flags=re.IGNORECASE)
+                else:
+                    text = pattern.sub(str(value), text)
     return text
-    
\ No newline at end of file
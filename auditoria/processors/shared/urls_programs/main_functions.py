@@ -6,11 +6,11 @@ Proporciona funciones para convertir patrones como 'A-1', 'R-10' a rutas de arch
 import os
 import logging
 import json
-from django.conf import settings
 
 from .financial_audit_mappings import PREFIX_TO_FOLDER, PATTERN_TO_FILE
 from .internal_audit_mappings import INTERNAL_PREFIX_TO_FOLDER, INTERNAL_PATTERN_TO_FILE, INTERNAL_PREFIX_TO_PROGRAM
 from .special_patterns import SPECIAL_PATTERNS, PREFIX_TO_PROGRAM
+from auditoria.utils.template_index import get_templates_base_path, get_template_index
 
 logger = logging.getLogger(__name__)
 
@@ -67,20 +67,15 @@ def get_file_info_from_pattern(pattern, is_internal=False):
             logger.warning(f"No se encontró archivo para el patrón: {pattern}")
             return None
     
-    # Construir la ruta completa según el tipo de auditoría
-    if is_internal:
-        base_path = os.path.join(settings.BASE_DIR, 'static', 'templates_base_interna')
-    else:
-        base_path = os.path.join(settings.BASE_DIR, 'static', 'templates_base_financiera')
-    
+    # Resolver la ruta con el índice de plantillas según el tipo de auditoría
+    base_path = get_templates_base_path(is_internal)
     full_path = os.path.join(base_path, folder, filename)
-    
+    template_path = get_template_index(is_internal).resolve(folder, filename)
+
     # Verificar si el archivo existe
-    if not os.path.exists(full_path):
+    if template_path != full_path:
         logger.warning(f"El archivo no existe en la ruta: {full_path}")
-        # Intentar buscar el archivo de forma más flexible
-        from auditoria.views import normalize_text, get_template_path
-        template_path = get_template_path(folder, filename, is_internal=is_internal)
+        # La búsqueda flexible (sin tildes, sin extensión) ya la hace el índice
         if template_path:
             full_path = template_path
         else:
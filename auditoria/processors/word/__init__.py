@@ -1,4 +1,9 @@
-from .text_processor import process_standard_text
-from .table_processor import process_tables
+from .document_walker import DocumentHandler, DocumentWalker
+from .text_processor import TextReplacementHandler, process_standard_text
+from .table_processor import TableReplacementHandler, HyperlinkHandler, get_hyperlink_handler, process_tables
 
-__all__ = ['process_standard_text', 'process_tables']
\ No newline at end of file
+__all__ = [
+    'DocumentHandler', 'DocumentWalker',
+    'TextReplacementHandler', 'TableReplacementHandler', 'HyperlinkHandler', 'get_hyperlink_handler',
+    'process_standard_text', 'process_tables',
+]
\ No newline at end of file
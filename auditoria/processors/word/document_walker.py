@@ -0,0 +1,154 @@
+"""
+Recorrido único de un documento Word con manejadores intercambiables.
+
+modify_document_word recorría el documento una vez por procesador: los
+párrafos, encabezados y pies para los reemplazos de texto, las tablas para
+los patrones de tablas.json y de nuevo párrafos y tablas para los
+hipervínculos. Además section.header / section.footer devuelven la parte de
+la sección anterior cuando está vinculada, así que una misma parte se
+procesaba una vez por sección (y se creaba una vacía si no existía).
+
+DocumentWalker recorre una sola vez los bloques del cuerpo y cada parte de
+encabezado o pie de página existente, y entrega cada párrafo o tabla a los
+manejadores en el orden en que se registraron. Con una medición de
+auditoria.utils.render_timing activa, el tiempo de cada manejador se acumula
+en la etapa word.<nombre>.
+"""
+
+import time
+
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+from ...utils.render_timing import current_timing
+
+_P_TAG = qn('w:p')
+_TBL_TAG = qn('w:tbl')
+_HEADER_FOOTER_REFERENCE_TAGS = (qn('w:headerReference'), qn('w:footerReference'))
+_R_ID = qn('r:id')
+
+
+class DocumentHandler:
+    """
+    Manejador de DocumentWalker. Cada método devuelve el número de elementos
+    que modificó; los que no se redefinen no se llaman.
+
+    Attributes:
+        name: Nombre con el que se informan sus cambios
+    """
+
+    name = 'handler'
+
+    def paragraph(self, paragraph, index):
+        """Párrafo del cuerpo; `index` es su posición en doc.paragraphs."""
+        return 0
+
+    def table(self, table, index):
+        """Tabla del cuerpo; `index` es su posición en doc.tables."""
+        return 0
+
+    def header_footer_paragraph(self, paragraph):
+        """Párrafo de una parte de encabezado o pie de página."""
+        return 0
+
+
+def _overrides(handler, method):
+    return getattr(type(handler), method) is not getattr(DocumentHandler, method)
+
+
+class _TimedHandler:
+    """Manejador que acumula en la medición activa el tiempo del que envuelve."""
+
+    def __init__(self, handler, timing):
+        self.handler = handler
+        self.name = handler.name
+        self._span = f'word.{handler.name}'
+        self._timing = timing
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._timing.add(self._span, time.perf_counter() - start)
+
+    def paragraph(self, paragraph, index):
+        return self._timed(self.handler.paragraph, paragraph, index)
+
+    def table(self, table, index):
+        return self._timed(self.handler.table, table, index)
+
+    def header_footer_paragraph(self, paragraph):
+        return self._timed(self.handler.header_footer_paragraph, paragraph)
+
+
+def iter_header_footer_parts(doc):
+    """Partes de encabezado y pie de página referenciadas por las secciones, cada una una vez."""
+    seen = set()
+    for sectPr in doc.element.sectPr_lst:
+        for reference in sectPr:
+            if reference.tag not in _HEADER_FOOTER_REFERENCE_TAGS:
+                continue
+            part = doc.part.related_parts.get(reference.get(_R_ID))
+            if part is not None and part.partname not in seen:
+                seen.add(part.partname)
+                yield part
+
+
+class DocumentWalker:
+    """
+    Recorre un documento una vez y entrega cada elemento a los manejadores.
+
+    Args:
+        handlers: DocumentHandler en el orden en que deben aplicarse a cada elemento
+    """
+
+    def __init__(self, handlers):
+        self.handlers = list(handlers)
+
+    def walk(self, doc):
+        """
+        Aplica los manejadores al documento.
+
+        Returns:
+            dict: {nombre del manejador: número de elementos modificados}
+        """
+        counts = {handler.name: 0 for handler in self.handlers}
+        paragraph_handlers = [h for h in self.handlers if _overrides(h, 'paragraph')]
+        table_handlers = [h for h in self.handlers if _overrides(h, 'table')]
+        header_footer_handlers = [h for h in self.handlers if _overrides(h, 'header_footer_paragraph')]
+
+        timing = current_timing()
+        if timing is not None:
+            timed = {id(h): _TimedHandler(h, timing) for h in self.handlers}
+            paragraph_handlers = [timed[id(h)] for h in paragraph_handlers]
+            table_handlers = [timed[id(h)] for h in table_handlers]
+            header_footer_handlers = [timed[id(h)] for h in header_footer_handlers]
+
+        if paragraph_handlers or table_handlers:
+            body = doc._body
+            paragraph_index = table_index = 0
+            for element in doc.element.body.iterchildren(_P_TAG, _TBL_TAG):
+                if element.tag == _P_TAG:
+                    if paragraph_handlers:
+                        paragraph = Paragraph(element, body)
+                        for handler in paragraph_handlers:
+                            counts[handler.name] += handler.paragraph(paragraph, paragraph_index)
+                    paragraph_index += 1
+                else:
+                    if table_handlers:
+                        table = Table(element, body)
+                        for handler in table_handlers:
+                            counts[handler.name] += handler.table(table, table_index)
+                    table_index += 1
+
+        if header_footer_handlers:
+            for part in iter_header_footer_parts(doc):
+                for element in part.element.iterchildren(_P_TAG):
+                    # La parte hace de contenedor: paragraph.part la devuelve a ella
+                    paragraph = Paragraph(element, part)
+                    for handler in header_footer_handlers:
+                        counts[handler.name] += handler.header_footer_paragraph(paragraph)
+
+        return counts
@@ -7,14 +7,123 @@ import logging
 import re
 from ...shared.text_replacer import replace_text
 from .style_utils import set_text_with_style_from_reference_cell, replace_text_preserving_format
-from .hyperlink_processor import apply_hyperlinks_to_document
+from .hyperlink_processor import HyperlinkHandler, apply_hyperlinks_to_document
 from .nomenclature_config import get_nomenclature_config
+from .table_walker import iter_table_cells
+from ..document_walker import DocumentHandler, DocumentWalker
+from ....utils.config_store import RegexRule
 
 logger = logging.getLogger(__name__)
 
-def process_tables(doc, replacements, tables_config=None, document_name=None, document_path=None, audit_id=None):
+class TableReplacementHandler(DocumentHandler):
     """
-    Procesa y reemplaza texto en tablas de un documento Word.
+    Reemplazos de tablas.json en las celdas de las tablas del cuerpo.
+
+    Cada celda física se visita una vez aunque esté combinada, y solo se
+    examinan las que contienen algún texto de 'patrones' o el inicio literal
+    de algún patrón regex aplicable.
+
+    Args:
+        replacements: Diccionario con los valores a reemplazar
+        tables_config: Configuración específica para tablas
+        document_name: Nombre del documento
+        table_indices: Índices de doc.tables a procesar (opcional, todas por defecto)
+        regex_rules: Patrones de 'patrones_regex' ya compilados (opcional)
+    """
+
+    name = 'tables'
+
+    def __init__(self, replacements, tables_config, document_name, table_indices=None, regex_rules=None):
+        self.replacements = replacements
+        self.patrones = tables_config.get("patrones", [])
+        self.table_indices = None if table_indices is None else frozenset(table_indices)
+        patrones_regex = regex_rules
+        if patrones_regex is None:
+            patrones_regex = [
+                RegexRule(re.compile(rule["pattern"]), rule.get("reemplazar_por"))
+                for rule in tables_config.get("patrones_regex", [])
+                if rule.get("pattern")
+            ]
+        self.is_programa_document = "1 programa" in document_name.lower()
+
+        # Patrones regex con valor, sin repetir (patrón, clave)
+        reglas_regex = {}
+        for patron_regex in patrones_regex:
+            valor = replacements.get(patron_regex.key, "")
+            if patron_regex.pattern and valor:
+                reglas_regex.setdefault((patron_regex.pattern, patron_regex.key), (patron_regex, valor))
+        self.reglas_regex = list(reglas_regex.values())
+
+        # Textos sin los cuales ningún caso modifica la celda
+        self.buscar_textos = [] if self.is_programa_document else [patron.get("buscar") for patron in self.patrones]
+        self.prefijos_regex = [patron_regex.literal_prefix for patron_regex, _ in self.reglas_regex]
+        self.filtrar_celdas = '' not in self.prefijos_regex and all(self.buscar_textos)
+
+    def _puede_cambiar(self, table_cell):
+        return (any(prefijo in table_cell.text for prefijo in self.prefijos_regex)
+                or any(buscar in table_cell.normalized_text for buscar in self.buscar_textos))
+
+    def table(self, table, index):
+        if self.table_indices is not None and index not in self.table_indices:
+            return 0
+
+        processed_cells = set()  # Celdas ya procesadas (o rellenadas por el Caso 1)
+
+        for row_cells, position, table_cell in iter_table_cells(table):
+            # Si la celda ya fue procesada, continuamos con la siguiente
+            if table_cell in processed_cells:
+                continue
+            if self.filtrar_celdas and not self._puede_cambiar(table_cell):
+                continue
+
+            # Para documentos "1 PROGRAMA", ejecutar Caso 3 (regex) PRIMERO con prioridad absoluta
+            if self.is_programa_document:
+                if _apply_regex_rules(table_cell, self.reglas_regex):
+                    processed_cells.add(table_cell)
+                continue
+
+            # Para documentos que NO son "1 PROGRAMA", usar el flujo normal
+            cell = table_cell.cell
+            cell_text = table_cell.normalized_text
+
+            # Caso 1: reemplazo en celda adyacente con estilo
+            for patron in self.patrones:
+                buscar = patron.get("buscar")
+                clave = patron.get("valor")
+                valor = self.replacements.get(clave, "")
+
+                if cell_text == buscar and position + 1 < len(row_cells):
+                    next_cell = row_cells[position + 1]
+                    set_text_with_style_from_reference_cell(next_cell.cell, valor, cell)
+                    next_cell.invalidate()
+                    processed_cells.update((table_cell, next_cell))
+
+            # Si la celda ya fue procesada, saltamos los otros casos
+            if table_cell in processed_cells:
+                continue
+
+            # Caso 2: reemplazo parcial dentro de la misma celda (directo)
+            for patron in self.patrones:
+                buscar = patron.get("buscar")
+                if buscar in cell_text:
+                    nuevo_texto = replace_text(cell_text, self.replacements)
+                    if nuevo_texto != cell_text:
+                        replace_text_preserving_format(cell, cell_text, nuevo_texto)
+                        table_cell.invalidate()
+                        processed_cells.add(table_cell)
+
+            # Caso 3: aplicar reemplazos regex desde JSON para documentos normales
+            if table_cell not in processed_cells and _apply_regex_rules(table_cell, self.reglas_regex):
+                processed_cells.add(table_cell)
+
+        return len(processed_cells)
+
+
+def process_tables(doc, replacements, tables_config=None, document_name=None, document_path=None, audit_id=None,
+                   table_indices=None, regex_rules=None):
+    """
+    Procesa y reemplaza texto en tablas de un documento Word (ver TableReplacementHandler)
+    y aplica los hipervínculos de la nomenclatura del documento.
     
     Args:
         doc: Documento Word a procesar
@@ -23,138 +132,61 @@ def process_tables(doc, replacements, tables_config=None, document_name=None, do
         document_name: Nombre del documento (para hipervínculos)
         document_path: Ruta del documento (para hipervínculos)
         audit_id: ID de la auditoría (para hipervínculos)
+        table_indices: Índices de doc.tables a procesar (opcional, todas por defecto)
+        regex_rules: Patrones de 'patrones_regex' ya compilados (opcional)
         
     Returns:
         Documento Word procesado
     """
-    patrones = tables_config.get("patrones", [])
-    patrones_regex = tables_config.get("patrones_regex", [])
-    processed_cells = {}  # Diccionario para rastrear celdas ya procesadas
-    is_programa_document = "1 programa" in document_name.lower()
-
-    for idx, table in enumerate(doc.tables):
-        for row_idx, row in enumerate(table.rows):
-            for col_idx, cell in enumerate(row.cells):
-                # Generar un ID único para esta celda
-                cell_id = f"table_{idx}_row_{row_idx}_col_{col_idx}"
-                
-                # Si la celda ya fue procesada, continuamos con la siguiente
-                if cell_id in processed_cells:
-                    continue
-                    
-                cell_text = cell.text.strip().replace('\n', ' ').replace('  ', ' ')
-
-                # Para documentos "1 PROGRAMA", ejecutar Caso 3 (regex) PRIMERO con prioridad absoluta
-                if is_programa_document and patrones_regex:
-                    texto_original = cell.text
-                    patrones_aplicados = set()
-                    
-                    for patron_regex in patrones_regex:
-                        pattern = patron_regex.get("pattern")
-                        key = patron_regex.get("reemplazar_por")
-                        
-                        patron_id = f"{pattern}_{key}"
-                        if patron_id in patrones_aplicados:
-                            continue
-                            
-                        valor = replacements.get(key, "")
-                        
-                        if pattern and valor and cell.text:
-                            match = re.search(pattern, cell.text)
-                            if match:
-                                patrones_aplicados.add(patron_id)
-                                # Para patrones que terminan en \\s*$, agregar el valor después del patrón
-                                if pattern.endswith("\\s*$"):
-                                    # Reemplazar el patrón manteniendo la etiqueta y agregando el valor
-                                    matched_text = match.group(0)
-                                    # Extraer la etiqueta (ej: "Entidad:", "Auditoría:")
-                                    label = matched_text.rstrip()
-                                    new_text = f"{label} {valor}"
-                                    replace_text_preserving_format(cell, matched_text, new_text)
-                                else:
-                                    # Comportamiento original para otros patrones
-                                    matched_text = cell.text[match.start():match.end()]
-                                    replace_text_preserving_format(cell, matched_text, valor)
-                                processed_cells[cell_id] = True
-                    
-                    # Si ya se procesó con regex, continuar con la siguiente celda
-                    if cell_id in processed_cells:
-                        continue
-
-                # Para documentos que NO son "1 PROGRAMA", usar el flujo normal
-                if not is_programa_document:
-                    # Caso 1: reemplazo en celda adyacente con estilo
-                    for patron in patrones:
-                        buscar = patron.get("buscar")
-                        clave = patron.get("valor")
-                        valor = replacements.get(clave, "")
-
-                        if cell_text == buscar:
-                            try:
-                                next_cell = row.cells[col_idx + 1]
-                                next_cell_id = f"table_{idx}_row_{row_idx}_col_{col_idx + 1}"
-                                set_text_with_style_from_reference_cell(next_cell, valor, cell)
-                                processed_cells[cell_id] = processed_cells[next_cell_id] = True
-                            except IndexError:
-                                pass
-
-                    # Si la celda ya fue procesada, saltamos los otros casos
-                    if cell_id in processed_cells:
-                        continue
-
-                    # Caso 2: reemplazo parcial dentro de la misma celda (directo)
-                    for patron in patrones:
-                        buscar = patron.get("buscar")
-                        if buscar in cell_text:
-                            nuevo_texto = replace_text(cell_text, replacements)
-                            if nuevo_texto != cell_text:
-                                replace_text_preserving_format(cell, cell_text, nuevo_texto)
-                                processed_cells[cell_id] = True
-                    
-                    # Caso 3: aplicar reemplazos regex desde JSON para documentos normales
-                    if not cell_id in processed_cells and patrones_regex:
-                        texto_original = cell.text
-                        patrones_aplicados = set()
-                        
-                        for patron_regex in patrones_regex:
-                            pattern = patron_regex.get("pattern")
-                            key = patron_regex.get("reemplazar_por")
-                            
-                            patron_id = f"{pattern}_{key}"
-                            if patron_id in patrones_aplicados:
-                                continue
-                                
-                            valor = replacements.get(key, "")
-                            
-                            if pattern and valor and cell.text:
-                                match = re.search(pattern, cell.text)
-                                if match:
-                                    patrones_aplicados.add(patron_id)
-                                    # Para patrones que terminan en \\s*$, agregar el valor después del patrón
-                                    if pattern.endswith("\\s*$"):
-                                        # Reemplazar el patrón manteniendo la etiqueta y agregando el valor
-                                        matched_text = match.group(0)
-                                        # Extraer la etiqueta (ej: "Entidad:", "Auditoría:")
-                                        label = matched_text.rstrip()
-                                        new_text = f"{label} {valor}"
-                                        replace_text_preserving_format(cell, matched_text, new_text)
-                                    else:
-                                        # Comportamiento original para otros patrones
-                                        matched_text = cell.text[match.start():match.end()]
-                                        replace_text_preserving_format(cell, matched_text, valor)
-                                    processed_cells[cell_id] = True
-    
+    handlers = [TableReplacementHandler(replacements, tables_config, document_name, table_indices, regex_rules)]
+    hyperlinks = get_hyperlink_handler(audit_id, document_name, document_path)
+    if hyperlinks is not None:
+        handlers.append(hyperlinks)
+    DocumentWalker(handlers).walk(doc)
+    return doc
+
+
+def get_hyperlink_handler(audit_id, document_name, document_path):
+    """HyperlinkHandler de la nomenclatura del documento, o None si no lleva hipervínculos."""
     # Aplicar hipervínculos si hay información suficiente
-    if audit_id and document_name:
-        # Obtener la configuración de nomenclatura
-        nomenclature_config = get_nomenclature_config(document_name, document_path)
-        doc = apply_hyperlinks_to_document(doc, audit_id, document_name, document_path, nomenclature_config)
+    if not (audit_id and document_name):
+        return None
+    return HyperlinkHandler.from_config(audit_id, get_nomenclature_config(document_name, document_path))
 
-    return doc
+
+def _apply_regex_rules(table_cell, reglas_regex):
+    """
+    Caso 3: reemplaza en la celda el texto de cada patrón regex que encuentra
+    por su valor. Devuelve si se aplicó alguno.
+    """
+    aplicado = False
+    for patron_regex, valor in reglas_regex:
+        if not table_cell.text:
+            break
+        match = patron_regex.regex.search(table_cell.text)
+        if not match:
+            continue
+        # Para patrones que terminan en \\s*$, agregar el valor después del patrón
+        if patron_regex.pattern.endswith("\\s*$"):
+            # Reemplazar el patrón manteniendo la etiqueta y agregando el valor
+            matched_text = match.group(0)
+            # Extraer la etiqueta (ej: "Entidad:", "Auditoría:")
+            label = matched_text.rstrip()
+            new_text = f"{label} {valor}"
+            replace_text_preserving_format(table_cell.cell, matched_text, new_text)
+        else:
+            # Comportamiento original para otros patrones
+            replace_text_preserving_format(table_cell.cell, match.group(0), valor)
+        table_cell.invalidate()
+        aplicado = True
+    return aplicado
 
 # Exportar las funciones principales para compatibilidad hacia atrás
 __all__ = [
     'process_tables',
+    'TableReplacementHandler',
+    'HyperlinkHandler',
+    'get_hyperlink_handler',
     'get_nomenclature_config',
     'apply_hyperlinks_to_document',
     'set_text_with_style_from_reference_cell',
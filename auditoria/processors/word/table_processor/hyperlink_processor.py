@@ -1,21 +1,82 @@
 """
 Procesador de hipervínculos para documentos Word.
 Contiene funciones para aplicar hipervínculos automáticos basados en nomenclatura.
+
+Las referencias (A-1, R-10, etc.) se buscan con un único patrón compilado por
+documento. Solo se modifican los párrafos que contienen alguna referencia, y
+en ellos solo los runs que ocupa cada referencia: el run se divide en el
+texto anterior, el hipervínculo y el texto posterior, conservando su formato.
 """
 
 import re
 import logging
+from copy import deepcopy
+
 from django.conf import settings
+from docx.enum.text import WD_UNDERLINE
 from docx.oxml.shared import qn, OxmlElement
 from docx.opc.constants import RELATIONSHIP_TYPE as RT
 
+from ..document_walker import DocumentHandler, DocumentWalker
+from .table_walker import iter_table_cells
+
 logger = logging.getLogger(__name__)
 
+# Hijos de un run que pueden dividirse reescribiendo su texto
+_RUN_TEXT_TAGS = {qn('w:rPr'), qn('w:t'), qn('w:tab'), qn('w:cr'), qn('w:lastRenderedPageBreak')}
+_BR_TAG = qn('w:br')
+_BR_TYPE = qn('w:type')
+_HYPERLINK_TAG = qn('w:hyperlink')
+
+
+def compile_reference_pattern(prefix):
+    """Patrón de las referencias PREFIX-N (sin ceros a la izquierda) como palabras completas."""
+    return re.compile(r'\b' + re.escape(prefix) + r'-([1-9]\d*)\b')
+
+
+class HyperlinkHandler(DocumentHandler):
+    """
+    Hipervínculos de las referencias en los párrafos del cuerpo y en las
+    celdas de sus tablas.
+
+    Args:
+        audit_id: ID de la auditoría
+        prefix: Prefijo de las referencias (A, R, ...)
+        max_range: Número máximo de referencia que se enlaza
+    """
+
+    name = 'hyperlinks'
+
+    def __init__(self, audit_id, prefix, max_range=20):
+        self.audit_id = audit_id
+        self.pattern = compile_reference_pattern(prefix)
+        self.max_range = max_range
+        # Un id de relación por URL, compartido por todos sus hipervínculos
+        self.rel_ids = {}
+
+    @classmethod
+    def from_config(cls, audit_id, nomenclature_config):
+        """Manejador para la configuración de nomenclatura, o None si no define un prefijo."""
+        if not nomenclature_config or not nomenclature_config.get("prefix"):
+            return None
+        return cls(audit_id, nomenclature_config["prefix"], nomenclature_config.get("max_range", 20))
+
+    def paragraph(self, paragraph, index):
+        return process_paragraph_for_hyperlinks(paragraph, self.pattern, self.max_range, self.audit_id, self.rel_ids)
+
+    def table(self, table, index):
+        hyperlinks_added = 0
+        for _, _, table_cell in iter_table_cells(table):
+            for paragraph in table_cell.cell.paragraphs:
+                hyperlinks_added += self.paragraph(paragraph, None)
+        return hyperlinks_added
+
+
 def apply_hyperlinks_to_document(doc, audit_id, document_name, document_path, nomenclature_config):
     """
     Aplica hipervínculos a las referencias en el documento según la nomenclatura correspondiente
     al nombre del archivo.
-    
+
     Args:
         doc: Documento Word
         audit_id: ID de la auditoría
@@ -23,216 +84,130 @@ def apply_hyperlinks_to_document(doc, audit_id, document_name, document_path, no
         document_path: Ruta completa del documento
         nomenclature_config: Configuración de nomenclatura obtenida externamente
     """
-    if not nomenclature_config:
-        return doc
-        
-    prefix = nomenclature_config.get("prefix")
-    max_range = nomenclature_config.get("max_range", 20)
-    
-    if not prefix:
+    handler = HyperlinkHandler.from_config(audit_id, nomenclature_config)
+    if handler is None:
         return doc
-        
-    # Recorrer las referencias y aplicar hipervínculos
-    hyperlinks_added = 0
-    
-    # Procesar texto en párrafos
-    for paragraph in doc.paragraphs:
-        hyperlinks_added += process_paragraph_for_hyperlinks(paragraph, prefix, max_range, audit_id)
-    
-    # Procesar texto en tablas
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    hyperlinks_added += process_paragraph_for_hyperlinks(paragraph, prefix, max_range, audit_id)
-    
+
+    counts = DocumentWalker([handler]).walk(doc)
+    logger.debug(f"Hipervínculos añadidos en {document_name}: {counts[handler.name]}")
     return doc
 
-def process_paragraph_for_hyperlinks(paragraph, prefix, max_range, audit_id):
+
+def process_paragraph_for_hyperlinks(paragraph, pattern, max_range, audit_id, rel_ids):
     """
     Procesa un párrafo buscando referencias que coincidan con el patrón y les aplica hipervínculos.
     Se enfoca exclusivamente en el formato estándar (A-1, R-10, etc.).
-    
-    Antes de procesar, unifica los runs para evitar problemas con patrones divididos entre runs.
-    
+
+    Solo se enlaza la primera aparición de cada referencia en el párrafo. Las
+    referencias que ya están dentro de un hipervínculo o en runs con contenido
+    distinto de texto (imágenes, campos...) se dejan como están.
+
+    Args:
+        paragraph: Párrafo de python-docx
+        pattern: Patrón compilado con compile_reference_pattern
+        max_range: Número máximo de referencia que se enlaza
+        audit_id: ID de la auditoría
+        rel_ids: {url: id de relación} del documento, se completa al añadir hipervínculos
+
     Returns:
         int: Número de hipervínculos añadidos
     """
-    # Verificar si hay patrones en el texto antes de procesarlo
-    potential_patterns = [f"{prefix}-{i}" for i in range(1, max_range + 1)]
-    if not any(pattern in paragraph.text for pattern in potential_patterns):
-        return 0  # No hay patrones, salir rápidamente
-    
-    # AQUÍ ESTÁ LA SOLUCIÓN: Unificar todos los runs del párrafo en uno solo
-    # Para evitar problemas con patrones divididos en múltiples runs
-    
-    # 1. Guardar el texto completo
-    text = paragraph.text
-    
-    # 2. Guardar propiedades de estilo del primer run si existe
-    style_props = {}
-    if paragraph.runs:
-        first_run = paragraph.runs[0]
-        style_props = {
-            'bold': first_run.bold,
-            'italic': first_run.italic,
-            'underline': first_run.underline,
-            'font_size': first_run.font.size,
-            'font_name': first_run.font.name,
-            'font_color': first_run.font.color.rgb if first_run.font.color and first_run.font.color.rgb else None
-        }
-    
-    # 3. Limpiar todos los runs existentes
-    for i in range(len(paragraph.runs)-1, -1, -1):
-        paragraph._p.remove(paragraph.runs[i]._r)
-    
-    # 4. Crear un solo run con todo el texto
-    new_run = paragraph.add_run(text)
-    
-    # 5. Aplicar propiedades de estilo guardadas
-    if style_props:
-        new_run.bold = style_props['bold']
-        new_run.italic = style_props['italic']
-        new_run.underline = style_props['underline']
-        new_run.font.size = style_props['font_size']
-        new_run.font.name = style_props['font_name']
-        if style_props['font_color']:
-            new_run.font.color.rgb = style_props['font_color']
-    
+    p = paragraph._p
+    text = p.text
+
+    # Primera aparición de cada referencia dentro del rango
+    matches = {}
+    for match in pattern.finditer(text):
+        if int(match.group(1)) <= max_range:
+            matches.setdefault(match.group(0), match)
+    if not matches:
+        return 0
+
+    # Posición de cada run o hipervínculo en el texto del párrafo
+    segments = []
+    offset = 0
+    for element in p.xpath('w:r | w:hyperlink'):
+        length = len(element.text)
+        segments.append((offset, offset + length, element))
+        offset += length
+
     hyperlinks_added = 0
-    
-    # Un patrón ya procesado no debe procesarse nuevamente
-    processed_patterns = set()
-    
-    # Formato estándar (PREFIX-NUMBER)
-    for i in range(1, max_range + 1):
-        pattern = f"{prefix}-{i}"
-        
-        # Usamos regex para encontrar coincidencias exactas de palabras
-        # \b representa límite de palabra para evitar coincidencias parciales
-        regex_pattern = r'\b' + re.escape(pattern) + r'\b'
-        
-        # Buscar coincidencias en el texto
-        matches = list(re.finditer(regex_pattern, paragraph.text))
-        
-        # Procesar cada coincidencia encontrada
-        if matches:
-            for match in matches:
-                hyperlinks_added = process_matched_hyperlink(paragraph, match, pattern, processed_patterns, hyperlinks_added, audit_id)
-    
+    # De derecha a izquierda, para que las posiciones pendientes sigan siendo válidas
+    for match in sorted(matches.values(), key=lambda m: m.start(), reverse=True):
+        start, end = match.span()
+        covered = [segment for segment in segments if segment[0] < end and start < segment[1]]
+        if not covered or not all(_is_splittable_run(element) for _, _, element in covered):
+            continue
+
+        reference = match.group(0)
+        url = f"{settings.BASE_URL}/auditoria/download/{audit_id}/{reference}"
+        r_id = rel_ids.get(url)
+        if r_id is None:
+            r_id = rel_ids[url] = paragraph.part.relate_to(url, RT.HYPERLINK, is_external=True)
+
+        run_before = _link_runs(covered, start, end, reference, r_id)
+        hyperlinks_added += 1
+
+        # Los runs sustituidos ya no forman parte del párrafo
+        segments = [segment for segment in segments if segment[0] < covered[0][0]]
+        if run_before is not None:
+            segments.append((covered[0][0], start, run_before))
+
     return hyperlinks_added
 
-def process_matched_hyperlink(paragraph, match, pattern, processed_patterns, hyperlinks_added, audit_id):
+
+def _is_splittable_run(element):
+    """Si el elemento es un run cuyo contenido puede reescribirse a partir de su texto."""
+    if element.tag == _HYPERLINK_TAG:
+        return False
+    for child in element:
+        if child.tag in _RUN_TEXT_TAGS:
+            continue
+        if child.tag == _BR_TAG and child.get(_BR_TYPE) in (None, 'textWrapping'):
+            continue
+        return False
+    return True
+
+
+def _new_run(rPr, text):
+    """Run con una copia de las propiedades `rPr` y el texto indicado."""
+    run = OxmlElement('w:r')
+    if rPr is not None:
+        run.append(deepcopy(rPr))
+    run.text = text
+    return run
+
+
+def _link_runs(covered, start, end, reference, r_id):
     """
-    Procesa una coincidencia encontrada y aplica el hipervínculo.
-    Función helper para evitar duplicación de código.
+    Sustituye los runs que ocupa la referencia [start, end) por el texto
+    anterior (con el formato del primer run), el hipervínculo y el texto
+    posterior (con el formato del último run).
+
+    Returns:
+        El run con el texto anterior, o None si la referencia empieza el run
     """
-    # No procesar patrones ya procesados
-    if pattern in processed_patterns:
-        return hyperlinks_added
-        
-    # Añadir información de depuración
-    
-    # Información detallada sobre la coincidencia
-    start_idx = match.start()
-    end_idx = match.end()
-    matched_text = paragraph.text[start_idx:end_idx]
-    
-    # Para los patrones A-16 a A-18, añadir información adicional
-    
-    processed_patterns.add(pattern)
-    
-    # Encontrar el run que contiene el patrón
-    current_idx = 0
-    target_run = None
-    target_run_start = 0
-    
-    for j, run in enumerate(paragraph.runs):
-        run_length = len(run.text)
-        if current_idx <= start_idx < current_idx + run_length:
-            target_run = run
-            target_run_start = current_idx
-            break
-        current_idx += run_length
-    
-    if target_run:
-        # Crear la URL
-        url = f"{settings.BASE_URL}/auditoria/download/{audit_id}/{pattern}"
-        
-        # Extraer el texto que coincide con el patrón
-        run_text = target_run.text
-        pattern_start_in_run = start_idx - target_run_start
-        pattern_end_in_run = min(end_idx - target_run_start, len(run_text))
-        
-        # Si el patrón está completamente dentro del run
-        if pattern_start_in_run >= 0 and pattern_end_in_run <= len(run_text):
-            # Guardar el texto y estilo del run
-            text_before = run_text[:pattern_start_in_run]
-            text_pattern = run_text[pattern_start_in_run:pattern_end_in_run]
-            text_after = run_text[pattern_end_in_run:]
-            
-            # Propiedades de estilo del run original
-            original_bold = target_run.bold
-            original_italic = target_run.italic
-            original_underline = target_run.underline
-            original_font_size = target_run.font.size
-            original_font_name = target_run.font.name
-            original_font_color = target_run.font.color.rgb if target_run.font.color and target_run.font.color.rgb else None
-            
-            # Eliminar el run original
-            paragraph._p.remove(target_run._r)
-            
-            # Crear nuevos runs: antes del patrón, patrón con hipervínculo y después del patrón
-            if text_before:
-                run_before = paragraph.add_run(text_before)
-                # Aplicar estilo del run original
-                run_before.bold = original_bold
-                run_before.italic = original_italic
-                run_before.underline = original_underline
-                run_before.font.size = original_font_size
-                run_before.font.name = original_font_name
-                if original_font_color:
-                    run_before.font.color.rgb = original_font_color
-            
-            # --- MÉTODO MEJORADO PARA AGREGAR HIPERVÍNCULOS ---
-            # Crear el run para el hipervínculo
-            hyperlink_run = paragraph.add_run(text_pattern)
-            hyperlink_run.bold = original_bold
-            hyperlink_run.italic = original_italic
-            hyperlink_run.underline = True  # Subrayar el hipervínculo
-            hyperlink_run.font.size = original_font_size
-            hyperlink_run.font.name = original_font_name
-            if original_font_color:
-                hyperlink_run.font.color.rgb = original_font_color
-            
-            # Crear el hipervínculo manualmente usando la API XML
-            r_id = paragraph.part.relate_to(url, RT.HYPERLINK, is_external=True)
-            
-            # Crear el elemento de hipervínculo
-            hyperlink = OxmlElement('w:hyperlink')
-            hyperlink.set(qn('r:id'), r_id)
-            hyperlink.set(qn('w:history'), '1')  # Para marcar como visitado
-            
-            # Mover el run del texto dentro del hipervínculo
-            hyperlink.append(hyperlink_run._r)
-            
-            # Reemplazar el run por el hipervínculo
-            paragraph._p.append(hyperlink)
-            
-            # Remover el run original del párrafo ya que ahora está dentro del hipervínculo
-            if hyperlink_run._r in paragraph._p:
-                paragraph._p.remove(hyperlink_run._r)
-            
-            if text_after:
-                run_after = paragraph.add_run(text_after)
-                run_after.bold = original_bold
-                run_after.italic = original_italic
-                run_after.underline = original_underline
-                run_after.font.size = original_font_size
-                run_after.font.name = original_font_name
-                if original_font_color:
-                    run_after.font.color.rgb = original_font_color
-            
-            hyperlinks_added += 1
-            
-    return hyperlinks_added
+    first_start, _, first_run = covered[0]
+    last_start, _, last_run = covered[-1]
+    text_before = first_run.text[:start - first_start]
+    text_after = last_run.text[end - last_start:]
+
+    hyperlink_run = _new_run(first_run.rPr, reference)
+    hyperlink_run.get_or_add_rPr().u_val = WD_UNDERLINE.SINGLE  # Subrayar el hipervínculo
+
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), r_id)
+    hyperlink.set(qn('w:history'), '1')  # Para marcar como visitado
+    hyperlink.append(hyperlink_run)
+
+    run_before = None
+    if text_before:
+        run_before = _new_run(first_run.rPr, text_before)
+        first_run.addprevious(run_before)
+    first_run.addprevious(hyperlink)
+    if text_after:
+        last_run.addnext(_new_run(last_run.rPr, text_after))
+
+    for _, _, run in covered:
+        run.getparent().remove(run)
+    return run_before
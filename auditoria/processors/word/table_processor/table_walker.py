@@ -0,0 +1,107 @@
+"""
+Recorrido de las celdas físicas de una tabla Word.
+
+row.cells de python-docx devuelve una celda por posición de la cuadrícula:
+una celda combinada horizontalmente (gridSpan) se repite en cada columna que
+ocupa y una combinada verticalmente (vMerge) en cada fila. Recorrer así las
+tablas procesaba varias veces la misma celda, y cell.text vuelve a construir
+el texto desde el XML en cada lectura.
+
+iter_table_cells visita cada elemento w:tc una sola vez, y TableCell guarda su
+texto hasta que se invalida tras modificar la celda. El texto se obtiene
+recorriendo los hijos de cada elemento en lugar de con las consultas xpath de
+python-docx, con el mismo resultado que cell.text.
+"""
+
+from docx.oxml.ns import qn
+from docx.oxml.simpletypes import ST_Merge
+from docx.table import _Cell
+
+_P_TAG = qn('w:p')
+_R_TAG = qn('w:r')
+_HYPERLINK_TAG = qn('w:hyperlink')
+# Hijos de un run con texto (ver CT_R.text); str() de cada uno da su texto
+_RUN_TEXT_TAGS = frozenset(qn(tag) for tag in ('w:br', 'w:cr', 'w:noBreakHyphen', 'w:ptab', 'w:t', 'w:tab'))
+
+
+def _run_text(r):
+    return ''.join(str(child) for child in r if child.tag in _RUN_TEXT_TAGS)
+
+
+def _paragraph_text(p):
+    parts = []
+    for child in p:
+        if child.tag == _R_TAG:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK_TAG:
+            parts.extend(_run_text(r) for r in child if r.tag == _R_TAG)
+    return ''.join(parts)
+
+
+def cell_text(tc):
+    """Texto de un elemento w:tc, igual que _Cell.text."""
+    return '\n'.join(_paragraph_text(p) for p in tc if p.tag == _P_TAG)
+
+
+class TableCell:
+    """
+    Celda física (w:tc) con su texto en caché.
+
+    Attributes:
+        cell: _Cell de python-docx
+    """
+
+    __slots__ = ('cell', '_text', '_normalized_text')
+
+    def __init__(self, cell):
+        self.cell = cell
+        self._text = None
+        self._normalized_text = None
+
+    @property
+    def text(self):
+        """Texto de la celda (cell.text)."""
+        if self._text is None:
+            self._text = cell_text(self.cell._tc)
+        return self._text
+
+    @property
+    def normalized_text(self):
+        """Texto sin espacios en los extremos y con los saltos de línea como espacios."""
+        if self._normalized_text is None:
+            self._normalized_text = self.text.strip().replace('\n', ' ').replace('  ', ' ')
+        return self._normalized_text
+
+    def invalidate(self):
+        """Descarta el texto guardado; debe llamarse tras modificar la celda."""
+        self._text = None
+        self._normalized_text = None
+
+
+def iter_table_cells(table):
+    """
+    Genera (fila, posición, celda) por cada celda física de la tabla, en orden
+    de filas y columnas.
+
+    `fila` es la lista de TableCell distintas de la fila en orden de columnas;
+    incluye las celdas que continúan una combinación vertical (la misma
+    TableCell de la fila donde empieza), que no se vuelven a generar.
+    """
+    above = {}  # Columna de la cuadrícula -> TableCell de la fila anterior
+    for tr in table._tbl.tr_lst:
+        row_cells = []
+        new_positions = []
+        current = {}
+        column = tr.grid_before
+        for tc in tr.tc_lst:
+            table_cell = above.get(column) if tc.vMerge == ST_Merge.CONTINUE else None
+            if table_cell is None:
+                table_cell = TableCell(_Cell(tc, table))
+                new_positions.append(len(row_cells))
+            row_cells.append(table_cell)
+            current[column] = table_cell
+            column += tc.grid_span
+        above = current
+
+        for position in new_positions:
+            yield row_cells, position, row_cells[position]
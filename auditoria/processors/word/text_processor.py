@@ -1,6 +1,33 @@
 from ..shared.text_replacer import replace_text
+from .document_walker import DocumentHandler, DocumentWalker
 
-def process_standard_text(doc, replacements, config):
+class TextReplacementHandler(DocumentHandler):
+    """
+    Reemplazos de texto en los párrafos del cuerpo, encabezados y pies de página.
+
+    Args:
+        replacements: Diccionario de reemplazos simples
+        regex_patterns: Patrones de 'patrones_regex' (diccionarios o ya compilados)
+        paragraph_indices: Índices de doc.paragraphs a procesar (opcional, todos por defecto)
+    """
+
+    name = 'text'
+
+    def __init__(self, replacements, regex_patterns, paragraph_indices=None):
+        self.replacements = replacements
+        self.regex_patterns = regex_patterns
+        self.paragraph_indices = None if paragraph_indices is None else frozenset(paragraph_indices)
+
+    def paragraph(self, paragraph, index):
+        if self.paragraph_indices is not None and index not in self.paragraph_indices:
+            return 0
+        return int(replace_in_paragraph(paragraph, self.replacements, self.regex_patterns))
+
+    def header_footer_paragraph(self, paragraph):
+        return int(replace_in_paragraph(paragraph, self.replacements, self.regex_patterns))
+
+
+def process_standard_text(doc, replacements, config, paragraph_indices=None, regex_rules=None):
     """
     Procesa el texto estándar en párrafos, encabezados y pies de página preservando estilos.
     Aplica tanto reemplazos directos como regex definidos en el JSON.
@@ -8,32 +35,27 @@ def process_standard_text(doc, replacements, config):
         doc: Documento Word
         replacements: Diccionario de reemplazos simples
         config: Configuración completa del JSON, incluyendo 'patrones_regex'
+        paragraph_indices: Índices de doc.paragraphs a procesar (opcional, todos por defecto)
+        regex_rules: Patrones de 'patrones_regex' ya compilados (opcional)
     """
-    regex_patterns = config.get("patrones_regex", [])
-
-    for paragraph in doc.paragraphs:
-        replace_in_paragraph(paragraph, replacements, regex_patterns)
-
-    for section in doc.sections:
-        for header in section.header.paragraphs:
-            replace_in_paragraph(header, replacements, regex_patterns)
-        for footer in section.footer.paragraphs:
-            replace_in_paragraph(footer, replacements, regex_patterns)
+    regex_patterns = regex_rules if regex_rules is not None else config.get("patrones_regex", [])
+    DocumentWalker([TextReplacementHandler(replacements, regex_patterns, paragraph_indices)]).walk(doc)
 
 
 def replace_in_paragraph(paragraph, replacements, regex_patterns=None):
     """
     Reemplaza el texto de un párrafo preservando estilos, incluso si los patrones están repartidos en varios runs.
+    Devuelve si el párrafo cambió.
     """
     full_text = paragraph.text
     new_text = replace_text(full_text, replacements, regex_patterns)
 
     if full_text == new_text:
-        return  # No hay cambios
+        return False  # No hay cambios
 
     runs = paragraph.runs
     if not runs:
-        return
+        return False
 
     # Guardamos el primer run como base para aplicar estilo
     first_run = runs[0]
@@ -41,3 +63,4 @@ def replace_in_paragraph(paragraph, replacements, regex_patterns=None):
         paragraph._element.remove(run._element)  # eliminamos los demás
 
     first_run.text = new_text
+    return True
@@ -0,0 +1,258 @@
+"""
+Generación de archivos ZIP con todos los documentos de una carpeta o de la
+auditoría completa.
+
+- La auditoría, los datos financieros y las marcas se obtienen una sola vez
+  por archivo ZIP y se entregan a cada proceso de generación al crearlo. De los
+  datos financieros solo se consultan los conjuntos que usan los documentos.
+- Los documentos se generan en un pool de procesos acotado, cada uno en un
+  archivo temporal, y se copian al ZIP a medida que terminan, sin mantener el
+  archivo completo en memoria.
+- Los documentos presentes en la caché en disco se copian directamente.
+"""
+
+import os
+import zipfile
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.db import connections
+
+from auditoria.utils.data_db import LazyFinancialData, get_financial_data_version
+from auditoria.processors.excel.sheet_processor import get_data_requirements
+from auditoria.services.audit_mark_processor import AuditMarkProcessor
+from auditoria.services.document_renderer import render_document, get_render_content_type
+from auditoria.services.render_cache import (
+    build_render_key, get_cached_render, store_render_file, get_audit_marks_version
+)
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# (audit, financial_data, marks) del ZIP en curso, en cada proceso del pool
+_shared = None
+
+
+class _ZipStream:
+    """
+    Destino no posicionable para zipfile: acumula lo escrito hasta que el
+    generador lo entrega al cliente.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _init_render_worker(audit, financial_data, marks):
+    """
+    Recibe los datos compartidos del ZIP una sola vez por proceso e inicializa
+    Django si no viene heredado por fork.
+    """
+    global _shared
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    _shared = (audit, financial_data, marks)
+
+
+def _render_member(template_path, filename, output_path, shared=None):
+    """
+    Genera un documento en `output_path` con los datos compartidos del proceso
+    y devuelve si está completo (ver render_document).
+    """
+    audit, financial_data, marks = shared or _shared
+    with open(output_path, 'wb') as output:
+        return render_document(template_path, filename, audit, output, financial_data=financial_data, marks=marks)
+
+
+def _pool_context():
+    """
+    Con fork los procesos heredan las cachés ya cargadas del proceso actual
+    (plantillas, plantillas compiladas y manifiestos) en lugar de empezar vacías.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _zip_info(arcname, filename):
+    """Los documentos Office ya están comprimidos; se almacenan sin recomprimir."""
+    info = zipfile.ZipInfo(arcname)
+    info.compress_type = zipfile.ZIP_STORED if get_render_content_type(filename) else zipfile.ZIP_DEFLATED
+    return info
+
+
+class AuditArchiveRenderer:
+    """
+    Genera un ZIP con los documentos indicados para una auditoría.
+
+    Args:
+        audit: Instancia de Audit (idealmente con select_related('audit_manager'))
+        entries: Lista de tuplas (arcname, template_path, filename)
+        max_workers: Procesos de generación; con 0 o 1 se genera en el proceso actual
+    """
+
+    def __init__(self, audit, entries, max_workers=None):
+        self.audit = audit
+        self.entries = entries
+        if max_workers is None:
+            max_workers = getattr(settings, 'ARCHIVE_RENDER_WORKERS', 2)
+        self.max_workers = max_workers
+        self.errors = []
+
+    def _load_shared_data(self):
+        """Consulta una sola vez todo lo que necesitan los documentos del ZIP."""
+        self.financial_data = LazyFinancialData(self.audit.id)
+        self.marks = AuditMarkProcessor.get_active_marks(self.audit.id)
+        self.financial_version = get_financial_data_version(self.audit.id)
+        self.marks_version = get_audit_marks_version(self.audit.id)
+
+    def stream(self):
+        """Generador de fragmentos de bytes del ZIP."""
+        for chunk in self._stream():
+            if chunk:
+                yield chunk
+
+    def write_to(self, fileobj):
+        """Escribe el ZIP completo en `fileobj`."""
+        for chunk in self.stream():
+            fileobj.write(chunk)
+
+    def _stream(self):
+        self._load_shared_data()
+        sink = _ZipStream()
+        pending = []
+
+        with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+            # Primero los documentos cacheados y los que no se procesan
+            for arcname, template_path, filename in self.entries:
+                if get_render_content_type(filename) is None:
+                    yield from self._copy_file(zf, sink, arcname, filename, template_path)
+                    continue
+                key = self._render_key(template_path, filename)
+                cached_path = get_cached_render(key)
+                if cached_path:
+                    try:
+                        yield from self._copy_file(zf, sink, arcname, filename, cached_path)
+                        continue
+                    except OSError:
+                        logger.info(f"Entrada de caché no disponible para {filename}, regenerando")
+                pending.append((arcname, template_path, filename, key))
+
+            if pending:
+                with tempfile.TemporaryDirectory(prefix='auditoria_zip_') as work_dir:
+                    yield from self._render_pending(zf, sink, pending, work_dir)
+
+            if self.errors:
+                zf.writestr('ERRORES.txt', '\n'.join(self.errors))
+        yield sink.drain()
+
+    def _render_key(self, template_path, filename):
+        return build_render_key(
+            template_path, filename, self.audit,
+            financial_version=self.financial_version,
+            marks_version=self.marks_version,
+        )
+
+    def _copy_file(self, zf, sink, arcname, filename, path):
+        with open(path, 'rb') as src, zf.open(_zip_info(arcname, filename), 'w') as dst:
+            for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                dst.write(chunk)
+                yield sink.drain()
+
+    def _write_rendered(self, zf, sink, item, complete):
+        arcname, _, filename, key, output_path = item
+        try:
+            if complete:
+                with open(output_path, 'rb') as f:
+                    store_render_file(key, f)
+            yield from self._copy_file(zf, sink, arcname, filename, output_path)
+        finally:
+            os.remove(output_path)
+
+    def _render_pending(self, zf, sink, pending, work_dir):
+        # Los procesos hijos reciben ya cargados los datos que van a usar
+        for _, _, filename, _ in pending:
+            self.financial_data.prefetch(get_data_requirements(filename))
+
+        items = [
+            (arcname, template_path, filename, key,
+             os.path.join(work_dir, f"{index}{os.path.splitext(filename)[1]}"))
+            for index, (arcname, template_path, filename, key) in enumerate(pending)
+        ]
+        shared = (self.audit, self.financial_data, self.marks)
+
+        if self.max_workers <= 1:
+            for item in items:
+                try:
+                    complete = _render_member(item[1], item[2], item[4], shared=shared)
+                except Exception as e:
+                    self._record_error(item[0], e)
+                    continue
+                yield from self._write_rendered(zf, sink, item, complete)
+            return
+
+        # Los procesos hijos no deben compartir las conexiones abiertas del padre
+        connections.close_all()
+
+        # Se mantienen como máximo 2 documentos por proceso en vuelo para acotar el disco temporal
+        max_in_flight = self.max_workers * 2
+        queue = iter(items)
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=_pool_context(),
+            initializer=_init_render_worker,
+            initargs=shared,
+        )
+        try:
+            in_flight = {}
+            for item in queue:
+                in_flight[self._submit(executor, item)] = item
+                if len(in_flight) >= max_in_flight:
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    try:
+                        complete = future.result()
+                    except Exception as e:
+                        self._record_error(item[0], e)
+                    else:
+                        yield from self._write_rendered(zf, sink, item, complete)
+
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight[self._submit(executor, next_item)] = next_item
+        finally:
+            # Si el cliente cancela la descarga se descartan los trabajos pendientes
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, executor, item):
+        _, template_path, filename, _, output_path = item
+        return executor.submit(_render_member, template_path, filename, output_path)
+
+    def _record_error(self, arcname, error):
+        logger.error(f"Error al generar {arcname} para el ZIP de la auditoría {self.audit.id}: {error}")
+        self.errors.append(f"{arcname}: {error}")
@@ -30,10 +30,20 @@ class AuditMarkProcessor:
     4. Verificar casos especiales ANTES del procesamiento
     """
 
-    def __init__(self, audit_id, filename):
+    def __init__(self, audit_id, filename, marks=None):
+        """
+        Args:
+            audit_id: ID de la auditoría
+            filename: Nombre del archivo que se está procesando
+            marks: Marcas activas ya obtenidas con get_active_marks (opcional).
+                Permite consultar la base de datos una sola vez para varios archivos.
+        """
         self.audit_id = audit_id
         self.filename = filename
         self.normalized_filename = self.normalize_text(filename)
+        self.marks = marks
+        # True si algún error dejó el documento sin todas sus marcas
+        self.failed = False
 
     @staticmethod
     def normalize_text(text):
@@ -57,6 +67,24 @@ class AuditMarkProcessor:
         text = re.sub(r'[^A-Z0-9]', '', text)
         return text
 
+    @staticmethod
+    def get_active_marks(audit_id):
+        """
+        Obtener las marcas activas de la auditoría, excluyendo ejemplos.
+
+        Returns:
+            list[AuditMark]: Marcas activas sin "Ejemplo:"/"Example:"
+        """
+        return list(
+            AuditMark.objects.filter(
+                audit_id=audit_id,
+                is_active=True
+            ).exclude(
+                Q(description__icontains='Ejemplo:') |
+                Q(description__icontains='Example:')
+            )
+        )
+
     def get_matching_marks(self):
         """
         Obtener marcas que coincidan con el nombre de archivo de este documento.
@@ -67,13 +95,9 @@ class AuditMarkProcessor:
             list[AuditMark]: Lista de marcas coincidentes
         """
         # Consultar marcas activas, excluir ejemplos
-        marks = AuditMark.objects.filter(
-            audit_id=self.audit_id,
-            is_active=True
-        ).exclude(
-            Q(description__icontains='Ejemplo:') |
-            Q(description__icontains='Example:')
-        )
+        marks = self.marks
+        if marks is None:
+            marks = self.get_active_marks(self.audit_id)
 
         # Filtrar por emparejamiento de nombre de archivo
         matched_marks = []
@@ -93,6 +117,18 @@ class AuditMarkProcessor:
 
         return matched_marks
 
+    def affects_document(self):
+        """
+        Indica si process_word_document / process_excel_document modificarían el documento.
+        Ante un error devuelve True para que lo gestionen esos métodos.
+        """
+        if 'PROGRAMA' in self.filename.upper():
+            return False
+        try:
+            return bool(self.get_matching_marks())
+        except Exception:
+            return True
+
     def process_word_document(self, doc):
         """
         Agregar marcas de auditoría al pie de página del documento Word.
@@ -153,6 +189,7 @@ class AuditMarkProcessor:
                 f"Error al procesar marcas de auditoría para {self.filename}: {e}",
                 exc_info=True
             )
+            self.failed = True
             return doc  # ⚠️ Devolver SIN CAMBIOS
 
     def _add_marks_to_footer(self, doc, marks):
@@ -167,10 +204,16 @@ class AuditMarkProcessor:
             marks: Lista de objetos AuditMark
         """
         # Agregar al pie de página en TODAS las secciones
+        marked_footers = set()
         for section_idx, section in enumerate(doc.sections):
             try:
                 footer = section.footer
 
+                # Un pie vinculado a la sección anterior es la misma parte: se marca una sola vez
+                if footer.part.partname in marked_footers:
+                    continue
+                marked_footers.add(footer.part.partname)
+
                 # Agregar línea en blanco para espaciado
                 footer.add_paragraph()
 
@@ -200,6 +243,7 @@ class AuditMarkProcessor:
                 logger.warning(
                     f"Error al agregar marcas a la sección {section_idx + 1}: {e}"
                 )
+                self.failed = True
                 continue
 
     def process_excel_document(self, wb):
@@ -262,6 +306,7 @@ class AuditMarkProcessor:
                 f"Error al procesar marcas de auditoría para {self.filename}: {e}",
                 exc_info=True
             )
+            self.failed = True
             return wb  # ⚠️ Devolver SIN CAMBIOS
 
     def _add_marks_to_excel_bottom(self, wb, marks):
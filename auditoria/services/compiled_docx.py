@@ -0,0 +1,537 @@
+"""
+Plantillas Word compiladas: XML pretokenizado con huecos para los valores de la auditoría.
+
+Los reemplazos de los documentos Word solo dependen de siete valores de la
+auditoría (entidad, título, auditor, fechas, tipo y moneda). Para compilar una
+plantilla se procesa dos veces con valores centinela (caracteres de uso privado
+de Unicode de distinta longitud) y se guardan las partes XML modificadas como
+trozos de texto estático separados por huecos. En cada descarga solo se
+escapan los valores reales y se concatenan los trozos; las partes que los
+reemplazos no modifican se copian del ZIP de la plantilla sin descomprimir
+(auditoria.utils.zip_utils).
+
+No se compilan (siguen la ruta de python-docx):
+- Plantillas con hipervínculos (configuración de nomenclatura)
+- Plantillas cuyo resultado depende de la longitud de los valores
+
+Y se descarta la versión compilada en la descarga cuando:
+- Hay marcas de auditoría que se agregarían al pie de página
+- Algún valor podría activar reemplazos distintos a los del centinela (contiene
+  o forma junto al texto vecino una clave de reemplazo o un patrón regex,
+  tiene espacios en los extremos, dobles espacios, barras invertidas o
+  caracteres de control)
+
+Las plantillas compiladas se guardan en COMPILED_DOCX_DIR (clave: versión del
+compilador + hash de la plantilla + huella de la configuración JSON); el
+comando `manage.py compile_word_templates` las genera por adelantado.
+"""
+
+import os
+import re
+import copy
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from docx.opc.part import XmlPart
+from docx.opc.pkgwriter import PackageWriter
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+from auditoria.word_utils import apply_word_replacements, build_word_replacements
+from auditoria.utils.template_cache import load_document
+from auditoria.utils.replacements_utils import get_replacements_config, get_tables_config, build_replacements_dict
+from auditoria.utils.template_bytes import open_template
+from auditoria.utils.zip_utils import RawZipWriter, read_raw_members
+from auditoria.processors.word.table_processor.nomenclature_config import get_nomenclature_config
+from auditoria.services.audit_mark_processor import AuditMarkProcessor
+from auditoria.services.render_cache import get_template_hash, get_config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Incrementar cuando cambie el formato o la lógica de compilación
+COMPILER_VERSION = 2
+
+_MARKER_OPEN = '\ue000'
+_MARKER_CLOSE = '\ue001'
+_SLOT_BASE = 0xe100
+_MARKER_RE = re.compile('\ue000([\ue100-\ue1ff]+)\ue001')
+_RESERVED_RE = re.compile('[\ue000-\ue1ff]')
+# Sustituye a cada hueco al comparar coincidencias (no coincide con ninguna clave)
+_NEUTRAL = '\ue0ff'
+_UNSAFE_VALUE_RE = re.compile('[\\x00-\\x1f\\x7f\\\\\ue000-\uf8ff]|  ')
+
+_SENTINEL_FIELDS = ('identidad', 'titulo', 'auditor', 'fecha_inicio', 'fecha_fin', 'tipo', 'moneda')
+
+# Máximo de combinaciones de valores cuya validación se memoriza por plantilla
+_SAFE_VALUES_MEMO_SIZE = 256
+
+
+class TemplateNotCompilable(Exception):
+    """La plantilla debe seguir procesándose con python-docx."""
+
+
+def _sentinel(slot, width):
+    return _MARKER_OPEN + chr(_SLOT_BASE + slot) * width + _MARKER_CLOSE
+
+
+def _sentinel_replacements(config, width):
+    """Reemplazos con un centinela distinto en cada valor que depende de la auditoría."""
+    sentinels = {name: _sentinel(i, width) for i, name in enumerate(_SENTINEL_FIELDS)}
+    config = copy.deepcopy(config)
+    if 'tipo_auditoria' in config:
+        config['tipo_auditoria']['values'] = {'F': sentinels['tipo']}
+    if 'moneda' in config:
+        # Sin '{}' en la plantilla: format() devuelve el centinela completo
+        config['moneda']['template'] = sentinels['moneda']
+
+    audit = SimpleNamespace(
+        identidad=sentinels['identidad'],
+        title=sentinels['titulo'],
+        tipoAuditoria='F',
+        moneda='GTQ',
+        audit_manager=SimpleNamespace(get_full_name=lambda: sentinels['auditor']),
+    )
+    return build_replacements_dict(config, audit, sentinels['fecha_inicio'], sentinels['fecha_fin'])
+
+
+class _MemberCollector:
+    """Sustituto de PhysPkgWriter que guarda los miembros en lugar de escribir el ZIP."""
+
+    def __init__(self):
+        self.members = {}
+
+    def write(self, pack_uri, blob):
+        self.members[pack_uri.membername] = blob
+
+
+def _package_members(doc):
+    """
+    Devuelve {miembro: bytes} con lo que escribiría doc.save(), en el mismo orden
+    (incluye las partes que python-docx agrega, p. ej. encabezados vacíos).
+    """
+    package = doc.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+    collector = _MemberCollector()
+    PackageWriter._write_content_types_stream(collector, parts)
+    PackageWriter._write_pkg_rels(collector, package.rels)
+    PackageWriter._write_parts(collector, parts)
+    return collector.members
+
+
+def _split_markers(text):
+    """
+    Divide el texto en [estático, hueco, estático, ...] con los huecos como
+    (número, ancho).
+    """
+    pieces = _MARKER_RE.split(text)
+    for i in range(1, len(pieces), 2):
+        marker = pieces[i]
+        if marker != marker[0] * len(marker):
+            raise TemplateNotCompilable("Centinelas solapados en el resultado")
+        pieces[i] = (ord(marker[0]) - _SLOT_BASE, len(marker))
+    return pieces
+
+
+def _text_contexts(doc):
+    """
+    Textos de párrafo y de celda (como los ven los procesadores de texto y
+    tablas) que contienen algún centinela, divididos con _split_markers.
+    """
+    contexts = set()
+
+    def add(text):
+        if _MARKER_OPEN in text:
+            pieces = _split_markers(text)
+            contexts.add(tuple(p if isinstance(p, str) else p[0] for p in pieces))
+
+    for part in doc.part.package.iter_parts():
+        if not isinstance(part, XmlPart):
+            continue
+        for p in part.element.iter(qn('w:p')):
+            add(Paragraph(p, None).text)
+        for tc in part.element.iter(qn('w:tc')):
+            cell_text = '\n'.join(Paragraph(p, None).text for p in tc.findall(qn('w:p')))
+            add(cell_text)
+            add(cell_text.strip().replace('\n', ' ').replace('  ', ' '))
+    return sorted(contexts, key=repr)
+
+
+class CompiledDocx:
+    """
+    Plantilla Word compilada.
+
+    Args:
+        template_path: Ruta de la plantilla
+        members: [(miembro del ZIP, piezas)] en el orden de doc.save(). Las piezas son
+            [estático, número de hueco, estático, ...] o None si el miembro se
+            copia sin cambios de la plantilla
+        slot_keys: {número de hueco: clave de reemplazo cuyo valor lo rellena}
+        contexts: Textos con huecos en los que se valida que los valores no activen reemplazos
+    """
+
+    def __init__(self, template_path, members, slot_keys, contexts):
+        self.template_path = template_path
+        self.members = [
+            (name, None if pieces is None else [p.encode('utf-8') if isinstance(p, str) else p for p in pieces])
+            for name, pieces in members
+        ]
+        self.slot_keys = slot_keys
+        self.contexts = contexts
+        self._safe_values = {}
+        self._guards = None
+
+    # ------------------------------------------------------------------
+    # Serialización
+    # ------------------------------------------------------------------
+    def to_dict(self):
+        return {
+            'members': [
+                [name, None if pieces is None else [p.decode('utf-8') if isinstance(p, bytes) else p for p in pieces]]
+                for name, pieces in self.members
+            ],
+            'slot_keys': {str(slot): key for slot, key in self.slot_keys.items()},
+            'contexts': [list(context) for context in self.contexts],
+        }
+
+    @classmethod
+    def from_dict(cls, template_path, data):
+        return cls(
+            template_path,
+            [(name, pieces) for name, pieces in data['members']],
+            {int(slot): key for slot, key in data['slot_keys'].items()},
+            [tuple(context) for context in data['contexts']],
+        )
+
+    # ------------------------------------------------------------------
+    # Validación de valores
+    # ------------------------------------------------------------------
+    def _get_guards(self):
+        """Claves literales y patrones regex que los valores no deben activar."""
+        if self._guards is None:
+            replacements_config = get_replacements_config()
+            tables_config = get_tables_config()
+            literals = set(key.lower() for key in _sentinel_replacements(replacements_config, 1))
+            literals.update(
+                p['buscar'].lower() for p in tables_config.get('patrones', []) if p.get('buscar')
+            )
+            patterns = []
+            for rule in replacements_config.get('patrones_regex', []) + tables_config.get('patrones_regex', []):
+                if rule.get('pattern'):
+                    patterns.append(re.compile(rule['pattern']))
+                    patterns.append(re.compile(rule['pattern'], re.IGNORECASE))
+            self._guards = (sorted(literals), patterns)
+        return self._guards
+
+    def _context_is_safe(self, context, values, literals, patterns):
+        real = []
+        neutral = []
+        offsets = []  # (posición en neutral, desplazamiento acumulado en real)
+        shift = 0
+        for piece in context:
+            if isinstance(piece, str):
+                real.append(piece)
+                neutral.append(piece)
+                continue
+            value = values[piece]
+            position = sum(map(len, neutral))
+            real.append(value)
+            neutral.append(_NEUTRAL)
+            offsets.append((position, shift, len(value)))
+            shift += len(value) - 1
+        real = ''.join(real)
+        neutral = ''.join(neutral)
+
+        # Claves literales (sin distinguir mayúsculas): ninguna puede solaparse con un valor
+        real_lower = real.lower()
+        if len(real_lower) != len(real):
+            return False
+        for position, prev_shift, length in offsets:
+            start = position + prev_shift
+            for key in literals:
+                window = real_lower[max(0, start - len(key) + 1):start + length + len(key) - 1]
+                if key in window:
+                    return False
+
+        def to_real(index):
+            moved = 0
+            for position, prev_shift, length in offsets:
+                if index > position:
+                    moved = prev_shift + length - 1
+            return index + moved
+
+        # Patrones regex: mismas coincidencias que con el hueco neutro
+        for pattern in patterns:
+            expected = [(to_real(m.start()), to_real(m.end())) for m in pattern.finditer(neutral)]
+            found = [(m.start(), m.end()) for m in pattern.finditer(real)]
+            if expected != found:
+                return False
+        return True
+
+    def resolve_values(self, replacements):
+        """
+        Devuelve {hueco: valor} a partir de los reemplazos reales de la auditoría
+        o None si algún valor no puede insertarse sin cambiar el resultado.
+        """
+        values = {}
+        for slot, key in self.slot_keys.items():
+            value = replacements.get(key)
+            if not isinstance(value, str) or not value or value != value.strip():
+                return None
+            if _UNSAFE_VALUE_RE.search(value):
+                return None
+            values[slot] = value
+
+        memo_key = tuple(sorted(values.items()))
+        safe = self._safe_values.get(memo_key)
+        if safe is None:
+            literals, patterns = self._get_guards()
+            safe = all(self._context_is_safe(c, values, literals, patterns) for c in self.contexts)
+            if len(self._safe_values) >= _SAFE_VALUES_MEMO_SIZE:
+                self._safe_values.clear()
+            self._safe_values[memo_key] = safe
+        return values if safe else None
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def write(self, output, values):
+        """Escribe el documento con los valores ya validados por resolve_values."""
+        escaped = {slot: escape(value).encode('utf-8') for slot, value in values.items()}
+        with open_template(self.template_path) as src:
+            raw_members = {member.filename: member for member in read_raw_members(src)}
+            writer = RawZipWriter(output)
+            for name, pieces in self.members:
+                if pieces is None:
+                    writer.copy_raw(src, raw_members[name])
+                else:
+                    data = b''.join(p if isinstance(p, bytes) else escaped[p] for p in pieces)
+                    writer.write(name, data)
+            writer.close()
+
+
+def _compile_pieces(name, blob, wide_blob):
+    """Piezas de un miembro modificado comprobando que no dependen de la longitud de los valores."""
+    pieces = _split_markers(blob.decode('utf-8'))
+    wide = _split_markers(wide_blob.decode('utf-8'))
+    if [p if isinstance(p, str) else p[0] for p in pieces] != [p if isinstance(p, str) else p[0] for p in wide]:
+        raise TemplateNotCompilable(f"El resultado de {name} depende de la longitud de los valores")
+
+    for i, piece in enumerate(pieces):
+        if isinstance(piece, str):
+            if _RESERVED_RE.search(piece):
+                raise TemplateNotCompilable(f"Centinela incompleto en {name}")
+            if i + 1 < len(pieces) and piece.rfind('<') > piece.rfind('>'):
+                raise TemplateNotCompilable(f"Valor dentro de una etiqueta o atributo en {name}")
+        else:
+            pieces[i] = piece[0]
+    return [p for p in pieces if p != '']
+
+
+def compile_docx_template(template_path):
+    """
+    Compila la plantilla.
+
+    Raises:
+        TemplateNotCompilable: Si la plantilla debe procesarse con python-docx
+    """
+    document_name = os.path.basename(template_path)
+    if get_nomenclature_config(document_name, template_path):
+        raise TemplateNotCompilable("La plantilla lleva hipervínculos")
+
+    replacements_config = get_replacements_config()
+    tables_config = get_tables_config()
+    pristine = _package_members(load_document(template_path))
+    with open_template(template_path) as f:
+        template_members = {member.filename for member in read_raw_members(f)}
+
+    runs = []
+    for width in (1, 3):
+        replacements = _sentinel_replacements(replacements_config, width)
+        doc = apply_word_replacements(
+            load_document(template_path), template_path, replacements, replacements_config, tables_config
+        )
+        runs.append((replacements, doc, _package_members(doc)))
+    (replacements, doc, output), (_, _, wide_output) = runs
+    if list(output) != list(wide_output):
+        raise TemplateNotCompilable("Los miembros del paquete dependen de los valores")
+
+    # Solo las partes se copian de la plantilla: [Content_Types].xml y las
+    # relaciones las regenera python-docx y pueden no coincidir con las originales
+    copyable = template_members & {part.partname.membername for part in doc.part.package.iter_parts()}
+
+    members = []
+    slots = set()
+    for name, blob in output.items():
+        if name in copyable and blob == pristine.get(name) and blob == wide_output[name]:
+            members.append((name, None))
+            continue
+        pieces = _compile_pieces(name, blob, wide_output[name])
+        slots.update(p for p in pieces if not isinstance(p, str))
+        members.append((name, pieces))
+
+    slot_keys = {}
+    for slot in sorted(slots):
+        sentinel = _sentinel(slot, 1)
+        key = next((k for k, v in replacements.items() if v == sentinel), None)
+        if key is None:
+            raise TemplateNotCompilable(f"Hueco {slot} sin clave de reemplazo")
+        slot_keys[slot] = key
+
+    return CompiledDocx(template_path, members, slot_keys, _text_contexts(doc))
+
+
+class CompiledDocxStore:
+    """
+    Plantillas compiladas del proceso (LRU en memoria) respaldadas por
+    archivos JSON en `directory` compartidos entre procesos.
+    """
+
+    def __init__(self, directory, max_entries=64):
+        self.directory = str(directory)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _artifact_key(self, template_path):
+        parts = (str(COMPILER_VERSION), get_template_hash(template_path), get_config_fingerprint())
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def _artifact_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, template_path):
+        """Devuelve la plantilla compilada o None si no es compilable."""
+        key = (os.path.abspath(template_path), self._artifact_key(template_path))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        compiled = self._load_or_compile(template_path, key[1])
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def compile(self, template_path, force=False):
+        """
+        Compila la plantilla y guarda el resultado (o el motivo por el que no es compilable).
+        Devuelve (CompiledDocx o None, motivo).
+        """
+        artifact_key = self._artifact_key(template_path)
+        if not force:
+            data = self._read(artifact_key)
+            if data is not None:
+                return self._from_artifact(template_path, data), data.get('reason')
+
+        try:
+            compiled = compile_docx_template(template_path)
+            data = {'reason': None, **compiled.to_dict()}
+        except TemplateNotCompilable as e:
+            compiled = None
+            data = {'reason': str(e)}
+        data['template'] = os.path.basename(template_path)
+        self._write(artifact_key, data)
+        return compiled, data['reason']
+
+    def _load_or_compile(self, template_path, artifact_key):
+        data = self._read(artifact_key)
+        if data is not None:
+            return self._from_artifact(template_path, data)
+        compiled, reason = self.compile(template_path, force=True)
+        if reason:
+            logger.info(f"Plantilla Word no compilable {os.path.basename(template_path)}: {reason}")
+        return compiled
+
+    @staticmethod
+    def _from_artifact(template_path, data):
+        if data.get('reason'):
+            return None
+        return CompiledDocx.from_dict(template_path, data)
+
+    def _read(self, artifact_key):
+        try:
+            with open(self._artifact_path(artifact_key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Plantilla compilada ilegible {artifact_key}: {e}")
+            return None
+
+    def _write(self, artifact_key, data):
+        path = self._artifact_path(artifact_key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la plantilla compilada en {self.directory}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_compiled_docx_store():
+    """Instancia de CompiledDocxStore del proceso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CompiledDocxStore(
+                    settings.COMPILED_DOCX_DIR,
+                    max_entries=getattr(settings, 'COMPILED_DOCX_MAX_ENTRIES', 64),
+                )
+    return _store
+
+
+def render_compiled_docx(template_path, filename, audit, output, marks=None):
+    """
+    Genera el documento Word desde la plantilla compilada.
+
+    Devuelve False, sin escribir nada en `output`, si el documento debe
+    generarse con python-docx (plantilla no compilable, marcas de auditoría
+    o valores no seguros).
+    """
+    if not getattr(settings, 'COMPILED_DOCX_ENABLED', False):
+        return False
+
+    try:
+        compiled = get_compiled_docx_store().get(template_path)
+    except Exception as e:
+        logger.warning(f"No se pudo compilar la plantilla {filename}: {e}")
+        return False
+    if compiled is None:
+        return False
+
+    if AuditMarkProcessor(audit.id, filename, marks=marks).affects_document():
+        return False
+
+    values = compiled.resolve_values(build_word_replacements(audit))
+    if values is None:
+        logger.debug(f"Valores de la auditoría {audit.id} no aptos para la plantilla compilada {filename}")
+        return False
+
+    compiled.write(output, values)
+    return True
@@ -0,0 +1,166 @@
+"""
+Generación de documentos de auditoría a partir de plantillas.
+
+Centraliza la cadena de procesamiento compartida por las vistas de descarga:
+reemplazos estándar + marcas de auditoría para Word/Excel y reemplazos en
+sharedStrings para archivos con macros. Los documentos Word se generan desde
+la plantilla compilada cuando es posible (auditoria.services.compiled_docx) y
+los Excel sin procesador de datos reescribiendo solo sus textos
+(auditoria.excel_utils.text_only_workbook).
+"""
+
+import os
+import shutil
+import logging
+
+from auditoria.word_utils import modify_document_word
+from auditoria.excel_utils import modify_document_excel, modify_document_excel_with_macros
+from auditoria.excel_utils.text_only_workbook import is_text_only_workbook, write_text_only_workbook
+from auditoria.excel_utils.xlsm_output_store import is_xlsm_output
+from auditoria.services.audit_mark_processor import AuditMarkProcessor
+from auditoria.services.compiled_docx import render_compiled_docx
+from auditoria.utils.render_timing import annotate, span
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.xlsm': 'application/vnd.ms-excel.sheet.macroEnabled.12',
+}
+
+
+def get_render_content_type(filename):
+    """
+    Devuelve el content type del documento generado o None si el tipo de
+    archivo no se procesa (se entrega la plantilla tal cual).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return CONTENT_TYPES.get(extension)
+
+
+def render_macro_workbook(template_path, filename, audit):
+    """
+    Procesa un archivo con macros (.xlsm) y devuelve la ruta del resultado.
+
+    La ruta es la plantilla o un resultado del almacén de xlsm_output_store,
+    que se reutiliza en las descargas siguientes y puede desalojarse: debe
+    abrirse enseguida y liberarse con discard_processed_file.
+    """
+    # modify_document_excel_with_macros devuelve una ruta de archivo, no un objeto workbook
+    # NOTA: Los archivos XLSM NO obtienen marcas de auditoría (demasiado riesgoso para macros)
+    annotate(pipeline='xlsm')
+    with span('xlsm'):
+        processed_file_path = modify_document_excel_with_macros(template_path, audit)
+    logger.info(f"Archivo XLSM: {filename} - Omitiendo procesamiento de marcas de auditoría")
+    return processed_file_path
+
+
+def discard_processed_file(processed_file_path, template_path):
+    """
+    Libera el resultado de render_macro_workbook. Los resultados del almacén
+    se conservan; cualquier otro archivo temporal se elimina con su carpeta.
+    """
+    if os.path.abspath(processed_file_path) == os.path.abspath(template_path):
+        return
+    if is_xlsm_output(processed_file_path):
+        return
+    try:
+        os.remove(processed_file_path)
+    except OSError:
+        pass
+    try:
+        os.rmdir(os.path.dirname(processed_file_path))
+    except OSError:
+        pass
+
+
+def render_document(template_path, filename, audit, output, financial_data=None, marks=None):
+    """
+    Genera el documento de la auditoría y lo escribe en `output`.
+
+    Args:
+        template_path: Ruta de la plantilla
+        filename: Nombre de archivo solicitado (se usa para emparejar marcas)
+        audit: Instancia de Audit
+        output: Objeto tipo archivo binario donde se escribe el resultado
+        financial_data: Datos financieros organizados ya obtenidos (opcional, solo Excel)
+        marks: Marcas activas ya obtenidas (opcional)
+
+    Returns:
+        bool: False si el documento se generó sin sus marcas de auditoría por un
+            error; se puede entregar, pero no debe guardarse en la caché
+
+    Raises:
+        ValueError: Si el tipo de archivo no se procesa
+    """
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension == '.docx':
+        # Plantilla compilada: sin python-docx si no hay marcas ni hipervínculos
+        with span('compiled_docx'):
+            compiled = render_compiled_docx(template_path, filename, audit, output, marks=marks)
+        if compiled:
+            annotate(pipeline='compiled_docx')
+            return True
+
+        # Aplicar reemplazos estándar
+        annotate(pipeline='python-docx')
+        with span('word'):
+            doc = modify_document_word(template_path, audit)
+
+        # Aplicar marcas de auditoría
+        try:
+            with span('marks'):
+                processor = AuditMarkProcessor(audit.id, filename, marks=marks)
+                doc = processor.process_word_document(doc)
+            complete = not processor.failed
+        except Exception as e:
+            logger.warning(f"No se pudieron agregar marcas de auditoría para {filename}: {e}")
+            # Continuar con la descarga incluso si las marcas fallan
+            complete = False
+
+        with span('save'):
+            doc.save(output)
+    elif extension == '.xlsx':
+        # Plantillas sin procesador de datos: solo se reescriben los textos del ZIP
+        if is_text_only_workbook(template_path):
+            with span('text_only'):
+                written = (not AuditMarkProcessor(audit.id, filename, marks=marks).affects_document()
+                           and write_text_only_workbook(template_path, audit, output))
+            if written:
+                annotate(pipeline='text_only')
+                return True
+
+        # Aplicar reemplazos estándar
+        annotate(pipeline='openpyxl')
+        with span('excel'):
+            wb = modify_document_excel(template_path, audit, financial_data=financial_data)
+
+        # Aplicar marcas de auditoría
+        try:
+            with span('marks'):
+                processor = AuditMarkProcessor(audit.id, filename, marks=marks)
+                wb = processor.process_excel_document(wb)
+            complete = not processor.failed
+        except Exception as e:
+            logger.warning(f"No se pudieron agregar marcas de auditoría para {filename}: {e}")
+            # Continuar con la descarga incluso si las marcas fallan
+            complete = False
+
+        with span('save'):
+            wb.save(output)
+    elif extension == '.xlsm':
+        processed_file_path = render_macro_workbook(template_path, filename, audit)
+        try:
+            with span('save'), open(processed_file_path, 'rb') as f:
+                shutil.copyfileobj(f, output)
+        finally:
+            discard_processed_file(processed_file_path, template_path)
+        complete = True
+    else:
+        raise ValueError(f"Tipo de archivo no procesable: {filename}")
+
+    if not complete:
+        annotate(marks='failed')
+    return complete
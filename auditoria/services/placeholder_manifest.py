@@ -0,0 +1,232 @@
+"""
+Manifiesto de placeholders por plantilla.
+
+La mayoría de las celdas de las plantillas son etiquetas fijas o números. El
+manifiesto guarda, para cada plantilla, solo las ubicaciones que contienen
+algún disparador de reemplazo, y en cada descarga se visitan únicamente esas:
+
+- Excel: {hoja: [coordenadas]} de las celdas de texto con alguna clave de
+  reemplazo, patrón exacto o patrón de tablas.json.
+- Word: índices de doc.paragraphs con alguna clave de reemplazo o patrón
+  regex de replacements.json, e índices de doc.tables con alguna celda que
+  contenga un patrón de tablas.json.
+
+Una ubicación sin disparadores en la plantilla original no cambia nunca, así
+que omitirla no altera el resultado. El manifiesto se calcula con la copia
+prístina de la plantilla la primera vez que se usa y se guarda como JSON en
+PLACEHOLDER_MANIFEST_DIR (clave: versión + hash de la plantilla + huella de
+la configuración), compartido entre procesos.
+"""
+
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from auditoria.services.render_cache import get_template_hash, get_config_fingerprint
+from auditoria.utils.config_store import get_config_store
+from auditoria.utils.replacements_utils import (
+    get_replacements_config,
+    get_tables_config,
+    get_replacement_triggers,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+class PlaceholderManifest:
+    """
+    Ubicaciones de una plantilla que pueden cambiar con los reemplazos.
+
+    Attributes:
+        cells: {título de hoja: [coordenadas]} (Excel)
+        paragraphs: Índices de doc.paragraphs (Word)
+        tables: Índices de doc.tables (Word)
+    """
+
+    __slots__ = ('cells', 'paragraphs', 'tables')
+
+    def __init__(self, cells=None, paragraphs=(), tables=()):
+        self.cells = cells or {}
+        self.paragraphs = tuple(paragraphs)
+        self.tables = tuple(tables)
+
+    def to_dict(self):
+        return {'cells': self.cells, 'paragraphs': list(self.paragraphs), 'tables': list(self.tables)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('cells'), data.get('paragraphs', ()), data.get('tables', ()))
+
+
+def _contains_any(text, triggers):
+    return any(trigger in text for trigger in triggers)
+
+
+def build_workbook_manifest(workbook):
+    """Manifiesto de un Workbook de openpyxl sin modificar."""
+    triggers = get_replacement_triggers(get_replacements_config(), get_tables_config())
+    cells = {}
+    for sheet in workbook.worksheets:
+        coordinates = [
+            cell.coordinate
+            for row in sheet.iter_rows()
+            for cell in row
+            if cell.value and isinstance(cell.value, str) and _contains_any(cell.value, triggers)
+        ]
+        if coordinates:
+            cells[sheet.title] = coordinates
+    return PlaceholderManifest(cells=cells)
+
+
+def build_document_manifest(doc):
+    """Manifiesto de un Document de python-docx sin modificar."""
+    replacements_config = get_replacements_config()
+    tables_config = get_tables_config()
+
+    # Párrafos: claves de reemplazo y patrones regex de replacements.json
+    paragraph_triggers = get_replacement_triggers(replacements_config, {})
+    paragraph_patterns = [rule.regex for rule in get_config_store().get_replacement_regex_rules()]
+    paragraphs = [
+        index for index, paragraph in enumerate(doc.paragraphs)
+        if _contains_any(paragraph.text, paragraph_triggers)
+        or any(pattern.search(paragraph.text) for pattern in paragraph_patterns)
+    ]
+
+    # Tablas: textos a buscar y patrones regex de tables.json
+    buscar = [patron['buscar'] for patron in tables_config.get('patrones', []) if patron.get('buscar')]
+    table_patterns = [rule.regex for rule in get_config_store().get_table_regex_rules()]
+
+    def cell_has_trigger(cell):
+        text = cell.text
+        normalized = text.strip().replace('\n', ' ').replace('  ', ' ')
+        return (_contains_any(normalized, buscar)
+                or any(pattern.search(text) for pattern in table_patterns))
+
+    tables = [
+        index for index, table in enumerate(doc.tables)
+        if any(cell_has_trigger(cell) for row in table.rows for cell in row.cells)
+    ]
+    return PlaceholderManifest(paragraphs=paragraphs, tables=tables)
+
+
+class PlaceholderManifestStore:
+    """
+    Manifiestos del proceso (LRU en memoria) respaldados por archivos JSON en
+    `directory` compartidos entre procesos.
+    """
+
+    def __init__(self, directory, max_entries=256):
+        self.directory = str(directory)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _artifact_key(self, template_path):
+        parts = (str(MANIFEST_VERSION), get_template_hash(template_path), get_config_fingerprint())
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def _artifact_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, template_path, build):
+        """
+        Devuelve el manifiesto de la plantilla. Si no existe se calcula con
+        build(), que recibe la plantilla sin modificar.
+        """
+        key = (os.path.abspath(template_path), self._artifact_key(template_path))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        data = self._read(key[1])
+        if data is not None:
+            manifest = PlaceholderManifest.from_dict(data)
+        else:
+            manifest = build()
+            self._write(key[1], {'template': os.path.basename(template_path), **manifest.to_dict()})
+
+        with self._lock:
+            self._entries[key] = manifest
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return manifest
+
+    def _read(self, artifact_key):
+        try:
+            with open(self._artifact_path(artifact_key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifiesto de placeholders ilegible {artifact_key}: {e}")
+            return None
+
+    def _write(self, artifact_key, data):
+        path = self._artifact_path(artifact_key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el manifiesto de placeholders en {self.directory}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_placeholder_manifest_store():
+    """Instancia de PlaceholderManifestStore del proceso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PlaceholderManifestStore(settings.PLACEHOLDER_MANIFEST_DIR)
+    return _store
+
+
+def get_workbook_manifest(template_path, workbook):
+    """
+    Manifiesto de una plantilla Excel, o None si está desactivado.
+    `workbook` debe ser la copia de trabajo aún sin modificar.
+    """
+    if not getattr(settings, 'PLACEHOLDER_MANIFEST_ENABLED', False):
+        return None
+    try:
+        return get_placeholder_manifest_store().get(template_path, lambda: build_workbook_manifest(workbook))
+    except Exception as e:
+        logger.warning(f"Sin manifiesto de placeholders para {os.path.basename(template_path)}: {e}")
+        return None
+
+
+def get_document_manifest(template_path, doc):
+    """
+    Manifiesto de una plantilla Word, o None si está desactivado.
+    `doc` debe ser la copia de trabajo aún sin modificar.
+    """
+    if not getattr(settings, 'PLACEHOLDER_MANIFEST_ENABLED', False):
+        return None
+    try:
+        return get_placeholder_manifest_store().get(template_path, lambda: build_document_manifest(doc))
+    except Exception as e:
+        logger.warning(f"Sin manifiesto de placeholders para {os.path.basename(template_path)}: {e}")
+        return None
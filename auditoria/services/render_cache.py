@@ -0,0 +1,180 @@
+"""
+Caché versionada de documentos de auditoría generados.
+
+La clave se construye a partir de todo lo que determina el contenido final:
+- Hash del archivo de plantilla
+- Huella de los campos de la auditoría usados en los reemplazos
+- Versión de los datos financieros (balances, auxiliares, saldos, ajustes)
+- Versión de las marcas de auditoría
+- Archivos de configuración JSON y BASE_URL (hipervínculos)
+
+Al cambiar cualquiera de ellos cambia la clave, por lo que nunca se invalida
+explícitamente: las entradas obsoletas se desalojan por LRU.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+
+from django.conf import settings
+
+from auditoria.models import AuditMark
+from auditoria.utils.data_db import get_financial_data_version
+from auditoria.utils.disk_cache import DiskCache
+from auditoria.utils.template_bytes import open_template
+
+logger = logging.getLogger(__name__)
+
+# Incrementar cuando cambie la lógica de generación para descartar documentos previos
+RENDER_PIPELINE_VERSION = 2
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config')
+
+_template_hashes = {}
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    """Devuelve la instancia de DiskCache del proceso o None si está deshabilitada."""
+    global _cache
+    if not getattr(settings, 'RENDER_CACHE_ENABLED', False):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(settings.RENDER_CACHE_DIR, settings.RENDER_CACHE_MAX_BYTES)
+    return _cache
+
+
+def get_template_hash(template_path):
+    """
+    Hash SHA-256 del contenido de la plantilla.
+    Se memoriza por (ruta, mtime, tamaño) para no releer el archivo en cada descarga.
+    """
+    stat = os.stat(template_path)
+    memo_key = (template_path, stat.st_mtime_ns, stat.st_size)
+    cached = _template_hashes.get(memo_key)
+    if cached is None:
+        digest = hashlib.sha256()
+        with open_template(template_path) as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        cached = digest.hexdigest()
+        _template_hashes[memo_key] = cached
+    return cached
+
+
+def get_config_fingerprint():
+    """Huella de los archivos de configuración JSON (nombre, mtime y tamaño)."""
+    parts = []
+    try:
+        for name in sorted(os.listdir(CONFIG_DIR)):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(CONFIG_DIR, name))
+                parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+    except OSError as e:
+        logger.warning(f"No se pudo leer el directorio de configuración: {e}")
+    return '|'.join(parts)
+
+
+def get_audit_fingerprint(audit):
+    """Huella de los campos de la auditoría que intervienen en los reemplazos."""
+    manager_name = audit.audit_manager.get_full_name() if audit.audit_manager else ''
+    fields = (
+        audit.id,
+        audit.title,
+        audit.identidad,
+        audit.tipoAuditoria,
+        audit.moneda,
+        audit.fechaInit.isoformat() if audit.fechaInit else None,
+        audit.fechaEnd.isoformat() if audit.fechaEnd else None,
+        manager_name,
+    )
+    return repr(fields)
+
+
+def get_audit_marks_version(audit_id):
+    """Huella de las marcas de auditoría de la auditoría."""
+    digest = hashlib.sha256()
+    rows = AuditMark.objects.filter(audit_id=audit_id).order_by('id').values_list(
+        'id', 'symbol', 'description', 'work_paper_number', 'category', 'is_active', 'updated_at'
+    )
+    for row in rows:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def build_render_key(template_path, filename, audit, financial_version=None, marks_version=None):
+    """
+    Construye la clave de caché del documento generado.
+
+    `financial_version` y `marks_version` pueden calcularse una sola vez
+    cuando se generan varios documentos de la misma auditoría.
+    """
+    if financial_version is None:
+        financial_version = get_financial_data_version(audit.id)
+    if marks_version is None:
+        marks_version = get_audit_marks_version(audit.id)
+    parts = (
+        f"v{RENDER_PIPELINE_VERSION}",
+        get_template_hash(template_path),
+        filename,
+        get_audit_fingerprint(audit),
+        financial_version,
+        marks_version,
+        get_config_fingerprint(),
+        settings.BASE_URL,
+    )
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_cached_render(key):
+    """Devuelve la ruta del documento cacheado o None."""
+    cache = get_render_cache()
+    if cache is None:
+        return None
+    return cache.get(key)
+
+
+def store_render_file(key, fileobj):
+    """
+    Guarda el documento generado copiándolo desde un archivo abierto.
+    Los errores de disco no interrumpen la descarga.
+    """
+    cache = get_render_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.put_file(key, fileobj)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el documento en caché: {e}")
+        return None
+
+
+def render_to_file(key, write):
+    """
+    Ejecuta write(f) sobre un archivo y lo devuelve abierto en lectura desde el inicio.
+
+    Con la caché habilitada el documento se escribe directamente en ella (queda
+    guardado bajo `key`, salvo que write devuelva False, y se sirve desde el
+    mismo descriptor). Sin caché se usa un SpooledTemporaryFile, que pasa a disco
+    por encima de RENDER_SPOOL_MAX_MEMORY.
+    """
+    cache = get_render_cache()
+    if cache is not None:
+        output = cache.put_stream(key, write)
+        if output is not None:
+            return output
+
+    output = tempfile.SpooledTemporaryFile(max_size=getattr(settings, 'RENDER_SPOOL_MAX_MEMORY', 1024 * 1024))
+    try:
+        write(output)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
@@ -0,0 +1,221 @@
+"""
+Cola de generación de documentos en segundo plano respaldada por la base de datos.
+
+Las plantillas Excel con procesadores pesados (centralizadoras, sumaria,
+análisis horizontal/vertical, ratios) pueden superar GUNICORN_TIMEOUT en
+auditorías con cientos de cuentas, igual que los ZIP de carpetas grandes o de
+la auditoría completa. En modo asíncrono la vista de descarga solo registra un
+RenderJob; el proceso `manage.py render_worker` lo genera, el navegador
+consulta el estado y descarga el archivo al terminar.
+
+Los trabajos se reclaman con un UPDATE condicional sobre el estado, por lo que
+pueden convivir varios workers sin bloqueos específicos del motor de base de datos.
+"""
+
+import os
+import shutil
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from auditoria.models import RenderJob
+from auditoria.utils.render_timing import log_render_timing, render_timing
+from auditoria.utils.template_index import get_template_index
+from auditoria.services.archive_renderer import AuditArchiveRenderer
+from auditoria.services.document_renderer import render_document
+from auditoria.services.render_cache import build_render_key, get_cached_render, store_render_file
+
+logger = logging.getLogger(__name__)
+
+# Extensiones que se generan en segundo plano cuando el modo asíncrono está habilitado
+ASYNC_RENDER_EXTENSIONS = ('.xlsx',)
+
+# Los trabajos cuyo archivo es un .zip generan todos los documentos de la carpeta
+ARCHIVE_JOB_EXTENSION = '.zip'
+
+ACTIVE_STATUSES = (RenderJob.STATUS_PENDING, RenderJob.STATUS_RUNNING)
+
+
+def is_async_render_enabled():
+    return getattr(settings, 'RENDER_JOBS_ENABLED', False)
+
+
+def is_async_render_candidate(filename):
+    """Indica si el documento puede generarse en segundo plano."""
+    return is_async_render_enabled() and filename.lower().endswith(ASYNC_RENDER_EXTENSIONS)
+
+
+def is_archive_job(job):
+    return job.filename.lower().endswith(ARCHIVE_JOB_EXTENSION)
+
+
+def enqueue_render_job(audit, folder, filename, user):
+    """
+    Registra un trabajo de generación. Si el usuario ya tiene uno pendiente o en
+    proceso para el mismo documento se devuelve ese en lugar de duplicarlo.
+    """
+    job = RenderJob.objects.filter(
+        audit=audit, requested_by=user, folder=folder, filename=filename,
+        status__in=ACTIVE_STATUSES,
+    ).first()
+    if job is None:
+        job = RenderJob.objects.create(audit=audit, requested_by=user, folder=folder, filename=filename)
+        logger.info(f"Trabajo de generación {job.id} encolado: {folder}/{filename} (auditoría {audit.id})")
+    return job
+
+
+def claim_next_job():
+    """Reclama el trabajo pendiente más antiguo; devuelve None si no hay ninguno."""
+    candidates = list(
+        RenderJob.objects.filter(status=RenderJob.STATUS_PENDING)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = RenderJob.objects.filter(id=job_id, status=RenderJob.STATUS_PENDING).update(
+            status=RenderJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return RenderJob.objects.select_related('audit__audit_manager', 'requested_by__role').get(id=job_id)
+    return None
+
+
+def get_job_dir(job_id):
+    return os.path.join(settings.RENDER_JOBS_DIR, str(job_id))
+
+
+def run_job(job):
+    """Genera el documento del trabajo y registra el resultado o el error."""
+    try:
+        result_path = _render_job(job)
+    except Exception as e:
+        logger.exception(f"Error en el trabajo de generación {job.id}: {e}")
+        RenderJob.objects.filter(id=job.id, status=RenderJob.STATUS_RUNNING).update(
+            status=RenderJob.STATUS_FAILED, error=str(e), finished_at=timezone.now(),
+        )
+        return False
+
+    RenderJob.objects.filter(id=job.id, status=RenderJob.STATUS_RUNNING).update(
+        status=RenderJob.STATUS_DONE, result_path=result_path, error='', finished_at=timezone.now(),
+    )
+    logger.info(f"Trabajo de generación {job.id} completado: {job.folder}/{job.filename}")
+    return True
+
+
+def _render_job(job):
+    if is_archive_job(job):
+        return _render_archive_job(job)
+
+    audit = job.audit
+    is_internal = audit.tipoAuditoria == 'I'
+    template_path = get_template_index(is_internal).resolve(job.folder, job.filename)
+    if not template_path or not os.path.exists(template_path):
+        raise FileNotFoundError(f"Plantilla no encontrada: {job.folder}/{job.filename}")
+
+    job_dir = get_job_dir(job.id)
+    os.makedirs(job_dir, exist_ok=True)
+    result_path = os.path.join(job_dir, os.path.basename(template_path))
+    tmp_path = f"{result_path}.tmp"
+
+    cache_key = build_render_key(template_path, job.filename, audit)
+    cached_path = get_cached_render(cache_key)
+    if cached_path:
+        try:
+            shutil.copyfile(cached_path, tmp_path)
+            os.replace(tmp_path, result_path)
+            return result_path
+        except OSError:
+            logger.info(f"Entrada de caché no disponible para {job.filename}, regenerando")
+
+    with open(tmp_path, 'w+b') as f:
+        with render_timing(template=job.filename, audit_id=audit.id, job_id=job.id) as timing:
+            complete = render_document(template_path, job.filename, audit, f)
+        if timing is not None:
+            timing.annotate(bytes=f.tell())
+            log_render_timing(timing)
+        if complete:
+            f.seek(0)
+            store_render_file(cache_key, f)
+    os.replace(tmp_path, result_path)
+    return result_path
+
+
+def _render_archive_job(job):
+    # Importación diferida: las vistas importan este módulo
+    from auditoria.views.utils import listar_documentos_zip
+
+    entries = listar_documentos_zip(job.audit, job.folder, job.requested_by)
+    if not entries:
+        raise FileNotFoundError(f"Sin documentos disponibles en la carpeta: {job.folder or '/'}")
+
+    job_dir = get_job_dir(job.id)
+    os.makedirs(job_dir, exist_ok=True)
+    result_path = os.path.join(job_dir, os.path.basename(job.filename))
+    tmp_path = f"{result_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        AuditArchiveRenderer(job.audit, entries).write_to(f)
+    os.replace(tmp_path, result_path)
+    return result_path
+
+
+def requeue_stale_jobs():
+    """
+    Trabajos en proceso que superaron RENDER_JOB_TIMEOUT (el worker murió o se
+    reinició): se reintentan hasta RENDER_JOB_MAX_ATTEMPTS y después se marcan fallidos.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.RENDER_JOB_TIMEOUT)
+    stale = RenderJob.objects.filter(status=RenderJob.STATUS_RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=settings.RENDER_JOB_MAX_ATTEMPTS).update(
+        status=RenderJob.STATUS_FAILED,
+        error='Tiempo de generación agotado',
+        finished_at=timezone.now(),
+    )
+    # started_at se conserva: fail_unclaimed_jobs mide desde ahí la espera del reintento
+    requeued = stale.update(status=RenderJob.STATUS_PENDING)
+    if failed or requeued:
+        logger.warning(f"Trabajos de generación vencidos: {requeued} reencolados, {failed} fallidos")
+    return requeued, failed
+
+
+def fail_unclaimed_jobs():
+    """
+    Trabajos pendientes que ningún worker tomó en RENDER_JOB_PENDING_TIMEOUT
+    (render_worker caído o no iniciado): se marcan fallidos para que el
+    navegador deje de consultar. Se ejecuta también desde la vista de estado,
+    ya que no puede depender del worker.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.RENDER_JOB_PENDING_TIMEOUT)
+    # Los reintentos pasaron a pendientes al vencer RENDER_JOB_TIMEOUT desde su último inicio
+    retry_cutoff = cutoff - timedelta(seconds=settings.RENDER_JOB_TIMEOUT)
+    failed = RenderJob.objects.filter(
+        Q(attempts=0, created_at__lt=cutoff) | Q(attempts__gt=0, started_at__lt=retry_cutoff),
+        status=RenderJob.STATUS_PENDING,
+    ).update(
+        status=RenderJob.STATUS_FAILED,
+        error='Ningún proceso de generación tomó el trabajo; vuelva a intentarlo más tarde',
+        finished_at=now,
+    )
+    if failed:
+        logger.warning(f"{failed} trabajos de generación sin procesar marcados como fallidos")
+    return failed
+
+
+def purge_expired_jobs():
+    """Elimina los trabajos terminados (y sus archivos) anteriores a RENDER_JOB_RETENTION."""
+    cutoff = timezone.now() - timedelta(seconds=settings.RENDER_JOB_RETENTION)
+    expired = RenderJob.objects.filter(
+        status__in=(RenderJob.STATUS_DONE, RenderJob.STATUS_FAILED), finished_at__lt=cutoff,
+    )
+    job_ids = list(expired.values_list('id', flat=True))
+    for job_id in job_ids:
+        shutil.rmtree(get_job_dir(job_id), ignore_errors=True)
+    if job_ids:
+        RenderJob.objects.filter(id__in=job_ids).delete()
+        logger.info(f"{len(job_ids)} trabajos de generación expirados eliminados")
+    return len(job_ids)
@@ -1,10 +1,136 @@
-const { audit_id, import_url } = window.AUDIT_CTX || { audit_id: null, import_url: null };
+const { audit_id, import_url, async_render, tree_url } = window.AUDIT_CTX || { audit_id: null, import_url: null, async_render: false, tree_url: null };
+
+const RENDER_POLL_INTERVAL_MS = 2000;
+
+// Árbol de carpetas: el servidor solo genera el primer nivel y el contenido de
+// cada carpeta se construye al abrirla a partir del árbol JSON (se pide una vez).
+let folderTreePromise = null;
+
+function loadFolderTree() {
+    if (!folderTreePromise) {
+        folderTreePromise = fetch(tree_url, { headers: { "Accept": "application/json" } })
+            .then(response => {
+                if (!response.ok) throw new Error("HTTP " + response.status);
+                return response.json();
+            })
+            .then(data => data.tree)
+            .catch(error => {
+                folderTreePromise = null;
+                throw error;
+            });
+    }
+    return folderTreePromise;
+}
+
+function findFolderChildren(tree, path) {
+    let nodes = tree;
+    for (const name of path.split("/").filter(Boolean)) {
+        const folder = nodes.find(node => node.children && node.name === name);
+        if (!folder) return null;
+        nodes = folder.children;
+    }
+    return nodes;
+}
+
+function fileIcon(name) {
+    const lower = name.toLowerCase();
+    if (lower.endsWith(".docx")) return ["/static/icons/microsoft-word-2013-logo.svg", "📝"];
+    if (lower.endsWith(".xlsx") || lower.endsWith(".xlsm")) return ["/static/icons/microsoft-excel-2013.svg", "📊"];
+    return ["📄", "📄"];
+}
+
+function createIcon(src, alt) {
+    const img = document.createElement("img");
+    img.src = src;
+    img.className = "icon-img";
+    img.alt = alt;
+    return img;
+}
+
+function createFolderItem(node, path) {
+    const li = document.createElement("li");
+    li.className = "folder-item";
+    const button = document.createElement("button");
+    button.className = "folder-button";
+    button.append(createIcon("/static/icons/carpeta.svg", "📂"), " " + node.name);
+    const container = document.createElement("div");
+    container.style.display = "none";
+    button.addEventListener("click", () => toggleFolderElement(container, () => node.children, path));
+    li.append(button, container);
+    return li;
+}
+
+function createFileItem(node, folderPath) {
+    const li = document.createElement("li");
+    const [src, alt] = fileIcon(node.name);
+    if (!node.locked) {
+        li.className = "file-item";
+        const link = document.createElement("a");
+        const folder = folderPath.split("/").map(encodeURIComponent).join("/");
+        link.href = `/auditoria/download/${audit_id}/${folder}/${encodeURIComponent(node.name)}`;
+        link.className = "file-link";
+        link.append(createIcon(src, alt), " " + node.name);
+        li.append(link);
+    } else {
+        li.className = "file-item file-locked";
+        const disabled = document.createElement("div");
+        disabled.className = "file-link-disabled";
+        disabled.style.cssText = "display: flex; align-items: center; color: #999; cursor: not-allowed; position: relative; padding: 5px 8px; border-radius: 4px; background-color: rgba(0,0,0,0.03);";
+        disabled.title = "Usuario no verificado. Contacte al administrador para desbloquear el acceso.";
+        const icon = createIcon(src, alt);
+        icon.style.cssText = "opacity: 0.5; margin-right: 5px;";
+        const label = document.createElement("span");
+        label.style.marginRight = "25px";
+        label.textContent = node.name;
+        const lock = document.createElement("i");
+        lock.className = "fas fa-lock";
+        lock.style.cssText = "position: absolute; right: 10px; color: #e74c3c; font-size: 14px;";
+        disabled.append(icon, " ", label, lock);
+        li.append(disabled);
+    }
+    return li;
+}
+
+function renderFolderContents(container, nodes, path) {
+    const ul = document.createElement("ul");
+    for (const node of nodes) {
+        if (node.children) {
+            ul.append(createFolderItem(node, path ? `${path}/${node.name}` : node.name));
+        } else {
+            ul.append(createFileItem(node, path));
+        }
+    }
+    container.replaceChildren(ul);
+    container.dataset.loaded = "1";
+}
+
+function toggleFolderElement(element, getChildren, path) {
+    const isVisible = element.style.display === "block";
+    if (isVisible || element.dataset.loaded || !getChildren) {
+        element.style.display = isVisible ? "none" : "block";
+        return;
+    }
+    Promise.resolve(getChildren())
+        .then(nodes => {
+            if (!nodes) throw new Error("Carpeta no encontrada: " + path);
+            renderFolderContents(element, nodes, path);
+            element.style.display = "block";
+        })
+        .catch(error => {
+            console.error("Error:", error);
+            alert("❌ Error inesperado al cargar la carpeta.");
+        });
+}
 
 function toggleFolder(folderId) {
     const element = document.getElementById(folderId);
-    if (element) {
-        const isVisible = element.style.display === "block";
-        element.style.display = isVisible ? "none" : "block";
+    if (!element) return;
+    // Carpetas generadas por el servidor sin contenido: se completan con el árbol JSON
+    if (element.dataset.folderPath !== undefined) {
+        const path = decodeURIComponent(element.dataset.folderPath);
+        toggleFolderElement(element, () => loadFolderTree().then(tree => findFolderChildren(tree, path)), path);
+    } else {
+        toggleFolderElement(element, null, null);
     }
 }
 
@@ -78,3 +204,77 @@ window.onclick = function (event) {
         exportModal.style.display = "none";
     }
 };
+
+// Generación en segundo plano de plantillas Excel y ZIP grandes: se encola el
+// trabajo, se consulta el estado periódicamente y se descarga el archivo al terminar.
+function setLinkRendering(link, rendering) {
+    link.classList.toggle("file-link-rendering", rendering);
+    link.style.opacity = rendering ? "0.6" : "";
+    link.title = rendering ? "Generando documento..." : "";
+}
+
+function pollRenderJob(link, statusUrl) {
+    fetch(statusUrl, { headers: { "Accept": "application/json" } })
+        .then(response => response.json())
+        .then(job => handleRenderJob(link, job))
+        .catch(error => {
+            console.error("Error:", error);
+            setLinkRendering(link, false);
+            alert("❌ Error inesperado al consultar la generación del documento.");
+        });
+}
+
+function handleRenderJob(link, job) {
+    if (job.status === "done") {
+        setLinkRendering(link, false);
+        window.location.href = job.download_url;
+    } else if (job.status === "failed") {
+        setLinkRendering(link, false);
+        alert("❌ Error al generar " + job.filename + ": " + job.error);
+    } else {
+        setTimeout(() => pollRenderJob(link, job.status_url), RENDER_POLL_INTERVAL_MS);
+    }
+}
+
+function startAsyncDownload(event, link) {
+    event.preventDefault();
+    if (link.classList.contains("file-link-rendering")) return;
+
+    setLinkRendering(link, true);
+    const url = new URL(link.href, window.location.origin);
+    if (!url.pathname.endsWith("/")) url.pathname += "/";
+    url.searchParams.set("async", "1");
+
+    fetch(url, { headers: { "Accept": "application/json" } })
+        .then(response => {
+            // Documentos (y ZIP pequeños) que no se generan en segundo plano se descargan directamente
+            if (response.status !== 202) {
+                setLinkRendering(link, false);
+                window.location.href = link.href;
+                return null;
+            }
+            return response.json();
+        })
+        .then(job => job && handleRenderJob(link, job))
+        .catch(error => {
+            console.error("Error:", error);
+            setLinkRendering(link, false);
+            alert("❌ Error inesperado al solicitar el documento.");
+        });
+}
+
+if (async_render) {
+    // Delegado en el contenedor: los enlaces se crean al abrir cada carpeta
+    const folderStructure = document.querySelector(".folder-structure");
+    if (folderStructure) {
+        folderStructure.addEventListener("click", event => {
+            const link = event.target.closest("a.file-link");
+            if (link && link.pathname.toLowerCase().endsWith(".xlsx")) {
+                startAsyncDownload(event, link);
+            }
+        });
+    }
+    document.querySelectorAll("a.zip-download-link").forEach(link => {
+        link.addEventListener("click", event => startAsyncDownload(event, link));
+    });
+}
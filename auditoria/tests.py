@@ -0,0 +1,1110 @@
+import io
+import os
+import pickle
+import time
+import random
+import zipfile
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from docx import Document
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from audits.models import Audit
+from users.models import Roles
+
+from .benchmarks import SyntheticAudit, compare_results
+from .models import RenderJob
+from .utils.account_index import AccountIndex
+from .utils.config_store import ConfigStore
+from .utils.disk_cache import DiskCache
+from .utils.render_timing import annotate, current_timing, render_timing, span
+from .utils.template_bytes import TemplateBytesStore
+from .utils.template_cache import ParsedTemplateCache
+from .utils.template_index import TemplateIndex
+from .utils.zip_utils import RawZipWriter, read_raw_members
+from .services import render_cache
+from .services.archive_renderer import AuditArchiveRenderer
+from .services.render_jobs import (
+    claim_next_job, fail_unclaimed_jobs, get_job_dir, purge_expired_jobs, requeue_stale_jobs
+)
+from .services.audit_mark_processor import AuditMarkProcessor
+from .services.compiled_docx import compile_docx_template
+from .services.placeholder_manifest import build_document_manifest, build_workbook_manifest
+from .word_utils import build_word_replacements, modify_document_word
+from .excel_utils import modify_document_excel
+from .excel_utils.shared_strings_replacer import replace_in_xlsm_shared_strings
+from .excel_utils.xlsm_output_store import XlsmOutputStore
+from .processors.shared.text_replacer import CompiledReplacer, replace_text
+from .processors.word import DocumentWalker, TextReplacementHandler, process_tables
+from .processors.word.table_processor.hyperlink_processor import apply_hyperlinks_to_document
+from .processors.word.table_processor.table_walker import cell_text, iter_table_cells
+from .processors.excel.materialidad_file import process_materialidad_file
+from .processors.excel.row_layout import RowLayoutPlan
+from .processors.excel.row_template import RowTemplate
+from .processors.excel.sheet_processor import apply_data_processor, get_data_requirements, process_excel_sheets
+from .utils.data_db import LazyFinancialData
+from .utils.financial_dataset import FinancialDataset
+from .excel_utils.text_only_workbook import get_workbook_template_info, write_text_only_workbook
+from .views.download_views import build_document_response
+from .views.utils import construir_arbol_carpetas, generar_html_estructura
+
+
+class DiskCacheTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.tmp_dir.name, max_bytes=100)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get("ab01"))
+        self.cache.put_bytes("ab01", b"contenido")
+        path = self.cache.get("ab01")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"contenido")
+
+    def test_put_stream_returns_readable_file(self):
+        output = self.cache.put_stream("ab02", lambda f: f.write(b"generado"))
+        with output:
+            self.assertEqual(output.read(), b"generado")
+        with open(self.cache.get("ab02"), "rb") as f:
+            self.assertEqual(f.read(), b"generado")
+
+    def test_put_stream_skips_entry_when_write_returns_false(self):
+        def write(f):
+            f.write(b"sin marcas")
+            return False
+
+        output = self.cache.put_stream("ab03", write)
+        with output:
+            self.assertEqual(output.read(), b"sin marcas")
+        self.assertIsNone(self.cache.get("ab03"))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put_bytes("aa01", b"x" * 40)
+        self.cache.put_bytes("bb02", b"x" * 40)
+        old = time.time() - 100
+        os.utime(self.cache.get("aa01"), (old, old))
+        os.utime(self.cache._path_for("bb02"), (old + 50, old + 50))
+
+        self.cache.put_bytes("cc03", b"x" * 40)
+
+        self.assertIsNone(self.cache.get("aa01"))
+        self.assertIsNotNone(self.cache.get("bb02"))
+        self.assertIsNotNone(self.cache.get("cc03"))
+
+
+class ParsedTemplateCacheTestCase(SimpleTestCase):
+    TEMPLATES_DIR = os.path.join(settings.BASE_DIR, "static", "templates_base_financiera")
+
+    def setUp(self) -> None:
+        self.cache = ParsedTemplateCache(max_bytes=64 * 1024 * 1024)
+
+    def test_document_copies_are_independent(self):
+        path = os.path.join(self.TEMPLATES_DIR, "1 PROYECTO INICIAL", "1 INICIO ENCARGO.docx")
+        first = self.cache.get_document(path)
+        original_text = first.paragraphs[0].text
+        first.paragraphs[0].add_run("MODIFICADO")
+
+        with render_timing(force=True) as timing:
+            second = self.cache.get_document(path)
+
+        self.assertEqual(second.paragraphs[0].text, original_text)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(timing.attributes["template_cache"], "hit")
+        self.assertIn("parse_seconds_saved", timing.attributes)
+
+    def test_workbook_copies_are_independent(self):
+        path = os.path.join(
+            self.TEMPLATES_DIR, "2 ESTRATEGIA Y PLAN DE AUDITORIA",
+            "1 ESTRATEGIA GLOBAL Y PLANIFICACIÓN", "4 Cuestionario.xlsx"
+        )
+        first = self.cache.get_workbook(path)
+        original_value = first.active["A1"].value
+        first.active["A1"] = "MODIFICADO"
+
+        second = self.cache.get_workbook(path)
+
+        self.assertEqual(second.active["A1"].value, original_value)
+
+    def test_evicts_by_size(self):
+        folder = os.path.join(self.TEMPLATES_DIR, "2 ESTRATEGIA Y PLAN DE AUDITORIA", "1 ESTRATEGIA GLOBAL Y PLANIFICACIÓN")
+        first, second = (os.path.join(folder, name) for name in ("1 Reunión Preliminar.docx", "4 Cuestionario.xlsx"))
+        self.cache.get_document(first)
+        self.cache.max_bytes = self.cache.total_bytes
+        self.cache.get_workbook(second)
+
+        stats = self.cache.stats()
+        self.assertLessEqual(stats["bytes"], self.cache.max_bytes)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_template_larger_than_limit_is_not_kept(self):
+        self.cache.max_bytes = 1
+        path = os.path.join(self.TEMPLATES_DIR, "1 PROYECTO INICIAL", "1 INICIO ENCARGO.docx")
+        self.cache.get_document(path)
+        self.cache.get_document(path)
+
+        self.assertEqual(self.cache.stats()["misses"], 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+class TemplateIndexTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        folder = os.path.join(self.tmp_dir.name, "1 Carpeta Única", "Sub")
+        os.makedirs(folder)
+        for name in ("Programa de Auditoría.docx", "Cédula.xlsx", "cedula.docx"):
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(b"x")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_resolves_normalized_names(self):
+        with self.assertLogs("auditoria.utils.template_index", level="WARNING"):
+            index = TemplateIndex(self.tmp_dir.name)
+        path = index.resolve("1 CARPETA UNICA", "PROGRAMA DE AUDITORIA.docx")
+        self.assertEqual(
+            path, os.path.join(self.tmp_dir.name, "1 Carpeta Única", "Sub", "Programa de Auditoría.docx")
+        )
+        self.assertIsNone(index.resolve("1 Carpeta Única", "Inexistente.docx"))
+
+    def test_reports_collisions(self):
+        with self.assertLogs("auditoria.utils.template_index", level="WARNING"):
+            index = TemplateIndex(self.tmp_dir.name)
+        self.assertEqual(len(index.collisions), 1)
+        self.assertIn("Cédula.xlsx", index.collisions[0])
+
+
+class TemplateBytesStoreTestCase(SimpleTestCase):
+    def test_serves_preloaded_content_until_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folder = os.path.join(tmp_dir, "Carpeta")
+            os.makedirs(folder)
+            path = os.path.join(folder, "Plantilla.docx")
+            with open(path, "wb") as f:
+                f.write(b"original")
+
+            store = TemplateBytesStore()
+            self.assertIsNone(store.get(path))
+            self.assertEqual(store.load_tree(tmp_dir), 1)
+            self.assertEqual(store.get(path), b"original")
+
+            with open(path, "wb") as f:
+                f.write(b"modificada")
+            self.assertIsNone(store.get(path))
+            self.assertEqual(len(store), 0)
+
+
+class RenderTimingTestCase(SimpleTestCase):
+    def test_spans_accumulate_only_inside_a_measurement(self):
+        with span("fuera"):
+            pass
+        self.assertIsNone(current_timing())
+
+        with render_timing(force=True, template="A.docx") as timing:
+            for _ in range(2):
+                with span("word.text"):
+                    pass
+            with span("save lento"):
+                pass
+            annotate(bytes=10)
+        self.assertIsNone(current_timing())
+
+        self.assertEqual(list(timing.spans), ["word.text", "save lento"])
+        record = timing.as_dict()
+        self.assertEqual((record["template"], record["bytes"]), ("A.docx", 10))
+        header = timing.server_timing()
+        self.assertTrue(header.startswith("word.text;dur="))
+        self.assertIn("save_lento;dur=", header)
+        self.assertIn("total;dur=", header)
+
+    def test_disabled_setting_yields_no_measurement(self):
+        with self.settings(RENDER_TIMING_ENABLED=False):
+            with render_timing(template="A.docx") as timing:
+                self.assertIsNone(timing)
+                self.assertIsNone(current_timing())
+
+
+class RawZipWriterTestCase(SimpleTestCase):
+    def test_copies_members_without_recompressing(self):
+        source = io.BytesIO()
+        with zipfile.ZipFile(source, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("a.xml", "<a>" + "x" * 1000 + "</a>")
+            zf.writestr("imágenes/b.bin", b"\x00\x01" * 50)
+
+        output = io.BytesIO()
+        writer = RawZipWriter(output)
+        for member in read_raw_members(source):
+            writer.copy_raw(source, member)
+        writer.write("c.xml", b"<c/>")
+        writer.close()
+
+        with zipfile.ZipFile(output) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["a.xml", "imágenes/b.bin", "c.xml"])
+            self.assertEqual(zf.read("a.xml"), b"<a>" + b"x" * 1000 + b"</a>")
+            self.assertEqual(zf.read("c.xml"), b"<c/>")
+
+
+class XlsmSharedStringsTestCase(SimpleTestCase):
+    def test_rewrites_only_changed_parts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "Macro.xlsm")
+            with zipfile.ZipFile(template, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("xl/sharedStrings.xml", "<sst><si><t>Entidad: [IDENTIDAD]</t></si></sst>")
+                zf.writestr("xl/worksheets/sheet1.xml", "<worksheet/>")
+                zf.writestr("xl/vbaProject.bin", os.urandom(256))
+
+            output = io.BytesIO()
+            touched = replace_in_xlsm_shared_strings(
+                template, output, {"[IDENTIDAD]": "[ENTIDAD]", "[ENTIDAD]": "Empresa", "": "x"}
+            )
+
+            self.assertEqual(touched, ["xl/sharedStrings.xml"])
+            with open(template, "rb") as src, zipfile.ZipFile(output) as zf:
+                source = {m.filename: m for m in read_raw_members(src)}
+                copied = {m.filename: m for m in read_raw_members(output)}
+                self.assertEqual(zf.read("xl/sharedStrings.xml"), b"<sst><si><t>Entidad: Empresa</t></si></sst>")
+                for name in ("xl/worksheets/sheet1.xml", "xl/vbaProject.bin"):
+                    self.assertEqual(copied[name].crc, source[name].crc)
+                    self.assertEqual(copied[name].compress_size, source[name].compress_size)
+
+
+class XlsmOutputStoreTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.legacy_dir = os.path.join(self.tmp_dir.name, "temp")
+        os.makedirs(self.legacy_dir)
+        self.store = XlsmOutputStore(
+            os.path.join(self.tmp_dir.name, "store"), max_bytes=1000, legacy_temp_dir=self.legacy_dir
+        )
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_reuses_output_for_same_key(self):
+        produced = []
+
+        def produce(path):
+            produced.append(os.path.basename(path))
+            with open(path, "wb") as f:
+                f.write(b"libro")
+
+        first = self.store.get_or_create("ab01", produce, "Macro.xlsm")
+        second = self.store.get_or_create("ab01", produce, "Macro.xlsm")
+
+        self.assertEqual(produced, ["Macro.xlsm"])
+        self.assertEqual(first, second)
+        self.assertTrue(self.store.owns(first))
+        self.assertEqual(os.listdir(self.store._tmp_dir()), [])
+
+    def test_sweep_removes_only_stale_orphans(self):
+        old = time.time() - 2 * self.store.orphan_max_age
+        paths = {}
+        for name, files in (("tmpviejo", ["Macro.xlsm"]), ("tmpotro", ["datos.txt"]), ("tmpnuevo", ["Macro.xlsm"])):
+            paths[name] = os.path.join(self.legacy_dir, name)
+            os.makedirs(paths[name])
+            for filename in files:
+                open(os.path.join(paths[name], filename), "wb").close()
+        orphan = os.path.join(self.store._tmp_dir(), "huerfano")
+        os.makedirs(orphan)
+        for path in (paths["tmpviejo"], paths["tmpotro"], orphan):
+            os.utime(path, (old, old))
+
+        self.assertEqual(self.store.sweep(), 2)
+
+        self.assertFalse(os.path.exists(paths["tmpviejo"]))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(paths["tmpotro"]))
+        self.assertTrue(os.path.exists(paths["tmpnuevo"]))
+
+    def test_sweep_leaves_system_temp_alone_by_default(self):
+        store = XlsmOutputStore(os.path.join(self.tmp_dir.name, "store"), max_bytes=1000)
+        legacy = os.path.join(self.legacy_dir, "tmpviejo")
+        os.makedirs(legacy)
+        open(os.path.join(legacy, "Macro.xlsm"), "wb").close()
+        old = time.time() - 2 * store.orphan_max_age
+        os.utime(legacy, (old, old))
+
+        self.assertEqual(store.sweep(), 0)
+        self.assertTrue(os.path.exists(legacy))
+
+
+class CompiledDocxTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.template_path = os.path.join(self.tmp_dir.name, "Carta.docx")
+        doc = Document()
+        doc.add_paragraph("Cliente: [IDENTIDAD]")
+        doc.add_paragraph("Preparado por [AUDITOR] - [TIPO_AUDITORIA]")
+        doc.save(self.template_path)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _audit(self, identidad):
+        return SimpleNamespace(
+            id=None, identidad=identidad, title="Revisión anual", tipoAuditoria="I", moneda="USD",
+            fechaInit=None, fechaEnd=None,
+            audit_manager=SimpleNamespace(get_full_name=lambda: "Ana López"),
+        )
+
+    def _paragraphs(self, source):
+        return [p.text for p in Document(source).paragraphs]
+
+    def test_matches_python_docx_output(self):
+        audit = self._audit("Ñandú & Cía <S.A.>")
+        compiled = compile_docx_template(self.template_path)
+        values = compiled.resolve_values(build_word_replacements(audit))
+        self.assertIsNotNone(values)
+
+        output = io.BytesIO()
+        compiled.write(output, values)
+        output.seek(0)
+        self.assertEqual(
+            self._paragraphs(output),
+            [p.text for p in modify_document_word(self.template_path, audit).paragraphs],
+        )
+        self.assertEqual(self._paragraphs(output)[0], "Cliente: Ñandú & Cía <S.A.>")
+
+    def test_rejects_values_that_trigger_replacements(self):
+        compiled = compile_docx_template(self.template_path)
+        for identidad in ("[AUDITOR] S.A.", " Con espacios ", "Entidad XXXXXXX"):
+            self.assertIsNone(compiled.resolve_values(build_word_replacements(self._audit(identidad))))
+
+
+class TextOnlyWorkbookTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.audit = SimpleNamespace(
+            id=None, identidad="Ñandú & Cía", title="Revisión anual", tipoAuditoria="F", moneda="GTQ",
+            fechaInit=None, fechaEnd=None, audit_manager=None,
+        )
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _template(self, name, text="Cliente: [IDENTIDAD]"):
+        path = os.path.join(self.tmp_dir.name, name)
+        wb = Workbook()
+        wb.active["A1"] = text
+        wb.active["A2"] = 10
+        wb.active["B2"] = "=A2*2"
+        wb.save(path)
+        return path
+
+    def _values(self, source):
+        wb = load_workbook(source)
+        return [(c.coordinate, c.value) for row in wb.active.iter_rows() for c in row]
+
+    def test_matches_openpyxl_output(self):
+        path = self._template("Cédula de análisis.xlsx")
+        self.assertTrue(get_workbook_template_info(path).text_only)
+
+        output = io.BytesIO()
+        self.assertTrue(write_text_only_workbook(path, self.audit, output))
+        expected = modify_document_excel(path, self.audit, financial_data={})
+        self.assertEqual(self._values(output), [(c.coordinate, c.value) for row in expected.active.iter_rows() for c in row])
+        self.assertEqual(self._values(output)[0], ("A1", "Cliente: Ñandú & Cía"))
+
+    def test_data_processor_templates_use_full_path(self):
+        info = get_workbook_template_info(self._template("8 MATERIALIDAD.xlsx"))
+        self.assertFalse(info.text_only)
+
+    def test_values_that_change_cell_type_fall_back(self):
+        path = self._template("Cédula.xlsx", text="[IDENTIDAD]")
+        self.audit.identidad = "=HYPERLINK(\"x\")"
+        self.assertFalse(write_text_only_workbook(path, self.audit, io.BytesIO()))
+
+
+class DataProcessorRegistryTestCase(SimpleTestCase):
+    class _TrackingData(dict):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.read = []
+
+        def get(self, key, default=None):
+            self.read.append(key)
+            return super().get(key, default)
+
+    def test_requirements_follow_processor(self):
+        self.assertEqual(get_data_requirements("Cédula.xlsx"), ())
+        self.assertEqual(get_data_requirements("6 RATIOS FINANCIEROS.xlsx"), ("balances",))
+        self.assertEqual(
+            get_data_requirements("CENTRALIZADORA CAJA.xlsx"), ("balances", "ajustes_reclasificaciones")
+        )
+
+    def test_stops_at_first_empty_dataset(self):
+        data = self._TrackingData(saldos_iniciales={"Caja-2024-12-31": 1.0})
+        wb = Workbook()
+        self.assertIs(apply_data_processor(wb, data, "6 Prueba de Saldos Iniciales.xlsx"), wb)
+        self.assertEqual(data.read, ["balances"])
+
+    def test_template_without_processor_skips_database(self):
+        # SimpleTestCase falla si se consulta la base de datos
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "Cédula.xlsx")
+            wb = Workbook()
+            wb.active["A1"] = "=SUM(1, 2)"
+            wb.save(path)
+            audit = SimpleNamespace(
+                id=1, identidad="ACME", title="Revisión", tipoAuditoria="F", moneda="GTQ",
+                fechaInit=None, fechaEnd=None, audit_manager=None,
+            )
+            data = LazyFinancialData(audit.id)
+            modify_document_excel(path, audit, financial_data=data)
+        self.assertEqual(data.loaded, [])
+
+
+class PlaceholderManifestTestCase(SimpleTestCase):
+    def test_workbook_manifest_lists_only_placeholder_cells(self):
+        wb = Workbook()
+        wb.active.title = "Hoja"
+        wb.active["A1"] = "Cliente: [IDENTIDAD]"
+        wb.active["A2"] = "Total activo"
+        wb.active["B2"] = 125.5
+        wb.active["C3"] = "Cifras expresadas en quetzales"
+        manifest = build_workbook_manifest(wb)
+        self.assertEqual(manifest.cells, {"Hoja": ["A1", "C3"]})
+
+        replacements = {"[IDENTIDAD]": "ACME", "Cifras expresadas en quetzales": "Cifras expresadas en euros"}
+        process_excel_sheets(wb, {}, replacements, {}, manifest=manifest)
+        self.assertEqual(
+            [c.value for row in wb.active.iter_rows() for c in row],
+            ["Cliente: ACME", None, None, "Total activo", 125.5, None, None, None, "Cifras expresadas en euros"],
+        )
+
+    def test_document_manifest_lists_paragraphs_and_tables(self):
+        doc = Document()
+        doc.add_paragraph("Papel de trabajo")
+        doc.add_paragraph("Cliente: [IDENTIDAD]")
+        doc.add_table(rows=1, cols=2).cell(0, 0).text = "Saldo"
+        doc.add_table(rows=1, cols=2).cell(0, 0).text = "Entidad:"
+        manifest = build_document_manifest(doc)
+        self.assertEqual(manifest.paragraphs, (1,))
+        self.assertEqual(manifest.tables, (1,))
+
+
+class ConfigStoreTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = ConfigStore(self.tmp_dir.name, check_interval=0)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        # Fuerza un mtime distinto aunque la escritura caiga en el mismo instante
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_reloads_changed_file_and_compiles_patterns(self):
+        self._write("tables.json", '{"patrones_regex": [{"pattern": "Entidad:\\\\s*", "reemplazar_por": "[E]"}]}')
+        first = self.store.get_tables_config()
+        self.assertIs(self.store.get_tables_config(), first)
+        self.assertTrue(self.store.get_table_regex_rules()[0].regex.match("Entidad:  "))
+
+        self._write("tables.json", '{"patrones": [{"buscar": "Entidad:", "valor": "[E]"}]}')
+        self.assertEqual(self.store.get_tables_config()["patrones"][0]["buscar"], "Entidad:")
+        self.assertEqual(self.store.get_table_regex_rules(), [])
+
+    def test_malformed_config_fails_loudly(self):
+        self._write("replacements.json", '{"patrones_regex": [{"pattern": "(", "reemplazar_por": "[E]"}]}')
+        with self.assertRaises(ImproperlyConfigured):
+            self.store.get_replacements_config()
+        self._write("folder_structure_interna.json", "{")
+        with self.assertRaises(ImproperlyConfigured):
+            self.store.get_folder_structure(is_internal=True)
+
+
+class CompiledReplacerTestCase(SimpleTestCase):
+    def test_matches_sequential_replacement(self):
+        replacements = {
+            "[ENTIDAD_COMPLETA]": "Entidad: ACME",
+            "Entidad: ": "Entidad: ACME",
+            "[A]": "x[B]",
+            "[B]": "y",
+            "ab": "",
+            "b": "ba",
+        }
+        replacer = CompiledReplacer(replacements)
+        for text in ("[ENTIDAD_COMPLETA]", "Entidad: [A]", "a[B]b", "aab b", "sin claves"):
+            self.assertEqual(replacer.replace(text), replace_text(text, replacements))
+
+    def test_random_keys_and_texts(self):
+        rng = random.Random(12)
+        alphabet = "ab[]: "
+        for _ in range(200):
+            replacements = {
+                "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))):
+                    "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+                for _ in range(rng.randint(1, 6))
+            }
+            replacer = CompiledReplacer(replacements)
+            for _ in range(20):
+                text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+                self.assertEqual(replacer.replace(text), replace_text(text, replacements), (replacements, text))
+
+
+class FolderTreeTestCase(SimpleTestCase):
+    estructura = {
+        "A": {"A1": {"uno.docx": [], "dos.xlsx": []}},
+        "B": {"tres.pdf": []},
+    }
+
+    def test_top_level_html_defers_subfolders(self):
+        html = generar_html_estructura(self.estructura, 1, profundidad=1)
+        self.assertIn('data-folder-path="A"', html)
+        self.assertIn('data-folder-path="B"', html)
+        self.assertNotIn("A1", html)
+        self.assertNotIn("uno.docx", html)
+
+    def test_tree_matches_full_html(self):
+        tree = construir_arbol_carpetas(self.estructura, user_verified=True)
+        self.assertEqual([node["name"] for node in tree], ["A", "B"])
+        self.assertEqual(tree[0]["children"][0]["children"][0], {"name": "uno.docx", "locked": False})
+        html = generar_html_estructura(self.estructura, 1, user_verified=True)
+        for name in ("A1", "uno.docx", "dos.xlsx", "tres.pdf"):
+            self.assertIn(name, html)
+
+
+class SyntheticAuditTestCase(SimpleTestCase):
+    def test_builds_unsaved_audit_with_data_and_marks(self):
+        synthetic = SyntheticAudit(3, auxiliares=2, marks=2, work_papers=["A-1 Caja", "B-1 Bancos", "C-1 Otros"])
+
+        # 2 tipos de balance x 2 fechas x 4 secciones x 3 cuentas
+        self.assertEqual(len(synthetic.financial_data["balances"]), 48)
+        self.assertEqual(len(synthetic.financial_data["registros_auxiliares"]), 2)
+        self.assertEqual(len(synthetic.financial_data["ajustes_reclasificaciones"]), 2)
+        self.assertEqual([mark.work_paper_number for mark in synthetic.marks], ["A-1 Caja", "B-1 Bancos"])
+        self.assertTrue(synthetic.audit._state.adding)
+        self.assertEqual(synthetic.audit.audit_manager.get_full_name(), "Ana Pérez")
+
+    def test_compare_results_reports_changes_over_threshold(self):
+        def results(*times):
+            return {"results": [
+                {"template": f"t{i}", "accounts": 10, "status": "ok", "warm": {"cpu_ms": value}}
+                for i, value in enumerate(times)
+            ]}
+
+        changes = compare_results(results(10, 10, 10), results(20, 10.5, 5))
+        self.assertEqual([(change[0], change[4]) for change in changes], [("t0", 2.0), ("t2", 0.5)])
+
+
+class FinancialDatasetTestCase(SimpleTestCase):
+    rows = [
+        ("ANUAL", "2023-12-31", "Activo", "Caja", "Corriente", 10.0),
+        ("ANUAL", "2024-12-31", "Activo", "Caja", "Corriente", 20.0),
+        ("ANUAL", "2024-12-31", "ESTADO DE RESULTADOS", "Ventas - Exportación", "NT", 30.0),
+        ("SEMESTRAL", "2024-06-30", "Activo", "Caja", "NT", 5.0),
+        ("ANUAL", "2024-12-31", "Activo", "Caja", "Corriente", 25.0),
+    ]
+
+    def test_indexes_and_text_keys(self):
+        dataset = FinancialDataset(self.rows)
+        self.assertEqual(len(dataset), 4)
+        self.assertEqual(dataset["ANUAL-2024-12-31-Activo-Caja-Corriente"], 25.0)
+        self.assertEqual(dataset.fechas("ANUAL"), ("2023-12-31", "2024-12-31"))
+        self.assertEqual(dataset.años(), ("2023", "2024"))
+        self.assertEqual(dataset.cuentas("ANUAL", "2024-12-31", "Activo"), {"Caja": 25.0})
+        self.assertEqual(dataset.serie("Caja", "ANUAL"), {"2023-12-31": 10.0, "2024-12-31": 25.0})
+
+        normalizado = dataset.normalizado()
+        self.assertIs(normalizado, dataset.normalizado())
+        self.assertIn("ANUAL-2024-12-31-ESTADO DE RESULTADOS-Ventas - Exportación", normalizado)
+        self.assertEqual(dict(pickle.loads(pickle.dumps(normalizado))), dict(normalizado))
+
+    def test_account_names_with_hyphens(self):
+        wb = Workbook()
+        wb.active["B5"] = "Base de materialidad"
+        process_materialidad_file(wb, FinancialDataset(self.rows).normalizado())
+        self.assertEqual(wb.active["B6"].value, "Ventas - Exportación")
+        self.assertEqual(wb.active["D6"].value, 30.0)
+
+
+class AccountIndexTestCase(SimpleTestCase):
+    nombres = ["Caja", "Caja y Bancos", "Bancos Nacionales", "Préstamos por Pagar", "Cuentas por Pagar"]
+
+    def test_ranking(self):
+        index = AccountIndex(self.nombres)
+        self.assertEqual(index.buscar("Caja"), "Caja")
+        self.assertEqual(index.buscar("CAJA Y BANCOS"), "Caja y Bancos")
+        self.assertEqual(index.buscar("Prestamos por pagar"), "Préstamos por Pagar")
+        self.assertEqual(index.buscar("Caja chica"), "Caja")
+        self.assertEqual(index.buscar("Bancos"), "Bancos Nacionales")
+        self.assertEqual(index.buscar("por Pagar"), "Cuentas por Pagar")
+        self.assertIsNone(index.buscar("Inventarios"))
+        self.assertIsNone(index.buscar(""))
+
+    def test_shorter_names_need_whole_words_and_a_single_match(self):
+        # Con "Caja" y "Bancos" por separado, "Caja y Bancos" no toma solo uno de los saldos
+        self.assertIsNone(AccountIndex(["Caja", "Bancos"]).buscar("Caja y Bancos"))
+        self.assertIsNone(AccountIndex(["Caja"]).buscar("Cajamarca"))
+        self.assertEqual(AccountIndex(["Inventario"]).buscar("Inventarios"), "Inventario")
+        self.assertEqual(AccountIndex(["Caja", "Caja chica"]).buscar("Caja chica general"), "Caja chica")
+
+    def test_independent_of_order(self):
+        forward, backward = AccountIndex(self.nombres), AccountIndex(reversed(self.nombres))
+        for consulta in ("caja", "bancos", "pagar", "a", "por"):
+            self.assertEqual(forward.buscar(consulta), backward.buscar(consulta))
+
+
+class RowLayoutPlanTestCase(SimpleTestCase):
+    def test_applies_all_insertions_at_once(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Hoja 1"
+        otra = wb.create_sheet("Otra")
+        for fila in range(1, 11):
+            ws.cell(row=fila, column=1, value=fila)
+        ws["B10"] = '=SUM(A1:A9)+$A$5+LOG10(A3)&"A7"'
+        ws.merge_cells("C4:D6")
+        ws.row_dimensions[8].height = 30
+        otra["A1"] = "='Hoja 1'!A8+A8"
+
+        plan = RowLayoutPlan(ws)
+        plan.insert(5, 2)
+        plan.insert(9)
+        plan.apply()
+
+        self.assertEqual([ws.cell(row=fila, column=1).value for fila in range(1, 14)],
+                         [1, 2, 3, 4, None, None, 5, 6, 7, 8, None, 9, 10])
+        self.assertEqual(list(plan.inserted_rows(5)), [5, 6])
+        self.assertEqual(plan.first_row(9), 11)
+        self.assertEqual(plan.row(10), 13)
+        self.assertEqual(ws["B13"].value, '=SUM(A1:A12)+$A$7+LOG10(A3)&"A7"')
+        self.assertEqual(otra["A1"].value, "='Hoja 1'!A10+A8")
+        self.assertEqual([str(rango) for rango in ws.merged_cells.ranges], ["C4:D8"])
+        self.assertEqual(ws.row_dimensions[10].height, 30)
+
+
+class RowTemplateTestCase(SimpleTestCase):
+    def test_stamps_styles_formulas_and_merges(self):
+        wb = Workbook()
+        ws = wb.active
+        ws["A2"].font = Font(bold=True)
+        ws["B2"].number_format = "#,##0.00"
+        ws["C2"] = "=A2+B2"
+        ws["D2"] = "sin estilo"
+        ws.merge_cells("E2:F2")
+        ws["A5"].font = Font(italic=True)
+        ws["D5"].font = Font(italic=True)
+
+        RowTemplate(ws, 2, formula_translator=lambda f, origen, destino: f.replace(str(origen), str(destino)),
+                    merges=True).stamp_rows([5, 6])
+
+        self.assertTrue(ws["A5"].font.bold)
+        self.assertEqual(ws["B6"].number_format, "#,##0.00")
+        self.assertEqual(ws["C6"].value, "=A6+B6")
+        # Las celdas sin estilo en la fila modelo conservan el suyo
+        self.assertTrue(ws["D5"].font.italic)
+        self.assertIsNone(ws["D6"].value)
+        self.assertIn("E6:F6", [str(rango) for rango in ws.merged_cells.ranges])
+        # Cada celda recibe su propio estilo
+        ws["A5"].font = Font(size=20)
+        self.assertTrue(ws["A6"].font.bold)
+        self.assertTrue(ws["A2"].font.bold)
+
+
+class HyperlinkProcessorTestCase(SimpleTestCase):
+    def test_links_split_runs_and_share_relationships(self):
+        doc = Document()
+        paragraph = doc.add_paragraph()
+        paragraph.add_run("Ver A-1 y A-").bold = True
+        paragraph.add_run("2, A-1 otra vez, A-30 y A-05")
+        doc.add_paragraph("Sin referencias")
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "A-2"
+        config = {"prefix": "A", "max_range": 20}
+
+        apply_hyperlinks_to_document(doc, 7, "A.docx", "A.docx", config)
+        # Volver a aplicarlos no añade nada
+        apply_hyperlinks_to_document(doc, 7, "A.docx", "A.docx", config)
+
+        self.assertEqual(paragraph.text, "Ver A-1 y A-2, A-1 otra vez, A-30 y A-05")
+        hyperlinks = paragraph.hyperlinks
+        self.assertEqual([h.text for h in hyperlinks], ["A-1", "A-2"])
+        self.assertTrue(all(h.runs[0].bold and h.runs[0].underline for h in hyperlinks))
+        self.assertEqual(hyperlinks[1].url, f"{settings.BASE_URL}/auditoria/download/7/A-2")
+        self.assertEqual(len(doc.tables[0].cell(0, 0).paragraphs[0].hyperlinks), 1)
+        self.assertEqual(len(doc.part.rels), len(Document().part.rels) + 2)
+
+
+class TableWalkerTestCase(SimpleTestCase):
+    def test_merged_cells_are_processed_once(self):
+        doc = Document()
+        table = doc.add_table(rows=3, cols=3)
+        label = table.cell(0, 0).merge(table.cell(0, 1))
+        label.text = "Entidad:"
+        notes = table.cell(1, 0).merge(table.cell(2, 0))
+        notes.text = "Nota\tEntidad de prueba"
+        table.cell(1, 1).add_paragraph("Auditoría: ")
+        tables_config = {
+            "patrones": [{"buscar": "Entidad:", "valor": "[IDENTIDAD]"}],
+            "patrones_regex": [{"pattern": "Auditoría:[^\\n]*", "reemplazar_por": "[AUDITORIA_COMPLETA]"}],
+        }
+        replacements = {"[IDENTIDAD]": "Empresa, S.A.", "[AUDITORIA_COMPLETA]": "Auditoría: Financiera 2024"}
+
+        visited = [table_cell.cell._tc for _, _, table_cell in iter_table_cells(table)]
+        self.assertEqual(len(visited), len(set(visited)))
+        self.assertEqual(len(visited), 7)
+        self.assertTrue(all(cell_text(cell._tc) == cell.text for row in table.rows for cell in row.cells))
+
+        process_tables(doc, replacements, tables_config, "Cuestionario.docx")
+        self.assertEqual(table.cell(0, 0).text, "Entidad:")
+        self.assertEqual(table.cell(0, 2).text, "Empresa, S.A.")
+        self.assertEqual(table.cell(1, 1).text, "\nAuditoría: Financiera 2024")
+
+
+class DocumentWalkerTestCase(SimpleTestCase):
+    def test_shared_footer_is_processed_once(self):
+        doc = Document()
+        doc.add_paragraph("Entidad [X]")
+        doc.sections[0].footer.paragraphs[0].text = "Pie [X]"
+        doc.add_section()
+        doc.add_paragraph("Sin cambios")
+
+        counts = DocumentWalker([TextReplacementHandler({"[X]": "Empresa"}, [])]).walk(doc)
+        self.assertEqual(counts, {"text": 2})
+        self.assertEqual(doc.paragraphs[0].text, "Entidad Empresa")
+        self.assertEqual(doc.sections[1].footer.paragraphs[0].text, "Pie Empresa")
+
+        mark = SimpleNamespace(work_paper_number="A-1", symbol="✓", description="Revisado")
+        AuditMarkProcessor(1, "A 1 Balance.docx", marks=[mark]).process_word_document(doc)
+        footer_texts = [p.text for p in doc.sections[0].footer.paragraphs]
+        self.assertEqual(footer_texts.count("MARCAS DE AUDITORÍA UTILIZADAS:"), 1)
+
+
+class AuditMarkProcessorTestCase(SimpleTestCase):
+    def test_failure_is_reported_and_document_kept(self):
+        doc = Document()
+        doc.add_paragraph("Cuerpo")
+        processor = AuditMarkProcessor(1, "A 1 Balance.docx", marks=[object()])
+
+        self.assertIs(processor.process_word_document(doc), doc)
+        self.assertTrue(processor.failed)
+        self.assertEqual([p.text for p in doc.sections[0].footer.paragraphs], [""])
+
+    def test_no_matching_marks_is_not_a_failure(self):
+        mark = SimpleNamespace(work_paper_number="B-2", symbol="✓", description="Revisado")
+        processor = AuditMarkProcessor(1, "A 1 Balance.xlsx", marks=[mark])
+        processor.process_excel_document(Workbook())
+        self.assertFalse(processor.failed)
+
+
+def _create_audit_manager(username, plan="M"):
+    role, _ = Roles.objects.get_or_create(name="audit_manager", verbose_name="Administrador")
+    return get_user_model().objects.create_user(
+        username=username, email=f"{username}@example.com", password="x", plan=plan, role=role,
+    )
+
+
+def _fake_render(template_path, filename, audit, output, financial_data=None, marks=None):
+    if "Malo" in filename:
+        raise ValueError("plantilla dañada")
+    output.write(f"generado {filename}".encode())
+    return "Incompleto" not in filename
+
+
+class AuditArchiveRendererTestCase(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        cache_settings = override_settings(
+            RENDER_CACHE_ENABLED=True, RENDER_CACHE_DIR=os.path.join(self.tmp_dir.name, "cache"),
+        )
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        for patcher in (
+            mock.patch.object(render_cache, "_cache", None),
+            mock.patch("auditoria.services.archive_renderer.render_document", side_effect=_fake_render),
+        ):
+            self.render = patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.audit = Audit.objects.create(title="Auditoría", audit_manager=_create_audit_manager("gerente"))
+
+    def _entry(self, arcname, content=b"plantilla"):
+        path = os.path.join(self.tmp_dir.name, os.path.basename(arcname))
+        with open(path, "wb") as f:
+            f.write(content)
+        return arcname, path, os.path.basename(arcname)
+
+    def _zip(self, entries):
+        data = b"".join(AuditArchiveRenderer(self.audit, entries, max_workers=1).stream())
+        zf = zipfile.ZipFile(io.BytesIO(data))
+        self.assertIsNone(zf.testzip())
+        return zf
+
+    def test_stream_builds_valid_zip(self):
+        zf = self._zip([self._entry("A/A-1 Caja.docx"), self._entry("A/Guía.pdf", b"%PDF")])
+
+        self.assertEqual(sorted(zf.namelist()), ["A/A-1 Caja.docx", "A/Guía.pdf"])
+        self.assertEqual(zf.read("A/A-1 Caja.docx"), b"generado A-1 Caja.docx")
+        self.assertEqual(zf.read("A/Guía.pdf"), b"%PDF")
+
+    def test_failed_member_is_listed_in_errores(self):
+        zf = self._zip([self._entry("A/A-2 Malo.xlsx"), self._entry("A/A-1 Caja.docx")])
+
+        self.assertEqual(sorted(zf.namelist()), ["A/A-1 Caja.docx", "ERRORES.txt"])
+        self.assertIn("A/A-2 Malo.xlsx: plantilla dañada", zf.read("ERRORES.txt").decode())
+
+    def test_cached_member_is_copied_without_rendering(self):
+        entries = [self._entry("A/A-1 Caja.docx"), self._entry("A/A-3 Incompleto.docx")]
+        self._zip(entries)
+        self.assertEqual(self.render.call_count, 2)
+
+        zf = self._zip(entries)
+        # Solo se regenera el documento incompleto, que no se guardó en la caché
+        self.assertEqual(self.render.call_count, 3)
+        self.assertEqual(self.render.call_args.args[1], "A-3 Incompleto.docx")
+        self.assertEqual(zf.read("A/A-1 Caja.docx"), b"generado A-1 Caja.docx")
+
+
+@override_settings(ARCHIVE_MAX_SYNC_ENTRIES=5, RENDER_CACHE_ENABLED=False)
+class DownloadFolderZipTestCase(TestCase):
+    STRUCTURE = {
+        "1 CAJA Y BANCOS": {"A-1 Caja.docx": []},
+        "5 INVENTARIOS": {"I-1 Inventario.docx": []},
+    }
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        for patcher in (
+            mock.patch("auditoria.views.utils.cargar_estructura_carpetas", return_value=self.STRUCTURE),
+            mock.patch("auditoria.views.utils.get_template_path", side_effect=self._template_path),
+            mock.patch("auditoria.services.archive_renderer.render_document", side_effect=_fake_render),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.manager = _create_audit_manager("gerente")
+        self.audit = Audit.objects.create(title="Auditoría", audit_manager=self.manager)
+
+    def _template_path(self, folder, filename, is_internal=False):
+        path = os.path.join(self.tmp_dir.name, filename)
+        with open(path, "wb") as f:
+            f.write(b"plantilla")
+        return path
+
+    def _download(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse("download_audit_zip", args=[self.audit.id]), params)
+
+    def _names(self, response):
+        self.assertEqual(response.status_code, 200)
+        data = b"".join(response.streaming_content)
+        return sorted(zipfile.ZipFile(io.BytesIO(data)).namelist())
+
+    @override_settings(ARCHIVE_RENDER_WORKERS=1)
+    def test_verified_user_downloads_every_folder(self):
+        self.assertEqual(
+            self._names(self._download(self.manager)),
+            ["1 CAJA Y BANCOS/A-1 Caja.docx", "5 INVENTARIOS/I-1 Inventario.docx"],
+        )
+
+    @override_settings(ARCHIVE_RENDER_WORKERS=1)
+    def test_unverified_user_only_gets_unlocked_folders(self):
+        self.manager.plan = "NT"
+        self.manager.save()
+        self.assertEqual(self._names(self._download(self.manager)), ["1 CAJA Y BANCOS/A-1 Caja.docx"])
+
+    def test_other_manager_gets_404(self):
+        response = self._download(_create_audit_manager("otro"))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(ARCHIVE_MAX_SYNC_ENTRIES=1, RENDER_JOBS_ENABLED=False)
+    def test_large_archive_is_rejected_without_render_jobs(self):
+        response = self._download(self.manager, **{"async": "1"})
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(RenderJob.objects.exists())
+
+    @override_settings(ARCHIVE_MAX_SYNC_ENTRIES=1, RENDER_JOBS_ENABLED=True)
+    def test_large_archive_is_queued_as_render_job(self):
+        response = self._download(self.manager, **{"async": "1"})
+        self.assertEqual(response.status_code, 202)
+        job = RenderJob.objects.get(id=response.json()["job_id"])
+        self.assertEqual((job.folder, job.filename), ("", "Auditoría.zip"))
+
+
+@override_settings(RENDER_JOB_TIMEOUT=60, RENDER_JOB_MAX_ATTEMPTS=2, RENDER_JOB_RETENTION=60,
+                   RENDER_JOB_PENDING_TIMEOUT=60)
+class RenderJobQueueTestCase(TestCase):
+    def setUp(self) -> None:
+        self.manager = _create_audit_manager("gerente")
+        self.audit = Audit.objects.create(title="Auditoría", audit_manager=self.manager)
+
+    def _job(self, **fields):
+        job = RenderJob.objects.create(
+            audit=self.audit, requested_by=self.manager, folder="5 INVENTARIOS", filename="I-1 Sumaria.xlsx",
+        )
+        RenderJob.objects.filter(id=job.id).update(**fields)
+        job.refresh_from_db()
+        return job
+
+    def _ago(self, seconds):
+        return timezone.now() - timedelta(seconds=seconds)
+
+    def test_job_is_claimed_once(self):
+        job = self._job()
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual((claimed.status, claimed.attempts), (RenderJob.STATUS_RUNNING, 1))
+        self.assertIsNone(claim_next_job())
+
+    def test_claim_skips_job_taken_by_another_worker(self):
+        first, second = self._job(), self._job()
+        real_filter = RenderJob.objects.filter
+
+        def filter_after_race(*args, **kwargs):
+            # Otro worker toma el primer trabajo entre la lectura de candidatos y el UPDATE
+            if kwargs.get("id") == first.id:
+                real_filter(id=first.id).update(status=RenderJob.STATUS_RUNNING)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(RenderJob.objects, "filter", side_effect=filter_after_race):
+            claimed = claim_next_job()
+
+        self.assertEqual(claimed.id, second.id)
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 0)
+
+    def test_stale_jobs_are_retried_until_max_attempts(self):
+        retry = self._job(status=RenderJob.STATUS_RUNNING, started_at=self._ago(120), attempts=1)
+        exhausted = self._job(status=RenderJob.STATUS_RUNNING, started_at=self._ago(120), attempts=2)
+        running = self._job(status=RenderJob.STATUS_RUNNING, started_at=self._ago(10), attempts=1)
+
+        self.assertEqual(requeue_stale_jobs(), (1, 1))
+        for job in (retry, exhausted, running):
+            job.refresh_from_db()
+        self.assertEqual(retry.status, RenderJob.STATUS_PENDING)
+        self.assertEqual(exhausted.status, RenderJob.STATUS_FAILED)
+        self.assertEqual(running.status, RenderJob.STATUS_RUNNING)
+
+    def test_unclaimed_jobs_fail(self):
+        waiting = self._job()
+        RenderJob.objects.filter(id=waiting.id).update(created_at=self._ago(10))
+        unclaimed = self._job()
+        RenderJob.objects.filter(id=unclaimed.id).update(created_at=self._ago(120))
+        retry = self._job(attempts=1, started_at=self._ago(200))
+
+        self.assertEqual(fail_unclaimed_jobs(), 2)
+        self.assertEqual(
+            dict(RenderJob.objects.values_list("id", "status")),
+            {waiting.id: RenderJob.STATUS_PENDING, unclaimed.id: RenderJob.STATUS_FAILED,
+             retry.id: RenderJob.STATUS_FAILED},
+        )
+
+    def test_purge_removes_expired_jobs_and_files(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        with override_settings(RENDER_JOBS_DIR=tmp_dir.name):
+            expired = self._job(status=RenderJob.STATUS_DONE, finished_at=self._ago(120))
+            recent = self._job(status=RenderJob.STATUS_DONE, finished_at=self._ago(10))
+            for job in (expired, recent):
+                os.makedirs(get_job_dir(job.id))
+                with open(os.path.join(get_job_dir(job.id), job.filename), "wb") as f:
+                    f.write(b"x")
+
+            self.assertEqual(purge_expired_jobs(), 1)
+
+            self.assertFalse(os.path.exists(get_job_dir(expired.id)))
+            self.assertTrue(os.path.exists(get_job_dir(recent.id)))
+        self.assertEqual(list(RenderJob.objects.values_list("id", flat=True)), [recent.id])
+
+
+class BuildDocumentResponseTestCase(SimpleTestCase):
+    def test_macro_workbooks_skip_the_render_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            processed_path = os.path.join(tmp_dir, "procesado.xlsm")
+            with open(processed_path, "wb") as f:
+                f.write(b"macros")
+            template_path = os.path.join(tmp_dir, "Libro.xlsm")
+            with mock.patch("auditoria.views.download_views.render_macro_workbook", return_value=processed_path), \
+                    mock.patch("auditoria.views.download_views.discard_processed_file"), \
+                    mock.patch("auditoria.views.download_views.build_render_key") as build_key, \
+                    mock.patch("auditoria.views.download_views.get_cached_render") as get_cached:
+                response = build_document_response(template_path, "Libro.xlsm", SimpleNamespace(id=1))
+                self.assertEqual(b"".join(response.streaming_content), b"macros")
+                response.close()
+
+        build_key.assert_not_called()
+        get_cached.assert_not_called()
+
+
+@override_settings(RENDER_JOBS_ENABLED=True, RENDER_JOB_PENDING_TIMEOUT=60, RENDER_JOB_TIMEOUT=60)
+class RenderJobViewsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.template_path = os.path.join(self.tmp_dir.name, "I-1 Sumaria.xlsx")
+        with open(self.template_path, "wb") as f:
+            f.write(b"plantilla")
+        patcher = mock.patch("auditoria.views.download_views.get_template_path", return_value=self.template_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.manager = _create_audit_manager("gerente")
+        self.audit = Audit.objects.create(title="Auditoría", audit_manager=self.manager)
+        self.client.force_login(self.manager)
+
+    def _enqueue(self):
+        url = reverse("download_document", args=[self.audit.id, "5 INVENTARIOS", "I-1 Sumaria.xlsx"])
+        response = self.client.get(url, {"async": "1"})
+        self.assertEqual(response.status_code, 202)
+        return RenderJob.objects.get(id=response.json()["job_id"])
+
+    def test_async_download_queues_one_job(self):
+        job = self._enqueue()
+        self.assertEqual(self._enqueue().id, job.id)
+        self.assertEqual(job.status, RenderJob.STATUS_PENDING)
+
+    def test_status_reports_unclaimed_job_as_failed(self):
+        job = self._enqueue()
+        self.assertEqual(self.client.get(reverse("render_job_status", args=[job.id])).json()["status"], "pending")
+
+        RenderJob.objects.filter(id=job.id).update(created_at=timezone.now() - timedelta(seconds=120))
+        payload = self.client.get(reverse("render_job_status", args=[job.id])).json()
+        self.assertEqual(payload["status"], "failed")
+        self.assertIn("error", payload)
+
+    def test_download_of_unfinished_job_returns_409(self):
+        job = self._enqueue()
+        response = self.client.get(reverse("download_render_job", args=[job.id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["status"], "pending")
+
+    def test_download_of_finished_job(self):
+        job = self._enqueue()
+        RenderJob.objects.filter(id=job.id).update(status=RenderJob.STATUS_DONE, result_path=self.template_path)
+        response = self.client.get(reverse("download_render_job", args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"plantilla")
+
+    def test_download_of_purged_result_returns_410(self):
+        job = self._enqueue()
+        RenderJob.objects.filter(id=job.id).update(
+            status=RenderJob.STATUS_DONE, result_path=os.path.join(self.tmp_dir.name, "borrado.xlsx"),
+        )
+        self.assertEqual(self.client.get(reverse("download_render_job", args=[job.id])).status_code, 410)
+
+    def test_jobs_of_other_users_are_not_found(self):
+        job = self._enqueue()
+        self.client.force_login(_create_audit_manager("otro"))
+        self.assertEqual(self.client.get(reverse("render_job_status", args=[job.id])).status_code, 404)
@@ -9,8 +9,13 @@ urlpatterns = [
     path('financiera/', views.auditoria_financiera_view, name='auditoria_financiera'),
     path('interna/', views.auditoria_interna_view, name='auditoria_interna'),
     path('detalle/<int:audit_id>/', views.auditoria_detalle_view, name='auditoria_detalle'),
+    path('detalle/<int:audit_id>/estructura/', views.estructura_carpetas_view, name='estructura_carpetas'),
     path('download/<int:audit_id>/<path:folder>/<str:filename>/', views.download_document, name='download_document'),
     path('download/<int:audit_id>/<str:pattern>/', views.download_document_by_pattern, name='download_document_by_pattern'),
+    path('download-zip/<int:audit_id>/', views.download_folder_zip, name='download_audit_zip'),
+    path('download-zip/<int:audit_id>/<path:folder>/', views.download_folder_zip, name='download_folder_zip'),
+    path('render-jobs/<int:job_id>/', views.render_job_status, name='render_job_status'),
+    path('render-jobs/<int:job_id>/download/', views.download_render_job, name='download_render_job'),
     path('detalle/<int:audit_id>/exportar/<str:tipo>/', export_cuentas_contables, name='export_cuentas_contables'),
     path('auditoria/detalle/<int:audit_id>/importar-cuentas/', importar_cuentas_contables, name='importar_cuentas_contables'),
 
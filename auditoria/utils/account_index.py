@@ -0,0 +1,212 @@
+"""
+Índice de nombres de cuentas para búsquedas aproximadas.
+
+Las SUMARIAS buscan la cuenta asociada al archivo entre los balances y los
+ajustes/reclasificaciones de cada cuenta, aceptando coincidencias parciales
+en ambos sentidos ("Caja" <-> "Caja y Bancos"). Antes se recorrían todas las
+claves en cada búsqueda, normalizándolas cada vez, y ganaba la primera según
+el orden del diccionario.
+
+AccountIndex normaliza los nombres una vez (minúsculas, sin acentos ni
+espacios repetidos) y los indexa por nombre completo y por trigramas, de modo
+que una búsqueda solo examina los nombres que pueden coincidir, y recuerda
+el resultado de cada nombre buscado.
+
+El resultado no depende del orden de los nombres: gana la coincidencia
+exacta, luego la de prefijo, la de palabras completas y por último la de
+subcadena; a igualdad, el nombre de longitud más parecida y después el menor
+alfabéticamente. Un nombre más corto que la búsqueda solo coincide por
+palabras completas (admitiendo plurales) y si es el único contenido en ella:
+"Caja y Bancos" no devuelve "Caja" cuando también existe "Bancos", porque su
+saldo sería solo una parte del total.
+"""
+
+import bisect
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set
+
+# Índices recientes, por identidad del diccionario de cuentas
+_INDEX_CACHE_SIZE = 64
+_indices = OrderedDict()
+_indices_lock = threading.Lock()
+
+
+def normalizar_nombre_cuenta(nombre: str) -> str:
+    """Nombre en minúsculas, sin acentos y con los espacios simplificados."""
+    descompuesto = unicodedata.normalize('NFKD', str(nombre))
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.lower().split())
+
+
+def _trigramas(texto: str) -> Set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _palabras(texto: str) -> FrozenSet[str]:
+    return frozenset(texto.split())
+
+
+def _misma_palabra(a: str, b: str) -> bool:
+    """Palabras iguales o que solo difieren en el plural ("inventario" / "inventarios")."""
+    return a == b or b in (a + 's', a + 'es') or a in (b + 's', b + 'es')
+
+
+def _contiene_palabras(texto: str, nombre: str) -> bool:
+    """Indica si las palabras de `nombre` aparecen seguidas y completas en `texto`."""
+    palabras_texto, palabras_nombre = texto.split(), nombre.split()
+    n = len(palabras_nombre)
+    return any(
+        all(_misma_palabra(p, q) for p, q in zip(palabras_nombre, palabras_texto[inicio:inicio + n]))
+        for inicio in range(len(palabras_texto) - n + 1)
+    )
+
+
+class AccountIndex:
+    """
+    Nombres de cuentas indexados para buscar la que mejor corresponde a un nombre.
+
+    Args:
+        nombres: Nombres originales (por ejemplo, las claves de un diccionario de cuentas)
+    """
+
+    def __init__(self, nombres: Iterable[str]):
+        self._originales: Set[str] = set()
+        self._por_normalizado: Dict[str, List[str]] = {}
+        for nombre in nombres:
+            self._originales.add(nombre)
+            self._por_normalizado.setdefault(normalizar_nombre_cuenta(nombre), []).append(nombre)
+        for originales in self._por_normalizado.values():
+            originales.sort()
+        self._ordenados = sorted(self._por_normalizado)
+        self._resultados: Dict[str, Optional[str]] = {}
+
+        self._palabras = {normalizado: _palabras(normalizado) for normalizado in self._por_normalizado}
+        self._trigramas: Dict[str, Set[str]] = {}
+        for normalizado in self._por_normalizado:
+            for trigrama in _trigramas(normalizado):
+                self._trigramas.setdefault(trigrama, set()).add(normalizado)
+        self._max_longitud = max(map(len, self._por_normalizado), default=0)
+
+    def __len__(self) -> int:
+        return len(self._originales)
+
+    def _contenidos_en(self, consulta: str) -> Set[str]:
+        """Nombres normalizados que son subcadena de `consulta`."""
+        encontrados = set()
+        for inicio in range(len(consulta)):
+            fin_maximo = min(len(consulta), inicio + self._max_longitud)
+            for fin in range(inicio + 1, fin_maximo + 1):
+                if consulta[inicio:fin] in self._por_normalizado:
+                    encontrados.add(consulta[inicio:fin])
+        return encontrados
+
+    def _que_contienen(self, consulta: str) -> Set[str]:
+        """Nombres normalizados que contienen `consulta`."""
+        if len(consulta) < 3:
+            # Sin trigramas que consultar: consultas de uno o dos caracteres
+            candidatos: Iterable[str] = self._por_normalizado
+        else:
+            listas = []
+            for trigrama in _trigramas(consulta):
+                lista = self._trigramas.get(trigrama)
+                if not lista:
+                    return set()
+                listas.append(lista)
+            listas.sort(key=len)
+            candidatos = set(listas[0]).intersection(*listas[1:])
+        return {normalizado for normalizado in candidatos if consulta in normalizado}
+
+    def _unico_contenido_en(self, consulta: str) -> Optional[str]:
+        """
+        Nombre normalizado contenido en `consulta` por palabras completas, o None
+        si no hay ninguno o hay varios (sin contar los incluidos en otro de ellos).
+        """
+        contenidos = [n for n in self._contenidos_en(consulta) if _contiene_palabras(consulta, n)]
+        maximos = [
+            n for n in contenidos
+            if not any(otro != n and _contiene_palabras(otro, n) for otro in contenidos)
+        ]
+        return maximos[0] if len(maximos) == 1 else None
+
+    def _con_prefijo(self, consulta: str) -> List[str]:
+        """Nombres normalizados que empiezan por `consulta`."""
+        encontrados = []
+        inicio = bisect.bisect_left(self._ordenados, consulta)
+        for normalizado in self._ordenados[inicio:]:
+            if not normalizado.startswith(consulta):
+                break
+            encontrados.append(normalizado)
+        return encontrados
+
+    def buscar(self, nombre: str) -> Optional[str]:
+        """
+        Nombre original que mejor corresponde a `nombre`: el mismo nombre, o uno
+        que lo contenga o esté contenido en él una vez normalizados. None si
+        no hay ninguno.
+        """
+        if nombre in self._originales:
+            return nombre
+        try:
+            return self._resultados[nombre]
+        except KeyError:
+            pass
+        mejor = self._mejor_coincidencia(normalizar_nombre_cuenta(nombre))
+        resultado = self._por_normalizado[mejor][0] if mejor is not None else None
+        self._resultados[nombre] = resultado
+        return resultado
+
+    def _mejor_coincidencia(self, consulta: str) -> Optional[str]:
+        if not consulta:
+            return None
+        if consulta in self._por_normalizado:
+            return consulta
+
+        def cercania(candidato):
+            return abs(len(candidato) - len(consulta)), candidato
+
+        # Nombres más cortos que la consulta: solo por palabras completas y sin ambigüedad
+        contenido = self._unico_contenido_en(consulta)
+
+        # Prefijo en cualquiera de los dos sentidos
+        candidatos = self._con_prefijo(consulta)
+        if contenido is not None and consulta.startswith(contenido):
+            candidatos.append(contenido)
+        if candidatos:
+            return min(candidatos, key=cercania)
+
+        # Palabras completas y, por último, cualquier subcadena
+        candidatos = self._que_contienen(consulta)
+        if contenido is not None:
+            candidatos.add(contenido)
+        if not candidatos:
+            return None
+        palabras_consulta = _palabras(consulta)
+
+        def rango(candidato):
+            palabras = self._palabras[candidato]
+            completas = palabras <= palabras_consulta or palabras_consulta <= palabras
+            return (0 if completas else 1,) + cercania(candidato)
+        return min(candidatos, key=rango)
+
+
+def get_account_index(cuentas: Mapping[str, object]) -> AccountIndex:
+    """
+    AccountIndex de las claves de `cuentas`. Se reutiliza mientras se pase el
+    mismo diccionario (los conjuntos de datos de una auditoría no se
+    modifican), de modo que se construye una vez por conjunto.
+    """
+    with _indices_lock:
+        cached = _indices.get(id(cuentas))
+        if cached is not None and cached[0] is cuentas and len(cached[1]) == len(cuentas):
+            _indices.move_to_end(id(cuentas))
+            return cached[1]
+
+    index = AccountIndex(cuentas)
+    with _indices_lock:
+        # Se guarda el diccionario para que su id no pueda reutilizarse mientras esté en caché
+        _indices[id(cuentas)] = (cuentas, index)
+        while len(_indices) > _INDEX_CACHE_SIZE:
+            _indices.popitem(last=False)
+    return index
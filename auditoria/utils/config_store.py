@@ -0,0 +1,257 @@
+"""
+Almacén en memoria de los archivos JSON de auditoria/config.
+
+replacements.json, tables.json y las estructuras de carpetas se leían y
+parseaban en cada descarga o vista. Aquí cada archivo se carga una vez por
+proceso y se recarga cuando cambian su mtime o su tamaño (comprobación
+limitada a una vez cada CONFIG_CHECK_INTERVAL segundos).
+
+Al cargar cada archivo se valida su estructura y se compilan sus patrones
+regex. Un archivo ilegible o con estructura incorrecta lanza
+ImproperlyConfigured en lugar de tratarse como configuración vacía.
+
+Los diccionarios devueltos se comparten entre solicitudes y no deben
+modificarse.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+REPLACEMENTS_FILE = 'replacements.json'
+TABLES_FILE = 'tables.json'
+FOLDER_STRUCTURE_FILES = {
+    False: 'folder_structure_financiera.json',
+    True: 'folder_structure_interna.json',
+}
+
+
+_REGEX_SPECIAL = frozenset('\\.^$*+?{}[]|()')
+
+
+class RegexRule:
+    """
+    Patrón regex compilado de una entrada de 'patrones_regex'.
+
+    Attributes:
+        regex: Patrón compilado
+        key: Placeholder cuyo valor sustituye al texto encontrado ('reemplazar_por')
+    """
+
+    __slots__ = ('regex', 'key')
+
+    def __init__(self, regex, key):
+        self.regex = regex
+        self.key = key
+
+    @property
+    def pattern(self):
+        return self.regex.pattern
+
+    @property
+    def literal_prefix(self):
+        """
+        Texto con el que empieza cualquier coincidencia del patrón, o '' si no
+        puede asegurarse (alternativas, grupos, flags que cambian la comparación...).
+        Un texto que no lo contiene no puede coincidir.
+        """
+        if self.regex.flags & (re.IGNORECASE | re.VERBOSE):
+            return ''
+        pattern = self.regex.pattern
+        if '|' in pattern:
+            return ''
+        prefix = []
+        for char in pattern[1:] if pattern.startswith('^') else pattern:
+            if char in _REGEX_SPECIAL:
+                # Un cuantificador que admite cero repeticiones hace opcional el último carácter
+                if char in '*?{' and prefix:
+                    prefix.pop()
+                break
+            prefix.append(char)
+        return ''.join(prefix)
+
+
+def _require(condition, file_name, message):
+    if not condition:
+        raise ImproperlyConfigured(f"Configuración inválida en {file_name}: {message}")
+
+
+def _compile_regex_rules(file_name, rules, flags):
+    """Valida y compila una lista de reglas {'pattern', 'reemplazar_por'}."""
+    _require(isinstance(rules, list), file_name, "'patrones_regex' debe ser una lista")
+    compiled = []
+    for index, rule in enumerate(rules):
+        _require(isinstance(rule, dict), file_name, f"patrones_regex[{index}] debe ser un objeto")
+        pattern = rule.get('pattern')
+        key = rule.get('reemplazar_por')
+        _require(isinstance(pattern, str) and pattern, file_name, f"patrones_regex[{index}] sin 'pattern'")
+        _require(isinstance(key, str) and key, file_name, f"patrones_regex[{index}] sin 'reemplazar_por'")
+        try:
+            compiled.append(RegexRule(re.compile(pattern, flags), key))
+        except re.error as e:
+            raise ImproperlyConfigured(
+                f"Configuración inválida en {file_name}: patrones_regex[{index}] {pattern!r}: {e}"
+            ) from e
+    return compiled
+
+
+def _validate_replacements(file_name, data):
+    _require(isinstance(data, dict), file_name, "debe ser un objeto")
+    for section, value in data.items():
+        if section != 'patrones_regex':
+            _require(isinstance(value, dict), file_name, f"'{section}' debe ser un objeto")
+    # replace_text aplica estos patrones sin distinguir mayúsculas
+    return {'regex_rules': _compile_regex_rules(file_name, data.get('patrones_regex', []), re.IGNORECASE)}
+
+
+def _validate_tables(file_name, data):
+    _require(isinstance(data, dict), file_name, "debe ser un objeto")
+    patrones = data.get('patrones', [])
+    _require(isinstance(patrones, list), file_name, "'patrones' debe ser una lista")
+    for index, patron in enumerate(patrones):
+        _require(isinstance(patron, dict) and isinstance(patron.get('buscar'), str),
+                 file_name, f"patrones[{index}] sin 'buscar'")
+    _require(isinstance(data.get('patrones_exactos', {}), dict), file_name, "'patrones_exactos' debe ser un objeto")
+
+    patrones_regex = data.get('patrones_regex', [])
+    if isinstance(patrones_regex, dict):
+        # Formato de subcadena -> placeholder usado por las hojas Excel
+        return {'regex_rules': []}
+    return {'regex_rules': _compile_regex_rules(file_name, patrones_regex, 0)}
+
+
+def _validate_folder_structure(file_name, data):
+    _require(isinstance(data, dict), file_name, "debe ser un objeto")
+    pending = [('', data)]
+    while pending:
+        path, node = pending.pop()
+        for name, value in node.items():
+            if isinstance(value, dict):
+                pending.append((f"{path}/{name}", value))
+            else:
+                _require(isinstance(value, list), file_name, f"'{path}/{name}' debe ser una carpeta o una lista")
+    return {}
+
+
+_VALIDATORS = {
+    REPLACEMENTS_FILE: _validate_replacements,
+    TABLES_FILE: _validate_tables,
+    **{name: _validate_folder_structure for name in FOLDER_STRUCTURE_FILES.values()},
+}
+
+
+class _ConfigEntry:
+    __slots__ = ('signature', 'data', 'extras')
+
+    def __init__(self, signature, data, extras):
+        self.signature = signature
+        self.data = data
+        self.extras = extras
+
+
+class ConfigStore:
+    """
+    Archivos de configuración JSON de `directory` cargados una vez por proceso.
+
+    Args:
+        directory: Carpeta con los archivos JSON
+        check_interval: Segundos entre comprobaciones de cambios de un archivo
+    """
+
+    def __init__(self, directory, check_interval=2):
+        self.directory = str(directory)
+        self.check_interval = check_interval
+        self._entries = {}
+        self._last_checks = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            raise ImproperlyConfigured(f"No se pudo leer el archivo de configuración {path}: {e}") from e
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, file_name, signature):
+        path = os.path.join(self.directory, file_name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error al leer el archivo {file_name}: {e}")
+            raise ImproperlyConfigured(f"No se pudo leer el archivo de configuración {file_name}: {e}") from e
+
+        validate = _VALIDATORS.get(file_name)
+        try:
+            extras = validate(file_name, data) if validate else {}
+        except ImproperlyConfigured as e:
+            logger.error(str(e))
+            raise
+        logger.info(f"Configuración cargada: {file_name}")
+        return _ConfigEntry(signature, data, extras)
+
+    def _entry(self, file_name):
+        now = time.monotonic()
+        entry = self._entries.get(file_name)
+        if entry is not None and now - self._last_checks.get(file_name, 0.0) < self.check_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(file_name)
+            signature = self._signature(os.path.join(self.directory, file_name))
+            if entry is None or entry.signature != signature:
+                entry = self._load(file_name, signature)
+                self._entries[file_name] = entry
+            self._last_checks[file_name] = now
+        return entry
+
+    def get(self, file_name):
+        """Contenido del archivo JSON (compartido: no modificar)."""
+        return self._entry(file_name).data
+
+    def get_replacements_config(self):
+        return self.get(REPLACEMENTS_FILE)
+
+    def get_tables_config(self):
+        return self.get(TABLES_FILE)
+
+    def get_replacement_regex_rules(self):
+        """Patrones regex de replacements.json compilados sin distinguir mayúsculas."""
+        return self._entry(REPLACEMENTS_FILE).extras['regex_rules']
+
+    def get_table_regex_rules(self):
+        """Patrones regex de tables.json compilados tal como los usa process_tables."""
+        return self._entry(TABLES_FILE).extras['regex_rules']
+
+    def get_folder_structure(self, is_internal=False):
+        return self.get(FOLDER_STRUCTURE_FILES[bool(is_internal)])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_checks.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_config_store():
+    """Instancia de ConfigStore del proceso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConfigStore(
+                    os.path.join(settings.BASE_DIR, 'auditoria', 'config'),
+                    check_interval=getattr(settings, 'CONFIG_CHECK_INTERVAL', 2),
+                )
+    return _store
@@ -1,5 +1,7 @@
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional, Iterable
 from django.db.models import QuerySet
 from auditoria.models import (
     BalanceCuentas,
@@ -7,6 +9,8 @@ from auditoria.models import (
     SaldoInicial,
     AjustesReclasificaciones,
 )
+from auditoria.utils.financial_dataset import FinancialDataset
+from auditoria.utils.render_timing import annotate, span
 
 logger = logging.getLogger(__name__)
 
@@ -114,42 +118,35 @@ def _serialize_ajuste(ajuste: AjustesReclasificaciones) -> Dict[str, Any]:
         'haber': float(ajuste.haber),
     }
 
+def _organize_balances(balances: Iterable[Dict[str, Any]]) -> FinancialDataset:
+    return FinancialDataset.from_records(balances)
+
+def _organize_registros_auxiliares(registros: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return {f"{r['cuenta']}": r['saldo'] for r in registros}
+
+def _organize_saldos_iniciales(saldos: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return {f"{s['cuenta']}-{s['fecha_corte']}": s['saldo'] for s in saldos}
+
+def _organize_ajustes(ajustes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        f"{a['cuenta']}": {'debe': a['debe'], 'haber': a['haber']}
+        for a in ajustes
+    }
+
 def organize_financial_data(financial_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Organiza los datos financieros en un diccionario estructurado
     para facilitar el acceso en otras partes del sistema.
+
+    Los balances se devuelven como FinancialDataset, que sigue admitiendo el
+    acceso por las claves de texto TIPO-FECHA-SECCION-CUENTA-TIPO_CUENTA.
     """
-    organized_data: Dict[str, Dict[str, Any]] = {
-        'balances': {},
-        'registros_auxiliares': {},
-        'saldos_iniciales': {},
-        'ajustes_reclasificaciones': {},
+    return {
+        'balances': _organize_balances(financial_data['balances']),
+        'registros_auxiliares': _organize_registros_auxiliares(financial_data['registros_auxiliares']),
+        'saldos_iniciales': _organize_saldos_iniciales(financial_data['saldos_iniciales']),
+        'ajustes_reclasificaciones': _organize_ajustes(financial_data.get('ajustes_reclasificaciones', [])),
     }
-    
-    # Organizar balances
-    for balance in financial_data['balances']:
-        key = f"{balance['tipo_balance']}-{balance['fecha_corte']}-{balance['seccion']}-{balance['nombre_cuenta']}-{balance['tipo_cuenta']}"
-        organized_data['balances'][key] = balance['valor']
-    
-    # Organizar registros auxiliares
-    for registro in financial_data['registros_auxiliares']:
-        key = f"{registro['cuenta']}"
-        organized_data['registros_auxiliares'][key] = registro['saldo']
-    
-    # Organizar saldos iniciales
-    for saldo in financial_data['saldos_iniciales']:
-        key = f"{saldo['cuenta']}-{saldo['fecha_corte']}"
-        organized_data['saldos_iniciales'][key] = saldo['saldo']
-    
-    # Organizar ajustes / reclasificaciones
-    for ajuste in financial_data.get('ajustes_reclasificaciones', []):
-        key = f"{ajuste['cuenta']}"
-        organized_data['ajustes_reclasificaciones'][key] = {
-            'debe': ajuste['debe'],
-            'haber': ajuste['haber'],
-        }
-    
-    return organized_data
 
 def get_all_financial_data(audit_id: int) -> Dict[str, Any]:
     """
@@ -182,4 +179,81 @@ def get_all_financial_data(audit_id: int) -> Dict[str, Any]:
     return {
         'raw': serialized_data,
         'organized': organized_data
-    }
\ No newline at end of file
+    }
+
+# Conjunto de datos organizado -> función que lo consulta para una auditoría
+_DATASET_LOADERS = {
+    'balances': lambda audit_id: _organize_balances(
+        _serialize_balance(b) for b in get_balance_data(audit_id)['balances']),
+    'registros_auxiliares': lambda audit_id: _organize_registros_auxiliares(
+        _serialize_registro_auxiliar(r) for r in get_auxiliary_records(audit_id)['registros']),
+    'saldos_iniciales': lambda audit_id: _organize_saldos_iniciales(
+        _serialize_saldo_inicial(s) for s in get_initial_balances(audit_id)['saldos']),
+    'ajustes_reclasificaciones': lambda audit_id: _organize_ajustes(
+        _serialize_ajuste(a) for a in get_adjustment_records(audit_id)['ajustes']),
+}
+
+FINANCIAL_DATASETS = tuple(_DATASET_LOADERS)
+
+class LazyFinancialData(Mapping):
+    """
+    Datos financieros organizados de una auditoría que se consultan solo al
+    pedirlos.
+
+    Tiene las mismas claves que get_all_financial_data()['organized'], pero
+    cada conjunto se consulta la primera vez que se accede a él y se conserva
+    para los siguientes accesos. Se puede enviar a otros procesos (pickle) con
+    los conjuntos ya cargados.
+    """
+
+    def __init__(self, audit_id: int):
+        self.audit_id = audit_id
+        self._data: Dict[str, Dict[str, Any]] = {}
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        if name not in self._data:
+            loader = _DATASET_LOADERS[name]
+            with span(f'db.{name}'):
+                self._data[name] = loader(self.audit_id)
+            annotate(**{name: len(self._data[name])})
+        return self._data[name]
+
+    def __iter__(self):
+        return iter(FINANCIAL_DATASETS)
+
+    def __len__(self) -> int:
+        return len(FINANCIAL_DATASETS)
+
+    def __repr__(self) -> str:
+        return f"LazyFinancialData(audit_id={self.audit_id}, cargados={sorted(self._data)})"
+
+    @property
+    def loaded(self) -> List[str]:
+        """Conjuntos ya consultados."""
+        return list(self._data)
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Consulta por adelantado los conjuntos indicados."""
+        for name in names:
+            self[name]
+
+def get_financial_data_version(audit_id: int) -> str:
+    """
+    Devuelve una huella de los datos financieros de la auditoría.
+
+    Cambia cuando se agrega, modifica o elimina cualquier balance, registro
+    auxiliar, saldo inicial o ajuste. Solo lee las columnas usadas por los
+    procesadores, sin construir instancias de modelo ni serializar.
+    """
+    digest = hashlib.sha256()
+    sources = (
+        (BalanceCuentas, ('id', 'tipo_balance', 'fecha_corte', 'seccion', 'nombre_cuenta', 'tipo_cuenta', 'valor')),
+        (RegistroAuxiliar, ('id', 'cuenta', 'saldo')),
+        (SaldoInicial, ('id', 'cuenta', 'saldo', 'fecha_corte')),
+        (AjustesReclasificaciones, ('id', 'nombre_cuenta', 'debe', 'haber')),
+    )
+    for model, fields in sources:
+        digest.update(model.__name__.encode())
+        for row in model.objects.filter(audit_id=audit_id).order_by('id').values_list(*fields):
+            digest.update(repr(row).encode())
+    return digest.hexdigest()
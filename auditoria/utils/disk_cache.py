@@ -0,0 +1,192 @@
+"""
+Caché en disco local direccionada por contenido con desalojo LRU acotado por tamaño.
+Se usa para guardar documentos ya generados y servirlos directamente desde disco.
+"""
+
+import os
+import uuid
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """
+    Almacena archivos en `directory` usando una clave hexadecimal como nombre.
+
+    - La fecha de modificación de cada archivo se usa como marca de último acceso.
+    - Cuando el tamaño total supera `max_bytes` se eliminan los archivos menos
+      usados recientemente hasta quedar por debajo del 90% del límite.
+    - Las escrituras son atómicas (archivo temporal + os.replace), por lo que
+      varios workers de gunicorn pueden compartir el mismo directorio.
+    """
+
+    TMP_DIRNAME = '.tmp'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = int(max_bytes)
+        self._total_bytes = None  # Se calcula de forma perezosa
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+    def _path_for(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _tmp_dir(self):
+        return os.path.join(self.directory, self.TMP_DIRNAME)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def get(self, key):
+        """
+        Devuelve la ruta del archivo cacheado para `key` o None si no existe.
+        Marca el archivo como usado recientemente.
+        """
+        path = self._path_for(key)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def put_bytes(self, key, data):
+        """Guarda `data` bajo `key` y devuelve la ruta final."""
+        tmp_path = self._new_tmp_path()
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        return self._commit(key, tmp_path)
+
+    def put_file(self, key, src_fileobj):
+        """Copia el contenido de un objeto archivo (desde su posición actual) bajo `key`."""
+        tmp_path = self._new_tmp_path()
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(src_fileobj, f)
+        return self._commit(key, tmp_path)
+
+    def put_stream(self, key, write):
+        """
+        Crea la entrada `key` llamando a write(f) sobre un archivo en disco, sin
+        pasar el contenido por memoria. Devuelve ese archivo abierto en lectura
+        desde el inicio; sigue siendo válido aunque la entrada se desaloje después.
+
+        Devuelve None (sin llamar a write) si no se puede crear el archivo en la caché.
+        Si write devuelve False, o falla el guardado final, el archivo se devuelve
+        igualmente pero no queda guardado bajo `key`.
+        """
+        try:
+            tmp_path = self._new_tmp_path()
+            f = open(tmp_path, 'w+b')
+        except OSError as e:
+            logger.warning(f"No se pudo crear la entrada de caché en {self.directory}: {e}")
+            return None
+
+        try:
+            keep = write(f)
+            f.flush()
+        except BaseException:
+            f.close()
+            self._remove_quietly(tmp_path)
+            raise
+
+        if keep is False:
+            # El descriptor abierto sigue siendo válido tras eliminar el archivo
+            self._remove_quietly(tmp_path)
+        else:
+            try:
+                self._commit(key, tmp_path)
+            except OSError as e:
+                logger.warning(f"No se pudo guardar la entrada de caché {key}: {e}")
+        f.seek(0)
+        return f
+
+    def _new_tmp_path(self):
+        tmp_dir = self._tmp_dir()
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    def _commit(self, key, tmp_path):
+        final_path = self._path_for(key)
+        try:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, final_path)
+        except OSError:
+            self._remove_quietly(tmp_path)
+            raise
+        self._account(size)
+        return final_path
+
+    def _account(self, size):
+        """Suma `size` al total en uso y desaloja si se supera el límite."""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total()
+            else:
+                self._total_bytes += size
+            needs_eviction = self._total_bytes > self.max_bytes
+
+        if needs_eviction:
+            self.evict()
+
+    # ------------------------------------------------------------------
+    # Desalojo
+    # ------------------------------------------------------------------
+    def _entries(self):
+        """Lista (mtime, size, path) de todos los archivos cacheados."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir() or bucket.name == self.TMP_DIRNAME:
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_total(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Elimina los archivos menos usados hasta quedar por debajo del 90% del límite."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                if self._remove_quietly(path):
+                    total -= size
+                    removed += 1
+            self._total_bytes = total
+
+        if removed:
+            logger.info(f"Caché {self.directory}: {removed} archivos desalojados, {total} bytes en uso")
+
+    def clear(self):
+        """Elimina todo el contenido de la caché."""
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._total_bytes = 0
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
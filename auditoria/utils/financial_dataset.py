@@ -0,0 +1,221 @@
+"""
+Balances de cuentas de una auditoría en memoria, por columnas y con índices.
+
+organize_financial_data codificaba cada balance como una clave de texto
+('ANUAL-2024-12-31-Activo-Caja-Corriente') y cada procesador volvía a
+separarla con regex o split('-') recorriendo todo el diccionario, lo que
+además fallaba con cuentas que contienen guiones. FinancialDataset guarda
+los campos tipados por columnas y construye al cargarse los índices por
+periodo (tipo, fecha), por sección y por cuenta, de modo que las consultas
+habituales de los procesadores no recorren todos los balances.
+
+Para los procesadores que aún leen las claves de texto se comporta como el
+diccionario de siempre: un Mapping de solo lectura clave -> valor.
+"""
+
+import re
+from collections import namedtuple
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+BalanceRow = namedtuple('BalanceRow', ('tipo', 'fecha', 'seccion', 'cuenta', 'tipo_cuenta', 'valor'))
+
+# tipo_cuenta que normalizar_balances elimina de las claves de texto
+_TIPO_CUENTA_NORMALIZABLE = re.compile(r'^(?:C|NC|NT|CORRIENTE|NO[ -]?CORRIENTE)$', re.IGNORECASE)
+
+# Clave de texto: TIPO-AAAA-MM-DD-Sección-Cuenta[-tipo_cuenta]
+_CLAVE_TEXTO = re.compile(r'^([^-]+)-(\d{4}-\d{2}-\d{2})-([^-]*)-(.*)$', re.DOTALL)
+_SUFIJO_TIPO_CUENTA = re.compile(r'^(.*?)-(C|NC|NT|CORRIENTE|NO[ -]?CORRIENTE)$', re.IGNORECASE | re.DOTALL)
+
+
+class FinancialDataset(Mapping):
+    """
+    Balances de cuentas de una auditoría.
+
+    Cada balance ocupa una posición en las columnas tipos, fechas
+    ('AAAA-MM-DD'), secciones, cuentas, tipos_cuenta y valores. Un balance
+    repetido (misma clave de texto) conserva la posición del primero y el
+    valor del último, igual que el diccionario de claves de texto.
+
+    Con normalized=True las claves omiten el tipo_cuenta, como hacía
+    normalizar_balances, y las cuentas que solo se diferencian por él se
+    combinan en una.
+
+    Las colecciones devueltas por las consultas se comparten entre llamadas
+    y no deben modificarse.
+    """
+
+    __slots__ = (
+        'normalized', 'tipos', 'fechas_corte', 'secciones', 'cuentas_balance', 'tipos_cuenta', 'valores',
+        '_positions', '_periodos', '_por_seccion', '_por_cuenta', '_fechas', '_cuentas', '_series',
+        '_normalizado',
+    )
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, str, str, float]] = (), normalized: bool = False):
+        self.normalized = normalized
+        positions: Dict[str, int] = {}
+        columns: Tuple[List[Any], ...] = ([], [], [], [], [], [])
+        tipos, fechas, secciones, cuentas, tipos_cuenta, valores = columns
+
+        for tipo, fecha, seccion, cuenta, tipo_cuenta, valor in rows:
+            if normalized and _TIPO_CUENTA_NORMALIZABLE.match(tipo_cuenta or ''):
+                clave = f"{tipo}-{fecha}-{seccion}-{cuenta}".strip()
+                cuenta = cuenta.rstrip()
+            else:
+                clave = f"{tipo}-{fecha}-{seccion}-{cuenta}-{tipo_cuenta}"
+
+            position = positions.get(clave)
+            if position is not None:
+                valores[position] = valor
+                continue
+            positions[clave] = len(valores)
+            for column, value in zip(columns, (tipo, fecha, seccion, cuenta, tipo_cuenta, valor)):
+                column.append(value)
+
+        self.tipos = tuple(tipos)
+        self.fechas_corte = tuple(fechas)
+        self.secciones = tuple(secciones)
+        self.cuentas_balance = tuple(cuentas)
+        self.tipos_cuenta = tuple(tipos_cuenta)
+        self.valores = tuple(valores)
+        self._positions = positions
+        self._normalizado = self if normalized else None
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        periodos: Dict[Tuple[str, str], List[int]] = {}
+        por_seccion: Dict[str, List[int]] = {}
+        por_cuenta: Dict[str, List[int]] = {}
+        cuentas: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        series: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {}
+
+        columns = zip(self.tipos, self.fechas_corte, self.secciones, self.cuentas_balance, self.valores)
+        for index, (tipo, fecha, seccion, cuenta, valor) in enumerate(columns):
+            periodos.setdefault((tipo, fecha), []).append(index)
+            por_seccion.setdefault(seccion, []).append(index)
+            por_cuenta.setdefault(cuenta, []).append(index)
+            cuentas.setdefault((tipo, fecha, seccion), {})[cuenta] = valor
+            series.setdefault((cuenta, tipo), {})[fecha] = valor
+            series.setdefault((cuenta, None), {})[fecha] = valor
+
+        fechas: Dict[Optional[str], Tuple[str, ...]] = {None: tuple(sorted({fecha for _, fecha in periodos}))}
+        for tipo in {tipo for tipo, _ in periodos}:
+            fechas[tipo] = tuple(sorted(fecha for t, fecha in periodos if t == tipo))
+
+        self._periodos = periodos
+        self._por_seccion = por_seccion
+        self._por_cuenta = por_cuenta
+        self._cuentas = cuentas
+        self._series = series
+        self._fechas = fechas
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], normalized: bool = False) -> 'FinancialDataset':
+        """Crea el conjunto a partir de balances serializados (ver data_db._serialize_balance)."""
+        return cls(
+            (
+                (r['tipo_balance'], r['fecha_corte'], r['seccion'], r['nombre_cuenta'], r['tipo_cuenta'], r['valor'])
+                for r in records
+            ),
+            normalized=normalized,
+        )
+
+    @classmethod
+    def from_mapping(cls, balances: Mapping, normalized: bool = False) -> 'FinancialDataset':
+        """
+        Crea el conjunto a partir de un diccionario de claves de texto. Las
+        claves sin el formato TIPO-AAAA-MM-DD-Sección-Cuenta se ignoran.
+        """
+        def rows():
+            for clave, valor in balances.items():
+                match = _CLAVE_TEXTO.match(clave)
+                if not match:
+                    continue
+                tipo, fecha, seccion, resto = match.groups()
+                if normalized:
+                    yield tipo, fecha, seccion, resto, 'NT', valor
+                elif sufijo := _SUFIJO_TIPO_CUENTA.match(resto):
+                    yield (tipo, fecha, seccion) + sufijo.groups() + (valor,)
+                elif '-' in resto:
+                    yield (tipo, fecha, seccion) + tuple(resto.rsplit('-', 1)) + (valor,)
+        return cls(rows(), normalized=normalized)
+
+    def __reduce__(self):
+        # Se envía solo el contenido; los índices se reconstruyen al recibirlo
+        return self.__class__, (list(self.filas()), self.normalized)
+
+    # Mapping de claves de texto -> valor
+
+    def __getitem__(self, clave: str) -> float:
+        return self.valores[self._positions[clave]]
+
+    def __contains__(self, clave: object) -> bool:
+        return clave in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+    def __repr__(self) -> str:
+        return f"FinancialDataset({len(self)} balances, normalized={self.normalized})"
+
+    # Consultas
+
+    def _fila(self, index: int) -> BalanceRow:
+        return BalanceRow(
+            self.tipos[index], self.fechas_corte[index], self.secciones[index],
+            self.cuentas_balance[index], self.tipos_cuenta[index], self.valores[index],
+        )
+
+    def filas(self, tipo: Optional[str] = None, fecha: Optional[str] = None,
+              seccion: Optional[str] = None) -> Iterator[BalanceRow]:
+        """Balances que cumplen los filtros indicados, en su orden original."""
+        if tipo is not None and fecha is not None:
+            indices: Iterable[int] = self._periodos.get((tipo, fecha), ())
+            tipo = fecha = None
+        elif seccion is not None:
+            indices = self._por_seccion.get(seccion, ())
+            seccion = None
+        else:
+            indices = range(len(self.valores))
+
+        for index in indices:
+            if ((tipo is None or self.tipos[index] == tipo)
+                    and (fecha is None or self.fechas_corte[index] == fecha)
+                    and (seccion is None or self.secciones[index] == seccion)):
+                yield self._fila(index)
+
+    def periodos(self) -> List[Tuple[str, str]]:
+        """(tipo, fecha) presentes, en el orden en que aparecen."""
+        return list(self._periodos)
+
+    def fechas(self, tipo: Optional[str] = None) -> Tuple[str, ...]:
+        """Fechas de corte ('AAAA-MM-DD') ordenadas, de un tipo de balance o de todos."""
+        return self._fechas.get(tipo, ())
+
+    def años(self, tipo: Optional[str] = None) -> Tuple[str, ...]:
+        """Años ('AAAA') con balances, ordenados."""
+        return tuple(sorted({fecha[:4] for fecha in self.fechas(tipo)}))
+
+    def cuentas(self, tipo: str, fecha: str, seccion: str) -> Dict[str, float]:
+        """{cuenta: valor} de una sección en una fecha de corte."""
+        return self._cuentas.get((tipo, fecha, seccion), {})
+
+    def serie(self, cuenta: str, tipo: Optional[str] = None) -> Dict[str, float]:
+        """{fecha: valor} de una cuenta, de un tipo de balance o de todos."""
+        return self._series.get((cuenta, tipo), {})
+
+    def normalizado(self) -> 'FinancialDataset':
+        """Conjunto con las claves sin tipo_cuenta (se calcula una vez)."""
+        if self._normalizado is None:
+            self._normalizado = FinancialDataset(self.filas(), normalized=True)
+        return self._normalizado
+
+
+def as_financial_dataset(balances: Mapping, normalized: bool = False) -> FinancialDataset:
+    """Devuelve `balances` como FinancialDataset (el mismo objeto si ya lo es)."""
+    if isinstance(balances, FinancialDataset):
+        return balances
+    return FinancialDataset.from_mapping(balances, normalized=normalized)
@@ -0,0 +1,137 @@
+"""
+Tiempos por etapa de la generación de un documento. render_timing() abre una
+medición (con RENDER_TIMING_ENABLED o force) y span(nombre) acumula en ella la
+duración de cada etapa; sin medición activa span() no hace nada.
+"""
+
+import re
+import json
+import time
+import logging
+import contextlib
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('render_timing', default=None)
+
+# Caracteres que no admite un nombre de métrica de Server-Timing (token de HTTP)
+_INVALID_TOKEN_CHARS_RE = re.compile(r"[^!#$%&'*+\-.^_`|~0-9A-Za-z]")
+
+
+class RenderTiming:
+    """
+    Tiempos de las etapas de una generación y sus atributos (plantilla,
+    auditoría, número de cuentas, tamaño...).
+
+    Las etapas con el mismo nombre se acumulan; las anidadas se cuentan en
+    ambas, igual que en Server-Timing.
+    """
+
+    def __init__(self, **attributes):
+        self.attributes = dict(attributes)
+        self.spans = {}
+        self._start = time.perf_counter()
+        self.total = None
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def annotate(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        if self.total is None:
+            self.total = time.perf_counter() - self._start
+        return self.total
+
+    def as_dict(self):
+        """Atributos, tiempo total y etapas en ms."""
+        record = dict(self.attributes)
+        record['total_ms'] = round(self.finish() * 1000, 1)
+        record['spans'] = {name: round(seconds * 1000, 1) for name, seconds in self.spans.items()}
+        return record
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing."""
+        metrics = [
+            f"{_INVALID_TOKEN_CHARS_RE.sub('_', name)};dur={seconds * 1000:.1f}"
+            for name, seconds in self.spans.items()
+        ]
+        metrics.append(f"total;dur={self.finish() * 1000:.1f}")
+        return ', '.join(metrics)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current_timing():
+    """Medición activa en el contexto actual, o None."""
+    return _current.get()
+
+
+def span(name):
+    """Contexto que acumula su duración en la medición activa como la etapa `name`."""
+    timing = _current.get()
+    if timing is None:
+        return _NULL_SPAN
+    return timing.span(name)
+
+
+def annotate(**attributes):
+    """Añade atributos a la medición activa, si la hay."""
+    timing = _current.get()
+    if timing is not None:
+        timing.annotate(**attributes)
+
+
+@contextlib.contextmanager
+def render_timing(force=False, **attributes):
+    """
+    Abre una medición para la generación en curso.
+
+    Produce la RenderTiming, o None si RENDER_TIMING_ENABLED está desactivado
+    y no se indica `force`.
+    """
+    if not (force or getattr(settings, 'RENDER_TIMING_ENABLED', False)):
+        yield None
+        return
+
+    timing = RenderTiming(**attributes)
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+        timing.finish()
+
+
+def log_render_timing(timing):
+    """Registra los tiempos de la generación en una línea con formato JSON."""
+    if timing is None:
+        return
+    record = timing.as_dict()
+    logger.info(
+        f"Tiempos de generación {json.dumps(record, ensure_ascii=False, default=str)}",
+        extra={'render_timing': record},
+    )
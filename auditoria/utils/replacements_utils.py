@@ -1,34 +1,21 @@
-import os
-import json
 import logging
-from django.conf import settings
+from types import SimpleNamespace
 from typing import Dict, Any, Optional
+from .config_store import get_config_store
 
 logger = logging.getLogger(__name__)
 
-def _load_json_config(file_name: str) -> dict:
-    """
-    Función auxiliar para cargar archivos JSON de configuración
-    """
-    try:
-        json_path = os.path.join(settings.BASE_DIR, 'auditoria', 'config', file_name)
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error al leer el archivo {file_name}: {str(e)}")
-        return {}
-
 def get_replacements_config() -> dict:
     """
     Lee la configuración de reemplazos
     """
-    return _load_json_config('replacements.json')
+    return get_config_store().get_replacements_config()
 
 def get_tables_config() -> dict:
     """
     Lee la configuración de tablas
     """
-    return _load_json_config('tables.json')
+    return get_config_store().get_tables_config()
 
 def _format_value(value: float) -> str:
     """
@@ -129,3 +116,18 @@ def build_replacements_dict(
             logger.debug(f"  {key}: {replacements[key]}")
 
     return replacements
+
+def get_replacement_triggers(replacements_config: dict, tables_config: dict) -> tuple:
+    """
+    Subcadenas sin las cuales replace_cell_value no modifica una celda: claves
+    de reemplazo, patrones exactos y patrones de tablas.json.
+    """
+    placeholder_audit = SimpleNamespace(
+        identidad='', title='', tipoAuditoria='F', moneda='GTQ', audit_manager=None
+    )
+    triggers = set(build_replacements_dict(replacements_config, placeholder_audit, '', ''))
+    triggers.update(tables_config.get('patrones_exactos', {}))
+    patrones_regex = tables_config.get('patrones_regex', {})
+    if isinstance(patrones_regex, dict):
+        triggers.update(patrones_regex)
+    return tuple(sorted(triggers))
@@ -0,0 +1,91 @@
+"""
+Contenido de las plantillas precargado en memoria; open_template() lo sirve
+mientras el archivo no cambie en disco y, si no, abre el archivo.
+"""
+
+import io
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateBytesStore:
+    """Contenido de los archivos de plantilla por ruta absoluta."""
+
+    def __init__(self):
+        self._entries = {}  # ruta absoluta -> (mtime_ns, tamaño, contenido)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return sum(len(data) for _, _, data in self._entries.values())
+
+    def load_tree(self, base_path):
+        """
+        Carga todos los archivos bajo `base_path`.
+
+        Returns:
+            int: Número de archivos cargados
+        """
+        loaded = 0
+        for current, _, files in os.walk(base_path):
+            for name in files:
+                if self.load(os.path.join(current, name)):
+                    loaded += 1
+        return loaded
+
+    def load(self, path):
+        """Carga el archivo `path`; devuelve False si no pudo leerse."""
+        try:
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"No se pudo precargar la plantilla {path}: {e}")
+            return False
+        self._entries[os.path.abspath(path)] = (stat.st_mtime_ns, stat.st_size, data)
+        return True
+
+    def get(self, path):
+        """Contenido precargado de `path`, o None si no se precargó o ha cambiado."""
+        if not self._entries:
+            return None
+        key = os.path.abspath(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        mtime_ns, size, data = entry
+        if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+            # La plantilla cambió en disco: se deja de usar la copia precargada
+            self._entries.pop(key, None)
+            return None
+        return data
+
+    def clear(self):
+        self._entries.clear()
+
+
+_store = TemplateBytesStore()
+
+
+def get_template_bytes_store():
+    """Instancia de TemplateBytesStore del proceso."""
+    return _store
+
+
+def open_template(path):
+    """
+    Equivalente a open(path, 'rb') que usa el contenido precargado si existe.
+    El resultado se usa como contexto (with) igual que un archivo.
+    """
+    data = _store.get(path)
+    if data is None:
+        return open(path, 'rb')
+    return io.BytesIO(data)
@@ -0,0 +1,314 @@
+"""
+Caché por proceso de plantillas ya parseadas.
+
+Document() y load_workbook() descomprimen y parsean todo el XML de la
+plantilla en cada descarga. Aquí se conserva una representación prístina de
+cada plantilla (clave: ruta + mtime + tamaño) y en cada solicitud se entrega
+una copia de trabajo independiente, mucho más barata que volver a parsear:
+
+- Word: se clona el paquete OPC copiando los árboles lxml de las partes XML
+  (copia en C) y compartiendo los blobs binarios (imágenes), que son inmutables.
+- Excel: se guarda el Workbook serializado con pickle; deserializarlo es varias
+  veces más rápido que load_workbook. IndexedList y TableList no sobreviven al
+  pickle estándar (índice compartido a nivel de clase e items() redefinido), por
+  lo que se serializan con reductores propios.
+
+La caché se acota por memoria (TEMPLATE_CACHE_MAX_BYTES): en Excel se cuenta
+el tamaño del pickle y en Word una estimación a partir del tamaño de sus partes.
+
+Las estadísticas (aciertos, fallos y tiempo de parseo ahorrado) se obtienen
+con get_template_cache_stats(), y cada generación registra en su medición de
+render_timing si la plantilla estaba en caché y el parseo que se evitó. Los
+tiempos son de CPU del proceso, que no se ven afectados por la espera de E/S
+ni por otros procesos del servidor.
+"""
+
+import io
+import os
+import copy
+import zipfile
+import time
+import pickle
+import copyreg
+import gc
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from docx import Document
+from docx.opc.part import XmlPart
+from docx.shared import lazyproperty
+from openpyxl import load_workbook
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.worksheet.table import TableList
+
+from .render_timing import annotate, span
+from .template_bytes import open_template
+
+logger = logging.getLogger(__name__)
+
+# Memoria aproximada de los árboles lxml de python-docx por byte de XML sin
+# comprimir (medido sobre las plantillas reales: entre 9 y 12)
+DOCX_XML_MEMORY_FACTOR = 12
+
+
+def _clone_part(part, package, element):
+    """Copia superficial de una parte apuntando al nuevo paquete y al nuevo elemento."""
+    clone = object.__new__(type(part))
+    cls = type(part)
+    for name, value in part.__dict__.items():
+        if isinstance(getattr(cls, name, None), lazyproperty):
+            # Valores perezosos cacheados (rels, partes relacionadas...): se recalculan
+            continue
+        if name == '_package':
+            value = package
+        elif element is not None and value is part._element:
+            value = element
+        clone.__dict__[name] = value
+    return clone
+
+
+def clone_document(document):
+    """
+    Devuelve una copia de trabajo independiente de un Document de python-docx.
+    Las partes XML se copian y las binarias se comparten.
+    """
+    src_package = document.part.package
+    package = type(src_package)()
+
+    clones = {}
+    for part in src_package.iter_parts():
+        element = copy.deepcopy(part._element) if isinstance(part, XmlPart) else None
+        clones[part] = _clone_part(part, package, element)
+
+    def _copy_rels(src, dst):
+        for rel in src.rels.values():
+            target = rel.target_ref if rel.is_external else clones[rel.target_part]
+            dst.load_rel(rel.reltype, target, rel.rId, rel.is_external)
+
+    _copy_rels(src_package, package)
+    for part, clone in clones.items():
+        _copy_rels(part, clone)
+
+    return package.main_document_part.document
+
+
+def _rebuild_indexed_list(items, index, clean):
+    indexed_list = IndexedList()
+    list.extend(indexed_list, items)
+    indexed_list._dict = index
+    indexed_list.clean = clean
+    return indexed_list
+
+
+def _rebuild_table_list(tables):
+    table_list = TableList()
+    for table in tables:
+        table_list.add(table)
+    return table_list
+
+
+class _WorkbookPickler(pickle.Pickler):
+    dispatch_table = copyreg.dispatch_table.copy()
+    # openpyxl modifica algunos StyleArray después de indexarlos: esas claves
+    # quedan con un hash obsoleto y nunca se encuentran. Se omiten para que la
+    # copia se comporte igual que el original en lugar de "repararlas" al rehashear.
+    dispatch_table[IndexedList] = lambda value: (
+        _rebuild_indexed_list,
+        (list(value), {k: value._dict[k] for k in value._dict if k in value._dict}, value.clean),
+    )
+    dispatch_table[TableList] = lambda value: (_rebuild_table_list, (list(dict.values(value)),))
+
+
+def dump_workbook(workbook):
+    """Serializa un Workbook de openpyxl de forma que pickle.loads devuelva una copia fiel."""
+    buffer = io.BytesIO()
+    _WorkbookPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(workbook)
+    return buffer.getvalue()
+
+
+def load_workbook_copy(data):
+    """
+    Deserializa una copia del Workbook. El recolector de ciclos se pausa mientras
+    tanto: la copia crea decenas de miles de objetos y dispararía varias
+    recolecciones completas sin nada que liberar.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _parse_document(template_path):
+    with open_template(template_path) as f:
+        return Document(f)
+
+
+def _parse_workbook(template_path):
+    with open_template(template_path) as f:
+        return load_workbook(f)
+
+
+def estimate_document_size(template_path):
+    """Memoria aproximada (bytes) de un Document parseado a partir de las partes del .docx."""
+    size = 0
+    with open_template(template_path) as f, zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.filename.endswith(('.xml', '.rels')):
+                size += info.file_size * DOCX_XML_MEMORY_FACTOR
+            else:
+                size += info.file_size
+    return size
+
+
+class _Entry:
+    __slots__ = ('pristine', 'parse_seconds', 'size')
+
+    def __init__(self, pristine, parse_seconds, size):
+        self.pristine = pristine
+        self.parse_seconds = parse_seconds
+        self.size = size
+
+
+class ParsedTemplateCache:
+    """
+    Caché LRU de plantillas parseadas, acotada por memoria.
+
+    Args:
+        max_bytes: Memoria máxima (estimada) de las plantillas conservadas; una
+            plantilla mayor que el límite se parsea en cada uso sin guardarse
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.parse_seconds = 0.0
+        self.copy_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def _get_or_parse(self, kind, template_path, parse, make_copy, measure):
+        stat = os.stat(template_path)
+        key = (kind, os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            start = time.process_time()
+            with span('template.parse'):
+                pristine = parse(template_path)
+            parse_seconds = time.process_time() - start
+            entry = _Entry(pristine, parse_seconds, measure(template_path, pristine))
+            with self._lock:
+                self.misses += 1
+                self.parse_seconds += parse_seconds
+                if entry.size <= self.max_bytes and key not in self._entries:
+                    self._entries[key] = entry
+                    self.total_bytes += entry.size
+                    self._evict()
+            hit = False
+        else:
+            hit = True
+
+        start = time.process_time()
+        with span('template.copy'):
+            working_copy = make_copy(entry.pristine)
+        copy_seconds = time.process_time() - start
+
+        saved_seconds = entry.parse_seconds - copy_seconds if hit else 0.0
+        with self._lock:
+            self.copy_seconds += copy_seconds
+            if hit:
+                self.hits += 1
+                self.saved_seconds += saved_seconds
+
+        annotate(template_cache='hit' if hit else 'miss', parse_seconds_saved=round(saved_seconds, 4))
+        if hit:
+            logger.debug(
+                f"Plantilla en caché {os.path.basename(template_path)}: copia {copy_seconds:.4f}s, "
+                f"parseo evitado {entry.parse_seconds:.4f}s"
+            )
+        return working_copy
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+
+    def get_document(self, template_path):
+        """Copia de trabajo de un Document de Word."""
+        return self._get_or_parse(
+            'docx', template_path, _parse_document, clone_document,
+            lambda path, document: estimate_document_size(path),
+        )
+
+    def get_workbook(self, template_path):
+        """Copia de trabajo de un Workbook de Excel."""
+        return self._get_or_parse(
+            'xlsx', template_path,
+            lambda path: dump_workbook(_parse_workbook(path)),
+            load_workbook_copy,
+            lambda path, data: len(data),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'parse_seconds': round(self.parse_seconds, 4),
+                'copy_seconds': round(self.copy_seconds, 4),
+                'parse_seconds_saved': round(self.saved_seconds, 4),
+            }
+
+
+_template_cache = None
+_template_cache_lock = threading.Lock()
+
+
+def get_template_cache():
+    """Instancia de ParsedTemplateCache del proceso."""
+    global _template_cache
+    if _template_cache is None:
+        with _template_cache_lock:
+            if _template_cache is None:
+                _template_cache = ParsedTemplateCache(
+                    max_bytes=getattr(settings, 'TEMPLATE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+                )
+    return _template_cache
+
+
+def load_document(template_path):
+    """Equivalente a Document(template_path) usando la caché si está habilitada."""
+    if not getattr(settings, 'TEMPLATE_CACHE_ENABLED', True):
+        return _parse_document(template_path)
+    return get_template_cache().get_document(template_path)
+
+
+def load_template_workbook(template_path):
+    """Equivalente a load_workbook(template_path) usando la caché si está habilitada."""
+    if not getattr(settings, 'TEMPLATE_CACHE_ENABLED', True):
+        return _parse_workbook(template_path)
+    return get_template_cache().get_workbook(template_path)
+
+
+def get_template_cache_stats():
+    """Estadísticas de la caché de plantillas del proceso actual."""
+    return get_template_cache().stats()
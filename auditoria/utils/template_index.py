@@ -0,0 +1,275 @@
+"""
+Índice en memoria de los árboles de plantillas (financiera e interna).
+
+Sustituye los os.path.exists / os.listdir / os.walk que get_template_path
+ejecutaba en cada solicitud por búsquedas en diccionarios. Reproduce la misma
+resolución:
+
+1. Cada componente de la carpeta se busca de forma exacta y, si no existe,
+   por nombre normalizado (sin tildes, minúsculas) dentro de la carpeta padre.
+2. El archivo se busca de forma exacta en la carpeta resuelta y, si no existe,
+   en toda la subcarpeta por nombre normalizado o por nombre normalizado sin
+   extensión, devolviendo el primero en el orden de recorrido de os.walk.
+
+Los nombres normalizados ambiguos se registran al construir el índice en vez
+de resolverse en silencio. El índice se reconstruye cuando cambia la fecha de
+modificación de alguna carpeta (comprobación limitada a una vez cada
+TEMPLATE_INDEX_CHECK_INTERVAL segundos).
+"""
+
+import os
+import time
+import logging
+import threading
+import unicodedata
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """
+    Normaliza el texto removiendo tildes y caracteres especiales
+    """
+    # Normalizar Unicode y remover tildes
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+    # Convertir a minúsculas y remover espacios extras
+    return ' '.join(text.lower().split())
+
+
+def get_templates_base_path(is_internal=False):
+    """Carpeta base de plantillas según el tipo de auditoría."""
+    nombre = 'templates_base_interna' if is_internal else 'templates_base_financiera'
+    return os.path.join(settings.BASE_DIR, 'static', nombre)
+
+
+class _DirNode:
+    """Carpeta del índice con sus entradas directas y búsquedas recursivas."""
+
+    __slots__ = ('path', 'entries', 'subdirs', 'subdirs_normalized', 'by_name', 'by_base')
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = set()            # Nombres exactos (archivos y carpetas)
+        self.subdirs = {}               # nombre exacto -> _DirNode
+        self.subdirs_normalized = {}    # nombre normalizado -> primer _DirNode
+        self.by_name = {}               # nombre normalizado -> (orden, ruta), recursivo
+        self.by_base = {}               # nombre normalizado sin extensión -> (orden, ruta), recursivo
+
+
+class TemplateIndex:
+    """
+    Índice de un árbol de plantillas.
+
+    Args:
+        base_path: Carpeta raíz del árbol
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.root = None
+        self.collisions = []
+        self.ambiguous = []
+        self._dir_mtimes = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.build()
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    def build(self):
+        """Recorre el árbol una vez y construye todas las tablas de búsqueda."""
+        start = time.perf_counter()
+        nodes = {}
+        dir_mtimes = {}
+        file_paths = []
+        order = 0
+
+        for current, dirs, files in os.walk(self.base_path):
+            node = _DirNode(current)
+            nodes[current] = node
+            try:
+                dir_mtimes[current] = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            node.entries.update(dirs)
+            node.entries.update(files)
+
+            parent = nodes.get(os.path.dirname(current))
+            if parent is not None and current != self.base_path:
+                name = os.path.basename(current)
+                parent.subdirs[name] = node
+                parent.subdirs_normalized.setdefault(normalize_text(name), node)
+
+            for name in files:
+                file_paths.append((order, os.path.join(current, name)))
+                order += 1
+
+        root = nodes.get(self.base_path)
+        if root is None:
+            logger.error(f"No existe la carpeta de plantillas: {self.base_path}")
+            root = _DirNode(self.base_path)
+
+        # Cada archivo se registra en su carpeta y en todas las carpetas ancestro,
+        # conservando el primero según el orden de os.walk. Si otro archivo ya
+        # ocupaba la clave, la búsqueda recursiva desde esa carpeta es ambigua.
+        shadowed = {}
+        for order, path in file_paths:
+            name = normalize_text(os.path.basename(path))
+            base = os.path.splitext(name)[0]
+            directory = os.path.dirname(path)
+            while True:
+                node = nodes.get(directory)
+                if node is not None:
+                    for table, key in ((node.by_name, name), (node.by_base, base)):
+                        winner = table.setdefault(key, (order, path))
+                        if winner[1] != path:
+                            shadowed.setdefault(winner[1], set()).add(path)
+                if directory == self.base_path or directory == os.path.dirname(directory):
+                    break
+                directory = os.path.dirname(directory)
+
+        collisions = self._find_collisions(nodes, file_paths)
+        ambiguous = self._describe_shadowed(shadowed)
+
+        with self._lock:
+            self.root = root
+            self.collisions = collisions
+            self.ambiguous = ambiguous
+            self._dir_mtimes = dir_mtimes
+            self._last_check = time.monotonic()
+
+        for message in collisions:
+            logger.warning(f"Índice de plantillas ambiguo: {message}")
+        if ambiguous:
+            logger.info(
+                f"{len(ambiguous)} nombres de plantilla se resuelven al primer archivo en orden de "
+                f"recorrido cuando la búsqueda parte de una carpeta superior"
+            )
+            for message in ambiguous:
+                logger.debug(f"Índice de plantillas: {message}")
+        logger.info(
+            f"Índice de plantillas construido para {self.base_path}: {len(file_paths)} archivos, "
+            f"{len(nodes)} carpetas en {time.perf_counter() - start:.3f}s"
+        )
+
+    def _describe_shadowed(self, shadowed):
+        """Mensajes para los archivos que ocultan a otros en búsquedas recursivas."""
+        return [
+            f"{os.path.relpath(winner, self.base_path)} tiene prioridad sobre "
+            f"{sorted(os.path.relpath(path, self.base_path) for path in paths)}"
+            for winner, paths in shadowed.items()
+        ]
+
+    def _find_collisions(self, nodes, file_paths):
+        """
+        Detecta nombres que dejan de ser únicos al normalizarlos: carpetas
+        hermanas con el mismo nombre normalizado y archivos de una misma
+        carpeta con el mismo nombre normalizado o el mismo nombre sin extensión.
+        """
+        collisions = []
+        for node in nodes.values():
+            seen = {}
+            for name in sorted(node.subdirs):
+                seen.setdefault(normalize_text(name), []).append(name)
+            for names in seen.values():
+                if len(names) > 1:
+                    collisions.append(f"carpetas {names} en {node.path}")
+
+        by_folder = {}
+        for _, path in file_paths:
+            directory, name = os.path.split(path)
+            normalized = normalize_text(name)
+            by_folder.setdefault((directory, 'nombre', normalized), []).append(name)
+            by_folder.setdefault((directory, 'base', os.path.splitext(normalized)[0]), []).append(name)
+        for (directory, kind, _), names in by_folder.items():
+            if len(names) > 1:
+                collisions.append(f"archivos {names} (mismo {kind} normalizado) en {directory}")
+        return collisions
+
+    # ------------------------------------------------------------------
+    # Vigencia
+    # ------------------------------------------------------------------
+    def refresh_if_stale(self):
+        """Reconstruye el índice si cambió alguna carpeta desde la última construcción."""
+        interval = getattr(settings, 'TEMPLATE_INDEX_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        if now - self._last_check < interval:
+            return
+        self._last_check = now
+
+        for path, mtime in self._dir_mtimes.items():
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                logger.info(f"Cambios en {path}, reconstruyendo índice de plantillas")
+                self.build()
+                return
+
+    # ------------------------------------------------------------------
+    # Resolución
+    # ------------------------------------------------------------------
+    def resolve_folder(self, folder):
+        """Devuelve el nodo de la carpeta indicada (ruta relativa) o None."""
+        node = self.root
+        components = folder.replace('\\', '/').split('/')
+        for component in components:
+            if not component:
+                continue
+            child = node.subdirs.get(component)
+            if child is None:
+                child = node.subdirs_normalized.get(normalize_text(component))
+                if child is None:
+                    return None
+            node = child
+        return node
+
+    def resolve(self, folder, filename):
+        """
+        Ruta absoluta de la plantilla o None.
+        Misma resolución que la búsqueda con os.walk (ver docstring del módulo).
+        """
+        if not folder:
+            return None
+        self.refresh_if_stale()
+
+        node = self.resolve_folder(folder)
+        if node is None:
+            return None
+
+        if filename in node.entries:
+            return os.path.join(node.path, filename)
+
+        filename_normalized = normalize_text(filename)
+        by_name = node.by_name.get(filename_normalized)
+        by_base = node.by_base.get(os.path.splitext(filename_normalized)[0])
+        matches = [match for match in (by_name, by_base) if match is not None]
+        if not matches:
+            return None
+        return min(matches)[1]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_template_index(is_internal=False):
+    """Índice del árbol de plantillas del tipo de auditoría (se construye una vez por proceso)."""
+    index = _indexes.get(is_internal)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(is_internal)
+            if index is None:
+                index = TemplateIndex(get_templates_base_path(is_internal))
+                _indexes[is_internal] = index
+    return index
+
+
+def build_template_indexes():
+    """Construye los índices de ambos árboles (se llama al iniciar la aplicación)."""
+    get_template_index(is_internal=False)
+    get_template_index(is_internal=True)
@@ -0,0 +1,166 @@
+"""
+Escritura de archivos ZIP copiando miembros comprimidos sin recomprimirlos.
+
+zipfile solo permite escribir miembros a partir de su contenido descomprimido,
+por lo que copiar una parte sin cambios de una plantilla (imágenes, estilos,
+temas...) obliga a descomprimirla y volver a comprimirla. RawZipWriter escribe
+las cabeceras ZIP directamente y copia los bytes comprimidos tal cual.
+
+Solo se soporta el formato ZIP clásico (sin ZIP64 ni cifrado), suficiente
+para las plantillas Office del sistema.
+"""
+
+import struct
+import zlib
+import zipfile
+
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+_CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+_CENTRAL_HEADER_SIGNATURE = b'PK\x01\x02'
+_END_RECORD = struct.Struct('<4s4H2LH')
+_END_RECORD_SIGNATURE = b'PK\x05\x06'
+
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+_ZIP_VERSION = 20
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class RawMember:
+    """
+    Miembro comprimido listo para copiarse: metadatos del directorio central y
+    posición de los datos comprimidos dentro del ZIP de origen.
+    """
+
+    __slots__ = ('filename', 'compress_type', 'date_time', 'crc', 'compress_size',
+                 'file_size', 'data_offset', 'external_attr')
+
+    def __init__(self, filename, compress_type, date_time, crc, compress_size,
+                 file_size, data_offset, external_attr=0):
+        self.filename = filename
+        self.compress_type = compress_type
+        self.date_time = date_time
+        self.crc = crc
+        self.compress_size = compress_size
+        self.file_size = file_size
+        self.data_offset = data_offset
+        self.external_attr = external_attr
+
+
+def read_raw_members(fp):
+    """
+    Devuelve la lista de RawMember del ZIP abierto en `fp`, en el orden del archivo.
+
+    Raises:
+        zipfile.BadZipFile: Si el ZIP está cifrado o usa ZIP64
+    """
+    members = []
+    with zipfile.ZipFile(fp) as zf:
+        for info in zf.infolist():
+            if info.flag_bits & _FLAG_ENCRYPTED:
+                raise zipfile.BadZipFile(f"Miembro cifrado no soportado: {info.filename}")
+            if max(info.header_offset, info.compress_size, info.file_size) >= _ZIP32_LIMIT:
+                raise zipfile.BadZipFile(f"Miembro ZIP64 no soportado: {info.filename}")
+            fp.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(fp.read(_LOCAL_HEADER.size))
+            if header[0] != _LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile(f"Cabecera local inválida: {info.filename}")
+            name_length, extra_length = header[-2], header[-1]
+            data_offset = info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+            members.append(RawMember(
+                info.filename, info.compress_type, info.date_time, info.CRC,
+                info.compress_size, info.file_size, data_offset, info.external_attr,
+            ))
+    return members
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    dos_date = (max(year, 1980) - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | (second // 2)
+    return dos_date, dos_time
+
+
+class RawZipWriter:
+    """
+    Escritor ZIP secuencial sobre cualquier objeto con write() (no necesita seek).
+
+    Uso:
+        writer = RawZipWriter(output)
+        writer.copy_raw(src_fp, member)        # Copia sin recomprimir
+        writer.write('word/document.xml', data)  # Comprime con deflate
+        writer.close()                         # Escribe el directorio central
+    """
+
+    def __init__(self, fileobj):
+        self.fp = fileobj
+        try:
+            self._offset = fileobj.tell()
+        except (AttributeError, OSError):
+            self._offset = 0
+        self._central = []
+
+    def _write(self, data):
+        self.fp.write(data)
+        self._offset += len(data)
+
+    def _add_entry(self, filename, compress_type, date_time, crc, compress_size, file_size,
+                   external_attr=0):
+        if max(self._offset, compress_size, file_size) >= _ZIP32_LIMIT:
+            raise zipfile.LargeZipFile("RawZipWriter no soporta ZIP64")
+        try:
+            name = filename.encode('ascii')
+            flags = 0
+        except UnicodeEncodeError:
+            name = filename.encode('utf-8')
+            flags = _FLAG_UTF8
+        dos_date, dos_time = _dos_date_time(date_time)
+
+        self._central.append(_CENTRAL_HEADER.pack(
+            _CENTRAL_HEADER_SIGNATURE, _ZIP_VERSION, 0, _ZIP_VERSION, 0, flags, compress_type,
+            dos_time, dos_date, crc, compress_size, file_size, len(name), 0, 0, 0, 0,
+            external_attr, self._offset,
+        ) + name)
+        self._write(_LOCAL_HEADER.pack(
+            _LOCAL_HEADER_SIGNATURE, _ZIP_VERSION, 0, flags, compress_type, dos_time, dos_date,
+            crc, compress_size, file_size, len(name), 0,
+        ) + name)
+
+    def copy_raw(self, src_fp, member, data=None):
+        """
+        Copia un miembro comprimido de `src_fp` sin descomprimirlo.
+        Si ya se leyeron sus bytes comprimidos pueden pasarse en `data`.
+        """
+        if data is None:
+            src_fp.seek(member.data_offset)
+            data = src_fp.read(member.compress_size)
+        self._add_entry(
+            member.filename, member.compress_type, member.date_time, member.crc,
+            member.compress_size, member.file_size, member.external_attr,
+        )
+        self._write(data)
+
+    def write(self, filename, data, date_time=(1980, 1, 1, 0, 0, 0), compresslevel=6):
+        """Comprime `data` con deflate y lo escribe como `filename`."""
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self._add_entry(
+            filename, zipfile.ZIP_DEFLATED, date_time, zlib.crc32(data),
+            len(compressed), len(data),
+        )
+        self._write(compressed)
+
+    def close(self):
+        """Escribe el directorio central y el registro de fin de archivo."""
+        if len(self._central) > 0xFFFF:
+            raise zipfile.LargeZipFile("RawZipWriter no soporta ZIP64")
+        central_offset = self._offset
+        central = b''.join(self._central)
+        self._write(central)
+        self._write(_END_RECORD.pack(
+            _END_RECORD_SIGNATURE, 0, 0, len(self._central), len(self._central),
+            len(central), central_offset, 0,
+        ))
@@ -6,7 +6,10 @@ Importa todas las vistas desde los módulos especializados para mantener compati
 # Importar vistas de descarga de documentos
 from .download_views import (
     download_document,
-    download_document_by_pattern
+    download_document_by_pattern,
+    download_folder_zip,
+    render_job_status,
+    download_render_job
 )
 
 # Importar vistas de auditorías
@@ -14,7 +17,8 @@ from .audit_views import (
     auditorias_view,
     auditoria_financiera_view,
     auditoria_interna_view,
-    auditoria_detalle_view
+    auditoria_detalle_view,
+    estructura_carpetas_view
 )
 
 # Importar utilidades (disponibles para uso interno)
@@ -22,7 +26,9 @@ from .utils import (
     normalize_text,
     get_template_path,
     crear_mensaje_error,
-    generar_html_estructura
+    generar_html_estructura,
+    cargar_estructura_carpetas,
+    listar_archivos_estructura
 )
 
 # Exportar todas las vistas para compatibilidad hacia atrás
@@ -30,16 +36,22 @@ __all__ = [
     # Vistas de descarga
     'download_document',
     'download_document_by_pattern',
+    'download_folder_zip',
+    'render_job_status',
+    'download_render_job',
     
     # Vistas de auditorías
     'auditorias_view',
     'auditoria_financiera_view',
     'auditoria_interna_view',
     'auditoria_detalle_view',
+    'estructura_carpetas_view',
     
     # Utilidades
     'normalize_text',
     'get_template_path',
     'crear_mensaje_error',
-    'generar_html_estructura'
+    'generar_html_estructura',
+    'cargar_estructura_carpetas',
+    'listar_archivos_estructura'
 ]
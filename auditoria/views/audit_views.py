@@ -3,13 +3,22 @@ Vistas para gestión de auditorías.
 Contiene funciones para listar auditorías financieras, internas y mostrar detalles.
 """
 
-import os
-import json
+import re
+
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
 from .config import (
-    render, redirect, HttpResponse, mark_safe, settings,
+    render, redirect, HttpResponse, JsonResponse, mark_safe, settings,
     Audit, login_required
 )
-from .utils import crear_mensaje_error, generar_html_estructura
+from .utils import (
+    crear_mensaje_error, generar_html_estructura,
+    cargar_estructura_carpetas, usuario_verificado,
+    obtener_auditoria_accesible, obtener_arbol_json
+)
+
+_ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
 
 @login_required
 def auditorias_view(request):
@@ -75,25 +84,50 @@ def auditoria_detalle_view(request, audit_id):
         return HttpResponse(mark_safe(mensaje_error), status=404)
     
     # Leer la estructura desde el archivo JSON correspondiente al tipo de auditoría
-    if audit.tipoAuditoria == 'I':
-        json_path = os.path.join(settings.BASE_DIR, 'auditoria', 'config', 'folder_structure_interna.json')
-    else:
-        json_path = os.path.join(settings.BASE_DIR, 'auditoria', 'config', 'folder_structure_financiera.json')
-    
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            estructura_carpetas = json.load(f)
-    except Exception:
-        estructura_carpetas = {}  # Estructura vacía en caso de error
+    estructura_carpetas = cargar_estructura_carpetas(is_internal=audit.tipoAuditoria == 'I')
     
     # Usuario verificado si es administrador o tiene plan Mensual o Anual
-    user_verified = request.user.username == 'administrador' or (hasattr(request.user, 'plan') and request.user.plan in ['M', 'A'])
+    user_verified = usuario_verificado(request.user)
     
-    # Generar HTML de la estructura con la información de verificación
-    estructura_html = generar_html_estructura(estructura_carpetas, audit_id, user_verified=user_verified)
+    # Solo el primer nivel; el navegador abre las subcarpetas con el árbol JSON
+    estructura_html = generar_html_estructura(
+        estructura_carpetas, audit_id, user_verified=user_verified, profundidad=1
+    )
 
     return render(request, 'auditoria/auditoria-detalle/auditoria_detalle.html', {
         'audit': audit,
         'estructura_html': mark_safe(estructura_html),  # Para que Django no escape el HTML
         'user_verified': user_verified,  # Pasar esta variable a la plantilla para debug
+        'async_render': settings.RENDER_JOBS_ENABLED,  # Generación de Excel en segundo plano
+        'tree_url': reverse('estructura_carpetas', args=[audit.id]),
     })
+
+@login_required
+def estructura_carpetas_view(request, audit_id):
+    """
+    Árbol de carpetas de la auditoría en JSON, para expandir las carpetas en
+    el navegador. Se sirve desde memoria, comprimido con gzip si el cliente lo
+    acepta, y con ETag para que las visitas repetidas reciban un 304.
+    """
+    audit = obtener_auditoria_accesible(request.user, audit_id)
+    if audit is None:
+        return JsonResponse({'error': 'Auditoría no encontrada'}, status=404)
+
+    body, body_gzip, etag = obtener_arbol_json(
+        is_internal=audit.tipoAuditoria == 'I',
+        user_verified=usuario_verificado(request.user),
+    )
+    use_gzip = bool(_ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    if use_gzip:
+        # Cada codificación es una representación distinta
+        etag = f'{etag[:-1]}-gzip"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body_gzip if use_gzip else body, content_type='application/json')
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -1,22 +1,134 @@
 """
 Vistas para descarga de documentos de auditoría.
-Contiene funciones para descargar documentos por carpeta/archivo y por patrón.
+Contiene funciones para descargar documentos por carpeta/archivo, por patrón y carpetas completas en ZIP.
 """
 
 import os
 import urllib.parse
 import logging
+from django.conf import settings
+from django.urls import reverse
 from .config import (
-    get_object_or_404, HttpResponse, FileResponse, mark_safe,
-    Audit, login_required, io,
-    modify_document_word, modify_document_excel, modify_document_excel_with_macros,
+    get_object_or_404, HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse,
+    mark_safe, Audit, login_required,
     get_file_info_from_pattern
 )
-from .utils import get_template_path, crear_mensaje_error
-from auditoria.services.audit_mark_processor import AuditMarkProcessor
+from .utils import (
+    get_template_path, crear_mensaje_error, listar_documentos_zip, obtener_auditoria_accesible
+)
+from auditoria.services.archive_renderer import AuditArchiveRenderer
+from auditoria.services.document_renderer import (
+    render_document, render_macro_workbook, discard_processed_file, get_render_content_type
+)
+from auditoria.services.render_cache import (
+    build_render_key, get_cached_render, render_to_file
+)
+from auditoria.services.render_jobs import (
+    is_async_render_candidate, is_async_render_enabled, enqueue_render_job, fail_unclaimed_jobs
+)
+from auditoria.models import RenderJob
+from auditoria.utils.render_timing import log_render_timing, render_timing, span
 
 logger = logging.getLogger(__name__)
 
+
+def build_document_response(template_path, filename, audit):
+    """
+    Genera (o recupera de la caché en disco) el documento de la auditoría
+    y devuelve la respuesta de descarga.
+
+    El documento nunca se mantiene completo en memoria: se escribe directamente
+    en un archivo (la entrada de la caché o un SpooledTemporaryFile) y la
+    respuesta se sirve desde ese descriptor, lo que permite a gunicorn usar
+    sendfile cuando está disponible.
+
+    Con RENDER_TIMING_ENABLED los tiempos de cada etapa se registran en una
+    línea de log; con RENDER_TIMING_HEADER_ENABLED se envían además al cliente
+    en la cabecera Server-Timing.
+    """
+    download_name = os.path.basename(template_path)
+    content_type = get_render_content_type(filename)
+    if content_type is None:
+        # Tipo no procesado, se devuelve el archivo tal cual
+        return FileResponse(
+            open(template_path, 'rb'),
+            as_attachment=True,
+            filename=download_name
+        )
+
+    with render_timing(template=download_name, audit_id=audit.id) as timing:
+        if os.path.splitext(filename)[1].lower() == '.xlsm':
+            # Los libros con macros no pasan por la caché de documentos
+            output = render_macro_output(template_path, filename, audit)
+            cache_state = 'bypass'
+        else:
+            with span('cache'):
+                cache_key = build_render_key(template_path, filename, audit)
+                output = open_cached_render(cache_key, filename)
+            cache_state = 'miss' if output is None else 'hit'
+            if output is None:
+                output = render_to_file(
+                    cache_key,
+                    lambda f: render_document(template_path, filename, audit, f)
+                )
+
+    response = FileResponse(output, as_attachment=True, filename=download_name)
+    response['Content-Type'] = content_type
+    if timing is not None:
+        timing.annotate(cache=cache_state, bytes=_output_size(output))
+        if settings.RENDER_TIMING_HEADER_ENABLED:
+            response['Server-Timing'] = timing.server_timing()
+        log_render_timing(timing)
+    return response
+
+def _output_size(output):
+    """Tamaño del documento servido desde `output`, sin mover su posición."""
+    try:
+        return os.fstat(output.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        position = output.tell()
+        size = output.seek(0, os.SEEK_END)
+        output.seek(position)
+        return size
+
+def open_cached_render(cache_key, filename):
+    """Abre el documento cacheado o devuelve None si no está disponible."""
+    cached_path = get_cached_render(cache_key)
+    if not cached_path:
+        return None
+    try:
+        return open(cached_path, 'rb')
+    except OSError:
+        # La entrada pudo ser desalojada entre la consulta y la apertura
+        logger.info(f"Entrada de caché no disponible para {filename}, regenerando")
+        return None
+
+def render_macro_output(template_path, filename, audit):
+    """
+    Genera un libro con macros y devuelve el archivo abierto desde el que se
+    sirve. El procesamiento de macros ya deja el resultado en su propio almacén
+    en disco; el descriptor sigue siendo válido aunque se desaloje después.
+    """
+    processed_file_path = render_macro_workbook(template_path, filename, audit)
+    try:
+        return open(processed_file_path, 'rb')
+    finally:
+        discard_processed_file(processed_file_path, template_path)
+
+def render_job_payload(job):
+    """Estado de un trabajo de generación en formato JSON para el navegador."""
+    payload = {
+        'job_id': job.id,
+        'status': job.status,
+        'filename': job.filename,
+        'status_url': reverse('render_job_status', args=[job.id]),
+    }
+    if job.status == RenderJob.STATUS_DONE:
+        payload['download_url'] = reverse('download_render_job', args=[job.id])
+    elif job.status == RenderJob.STATUS_FAILED:
+        payload['error'] = job.error
+    return payload
+
 @login_required
 def download_document(request, audit_id, folder, filename):
     """Vista para descargar un documento específico"""
@@ -31,59 +143,14 @@ def download_document(request, audit_id, folder, filename):
     template_path = get_template_path(folder, filename, is_internal=is_internal)
     if not template_path or not os.path.exists(template_path):
         return HttpResponse(f'Plantilla no encontrada: {folder}/{filename}', status=404)
-    try:
-        buffer = io.BytesIO()
-        if filename.lower().endswith('.docx'):
-            # Aplicar reemplazos estándar
-            doc = modify_document_word(template_path, audit)
-
-            # Aplicar marcas de auditoría (NUEVO)
-            try:
-                processor = AuditMarkProcessor(audit_id, filename)
-                doc = processor.process_word_document(doc)
-            except Exception as e:
-                logger.warning(f"No se pudieron agregar marcas de auditoría para {filename}: {e}")
-                # Continuar con la descarga incluso si las marcas fallan
-
-            doc.save(buffer)
-            content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        elif filename.lower().endswith('.xlsx'):
-            # Aplicar reemplazos estándar
-            wb = modify_document_excel(template_path, audit)
-
-            # Aplicar marcas de auditoría (NUEVO)
-            try:
-                processor = AuditMarkProcessor(audit_id, filename)
-                wb = processor.process_excel_document(wb)
-            except Exception as e:
-                logger.warning(f"No se pudieron agregar marcas de auditoría para {filename}: {e}")
-                # Continuar con la descarga incluso si las marcas fallan
-
-            wb.save(buffer)
-            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        elif filename.lower().endswith('.xlsm'):
-            # modify_document_excel_with_macros devuelve una ruta de archivo, no un objeto workbook
-            processed_file_path = modify_document_excel_with_macros(template_path, audit)
-            # Leer el contenido del archivo procesado en el buffer
-            # NOTA: Los archivos XLSM NO obtienen marcas de auditoría (demasiado riesgoso para macros)
-            logger.info(f"Archivo XLSM: {filename} - Omitiendo procesamiento de marcas de auditoría")
-            with open(processed_file_path, 'rb') as f:
-                buffer.write(f.read())
-            buffer.seek(0)
-            content_type = 'application/vnd.ms-excel.sheet.macroEnabled.12'
-        else:
-            # Tipo no procesado, se devuelve el archivo tal cual
-            return FileResponse(
-                open(template_path, 'rb'),
-                as_attachment=True,
-                filename=os.path.basename(template_path)
-            )
 
-        buffer.seek(0)
-        response = FileResponse(buffer, as_attachment=True, filename=os.path.basename(template_path))
-        response['Content-Type'] = content_type
+    # Modo asíncrono (opt-in): se encola la generación y el navegador consulta el estado
+    if request.GET.get('async') == '1' and is_async_render_candidate(filename):
+        job = enqueue_render_job(audit, folder, filename, request.user)
+        return JsonResponse(render_job_payload(job), status=202)
 
-        return response
+    try:
+        return build_document_response(template_path, filename, audit)
 
     except Exception as e:
         return HttpResponse(f'Error al descargar documento: {str(e)}', status=500)
@@ -161,48 +228,7 @@ def download_document_by_pattern(request, audit_id, pattern):
         
         # Procesar y devolver el documento
         try:
-            buffer = io.BytesIO()
-            if filename.lower().endswith('.docx'):
-                # Aplicar reemplazos estándar
-                doc = modify_document_word(template_path, audit)
-
-                # Aplicar marcas de auditoría (NUEVO)
-                try:
-                    processor = AuditMarkProcessor(audit_id, filename)
-                    doc = processor.process_word_document(doc)
-                except Exception as e:
-                    logger.warning(f"No se pudieron agregar marcas de auditoría para {filename}: {e}")
-                    # Continuar con la descarga incluso si las marcas fallan
-
-                doc.save(buffer)
-                content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            elif filename.lower().endswith('.xlsx'):
-                # Aplicar reemplazos estándar
-                wb = modify_document_excel(template_path, audit)
-
-                # Aplicar marcas de auditoría (NUEVO)
-                try:
-                    processor = AuditMarkProcessor(audit_id, filename)
-                    wb = processor.process_excel_document(wb)
-                except Exception as e:
-                    logger.warning(f"No se pudieron agregar marcas de auditoría para {filename}: {e}")
-                    # Continuar con la descarga incluso si las marcas fallan
-
-                wb.save(buffer)
-                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            else:
-                # Tipo no procesado, se devuelve el archivo tal cual
-                return FileResponse(
-                    open(template_path, 'rb'),
-                    as_attachment=True,
-                    filename=os.path.basename(template_path)
-                )
-
-            buffer.seek(0)
-            response = FileResponse(buffer, as_attachment=True, filename=os.path.basename(template_path))
-            response['Content-Type'] = content_type
-
-            return response
+            return build_document_response(template_path, filename, audit)
 
         except Exception as e:
             mensaje_error = crear_mensaje_error(
@@ -217,3 +243,86 @@ def download_document_by_pattern(request, audit_id, pattern):
             f"Ocurrió un error al procesar su solicitud: {str(e)}"
         )
         return HttpResponse(mark_safe(mensaje_error), status=500)
+
+@login_required
+def download_folder_zip(request, audit_id, folder=''):
+    """
+    Vista para descargar en un ZIP todos los documentos de una carpeta de la
+    estructura (o de la auditoría completa si no se indica carpeta).
+    Los documentos se generan en paralelo y el ZIP se envía a medida que
+    se van completando.
+
+    Por encima de ARCHIVE_MAX_SYNC_ENTRIES documentos el ZIP no cabe en el
+    tiempo de una solicitud: con la cola de generación habilitada se encola
+    (?async=1) y, si no, se rechaza.
+    """
+    folder = urllib.parse.unquote(folder).strip('/')
+    audit = obtener_auditoria_accesible(request.user, audit_id)
+    if audit is None:
+        mensaje_error = crear_mensaje_error(
+            "Auditoría no encontrada",
+            "La auditoría solicitada no existe o no tienes permisos para acceder a ella."
+        )
+        return HttpResponse(mark_safe(mensaje_error), status=404)
+
+    entries = listar_documentos_zip(audit, folder, request.user)
+    if entries is None:
+        mensaje_error = crear_mensaje_error(
+            "Carpeta no encontrada",
+            f"No existe la carpeta: <strong>{folder}</strong>"
+        )
+        return HttpResponse(mark_safe(mensaje_error), status=404)
+
+    if not entries:
+        mensaje_error = crear_mensaje_error(
+            "Sin documentos disponibles",
+            "No hay documentos disponibles para descargar en esta carpeta."
+        )
+        return HttpResponse(mark_safe(mensaje_error), status=404)
+
+    zip_name = f"{(os.path.basename(folder) or audit.title or 'auditoria')[:200]}.zip"
+    to_render = sum(1 for _, _, filename in entries if get_render_content_type(filename))
+    if to_render > settings.ARCHIVE_MAX_SYNC_ENTRIES:
+        if request.GET.get('async') == '1' and is_async_render_enabled():
+            job = enqueue_render_job(audit, folder, zip_name, request.user)
+            return JsonResponse(render_job_payload(job), status=202)
+        mensaje_error = crear_mensaje_error(
+            "Demasiados documentos",
+            f"La carpeta tiene {to_render} documentos y el máximo para descargar en un ZIP es "
+            f"{settings.ARCHIVE_MAX_SYNC_ENTRIES}. Descargue las subcarpetas por separado."
+        )
+        return HttpResponse(mark_safe(mensaje_error), status=413)
+
+    renderer = AuditArchiveRenderer(audit, entries)
+    response = StreamingHttpResponse(renderer.stream(), content_type='application/zip')
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{urllib.parse.quote(zip_name)}"
+    return response
+
+@login_required
+def render_job_status(request, job_id):
+    """Estado de un trabajo de generación en segundo plano (consultado por el navegador)."""
+    fail_unclaimed_jobs()
+    job = get_object_or_404(RenderJob, id=job_id, requested_by=request.user)
+    return JsonResponse(render_job_payload(job))
+
+@login_required
+def download_render_job(request, job_id):
+    """Descarga el documento generado por un trabajo en segundo plano."""
+    job = get_object_or_404(RenderJob, id=job_id, requested_by=request.user)
+    if job.status != RenderJob.STATUS_DONE:
+        return JsonResponse(render_job_payload(job), status=409)
+
+    try:
+        response = FileResponse(
+            open(job.result_path, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.result_path)
+        )
+    except OSError:
+        mensaje_error = crear_mensaje_error(
+            "Documento no disponible",
+            "El documento generado ya no está disponible. Vuelva a solicitar la descarga."
+        )
+        return HttpResponse(mark_safe(mensaje_error), status=410)
+    response['Content-Type'] = get_render_content_type(job.filename) or response['Content-Type']
+    return response
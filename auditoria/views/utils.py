@@ -4,71 +4,31 @@ Contiene funciones de normalización, rutas, mensajes de error y generación de
 """
 
 import os
+import gzip
+import json
+import hashlib
+import logging
 import urllib.parse
-import unicodedata
-from django.conf import settings
+from audits.models import Audit
+from auditoria.utils.template_index import normalize_text, get_template_index
+from auditoria.utils.config_store import get_config_store
 
-def normalize_text(text):
-    """
-    Normaliza el texto removiendo tildes y caracteres especiales
-    """
-    # Normalizar Unicode y remover tildes
-    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
-    # Convertir a minúsculas y remover espacios extras
-    return ' '.join(text.lower().split())
+logger = logging.getLogger(__name__)
+
+# Carpetas cuyos archivos están disponibles aunque el usuario no esté verificado
+CARPETAS_LIBRES = (
+    "1 CAJA Y BANCOS",
+    "3 INVERSIONES",
+    "2 AUDITORIA PROCESOS CONTABILIDAD",
+)
 
 def get_template_path(folder, filename, is_internal=False):
     """
-    Obtiene la ruta completa de una plantilla
+    Obtiene la ruta completa de una plantilla.
+    La búsqueda se resuelve con el índice en memoria del árbol de plantillas
+    (ver auditoria.utils.template_index).
     """
-    # Determinar qué carpeta base usar según el tipo de auditoría
-    if is_internal:
-        base_path = os.path.join(settings.BASE_DIR, 'static', 'templates_base_interna')
-    else:
-        base_path = os.path.join(settings.BASE_DIR, 'static', 'templates_base_financiera')
-        
-    if folder:
-        # Normalizar la ruta usando os.path
-        folder = folder.replace('/', os.path.sep).replace('\\', os.path.sep)
-        current_path = base_path
-        # Dividir la ruta usando el separador correcto del sistema
-        folder_components = folder.split(os.path.sep)
-        # Navegar por cada componente de la carpeta
-        for component in folder_components:
-            if component:
-                current_path = os.path.join(current_path, component)
-                if not os.path.exists(current_path):
-                    # Buscar de forma case-insensitive y sin tildes
-                    parent_dir = os.path.dirname(current_path)
-                    if os.path.exists(parent_dir):
-                        found = False
-                        component_normalized = normalize_text(component)
-                        for item in os.listdir(parent_dir):
-                            if normalize_text(item) == component_normalized:
-                                current_path = os.path.join(parent_dir, item)
-                                found = True
-                                break
-                        if not found:
-                            return None
-        if os.path.exists(current_path):
-            # Primero intentar encontrar una coincidencia exacta
-            exact_path = os.path.join(current_path, filename)
-            if os.path.exists(exact_path):
-                return exact_path
-            # Si no hay coincidencia exacta, buscar de forma más flexible
-            filename_normalized = normalize_text(filename)
-            # Buscar recursivamente en la carpeta actual y subcarpetas
-            for root, dirs, files in os.walk(current_path):
-                for file in files:
-                    # Comparar nombres normalizados (sin tildes y case insensitive)
-                    if normalize_text(file) == filename_normalized:
-                        return os.path.join(root, file)        
-                    # Si aún no hay coincidencia, intentar comparar sin extensión
-                    filename_base = os.path.splitext(filename_normalized)[0]
-                    file_base = os.path.splitext(normalize_text(file))[0]
-                    if file_base == filename_base:
-                        return os.path.join(root, file)
-    return None
+    return get_template_index(is_internal).resolve(folder, filename)
 
 def crear_mensaje_error(titulo, mensaje):
     """
@@ -114,9 +74,21 @@ def crear_mensaje_error(titulo, mensaje):
     </html>
     """
 
-def generar_html_estructura(estructura, audit_id, current_path='', user_verified=False):
+def icono_archivo(nombre):
+    """Devuelve (icono, alt) del archivo según su extensión."""
+    if nombre.lower().endswith('.docx'):
+        return '/static/icons/microsoft-word-2013-logo.svg', '📝'
+    if nombre.lower().endswith(('.xlsx', '.xlsm')):
+        return '/static/icons/microsoft-excel-2013.svg', '📊'
+    return '📄', '📄'
+
+def generar_html_estructura(estructura, audit_id, current_path='', user_verified=False, profundidad=None):
     """
     Genera HTML recursivo para la estructura de carpetas.
+
+    Con `profundidad` solo se generan ese número de niveles; el contenido de
+    las carpetas más profundas queda vacío, con su ruta en data-folder-path,
+    y el navegador lo construye al abrirlas a partir de obtener_arbol_json.
     """ 
     if not estructura:
         return ""
@@ -130,26 +102,25 @@ def generar_html_estructura(estructura, audit_id, current_path='', user_verified
             # Generar un ID único y seguro para la carpeta
             escaped_path = new_path.replace('\\', '_')
             folder_id = f"folder_{urllib.parse.quote(escaped_path)}"
+            if profundidad is not None and profundidad <= 1:
+                contenido_html = ""
+                atributos = f' data-folder-path="{urllib.parse.quote(url_path)}"'
+            else:
+                siguiente = profundidad - 1 if profundidad is not None else None
+                contenido_html = generar_html_estructura(contenido, audit_id, new_path, user_verified, siguiente)
+                atributos = ""
             html += f"""
             <li class="folder-item">
                 <button class="folder-button" onclick="toggleFolder('{folder_id}')">
                     <img src="/static/icons/carpeta.svg" class="icon-img" alt="📂"/> {nombre}
                 </button>
-                <div id="{folder_id}" style="display: none;">
-                    {generar_html_estructura(contenido, audit_id, new_path, user_verified)}
+                <div id="{folder_id}"{atributos} style="display: none;">
+                    {contenido_html}
                 </div>
             </li>
             """
         elif isinstance(contenido, list):  # Es un archivo
-            if nombre.lower().endswith('.docx'):
-                icono = '/static/icons/microsoft-word-2013-logo.svg'
-                alt = '📝'
-            elif nombre.lower().endswith(('.xlsx', '.xlsm')):
-                icono = '/static/icons/microsoft-excel-2013.svg'
-                alt = '📊'
-            else:
-                icono = '📄'
-                alt = '📄'
+            icono, alt = icono_archivo(nombre)
                 
             # Codificar la ruta y el nombre del archivo para la URL
             folder_encoded = urllib.parse.quote(current_path.replace('\\', '/')) if current_path else ''
@@ -157,10 +128,7 @@ def generar_html_estructura(estructura, audit_id, current_path='', user_verified
             download_url = f"/auditoria/download/{audit_id}/{folder_encoded}/{filename_encoded}"
             
             # aunque el usuario no esté verificado
-            is_investment_folder = (current_path and 
-                                     ("1 CAJA Y BANCOS" in current_path or 
-                                      "3 INVERSIONES" in current_path or
-                                      "2 AUDITORIA PROCESOS CONTABILIDAD" in current_path))
+            is_investment_folder = carpeta_desbloqueada(current_path)
             
             # Mostrar con enlace si el usuario está verificado o si el archivo está en 3 INVERSIONES
             if user_verified or is_investment_folder:
@@ -183,3 +151,119 @@ def generar_html_estructura(estructura, audit_id, current_path='', user_verified
                 </li>"""
     html += "</ul>"
     return html
+
+def construir_arbol_carpetas(estructura, user_verified=False, current_path=''):
+    """
+    Árbol de carpetas serializable a JSON, independiente de la auditoría:
+    carpetas {'name', 'children'} y archivos {'name', 'locked'}.
+    """
+    nodos = []
+    for nombre, contenido in estructura.items():
+        if isinstance(contenido, dict):
+            new_path = os.path.join(current_path, nombre) if current_path else nombre
+            nodos.append({'name': nombre, 'children': construir_arbol_carpetas(contenido, user_verified, new_path)})
+        elif isinstance(contenido, list):
+            locked = not (user_verified or carpeta_desbloqueada(current_path))
+            nodos.append({'name': nombre, 'locked': locked})
+    return nodos
+
+# (tipo de auditoría, usuario verificado) -> (estructura, JSON, JSON gzip, etag)
+_arboles_json = {}
+
+def obtener_arbol_json(is_internal=False, user_verified=False):
+    """
+    Devuelve (JSON, JSON comprimido con gzip, etag) del árbol de carpetas.
+    Se genera una vez por tipo de auditoría y verificación del usuario, y se
+    regenera cuando se recarga el archivo de estructura.
+    """
+    estructura = cargar_estructura_carpetas(is_internal)
+    clave = (bool(is_internal), bool(user_verified))
+    cached = _arboles_json.get(clave)
+    if cached is None or cached[0] is not estructura:
+        body = json.dumps(
+            {'tree': construir_arbol_carpetas(estructura, user_verified)},
+            ensure_ascii=False, separators=(',', ':'),
+        ).encode('utf-8')
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        cached = (estructura, body, gzip.compress(body, compresslevel=6), etag)
+        _arboles_json[clave] = cached
+    return cached[1:]
+
+def carpeta_desbloqueada(current_path):
+    """Indica si los archivos de la carpeta se pueden descargar sin verificación."""
+    return bool(current_path) and any(carpeta in current_path for carpeta in CARPETAS_LIBRES)
+
+def usuario_verificado(user):
+    """Usuario verificado si es administrador o tiene plan Mensual o Anual."""
+    return user.username == 'administrador' or (hasattr(user, 'plan') and user.plan in ['M', 'A'])
+
+def obtener_auditoria_accesible(user, audit_id):
+    """
+    Devuelve la auditoría si el usuario tiene acceso a ella, o None.
+    Los administradores solo acceden a las auditorías que crearon y los
+    auditores a las que les fueron asignadas.
+    """
+    queryset = Audit.objects.select_related('audit_manager')
+    try:
+        if user.role.name == "audit_manager":
+            return queryset.get(id=audit_id, audit_manager=user)
+        return queryset.get(id=audit_id, assigned_users=user)
+    except Audit.DoesNotExist:
+        return None
+
+def cargar_estructura_carpetas(is_internal=False):
+    """
+    Devuelve la estructura de carpetas del tipo de auditoría, cargada una
+    sola vez por proceso (compartida: no modificar).
+    Lanza ImproperlyConfigured si el archivo JSON no es válido.
+    """
+    return get_config_store().get_folder_structure(is_internal)
+
+def obtener_subestructura(estructura, folder):
+    """
+    Devuelve la parte de la estructura correspondiente a `folder`
+    (ruta separada por '/'), o None si no existe.
+    """
+    actual = estructura
+    for parte in [p for p in folder.replace('\\', '/').split('/') if p]:
+        if not isinstance(actual, dict) or not isinstance(actual.get(parte), dict):
+            return None
+        actual = actual[parte]
+    return actual
+
+def listar_documentos_zip(audit, folder, user):
+    """
+    Documentos de `folder` (o de toda la auditoría si está vacío) que el usuario
+    puede descargar, como tuplas (arcname, template_path, filename) para
+    AuditArchiveRenderer. Devuelve None si la carpeta no existe.
+    """
+    is_internal = audit.tipoAuditoria == 'I'
+    estructura = obtener_subestructura(cargar_estructura_carpetas(is_internal), folder)
+    if estructura is None:
+        return None
+
+    # Respetar el bloqueo de archivos de la vista de detalle
+    user_verified = usuario_verificado(user)
+    entries = []
+    for file_folder, filename in listar_archivos_estructura(estructura, folder):
+        if not (user_verified or carpeta_desbloqueada(file_folder)):
+            continue
+        template_path = get_template_path(file_folder, filename, is_internal=is_internal)
+        if not template_path or not os.path.exists(template_path):
+            logger.warning(f"Plantilla no encontrada para el ZIP: {file_folder}/{filename}")
+            continue
+        arcname = f"{file_folder}/{filename}" if file_folder else filename
+        entries.append((arcname, template_path, filename))
+    return entries
+
+def listar_archivos_estructura(estructura, current_path=''):
+    """
+    Recorre la estructura de carpetas y genera tuplas (carpeta, archivo)
+    en el mismo orden en que se muestran en la vista de detalle.
+    """
+    for nombre, contenido in estructura.items():
+        if isinstance(contenido, dict):
+            new_path = f"{current_path}/{nombre}" if current_path else nombre
+            yield from listar_archivos_estructura(contenido, new_path)
+        elif isinstance(contenido, list):
+            yield current_path, nombre
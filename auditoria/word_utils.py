@@ -1,18 +1,22 @@
-from docx import Document
-from .processors.word import process_standard_text, process_tables
+from .processors.word import DocumentWalker, TextReplacementHandler, TableReplacementHandler, get_hyperlink_handler
+from .processors.shared.text_replacer import get_compiled_replacer
 from .utils.replacements_utils import (
     get_replacements_config,
     get_tables_config,
     build_replacements_dict
 )
+from .utils.template_cache import load_document
+from .utils.config_store import get_config_store
+from .services.placeholder_manifest import get_document_manifest
 import os
+import logging
 
-def modify_document_word(template_path, audit):
+logger = logging.getLogger(__name__)
+
+def format_audit_dates(audit):
     """
-    Modifica el documento Word con los datos de la auditoría
+    Devuelve (fecha_inicio, fecha_fin) de la auditoría en el formato de los documentos Word
     """
-    doc = Document(template_path)
-
     # Formatear las fechas usando los nombres correctos de los campos
     fecha_inicio = audit.fechaInit.strftime('%d de %B de %Y') if audit.fechaInit else '01 de Enero de 2024'
     fecha_fin = audit.fechaEnd.strftime('%d de %B de %Y') if audit.fechaEnd else '31 de Diciembre de 2024'
@@ -36,18 +40,64 @@ def modify_document_word(template_path, audit):
     if len(fecha_fin_parts) >= 4:
         fecha_fin = f"{fecha_fin_parts[0].zfill(2)} de {fecha_fin_parts[2].capitalize()} de {fecha_fin_parts[4]}"
 
+    return fecha_inicio, fecha_fin
+
+def build_word_replacements(audit):
+    """
+    Construye los reemplazos de los documentos Word de la auditoría
+    """
+    fecha_inicio, fecha_fin = format_audit_dates(audit)
+    return build_replacements_dict(get_replacements_config(), audit, fecha_inicio, fecha_fin)
+
+def apply_word_replacements(doc, template_path, replacements, replacements_config, tables_config, audit_id=None,
+                            manifest=None):
+    """
+    Aplica los reemplazos de texto y tablas (e hipervínculos si hay audit_id) sobre el documento.
+    Con un PlaceholderManifest solo se procesan los párrafos y tablas que contienen placeholders.
+    """
+    replacements = get_compiled_replacer(replacements)
+    paragraph_indices = manifest.paragraphs if manifest is not None else None
+    table_indices = manifest.tables if manifest is not None else None
+
+    # Patrones regex precompilados; solo aplican si la configuración es la del almacén
+    store = get_config_store()
+    text_rules = store.get_replacement_regex_rules() if replacements_config is store.get_replacements_config() else None
+    table_rules = store.get_table_regex_rules() if tables_config is store.get_tables_config() else None
+
+    # Texto, tablas e hipervínculos en un solo recorrido del documento
+    document_name = os.path.basename(template_path)
+    handlers = [
+        TextReplacementHandler(
+            replacements,
+            text_rules if text_rules is not None else replacements_config.get("patrones_regex", []),
+            paragraph_indices,
+        ),
+        TableReplacementHandler(replacements, tables_config, document_name, table_indices, table_rules),
+    ]
+    hyperlinks = get_hyperlink_handler(audit_id, document_name, template_path)
+    if hyperlinks is not None:
+        handlers.append(hyperlinks)
+
+    counts = DocumentWalker(handlers).walk(doc)
+    logger.debug(f"Reemplazos Word en {document_name}: {counts}")
+    return doc
+
+def modify_document_word(template_path, audit):
+    """
+    Modifica el documento Word con los datos de la auditoría
+    """
+    # Copia de trabajo de la plantilla (parseada una sola vez por proceso)
+    doc = load_document(template_path)
+    manifest = get_document_manifest(template_path, doc)
+
     # Cargar configuraciones
     replacements_config = get_replacements_config()
     tables_config = get_tables_config()
 
     # Construir reemplazos
+    fecha_inicio, fecha_fin = format_audit_dates(audit)
     replacements = build_replacements_dict(replacements_config, audit, fecha_inicio, fecha_fin)
 
-    # Procesar texto y tablas
-    process_standard_text(doc, replacements, replacements_config)
-
-    # Extraer el nombre del documento para los hipervínculos
-    document_name = os.path.basename(template_path)
-    process_tables(doc, replacements, tables_config, document_name, template_path, audit.id)
-    
-    return doc
+    return apply_word_replacements(
+        doc, template_path, replacements, replacements_config, tables_config, audit.id, manifest=manifest
+    )
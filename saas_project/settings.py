@@ -3,6 +3,7 @@
 from pathlib import Path
 import os
 import locale
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -140,6 +141,56 @@ USE_TZ = False
 
 STATIC_URL = "static/"
 BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+
+# Caché en disco de documentos de auditoría generados
+RENDER_CACHE_ENABLED = os.environ.get("RENDER_CACHE_ENABLED", "True") == "True"
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "auditoria_render_cache"))
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Tamaño a partir del cual un documento generado sin caché pasa de memoria a disco
+RENDER_SPOOL_MAX_MEMORY = int(os.environ.get("RENDER_SPOOL_MAX_MEMORY", 1024 * 1024))
+# Caché por proceso de plantillas Word/Excel ya parseadas (memoria estimada por proceso de gunicorn)
+TEMPLATE_CACHE_ENABLED = os.environ.get("TEMPLATE_CACHE_ENABLED", "True") == "True"
+TEMPLATE_CACHE_MAX_BYTES = int(os.environ.get("TEMPLATE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Plantillas Word compiladas (`manage.py compile_word_templates` las genera por adelantado)
+COMPILED_DOCX_ENABLED = os.environ.get("COMPILED_DOCX_ENABLED", "True") == "True"
+COMPILED_DOCX_DIR = os.environ.get("COMPILED_DOCX_DIR", os.path.join(tempfile.gettempdir(), "auditoria_compiled_docx"))
+COMPILED_DOCX_MAX_ENTRIES = int(os.environ.get("COMPILED_DOCX_MAX_ENTRIES", 64))
+# Segundos entre comprobaciones de cambios en los archivos JSON de auditoria/config
+CONFIG_CHECK_INTERVAL = int(os.environ.get("CONFIG_CHECK_INTERVAL", 2))
+# Manifiestos de placeholders: solo se visitan las celdas/párrafos/tablas con placeholders
+PLACEHOLDER_MANIFEST_ENABLED = os.environ.get("PLACEHOLDER_MANIFEST_ENABLED", "True") == "True"
+PLACEHOLDER_MANIFEST_DIR = os.environ.get("PLACEHOLDER_MANIFEST_DIR", os.path.join(tempfile.gettempdir(), "auditoria_placeholder_manifests"))
+# Plantillas Excel sin procesador de datos: reemplazos directos sobre sharedStrings
+XLSX_TEXT_FAST_PATH_ENABLED = os.environ.get("XLSX_TEXT_FAST_PATH_ENABLED", "True") == "True"
+# Resultados de plantillas con macros (.xlsm), reutilizados mientras no cambien la plantilla ni los reemplazos
+XLSM_OUTPUT_DIR = os.environ.get("XLSM_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "auditoria_xlsm_outputs"))
+XLSM_OUTPUT_MAX_BYTES = int(os.environ.get("XLSM_OUTPUT_MAX_BYTES", 256 * 1024 * 1024))
+# Segundos entre barridos de temporales huérfanos y antigüedad a partir de la cual se eliminan
+XLSM_OUTPUT_JANITOR_INTERVAL = int(os.environ.get("XLSM_OUTPUT_JANITOR_INTERVAL", 15 * 60))
+XLSM_OUTPUT_ORPHAN_MAX_AGE = int(os.environ.get("XLSM_OUTPUT_ORPHAN_MAX_AGE", 60 * 60))
+# Barrer también las carpetas tmp* con .xlsm que dejaban versiones anteriores en el directorio temporal del sistema
+XLSM_OUTPUT_SWEEP_LEGACY_TEMP = os.environ.get("XLSM_OUTPUT_SWEEP_LEGACY_TEMP", "False") == "True"
+# Procesos usados para generar los documentos de una descarga ZIP
+ARCHIVE_RENDER_WORKERS = int(os.environ.get("ARCHIVE_RENDER_WORKERS", min(2, os.cpu_count() or 1)))
+# Documentos por generar como máximo en un ZIP dentro de la solicitud; por encima se encola (RENDER_JOBS_ENABLED) o se rechaza
+ARCHIVE_MAX_SYNC_ENTRIES = int(os.environ.get("ARCHIVE_MAX_SYNC_ENTRIES", 40))
+# Segundos entre comprobaciones de cambios en las carpetas de plantillas
+TEMPLATE_INDEX_CHECK_INTERVAL = int(os.environ.get("TEMPLATE_INDEX_CHECK_INTERVAL", 5))
+# Tiempos por etapa de cada descarga (una línea de log por documento)
+RENDER_TIMING_ENABLED = os.environ.get("RENDER_TIMING_ENABLED", "True") == "True"
+# Enviar también esos tiempos al cliente en la cabecera Server-Timing
+RENDER_TIMING_HEADER_ENABLED = os.environ.get("RENDER_TIMING_HEADER_ENABLED", "False") == "True"
+# Precarga de bibliotecas, configuración y plantillas en el maestro de gunicorn (start.sh añade --preload)
+TEMPLATE_PRELOAD_ENABLED = os.environ.get("TEMPLATE_PRELOAD_ENABLED", "False") == "True"
+# Generación en segundo plano de plantillas Excel pesadas y ZIP grandes (requiere `manage.py render_worker`)
+RENDER_JOBS_ENABLED = os.environ.get("RENDER_JOBS_ENABLED", "False") == "True"
+RENDER_JOBS_DIR = os.environ.get("RENDER_JOBS_DIR", os.path.join(tempfile.gettempdir(), "auditoria_render_jobs"))
+RENDER_JOB_TIMEOUT = int(os.environ.get("RENDER_JOB_TIMEOUT", 900))
+# Segundos que un trabajo puede esperar a un worker antes de marcarse fallido
+RENDER_JOB_PENDING_TIMEOUT = int(os.environ.get("RENDER_JOB_PENDING_TIMEOUT", 900))
+RENDER_JOB_MAX_ATTEMPTS = int(os.environ.get("RENDER_JOB_MAX_ATTEMPTS", 2))
+RENDER_JOB_RETENTION = int(os.environ.get("RENDER_JOB_RETENTION", 24 * 60 * 60))
+RENDER_WORKER_POLL_INTERVAL = float(os.environ.get("RENDER_WORKER_POLL_INTERVAL", 2))
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
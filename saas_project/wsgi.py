@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saas_project.settings')
 
 application = get_wsgi_application()
+
+# Con gunicorn --preload este módulo se importa en el maestro antes del fork
+if settings.TEMPLATE_PRELOAD_ENABLED:
+    from auditoria.preload import preload_process
+    preload_process()
@@ -4,13 +4,35 @@ set -eu
 echo "Applying database migrations..."
 python manage.py migrate --noinput
 
+echo "Compiling Word templates..."
+python manage.py compile_word_templates || echo "Word template compilation failed, documents will be rendered with python-docx"
+
+if [ "${RENDER_JOBS_ENABLED:-False}" = "True" ]; then
+  echo "Starting background render worker..."
+  # Restart the worker if it dies so queued jobs keep being processed
+  (
+    while true; do
+      python manage.py render_worker || echo "Render worker exited with status $?"
+      echo "Restarting render worker in 5s..."
+      sleep 5
+    done
+  ) &
+fi
+
 WEB_CONCURRENCY=${WEB_CONCURRENCY:-2}
 GUNICORN_TIMEOUT=${GUNICORN_TIMEOUT:-120}
 GUNICORN_GRACEFUL_TIMEOUT=${GUNICORN_GRACEFUL_TIMEOUT:-120}
 GUNICORN_KEEPALIVE=${GUNICORN_KEEPALIVE:-75}
 
+# Preload libraries, config and templates in the master so workers share them copy-on-write
+export TEMPLATE_PRELOAD_ENABLED=${TEMPLATE_PRELOAD_ENABLED:-True}
+GUNICORN_PRELOAD=""
+if [ "${TEMPLATE_PRELOAD_ENABLED}" = "True" ]; then
+  GUNICORN_PRELOAD="--preload"
+fi
+
 echo "Starting Gunicorn on port ${PORT:-10000} with ${WEB_CONCURRENCY} sync workers..."
-exec gunicorn saas_project.wsgi:application \
+exec gunicorn saas_project.wsgi:application ${GUNICORN_PRELOAD} \
   --bind 0.0.0.0:${PORT:-10000} \
   --workers ${WEB_CONCURRENCY} \
   --worker-class sync \